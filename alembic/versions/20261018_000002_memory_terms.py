@@ -0,0 +1,33 @@
+"""memory term index
+
+Revision ID: 20261018_000002
+Revises: 20260227_000001
+Create Date: 2026-10-18 09:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000002"
+down_revision = "20260227_000001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ah_memory_terms",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("memory_id", sa.Integer(), nullable=False),
+        sa.Column("term", sa.String(length=64), nullable=False),
+    )
+    op.create_index("ix_ah_memory_terms_memory_id", "ah_memory_terms", ["memory_id"], unique=False)
+    op.create_index("ix_ah_memory_terms_term_memory", "ah_memory_terms", ["term", "memory_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ah_memory_terms_term_memory", table_name="ah_memory_terms")
+    op.drop_index("ix_ah_memory_terms_memory_id", table_name="ah_memory_terms")
+    op.drop_table("ah_memory_terms")
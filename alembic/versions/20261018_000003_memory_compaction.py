@@ -0,0 +1,49 @@
+"""memory compaction columns and archive table
+
+Revision ID: 20261018_000003
+Revises: 20261018_000002
+Create Date: 2026-10-18 10:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000003"
+down_revision = "20261018_000002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("ah_memory", sa.Column("hit_count", sa.Integer(), nullable=True))
+    op.add_column("ah_memory", sa.Column("last_seen_at", sa.DateTime(), nullable=True))
+    op.add_column("ah_memory", sa.Column("decayed_at", sa.DateTime(), nullable=True))
+
+    op.create_table(
+        "ah_memory_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("memory_id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("source", sa.String(length=64), nullable=True),
+        sa.Column("tags", sa.Text(), nullable=True),
+        sa.Column("importance", sa.Float(), nullable=True),
+        sa.Column("metadata_", sa.Text(), nullable=True),
+        sa.Column("hit_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ah_memory_archive_memory_id", "ah_memory_archive", ["memory_id"], unique=False)
+    op.create_index("ix_ah_memory_archive_archived_at", "ah_memory_archive", ["archived_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ah_memory_archive_archived_at", table_name="ah_memory_archive")
+    op.drop_index("ix_ah_memory_archive_memory_id", table_name="ah_memory_archive")
+    op.drop_table("ah_memory_archive")
+
+    with op.batch_alter_table("ah_memory") as batch:
+        batch.drop_column("decayed_at")
+        batch.drop_column("last_seen_at")
+        batch.drop_column("hit_count")
@@ -0,0 +1,25 @@
+"""memory keyset pagination index
+
+Revision ID: 20261018_000004
+Revises: 20261018_000003
+Create Date: 2026-10-18 11:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000004"
+down_revision = "20261018_000003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ah_memory_created_id", "ah_memory", ["created_at", "id"], unique=False)
+    op.drop_index("ix_ah_memory_created_at", table_name="ah_memory")
+
+
+def downgrade() -> None:
+    op.create_index("ix_ah_memory_created_at", "ah_memory", ["created_at"], unique=False)
+    op.drop_index("ix_ah_memory_created_id", table_name="ah_memory")
@@ -0,0 +1,23 @@
+"""lmf working memory expiry index
+
+Revision ID: 20261018_000005
+Revises: 20261018_000004
+Create Date: 2026-10-18 12:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000005"
+down_revision = "20261018_000004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ah_lmf_working_expires_at", "ah_lmf_working", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ah_lmf_working_expires_at", table_name="ah_lmf_working")
@@ -0,0 +1,33 @@
+"""lmf incremental stats table
+
+Revision ID: 20261018_000006
+Revises: 20261018_000005
+Create Date: 2026-10-18 13:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000006"
+down_revision = "20261018_000005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # rows are seeded lazily by the first stats read (app/lmf/core/stats.py recount)
+    op.create_table(
+        "ah_lmf_stats",
+        sa.Column("layer", sa.String(length=32), primary_key=True),
+        sa.Column("row_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("byte_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("last_write_at", sa.DateTime(), nullable=True),
+        sa.Column("recounted_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ah_lmf_stats")
@@ -0,0 +1,47 @@
+"""lmf episodic cold tier for the consolidator
+
+Revision ID: 20261018_000007
+Revises: 20261018_000006
+Create Date: 2026-10-18 14:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000007"
+down_revision = "20261018_000006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ah_lmf_episodic_cold",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("episodic_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=64), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("source", sa.String(length=64), nullable=True),
+        sa.Column("task_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.Integer(), nullable=True),
+        sa.Column("importance", sa.Float(), nullable=True),
+        sa.Column("tags", sa.Text(), nullable=True),
+        sa.Column("metadata_", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("semantic_id", sa.Integer(), nullable=True),
+        sa.Column("concept", sa.String(length=256), nullable=True),
+        sa.Column("consolidated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ah_lmf_episodic_cold_episodic_id", "ah_lmf_episodic_cold", ["episodic_id"], unique=False)
+    op.create_index("ix_ah_lmf_episodic_cold_semantic_id", "ah_lmf_episodic_cold", ["semantic_id"], unique=False)
+    op.create_index("ix_ah_lmf_episodic_cold_consolidated_at", "ah_lmf_episodic_cold", ["consolidated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ah_lmf_episodic_cold_consolidated_at", table_name="ah_lmf_episodic_cold")
+    op.drop_index("ix_ah_lmf_episodic_cold_semantic_id", table_name="ah_lmf_episodic_cold")
+    op.drop_index("ix_ah_lmf_episodic_cold_episodic_id", table_name="ah_lmf_episodic_cold")
+    op.drop_table("ah_lmf_episodic_cold")
@@ -0,0 +1,36 @@
+"""lmf content-addressed blob index
+
+Revision ID: 20261018_000008
+Revises: 20261018_000007
+Create Date: 2026-10-18 15:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000008"
+down_revision = "20261018_000007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ah_lmf_blobs",
+        sa.Column("digest", sa.String(length=64), primary_key=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("stored_size", sa.BigInteger(), nullable=True),
+        sa.Column("compression", sa.String(length=16), nullable=True),
+        sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("zero_since", sa.DateTime(), nullable=True),
+        sa.Column("last_ref_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ah_lmf_blobs_refcount_zero", "ah_lmf_blobs", ["refcount", "zero_since"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ah_lmf_blobs_refcount_zero", table_name="ah_lmf_blobs")
+    op.drop_table("ah_lmf_blobs")
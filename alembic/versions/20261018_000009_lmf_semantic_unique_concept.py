@@ -0,0 +1,36 @@
+"""lmf semantic unique concept key for native upserts
+
+Revision ID: 20261018_000009
+Revises: 20261018_000008
+Create Date: 2026-10-18 16:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000009"
+down_revision = "20261018_000008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("ah_lmf_semantic", sa.Column("evidence_count", sa.Integer(), nullable=False, server_default="1"))
+    # the old select-then-insert path could race into duplicate concepts: keep the newest row of each
+    op.execute(
+        "DELETE FROM ah_lmf_semantic WHERE id NOT IN "
+        "(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM ah_lmf_semantic GROUP BY concept) AS keep)"
+    )
+    # force the incremental counters to recount the table on next read
+    op.execute("DELETE FROM ah_lmf_stats WHERE layer = 'semantic'")
+    op.create_index("ux_ah_lmf_semantic_concept", "ah_lmf_semantic", ["concept"], unique=True)
+    op.drop_index("ix_ah_lmf_semantic_concept", table_name="ah_lmf_semantic")
+
+
+def downgrade() -> None:
+    op.create_index("ix_ah_lmf_semantic_concept", "ah_lmf_semantic", ["concept"], unique=False)
+    op.drop_index("ux_ah_lmf_semantic_concept", table_name="ah_lmf_semantic")
+    with op.batch_alter_table("ah_lmf_semantic") as batch:
+        batch.drop_column("evidence_count")
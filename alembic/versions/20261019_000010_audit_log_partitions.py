@@ -0,0 +1,59 @@
+"""audit log monthly RANGE partitions (MySQL)
+
+Revision ID: 20261019_000010
+Revises: 20261018_000009
+Create Date: 2026-10-19 09:00:00
+
+MySQL only: ah_audit_log becomes RANGE COLUMNS(created_at) partitioned with
+p_history (everything before this month), pYYYYMM (this month) and pmax.
+The partition key must be part of every unique key, so the primary key
+becomes (id, created_at) and created_at NOT NULL.  The audit partition roll
+(app/security/audit_partitions.py) adds the following months ahead of time
+and drops a month's partition once it is archived.  Other dialects keep the
+single table; the roll deletes archived months from it in batches.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_000010"
+down_revision = "20261018_000009"
+branch_labels = None
+depends_on = None
+
+
+def _month_bounds() -> tuple[str, str, str]:
+    now = datetime.utcnow()
+    start = datetime(now.year, now.month, 1)
+    nxt = datetime(now.year + (now.month == 12), now.month % 12 + 1, 1)
+    return f"p{start:%Y%m}", f"{start:%Y-%m-%d %H:%M:%S}", f"{nxt:%Y-%m-%d %H:%M:%S}"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    name, start, nxt = _month_bounds()
+    op.execute("UPDATE ah_audit_log SET created_at = UTC_TIMESTAMP() WHERE created_at IS NULL")
+    op.execute(
+        "ALTER TABLE ah_audit_log MODIFY created_at DATETIME NOT NULL, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    )
+    op.execute(
+        "ALTER TABLE ah_audit_log PARTITION BY RANGE COLUMNS(created_at) ("
+        f"PARTITION p_history VALUES LESS THAN ('{start}'), "
+        f"PARTITION {name} VALUES LESS THAN ('{nxt}'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    op.execute("ALTER TABLE ah_audit_log REMOVE PARTITIONING")
+    op.execute(
+        "ALTER TABLE ah_audit_log DROP PRIMARY KEY, ADD PRIMARY KEY (id), "
+        "MODIFY created_at DATETIME NULL"
+    )
@@ -0,0 +1,40 @@
+"""composite indexes for hot query shapes
+
+Revision ID: 20261019_000011
+Revises: 20261019_000010
+Create Date: 2026-10-19 10:00:00
+
+Generated by scripts/index_advisor.py from the built-in hot query workload
+(audit by action, session tasks by status, active goals by priority, memory
+hot set).  The single-column indexes dropped here are left-prefixes of the
+new composites.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_000011"
+down_revision = "20261019_000010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ah_audit_log_action_created_at", "ah_audit_log", ["action", "created_at"], unique=False)
+    op.create_index("ix_ah_tasks_session_id_status", "ah_tasks", ["session_id", "status"], unique=False)
+    op.create_index("ix_ah_goals_status_priority", "ah_goals", ["status", "priority"], unique=False)
+    op.create_index("ix_ah_memory_importance_created_at", "ah_memory", ["importance", "created_at"], unique=False)
+    op.drop_index("ix_ah_tasks_session_id", table_name="ah_tasks")
+    op.drop_index("ix_ah_goals_status", table_name="ah_goals")
+    op.drop_index("ix_ah_memory_importance", table_name="ah_memory")
+
+
+def downgrade() -> None:
+    op.create_index("ix_ah_tasks_session_id", "ah_tasks", ["session_id"], unique=False)
+    op.create_index("ix_ah_goals_status", "ah_goals", ["status"], unique=False)
+    op.create_index("ix_ah_memory_importance", "ah_memory", ["importance"], unique=False)
+    op.drop_index("ix_ah_memory_importance_created_at", table_name="ah_memory")
+    op.drop_index("ix_ah_goals_status_priority", table_name="ah_goals")
+    op.drop_index("ix_ah_tasks_session_id_status", table_name="ah_tasks")
+    op.drop_index("ix_ah_audit_log_action_created_at", table_name="ah_audit_log")
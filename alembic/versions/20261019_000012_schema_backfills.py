@@ -0,0 +1,38 @@
+"""online migration backfill progress
+
+Revision ID: 20261019_000012
+Revises: 20261019_000011
+Create Date: 2026-10-19 11:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_000012"
+down_revision = "20261019_000011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ah_schema_backfills",
+        sa.Column("name", sa.String(length=128), primary_key=True, nullable=False),
+        sa.Column("table_name", sa.String(length=128), nullable=False),
+        sa.Column("phase", sa.String(length=16), nullable=False, server_default="pending"),
+        sa.Column("last_key", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("rows_done", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("batches", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("owner", sa.String(length=128), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ah_schema_backfills")
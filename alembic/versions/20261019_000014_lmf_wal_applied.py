@@ -0,0 +1,30 @@
+"""lmf wal_id -> applied row map for idempotent WAL replay
+
+Revision ID: 20261019_000014
+Revises: 20261019_000012
+Create Date: 2026-10-19 14:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_000014"
+down_revision = "20261019_000012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ah_lmf_wal_applied",
+        sa.Column("wal_id", sa.String(length=64), primary_key=True),
+        sa.Column("layer", sa.String(length=32), nullable=False),
+        sa.Column("row_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ah_lmf_wal_applied")
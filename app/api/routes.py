@@ -176,7 +176,77 @@ async def metrics():
     from ..config import settings
     if not settings.enable_metrics:
         raise service_unavailable("METRICS_DISABLED", "Metrics are disabled")
-    return PlainTextResponse(telemetry.as_prometheus(), media_type="text/plain; version=0.0.4")
+    from ..db.session import pool_monitor
+    pool_monitor.report_leaks()
+    body = telemetry.as_prometheus()
+    if settings.db_profile:
+        from ..db.profiler import query_profiler
+        body += query_profiler.as_prometheus()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@router.get("/admin/db/pool", tags=["system"])
+async def db_pool_status(older_than_s: Optional[float] = Query(None, ge=0)):
+    """Connection-pool occupancy per engine and connections held past the leak threshold."""
+    from ..db.replica import replica_monitor
+    from ..db.session import pool_monitor
+    out = pool_monitor.status()
+    if older_than_s is not None:
+        out["leaks"] = pool_monitor.leaks(older_than_s)
+    out["replica"] = replica_monitor.status()
+    return out
+
+
+@router.get("/admin/db/profile", tags=["system"])
+async def db_profile(
+    top: int = Query(20, ge=1, le=500),
+    sort: str = Query("total", pattern="^(total|count|max|avg|rows)$"),
+):
+    """Top statement fingerprints, queries per request / OODA run / cron job, and N+1 suspects."""
+    from ..db.profiler import query_profiler
+    return query_profiler.snapshot(top=top, sort=sort)
+
+
+@router.post("/admin/db/profile/reset", tags=["system"])
+async def db_profile_reset():
+    from ..db.profiler import query_profiler
+    query_profiler.reset()
+    return {"reset": True}
+
+
+@router.get("/admin/db/index-advice", tags=["system"])
+async def db_index_advice(top: int = Query(50, ge=1, le=500)):
+    """Composite / covering index proposals for the heaviest profiled statements (scripts/index_advisor.py to benchmark)."""
+    from ..db.index_advisor import advise, load_workload
+    from ..db.profiler import query_profiler
+    snap = query_profiler.snapshot(top=top, sort="total")
+    return advise(load_workload(snap))
+
+
+@router.get("/admin/db/backfills", tags=["system"])
+async def db_backfills():
+    """Registered online-migration backfills and their progress (run them with scripts/online_migrate.py)."""
+    from ..db.aio import run_db
+    from ..db.online_migration import online_migrator
+    return await run_db(online_migrator.status)
+
+
+@router.get("/admin/db/backfills/{name}/estimate", tags=["system"])
+async def db_backfill_estimate(name: str, batch_size: Optional[int] = Query(None, ge=1, le=100_000),
+                               sample: bool = True):
+    """Dry run: rows and chunks left, and the time one chunk takes in a rolled-back transaction."""
+    from ..db.aio import run_db
+    from ..db.online_migration import BACKFILLS, online_migrator
+    if name not in BACKFILLS:
+        raise not_found("BACKFILL_NOT_FOUND", "Backfill not registered", {"name": name})
+    return await run_db(lambda: online_migrator.estimate(name, batch_size=batch_size, sample=sample))
+
+
+@router.get("/admin/db/counters", tags=["system"])
+async def db_counters():
+    """Buffered counter increments, flush totals and the last flush."""
+    from ..db.counters import counter_coalescer
+    return counter_coalescer.status()
 
 
 @router.get("/telemetry", tags=["system"])
@@ -383,14 +453,14 @@ async def agent_run(req: AgentRunReq):
 
 @router.get("/agent/tasks", tags=["agent"])
 async def list_tasks(limit: int = 20):
-    from ..runtime.lifecycle import lifecycle
-    return {"tasks": lifecycle.tasks.list_recent(limit)}
+    from ..db.repositories import tasks
+    return {"tasks": await tasks.list_recent(limit)}
 
 
 @router.get("/agent/tasks/{task_id}", tags=["agent"])
 async def get_task(task_id: int):
-    from ..runtime.lifecycle import lifecycle
-    t = lifecycle.tasks.get(task_id)
+    from ..db.repositories import tasks
+    t = await tasks.get(task_id)
     if not t:
         raise not_found("TASK_NOT_FOUND", "Task not found", {"task_id": task_id})
     return t
@@ -429,38 +499,29 @@ async def invoke_skill(req: SkillInvokeReq, request: Request):
 
 @router.get("/goals", tags=["goals"])
 async def list_goals(status: Optional[str] = None):
-    from ..loop.goal_tracker import goal_tracker
-    return {"goals": goal_tracker.list_active() if status == "active"
-            else goal_tracker.list_all()}
+    from ..db.repositories import goals
+    return {"goals": await goals.list(active_only=status == "active")}
 
 
 @router.post("/goals", tags=["goals"])
 async def create_goal(req: GoalCreateReq):
-    from ..loop.goal_tracker import goal_tracker
-    gid = goal_tracker.create(req.title, req.description,
-                               req.priority, req.context)
+    from ..db.repositories import goals
+    gid = await goals.create(req.title, req.description, req.priority, req.context)
     return {"goal_id": gid}
 
 
 @router.patch("/goals/{goal_id}", tags=["goals"])
 async def update_goal(goal_id: int, req: GoalUpdateReq):
-    from ..loop.goal_tracker import goal_tracker
-    g = goal_tracker.get(goal_id)
-    if not g:
+    from ..db.repositories import goals
+    if not await goals.get(goal_id):
         raise not_found("GOAL_NOT_FOUND", "Goal not found", {"goal_id": goal_id})
-    if req.progress is not None:
-        goal_tracker.update_progress(goal_id, req.progress, req.notes)
-    if req.status == "paused":    goal_tracker.pause(goal_id)
-    elif req.status == "active":  goal_tracker.resume(goal_id)
-    elif req.status == "abandoned": goal_tracker.abandon(goal_id)
-    elif req.status == "completed": goal_tracker.complete(goal_id)
-    return goal_tracker.get(goal_id)
+    return await goals.update(goal_id, progress=req.progress, notes=req.notes, status=req.status)
 
 
 @router.delete("/goals/{goal_id}", tags=["goals"])
 async def delete_goal(goal_id: int):
-    from ..loop.goal_tracker import goal_tracker
-    goal_tracker.abandon(goal_id)
+    from ..db.repositories import goals
+    await goals.abandon(goal_id)
     return {"status": "abandoned", "goal_id": goal_id}
 
 
@@ -468,21 +529,21 @@ async def delete_goal(goal_id: int):
 
 @router.get("/sessions", tags=["sessions"])
 async def list_sessions():
-    from ..runtime.lifecycle import lifecycle
-    return {"sessions": lifecycle.sessions.list_active()}
+    from ..db.repositories import sessions
+    return {"sessions": await sessions.list_active()}
 
 
 @router.post("/sessions", tags=["sessions"])
 async def create_session(req: SessionCreateReq):
-    from ..runtime.lifecycle import lifecycle
-    sid = lifecycle.sessions.create(req.name, req.context)
+    from ..db.repositories import sessions
+    sid = await sessions.create(req.name, req.context)
     return {"session_id": sid}
 
 
 @router.delete("/sessions/{session_id}", tags=["sessions"])
 async def end_session(session_id: int):
-    from ..runtime.lifecycle import lifecycle
-    lifecycle.sessions.end(session_id)
+    from ..db.repositories import sessions
+    await sessions.end(session_id)
     return {"status": "ended", "session_id": session_id}
 
 
@@ -491,24 +552,62 @@ async def end_session(session_id: int):
 @router.get("/memory/search", tags=["memory"])
 async def search_memory(q: str, top_k: int = 5, tags: Optional[str] = None,
                         min_importance: float = 0.0, source: Optional[str] = None):
-    from ..memory.store import memory_store
+    from ..db.repositories import memory
     tag_list = [t.strip() for t in (tags or "").split(",") if t.strip()]
-    return {"results": memory_store.query(q, top_k=top_k, tags=tag_list or None,
-                                           min_importance=min_importance, source=source)}
+    return {"results": await memory.query(q, top_k=top_k, tags=tag_list or None,
+                                          min_importance=min_importance, source=source)}
 
 
 @router.post("/memory", tags=["memory"])
 async def add_memory(req: MemoryAddReq):
-    from ..memory.store import memory_store
-    mid = memory_store.add(req.content, req.source, req.tags,
-                            req.importance, req.metadata)
+    from ..db.repositories import memory
+    mid = await memory.add(req.content, req.source, req.tags, req.importance, req.metadata)
     return {"memory_id": mid}
 
 
 @router.get("/memory/recent", tags=["memory"])
 async def recent_memory(limit: int = 10):
+    from ..db.repositories import memory
+    return {"items": await memory.recent(limit)}
+
+
+@router.get("/memory", tags=["memory"])
+async def list_memory(limit: int = 50, cursor: Optional[str] = None, source: Optional[str] = None):
+    """Keyset-paginated listing, newest first; pass back `next_cursor` for the next page."""
+    from ..db.repositories import memory
+    try:
+        return await memory.page(limit=limit, cursor=cursor, source=source)
+    except ValueError as e:
+        raise bad_request("INVALID_CURSOR", str(e), {"cursor": cursor})
+
+
+@router.get("/memory/export", tags=["memory"])
+def export_memory(source: Optional[str] = None):
+    """Stream the whole memory corpus as NDJSON (one object per line)."""
+    import json
+    from fastapi.responses import StreamingResponse
     from ..memory.store import memory_store
-    return {"items": memory_store.get_recent(limit)}
+    lines = (json.dumps(item, ensure_ascii=False) + "\n" for item in memory_store.iter_export(source=source))
+    return StreamingResponse(lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="memory.ndjson"'})
+
+
+@router.get("/memory/compaction", tags=["memory"])
+async def memory_compaction_status():
+    """Compaction policy, scheduler state and last run summary."""
+    from ..memory.compaction import memory_compactor
+    return memory_compactor.status()
+
+
+@router.post("/memory/compaction/run", tags=["memory"])
+async def memory_compaction_run():
+    """Run one compaction pass now (dedup → decay → archive)."""
+    from ..memory.compaction import memory_compactor
+    try:
+        return memory_compactor.run_once()
+    except Exception as e:
+        logger.exception("memory compaction run failed")
+        raise internal_error("MEMORY_COMPACTION_FAILED", "Memory compaction failed", {"reason": str(e)})
 
 
 # ── Cron ──────────────────────────────────────────────────────────────────────
@@ -582,6 +681,11 @@ class LMFSemanticAddReq(BaseModel):
     metadata: dict = Field(default_factory=dict)
 
 
+class LMFSemanticBulkReq(BaseModel):
+    items: list[LMFSemanticAddReq]
+    merge: bool = True
+
+
 class LMFWorkingSetReq(BaseModel):
     task_id: int
     key: str
@@ -589,6 +693,31 @@ class LMFWorkingSetReq(BaseModel):
     ttl_seconds: Optional[int] = None
 
 
+class LMFCausalNodeReq(BaseModel):
+    node_type: str
+    description: str
+    ref: Optional[str] = None
+    parent_id: Optional[int] = None
+    parent_ref: Optional[str] = None
+    confidence: float = 1.0
+    evidence: list = Field(default_factory=list)
+    task_id: Optional[int] = None
+    metadata: dict = Field(default_factory=dict)
+
+
+class LMFCausalNodesReq(BaseModel):
+    nodes: list[LMFCausalNodeReq]
+
+
+class LMFCausalEdge(BaseModel):
+    effect_id: int
+    cause_id: Optional[int] = None
+
+
+class LMFCausalEdgesReq(BaseModel):
+    edges: list[LMFCausalEdge]
+
+
 def _require_lmf():
     from ..config import settings
     if not settings.enable_lmf:
@@ -632,6 +761,18 @@ async def lmf_add_semantic(req: LMFSemanticAddReq):
     return {"memory_id": mid}
 
 
+@router.post("/lmf/semantic/bulk", tags=["lmf"])
+async def lmf_bulk_semantic(req: LMFSemanticBulkReq):
+    """Bulk-import semantic concepts with native upserts (merge=true keeps the higher confidence); not WAL-logged."""
+    _require_lmf()
+    if len(req.items) > 10_000:
+        raise bad_request("SEMANTIC_BATCH_TOO_LARGE", "At most 10000 items per request",
+                          {"items": len(req.items)})
+    from ..lmf.core.stores import get_semantic_store
+    ids = get_semantic_store().upsert_many([i.model_dump() for i in req.items], merge=req.merge)
+    return {"memory_ids": ids, "count": len(ids)}
+
+
 @router.get("/lmf/semantic", tags=["lmf"])
 async def lmf_search_semantic(q: str = "", limit: int = 20):
     """Search semantic memory."""
@@ -683,14 +824,172 @@ async def lmf_search_procedural(skill_name: str = "", outcome: str = "", limit:
     return {"results": results}
 
 
+@router.post("/lmf/causal/nodes", tags=["lmf"])
+async def lmf_causal_add_nodes(req: LMFCausalNodesReq):
+    """Insert causal nodes in one batch; parent_ref links nodes within the batch."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    try:
+        ids = get_causal_graph().add_nodes([n.model_dump() for n in req.nodes])
+    except ValueError as e:
+        raise bad_request("INVALID_CAUSAL_BATCH", str(e))
+    return {"ids": ids}
+
+
+@router.post("/lmf/causal/edges", tags=["lmf"])
+async def lmf_causal_add_edges(req: LMFCausalEdgesReq):
+    """Set cause → effect links in one transaction (cause_id null detaches a node)."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    try:
+        applied = get_causal_graph().add_edges([(e.effect_id, e.cause_id) for e in req.edges])
+    except LookupError as e:
+        raise not_found("CAUSAL_NODE_NOT_FOUND", str(e))
+    except ValueError as e:
+        raise bad_request("INVALID_CAUSAL_EDGE", str(e))
+    return {"applied": applied}
+
+
+@router.get("/lmf/causal/path", tags=["lmf"])
+async def lmf_causal_path(from_id: int, to_id: int, max_depth: Optional[int] = None):
+    """Shortest causal path between two nodes (through their lowest common ancestor)."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    path = get_causal_graph().shortest_path(from_id, to_id, max_depth)
+    if path is None:
+        raise not_found("CAUSAL_PATH_NOT_FOUND", "Nodes are not causally connected",
+                        {"from_id": from_id, "to_id": to_id})
+    return {"path": path, "length": len(path) - 1}
+
+
+@router.get("/lmf/causal/{node_id}/ancestors", tags=["lmf"])
+async def lmf_causal_ancestors(node_id: int, max_depth: Optional[int] = None):
+    """Root-cause chain of a node, nearest cause first (single query)."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    chain = get_causal_graph().ancestors(node_id, max_depth)
+    if not chain:
+        raise not_found("CAUSAL_NODE_NOT_FOUND", "Causal node not found", {"node_id": node_id})
+    return {"node_id": node_id, "ancestors": chain[1:], "root_id": chain[-1]["id"]}
+
+
+@router.get("/lmf/causal/{node_id}/descendants", tags=["lmf"])
+async def lmf_causal_descendants(node_id: int, max_depth: Optional[int] = None, limit: int = 1000):
+    """Effects downstream of a node, breadth-first."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    tree = get_causal_graph().descendants(node_id, max_depth, limit)
+    if not tree:
+        raise not_found("CAUSAL_NODE_NOT_FOUND", "Causal node not found", {"node_id": node_id})
+    return {"node_id": node_id, "descendants": tree[1:]}
+
+
+@router.get("/lmf/causal/{node_id}/subgraph", tags=["lmf"])
+async def lmf_causal_subgraph(node_id: int, up: Optional[int] = None, down: Optional[int] = None,
+                              limit: int = 1000):
+    """Export the causal neighbourhood of a node as {nodes, edges}."""
+    _require_lmf()
+    from ..lmf.core.causal import get_causal_graph
+    graph = get_causal_graph().subgraph(node_id, up, down, limit)
+    if not graph["nodes"]:
+        raise not_found("CAUSAL_NODE_NOT_FOUND", "Causal node not found", {"node_id": node_id})
+    return graph
+
+
+@router.get("/lmf/blobs/stats", tags=["lmf"])
+async def lmf_blob_stats():
+    """Blob store totals and GC state."""
+    _require_lmf()
+    from ..lmf.core.blob_store import get_blob_store, lmf_blob_collector
+    return {"enabled": settings.enable_lmf_blob, "store": get_blob_store().stats(),
+            "gc": lmf_blob_collector.status()}
+
+
+@router.post("/lmf/blobs/gc", tags=["lmf"])
+async def lmf_blob_gc():
+    """Collect unreferenced blobs past their grace period now."""
+    _require_lmf()
+    from ..lmf.core.blob_store import lmf_blob_collector
+    try:
+        return lmf_blob_collector.run_once()
+    except Exception as e:
+        logger.exception("LMF blob GC failed")
+        raise internal_error("LMF_BLOB_GC_FAILED", "LMF blob GC failed", {"reason": str(e)})
+
+
+@router.get("/lmf/blobs/{digest}", tags=["lmf"])
+def lmf_blob_read(digest: str, offset: int = Query(0, ge=0), length: Optional[int] = Query(None, ge=0)):
+    """Read a blob, or the byte range [offset, offset+length) of it."""
+    _require_lmf()
+    from fastapi.responses import Response
+    from ..lmf.core.blob_store import BlobNotFound, get_blob_store
+    try:
+        data = get_blob_store().read_range(digest, offset, length)
+    except ValueError as e:
+        raise bad_request("INVALID_BLOB_DIGEST", str(e), {"digest": digest})
+    except BlobNotFound:
+        raise not_found("BLOB_NOT_FOUND", "Blob not found", {"digest": digest})
+    return Response(content=data, media_type="application/octet-stream",
+                    headers={"X-Blob-Digest": digest, "X-Blob-Offset": str(offset)})
+
+
+@router.get("/lmf/wal/recovery", tags=["lmf"])
+async def lmf_wal_recovery():
+    """Return the WAL crash-recovery report from the last startup."""
+    _require_lmf()
+    from ..lmf.core.recovery import last_recovery_report
+    from ..lmf.core.wal import get_wal_manager
+    wal = get_wal_manager() if settings.enable_lmf_wal else None
+    return {
+        "enabled": settings.enable_lmf_wal,
+        "last_recovery": last_recovery_report(),
+        "wal": wal.stats() if wal else None,
+    }
+
+
 @router.get("/lmf/stats", tags=["lmf"])
-async def lmf_stats():
-    """Return row counts across all LMF tiers."""
+async def lmf_stats(detail: bool = False):
+    """Return row counts across all LMF tiers (detail=true adds bytes and last-write times)."""
     _require_lmf()
     from ..lmf.core.stores import get_lmf_stats
+    if detail:
+        from ..lmf.core.stats import lmf_stats_reconciler
+        return {"stats": get_lmf_stats(detail=True), "recount": lmf_stats_reconciler.status()}
     return {"stats": get_lmf_stats()}
 
 
+@router.get("/lmf/consolidator", tags=["lmf"])
+async def lmf_consolidator_status():
+    """Return consolidator policy, schedule state and the last run summary."""
+    _require_lmf()
+    from ..lmf.core.consolidator import lmf_consolidator
+    return lmf_consolidator.status()
+
+
+@router.post("/lmf/consolidator/run", tags=["lmf"])
+async def lmf_consolidator_run():
+    """Run one bounded consolidation pass now (episodic → semantic, sources to cold tier)."""
+    _require_lmf()
+    from ..lmf.core.consolidator import lmf_consolidator
+    try:
+        return lmf_consolidator.run_once()
+    except Exception as e:
+        logger.exception("LMF consolidation run failed")
+        raise internal_error("LMF_CONSOLIDATION_FAILED", "LMF consolidation failed", {"reason": str(e)})
+
+
+@router.post("/lmf/stats/recount", tags=["lmf"])
+async def lmf_stats_recount():
+    """Recount every LMF tier now and overwrite the incremental counters."""
+    _require_lmf()
+    from ..lmf.core.stats import lmf_stats_reconciler
+    try:
+        return lmf_stats_reconciler.run_once()
+    except Exception as e:
+        logger.exception("LMF stats recount failed")
+        raise internal_error("LMF_STATS_RECOUNT_FAILED", "LMF stats recount failed", {"reason": str(e)})
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  Planner  (feature-gated: ENABLE_PLANNER=true)
 # ══════════════════════════════════════════════════════════════════════════════
@@ -849,20 +1148,8 @@ async def notifications_status():
 #  Governor / Audit  (always available)
 # ══════════════════════════════════════════════════════════════════════════════
 
-@router.get("/audit/summary", tags=["governor"])
-async def audit_summary(
-    decision: Optional[str] = None,
-    action: Optional[str] = None,
-    action_prefix: Optional[str] = None,
-    risk_score_min: Optional[int] = Query(None, ge=0, le=100),
-    risk_score_max: Optional[int] = Query(None, ge=0, le=100),
-    created_after: Optional[datetime] = None,
-    created_before: Optional[datetime] = None,
-):
-    """Return aggregate audit stats for current filters."""
-    from ..db.schema import SessionLocal, AHAuditLog
-    from sqlalchemy import desc
-
+def _audit_filters(decision, action, action_prefix, risk_score_min, risk_score_max,
+                   created_after, created_before) -> dict[str, Any]:
     if risk_score_min is not None and risk_score_max is not None and risk_score_min > risk_score_max:
         raise bad_request(
             "AUDIT_INVALID_RISK_RANGE",
@@ -878,65 +1165,36 @@ async def audit_summary(
                 "created_before": created_before.isoformat(),
             },
         )
+    return {
+        "decision": decision, "action": action, "action_prefix": action_prefix,
+        "risk_score_min": risk_score_min, "risk_score_max": risk_score_max,
+        "created_after": created_after, "created_before": created_before,
+    }
 
-    db = SessionLocal()
-    try:
-        q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
-        if decision:
-            q = q.filter(AHAuditLog.decision == decision.upper())
-        if action:
-            q = q.filter(AHAuditLog.action == action)
-        if action_prefix:
-            q = q.filter(AHAuditLog.action.like(f"{action_prefix}%"))
-        if risk_score_min is not None:
-            q = q.filter(AHAuditLog.risk_score >= risk_score_min)
-        if risk_score_max is not None:
-            q = q.filter(AHAuditLog.risk_score <= risk_score_max)
-        if created_after:
-            q = q.filter(AHAuditLog.created_at >= created_after)
-        if created_before:
-            q = q.filter(AHAuditLog.created_at <= created_before)
-        rows = q.all()
-
-        by_decision: dict[str, int] = {}
-        by_action: dict[str, int] = {}
-        risk_buckets = {"low": 0, "medium": 0, "high": 0, "critical": 0}
-        for r in rows:
-            d = str(r.decision or "UNKNOWN")
-            by_decision[d] = by_decision.get(d, 0) + 1
-            a = str(r.action or "unknown")
-            by_action[a] = by_action.get(a, 0) + 1
-            score = int(r.risk_score or 0)
-            if score >= 90:
-                risk_buckets["critical"] += 1
-            elif score >= 70:
-                risk_buckets["high"] += 1
-            elif score >= 40:
-                risk_buckets["medium"] += 1
-            else:
-                risk_buckets["low"] += 1
-
-        latest_created_at = rows[0].created_at.isoformat() if rows else None
-        return {
-            "summary": {
-                "total": len(rows),
-                "by_decision": by_decision,
-                "by_action": by_action,
-                "risk_buckets": risk_buckets,
-                "latest_created_at": latest_created_at,
-            },
-            "filters": {
-                "decision": decision.upper() if decision else None,
-                "action": action,
-                "action_prefix": action_prefix,
-                "risk_score_min": risk_score_min,
-                "risk_score_max": risk_score_max,
-                "created_after": created_after.isoformat() if created_after else None,
-                "created_before": created_before.isoformat() if created_before else None,
-            },
-        }
-    finally:
-        db.close()
+
+def _echo_filters(filters: dict[str, Any]) -> dict[str, Any]:
+    out = dict(filters)
+    out["decision"] = filters["decision"].upper() if filters.get("decision") else None
+    for key in ("created_after", "created_before"):
+        out[key] = filters[key].isoformat() if filters.get(key) else None
+    return out
+
+
+@router.get("/audit/summary", tags=["governor"])
+async def audit_summary(
+    decision: Optional[str] = None,
+    action: Optional[str] = None,
+    action_prefix: Optional[str] = None,
+    risk_score_min: Optional[int] = Query(None, ge=0, le=100),
+    risk_score_max: Optional[int] = Query(None, ge=0, le=100),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    """Return aggregate audit stats for current filters."""
+    from ..db.repositories import audit
+    filters = _audit_filters(decision, action, action_prefix, risk_score_min, risk_score_max,
+                             created_after, created_before)
+    return {"summary": await audit.summary(**filters), "filters": _echo_filters(filters)}
 
 
 @router.get("/audit", tags=["governor"])
@@ -952,66 +1210,11 @@ async def audit_log(
     created_before: Optional[datetime] = None,
 ):
     """Query the governor audit log."""
-    from ..db.schema import SessionLocal, AHAuditLog
-    from sqlalchemy import desc
-
-    if risk_score_min is not None and risk_score_max is not None and risk_score_min > risk_score_max:
-        raise bad_request(
-            "AUDIT_INVALID_RISK_RANGE",
-            "risk_score_min cannot be greater than risk_score_max",
-            {"risk_score_min": risk_score_min, "risk_score_max": risk_score_max},
-        )
-    if created_after and created_before and created_after > created_before:
-        raise bad_request(
-            "AUDIT_INVALID_DATE_RANGE",
-            "created_after cannot be later than created_before",
-            {
-                "created_after": created_after.isoformat(),
-                "created_before": created_before.isoformat(),
-            },
-        )
-
-    db = SessionLocal()
-    try:
-        q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
-        if decision:
-            q = q.filter(AHAuditLog.decision == decision.upper())
-        if action:
-            q = q.filter(AHAuditLog.action == action)
-        if action_prefix:
-            q = q.filter(AHAuditLog.action.like(f"{action_prefix}%"))
-        if risk_score_min is not None:
-            q = q.filter(AHAuditLog.risk_score >= risk_score_min)
-        if risk_score_max is not None:
-            q = q.filter(AHAuditLog.risk_score <= risk_score_max)
-        if created_after:
-            q = q.filter(AHAuditLog.created_at >= created_after)
-        if created_before:
-            q = q.filter(AHAuditLog.created_at <= created_before)
-        rows = q.offset(offset).limit(limit).all()
-        return {
-            "entries": [
-                {
-                    "id": r.id, "action": r.action, "decision": r.decision,
-                    "risk_score": r.risk_score, "reason": r.reason,
-                    "created_at": r.created_at.isoformat(),
-                }
-                for r in rows
-            ],
-            "filters": {
-                "limit": limit,
-                "offset": offset,
-                "decision": decision.upper() if decision else None,
-                "action": action,
-                "action_prefix": action_prefix,
-                "risk_score_min": risk_score_min,
-                "risk_score_max": risk_score_max,
-                "created_after": created_after.isoformat() if created_after else None,
-                "created_before": created_before.isoformat() if created_before else None,
-            },
-        }
-    finally:
-        db.close()
+    from ..db.repositories import audit
+    filters = _audit_filters(decision, action, action_prefix, risk_score_min, risk_score_max,
+                             created_after, created_before)
+    entries = await audit.list(limit=limit, offset=offset, **filters)
+    return {"entries": entries, "filters": {"limit": limit, "offset": offset, **_echo_filters(filters)}}
 
 
 @router.get("/audit/actions", tags=["governor"])
@@ -1019,44 +1222,16 @@ async def audit_actions(
     decision: Optional[str] = None,
     action_prefix: Optional[str] = None,
 ):
-    from ..db.schema import SessionLocal, AHAuditLog
-    from sqlalchemy import desc
-
-    db = SessionLocal()
-    try:
-        q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
-        if decision:
-            q = q.filter(AHAuditLog.decision == decision.upper())
-        if action_prefix:
-            q = q.filter(AHAuditLog.action.like(f"{action_prefix}%"))
-        rows = q.all()
-        counts: dict[str, int] = {}
-        for r in rows:
-            a = str(r.action or "unknown")
-            counts[a] = counts.get(a, 0) + 1
-        return {"actions": [{"action": k, "count": counts[k]} for k in sorted(counts)], "filters": {"decision": decision.upper() if decision else None, "action_prefix": action_prefix}}
-    finally:
-        db.close()
+    from ..db.repositories import audit
+    counts = await audit.count_by("action", decision=decision, action_prefix=action_prefix)
+    return {"actions": [{"action": k, "count": counts[k]} for k in sorted(counts)], "filters": {"decision": decision.upper() if decision else None, "action_prefix": action_prefix}}
 
 
 @router.get("/audit/decisions", tags=["governor"])
 async def audit_decisions(action: Optional[str] = None):
-    from ..db.schema import SessionLocal, AHAuditLog
-    from sqlalchemy import desc
-
-    db = SessionLocal()
-    try:
-        q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
-        if action:
-            q = q.filter(AHAuditLog.action == action)
-        rows = q.all()
-        counts: dict[str, int] = {}
-        for r in rows:
-            d = str(r.decision or "UNKNOWN")
-            counts[d] = counts.get(d, 0) + 1
-        return {"decisions": [{"decision": k, "count": counts[k]} for k in sorted(counts)], "filters": {"action": action}}
-    finally:
-        db.close()
+    from ..db.repositories import audit
+    counts = await audit.count_by("decision", action=action)
+    return {"decisions": [{"decision": k, "count": counts[k]} for k in sorted(counts)], "filters": {"action": action}}
 
 
 @router.get("/audit/export", tags=["governor"])
@@ -1068,37 +1243,15 @@ async def audit_export(
     action: Optional[str] = None,
     action_prefix: Optional[str] = None,
 ):
-    from ..db.schema import SessionLocal, AHAuditLog
-    from sqlalchemy import desc
+    from ..db.repositories import audit
     import json
 
-    db = SessionLocal()
-    try:
-        q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
-        if decision:
-            q = q.filter(AHAuditLog.decision == decision.upper())
-        if action:
-            q = q.filter(AHAuditLog.action == action)
-        if action_prefix:
-            q = q.filter(AHAuditLog.action.like(f"{action_prefix}%"))
-        rows = q.offset(offset).limit(limit).all()
-        items = []
-        for r in rows:
-            items.append({
-                "id": getattr(r, "id", None),
-                "action": r.action,
-                "decision": r.decision,
-                "risk_score": r.risk_score,
-                "reason": getattr(r, "reason", None),
-                "context": getattr(r, "context_json", None),
-                "created_at": r.created_at.isoformat() if getattr(r, "created_at", None) else None,
-            })
-        if format == "json":
-            return {"items": items, "count": len(items), "filters": {"limit": limit, "offset": offset, "decision": decision.upper() if decision else None, "action": action, "action_prefix": action_prefix}}
-        body = "\n".join(json.dumps(x, ensure_ascii=False) for x in items)
-        return PlainTextResponse(body, media_type="application/x-ndjson")
-    finally:
-        db.close()
+    items = await audit.export(limit=limit, offset=offset, decision=decision, action=action,
+                               action_prefix=action_prefix)
+    if format == "json":
+        return {"items": items, "count": len(items), "filters": {"limit": limit, "offset": offset, "decision": decision.upper() if decision else None, "action": action, "action_prefix": action_prefix}}
+    body = "\n".join(json.dumps(x, ensure_ascii=False) for x in items)
+    return PlainTextResponse(body, media_type="application/x-ndjson")
 
 
 @router.post("/audit/archive", tags=["governor"])
@@ -1107,6 +1260,21 @@ async def audit_archive_roll():
     return archive_snapshot()
 
 
+@router.get("/audit/partitions", tags=["governor"])
+async def audit_partitions_status():
+    """Hot-window boundary, archived monthly segments and the last roll."""
+    from ..security.audit_partitions import audit_partitioner
+    return audit_partitioner.status()
+
+
+@router.post("/audit/partitions/roll", tags=["governor"])
+async def audit_partitions_roll():
+    """Archive every month older than the hot window now and apply retention."""
+    from ..db.aio import run_db
+    from ..security.audit_partitions import audit_partitioner
+    return await run_db(audit_partitioner.run_once)
+
+
 @router.get("/governor/config", tags=["governor"])
 async def governor_config():
     """Return current governor configuration."""
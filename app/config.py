@@ -46,6 +46,50 @@ class Settings(BaseSettings):
     db_pool_timeout: int = 30
     db_pool_recycle: int = 3600
 
+    # SQLite file engine: "null" opens a connection per session; "pooled" keeps
+    # a bounded reader pool plus one serialized writer connection.
+    sqlite_pool_mode: Literal["null", "pooled"] = "null"
+    sqlite_reader_pool_size: int = 4
+    sqlite_writer_timeout_s: int = 30
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -16000        # negative = KiB, i.e. ~16 MB per connection
+    sqlite_temp_store: Literal["default", "file", "memory"] = "memory"
+
+    # Sessions: one shared session per HTTP request; warn on connections held too long
+    db_request_scoped_session: bool = True
+    db_leak_warn_s: int = 60
+    db_leak_trace: bool = False            # record the app frame that checked out each connection
+
+    # Async routes: hot-table queries run on a bounded DB thread pool (0 = size from the pool)
+    db_async_routes: bool = True
+    db_async_workers: int = 0
+
+    # Read replica for reporting reads (audit, LMF stats).  Empty URL on SQLite =
+    # a separate mode=ro connection pool on the same file.
+    db_read_replica: bool = False
+    db_replica_url: str = ""
+    db_replica_max_lag_s: float = 5.0      # fall back to the primary beyond this lag
+    db_replica_lag_check_s: float = 10.0   # how often the lag probe runs
+
+    # Query profiler: per-statement fingerprints, per-request query cost, slow-query log
+    db_profile: bool = True
+    db_slow_query_ms: int = 200
+    db_profile_max_fingerprints: int = 500
+    db_n_plus_one_threshold: int = 10      # same statement this many times in one request/run
+    db_query_cache_size: int = 1200        # compiled statements kept per engine (SQLAlchemy default 500)
+
+    # Online migrations: chunked, resumable backfills between expand and contract revisions
+    db_backfill_batch_size: int = 1000
+    db_backfill_sleep_ms: int = 50         # pause between batches so foreground writes get the lock
+    db_backfill_max_batch_ms: int = 500    # halve the batch when one takes longer than this
+    db_backfill_lease_s: int = 120         # another runner may take over after this much silence
+
+    # Counter coalescing: skill / cron / goal counter bumps summed in memory, flushed in one transaction
+    enable_counter_coalescing: bool = True
+    counter_flush_interval_ms: int = 1000  # loss window on a crash: increments newer than this
+    counter_max_pending: int = 5000        # distinct rows buffered before an inline flush
+
     # ── AI Providers ─────────────────────────────────────────────────────────
     anthropic_api_key: str = ""
     openai_api_key: str = ""
@@ -80,6 +124,12 @@ class Settings(BaseSettings):
     rate_limit_per_min: int = 120
     high_risk_rate_limit_per_min: int = 15
     audit_file_max_bytes: int = 5 * 1024 * 1024
+    # ah_audit_log keeps the last N months hot; older months roll into gzip segments
+    enable_audit_partitioning: bool = False
+    audit_partition_interval_s: int = 3600
+    audit_hot_months: int = 1                   # current month (+ N-1 before it)
+    audit_archive_retention_months: int = 24    # archived months kept past the hot window; 0 = forever
+    audit_partition_batch_size: int = 5000
     enable_metrics: bool = True
     enable_migration_check: bool = True
     require_migration_head: bool = True
@@ -117,6 +167,53 @@ class Settings(BaseSettings):
     enable_lmf_wal: bool = False            # Write-Ahead Log for crash recovery
     enable_lmf_consolidator: bool = False   # Periodic memory consolidation
     enable_lmf_blob: bool = False           # Large artifact / blob storage
+    lmf_wal_path: str = "./lmf_wal.jsonl"   # file, or directory when segmented
+    lmf_wal_durability: Literal["record", "group", "os"] = "record"
+    lmf_wal_group_window_ms: float = 2.0    # group/os: max wait to fill a batch
+    lmf_wal_group_max_bytes: int = 256 * 1024
+    lmf_wal_segment_max_bytes: int = 0      # >0 enables segment rotation + index
+    lmf_wal_checkpoint_every: int = 1000    # records between checkpoints
+    lmf_wal_retire_mode: Literal["archive", "delete"] = "archive"
+    lmf_wal_format: Literal["jsonl", "binary"] = "jsonl"
+    lmf_wal_compression: Literal["none", "zlib", "zstd"] = "zlib"  # binary format only
+    lmf_wal_body_codec: Literal["json", "msgpack"] = "json"        # binary format only; msgpack is optional
+    enable_lmf_working_cache: bool = False  # In-process write-behind LRU tier for working memory
+    lmf_working_cache_max_tasks: int = 1024
+    lmf_working_cache_max_keys_per_task: int = 256
+    lmf_working_flush_interval_ms: int = 200
+    lmf_working_flush_batch: int = 500
+    lmf_working_db_sweep_interval_s: int = 60   # bulk DELETE of expired rows
+    lmf_stats_recount_interval_s: int = 86400   # full recount of ah_lmf_stats; 0 = manual only
+    lmf_consolidator_interval_s: int = 3600
+    lmf_consolidator_min_age_s: int = 86400      # episodic rows younger than this stay hot
+    lmf_consolidator_window_s: int = 86400       # events are only clustered within one window
+    lmf_consolidator_batch_size: int = 500
+    lmf_consolidator_max_batches: int = 20       # per run: bounds rows moved to batch_size × max_batches
+    lmf_consolidator_similarity: float = 0.5     # Jaccard over content terms
+    lmf_consolidator_keep_importance: float = 0.8  # rows at/above this are never consolidated
+    lmf_consolidator_summarizer: Literal["rule", "model"] = "rule"
+    lmf_blob_dir: str = "./evidence/lmf_blobs"
+    lmf_blob_inline_max_bytes: int = 4096         # larger episodic content / WAL payload strings go to blobs
+    lmf_blob_compression: Literal["none", "zlib"] = "zlib"
+    lmf_blob_compress_min_bytes: int = 1024
+    lmf_blob_gc_interval_s: int = 3600
+    lmf_blob_gc_grace_s: int = 3600               # unreferenced blobs are kept at least this long
+
+    # ── Memory compaction (ah_memory + LMF episodic retention) ───────────────
+    enable_memory_compaction: bool = False
+    memory_compaction_interval_s: int = 3600
+    memory_compaction_batch_size: int = 500
+    memory_dedup_hamming_threshold: int = 3       # SimHash bits, 0 = exact only; max 15 (clamped)
+    memory_importance_half_life_days: float = 30.0  # 0 disables decay
+    memory_archive_after_days: int = 30
+    memory_archive_max_importance: float = 0.3
+    memory_archive_mode: Literal["table", "file"] = "table"
+    memory_compaction_include_lmf_episodic: bool = True
+
+    # ── Memory hot set (in-process recall working set) ───────────────────────
+    enable_memory_hot_set: bool = False
+    memory_hot_set_size: int = 256                # top-N by importance, then recency
+    memory_hot_set_ttl_s: int = 60                # reload interval; 0 = only on invalidate
 
     # ── Causal Analysis ───────────────────────────────────────────────────────
     enable_causal_abstraction: bool = False  # Causal node/link abstraction layer
@@ -213,6 +310,17 @@ class Settings(BaseSettings):
             )
         return f"sqlite:///./{self.db_name}.db"
 
+    @property
+    def database_replica_url(self) -> str:
+        """Read-replica URL; on SQLite defaults to a read-only URI of the primary file."""
+        if self.db_replica_url:
+            return self.db_replica_url
+        url = self.database_url
+        if url.startswith("sqlite:///") and ":memory:" not in url:
+            path = url[len("sqlite:///"):].split("?", 1)[0]
+            return f"sqlite:///file:{path}?mode=ro&uri=true"
+        return ""
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore",
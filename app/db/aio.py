@@ -0,0 +1,85 @@
+"""
+ArcHillx — Async DB access
+==========================
+Runs the synchronous SQLAlchemy stack on a dedicated, bounded thread pool so
+`async def` routes await their queries instead of blocking the event loop.
+
+One executor serves every dialect (SQLite, MySQL, MSSQL) and keeps the sync
+session machinery — RoutingSession, session_scope, pool monitoring — as the
+single code path.  Its size matches what the connection pool can hand out, so
+a burst of requests queues here rather than timing out in the pool:
+
+  mysql            db_pool_size + db_max_overflow
+  sqlite pooled    sqlite_reader_pool_size + 1 (writer)
+  otherwise        8
+
+DB_ASYNC_WORKERS overrides the size; DB_ASYNC_ROUTES=false runs the work inline
+on the loop (the old behaviour, kept for comparison and as an escape hatch).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from ..utils.telemetry import telemetry
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _default_workers() -> int:
+    from ..config import settings
+    if settings.db_async_workers > 0:
+        return settings.db_async_workers
+    if settings.db_type == "mysql":
+        return max(1, settings.db_pool_size + settings.db_max_overflow)
+    if settings.db_type == "sqlite" and settings.sqlite_pool_mode == "pooled":
+        return max(1, settings.sqlite_reader_pool_size) + 1
+    return 8
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_default_workers(), thread_name_prefix="archillx-db")
+    return _executor
+
+
+def shutdown_db_executor() -> None:
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=True)
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await fn(*args, **kwargs) on the DB executor, carrying the caller's contextvars."""
+    from ..config import settings
+    if not settings.db_async_routes:
+        return fn(*args, **kwargs)
+    ctx = contextvars.copy_context()
+    queued = time.perf_counter()
+
+    def call() -> T:
+        telemetry.timing("db_async_queue", time.perf_counter() - queued)
+        return ctx.run(fn, *args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(get_db_executor(), call)
+
+
+def to_async(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Decorator form of run_db for repository methods."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(fn, *args, **kwargs)
+    return wrapper
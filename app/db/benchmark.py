@@ -0,0 +1,162 @@
+"""
+ArcHillx — Async route throughput benchmark
+===========================================
+Drives the hot DB routes (/v1/memory/search, /v1/memory/recent, /v1/agent/tasks,
+/v1/goals, /v1/audit) through the ASGI app at a fixed concurrency, once with DB
+work inline on the event loop (DB_ASYNC_ROUTES=false, the old behaviour) and
+once on the DB executor, against the same SQLite file.
+
+Per mode it reports requests/s, request latency p50 / p99, and event-loop lag
+(how late a 5 ms heartbeat wakes up while the load runs) — the lag is what a
+blocked loop costs every other request on the worker.
+
+SQLite answers in-process in microseconds, which hides exactly the cost the
+executor removes, so db_latency_ms adds a GIL-releasing sleep per statement
+to model the network round-trip of a MySQL / MSSQL server (0 = raw SQLite).
+
+CLI: scripts/bench_db_async.py
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from ..memory.benchmark import bind_engine, build_corpus, load_corpus, percentile
+
+MODES = ("inline", "executor")
+HEARTBEAT_S = 0.005
+
+
+def _seed_tables(engine: Any, rows: int, seed: int) -> None:
+    from sqlalchemy import insert
+    from .schema import AHAuditLog, AHGoal, AHSession, AHTask
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(AHSession), [{"name": f"bench-{i}", "status": "active"} for i in range(50)])
+        conn.execute(insert(AHGoal), [{"title": f"goal {i}", "status": "active", "priority": i % 10}
+                                      for i in range(100)])
+        conn.execute(insert(AHTask), [
+            {"title": f"task {i}", "status": rng.choice(("closed", "failed", "executing")),
+             "created_at": now - timedelta(seconds=i)}
+            for i in range(rows)
+        ])
+        conn.execute(insert(AHAuditLog), [
+            {"action": rng.choice(("skill_invoke", "sandbox_execute", "agent_run")),
+             "decision": rng.choice(("APPROVED", "WARNED", "BLOCKED")),
+             "risk_score": rng.randint(0, 100), "created_at": now - timedelta(seconds=i)}
+            for i in range(rows)
+        ])
+
+
+def _paths(queries: list[str]) -> list[str]:
+    out = []
+    for q in queries:
+        out += [f"/v1/memory/search?q={q}&top_k=5", "/v1/agent/tasks?limit=20", "/v1/memory/recent?limit=10",
+                "/v1/goals", "/v1/audit?limit=50&decision=blocked"]
+    return out
+
+
+async def _drive(app: Any, paths: list[str], n_requests: int, concurrency: int) -> dict[str, Any]:
+    import httpx
+
+    latencies: list[float] = []
+    lags: list[float] = []
+    errors = 0
+    stop = asyncio.Event()
+
+    async def heartbeat() -> None:
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            t0 = loop.time()
+            await asyncio.sleep(HEARTBEAT_S)
+            lags.append(max(0.0, loop.time() - t0 - HEARTBEAT_S))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.get(paths[i % len(paths)])
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 200:
+                    errors += 1
+
+        await client.get(paths[0])                                   # warm-up
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await beat
+
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(n_requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 3),
+        "loop_lag_max_ms": round(max(lags) * 1000, 3) if lags else 0.0,
+    }
+
+
+def run(*, rows: int = 20_000, n_requests: int = 500, concurrency: int = 32, seed: int = 7,
+        db_latency_ms: float = 2.0, workdir: str | Path | None = None) -> dict[str, Any]:
+    from sqlalchemy import create_engine, event
+    from ..config import settings
+    from ..main import app
+    from .aio import shutdown_db_executor
+
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="archillx_bench_")
+        workdir = tmp.name
+    db_path = Path(workdir) / f"db_async_bench_{rows}.db"
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, future=True)
+    saved = (settings.db_async_routes, settings.api_key, settings.enable_rate_limit)
+    try:
+        corpus = build_corpus(rows, n_queries=20, seed=seed)
+        load_corpus(engine, corpus, lmf=False)
+        _seed_tables(engine, rows, seed)
+        paths = _paths([q["query"] for q in corpus.queries])
+        if db_latency_ms > 0:
+            event.listen(engine, "before_cursor_execute",
+                         lambda *_a: time.sleep(db_latency_ms / 1000.0))
+        settings.api_key, settings.enable_rate_limit = "", False
+        results: dict[str, Any] = {}
+        with bind_engine(engine):
+            for mode in MODES:
+                settings.db_async_routes = mode == "executor"
+                shutdown_db_executor()
+                results[mode] = asyncio.run(_drive(app, paths, n_requests, concurrency))
+        shutdown_db_executor()
+        inline, executor = results["inline"], results["executor"]
+        return {
+            "benchmark": "db_async_routes",
+            "version": settings.app_version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "params": {"rows": rows, "requests": n_requests, "concurrency": concurrency, "seed": seed,
+                       "db_latency_ms": db_latency_ms},
+            "results": results,
+            "speedup": {
+                "rps": round(executor["rps"] / inline["rps"], 2) if inline["rps"] else None,
+                "loop_lag_p99_ms": round(executor["loop_lag_p99_ms"] - inline["loop_lag_p99_ms"], 3),
+            },
+        }
+    finally:
+        settings.db_async_routes, settings.api_key, settings.enable_rate_limit = saved
+        engine.dispose()
+        if tmp is not None:
+            tmp.cleanup()
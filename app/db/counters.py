@@ -0,0 +1,255 @@
+"""
+ArcHillx — Counter write coalescer
+==================================
+Skill invoke / error counts, cron run counts and goal progress used to cost
+one write transaction per event (select the row, bump it, commit).  Here the
+increments are summed in memory per (table, key, column) and flushed on an
+interval as one transaction: one executemany UPDATE per statement shape,
+
+    UPDATE ah_skills SET invoke_count = COALESCE(invoke_count, 0) + :d_invoke_count, ...
+     WHERE name = :k
+
+so N events on a row become one row update, applied relative to whatever the
+row holds at flush time (no lost updates between processes).
+
+Loss window: increments not yet flushed live only in this process — at most
+COUNTER_FLUSH_INTERVAL_MS of them, or COUNTER_MAX_PENDING rows (reaching it
+flushes inline).  shutdown() flushes whatever is left; a failed flush puts
+the batch back for the next one.  Until startup() has run (scripts, tests,
+ENABLE_COUNTER_COALESCING=false or COUNTER_FLUSH_INTERVAL_MS=0) every
+increment is written through at once.  The flush runs on the shared
+maintenance scheduler (app/utils/background.py).
+
+    counter_coalescer.incr("ah_skills", name, "invoke_count", key_column="name")
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.background import IntervalJob
+from ..utils.telemetry import telemetry
+from .statements import prepared
+
+logger = logging.getLogger("archillx.db.counters")
+
+_RowKey = Tuple[str, str, Any, Tuple[Tuple[str, Any], ...]]
+
+
+@dataclass
+class _Pending:
+    deltas: Dict[str, float] = field(default_factory=dict)
+    caps: Dict[str, float] = field(default_factory=dict)
+    touch: Dict[str, Any] = field(default_factory=dict)
+    events: int = 0
+
+    def merge(self, other: "_Pending") -> None:
+        for col, d in other.deltas.items():
+            self.deltas[col] = self.deltas.get(col, 0) + d
+        for col, v in other.caps.items():          # `other` is older: newer values win
+            self.caps.setdefault(col, v)
+        for col, v in other.touch.items():
+            self.touch.setdefault(col, v)
+        self.events += other.events
+
+
+def _table(name: str) -> Any:
+    from .schema import Base
+    try:
+        return Base.metadata.tables[name]
+    except KeyError:
+        raise ValueError(f"unknown table {name!r}") from None
+
+
+@prepared
+def counter_update(table: str, key_column: str, guards: Tuple[str, ...], deltas: Tuple[str, ...],
+                   capped: Tuple[str, ...], touch: Tuple[str, ...]) -> Any:
+    """
+    Bind names: k (key), g_<col> (guards), d_<col> (increments), c_<col>
+    (caps: never raise past it, never lower a value already above it), t_<col>.
+    """
+    from sqlalchemy import bindparam, case, func, update
+    t = _table(table)
+    values: Dict[str, Any] = {}
+    for col in deltas:
+        c = t.c[col]
+        bumped = func.coalesce(c, 0) + bindparam(f"d_{col}")
+        if col in capped:
+            cap = bindparam(f"c_{col}")
+            bumped = case((func.coalesce(c, 0) >= cap, c), (bumped > cap, cap), else_=bumped)
+        values[col] = bumped
+    for col in touch:
+        values[col] = bindparam(f"t_{col}")
+    stmt = update(t).where(t.c[key_column] == bindparam("k"))
+    for col in guards:
+        stmt = stmt.where(t.c[col] == bindparam(f"g_{col}"))
+    return stmt.values(values)
+
+
+class CounterCoalescer(IntervalJob):
+    job_id = "counter_flush"
+    label = "counter coalescing"
+    min_interval_s = 0.1
+
+    def __init__(self) -> None:
+        super().__init__()                     # self._lock guards _pending
+        self._flush_lock = threading.Lock()    # one flush at a time
+        self._pending: Dict[_RowKey, _Pending] = {}
+        self._last_flush: dict | None = None
+        self._totals = {"events": 0, "rows": 0, "flushes": 0, "failures": 0}
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_counter_coalescing)
+
+    def interval_s(self) -> float:
+        return int(settings.counter_flush_interval_ms) / 1000.0
+
+    def run_once(self) -> dict:
+        return self.flush()
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self.flush()
+
+    def policy(self) -> dict:
+        return {
+            "flush_interval_ms": int(settings.counter_flush_interval_ms),
+            "max_pending": int(settings.counter_max_pending),
+        }
+
+    def status(self) -> dict:
+        with self._lock:
+            rows = len(self._pending)
+            events = sum(p.events for p in self._pending.values())
+        totals = dict(self._totals)
+        totals["events_per_row"] = round(totals["events"] / totals["rows"], 2) if totals["rows"] else None
+        return {
+            "enabled": bool(settings.enable_counter_coalescing),
+            "started": self._started,
+            "policy": self.policy(),
+            "pending": {"rows": rows, "events": events},
+            "totals": totals,
+            "last_flush": self._last_flush,
+        }
+
+    # ── Increments ────────────────────────────────────────────────────────────
+
+    def incr(self, table: str, key: Any, column: str, delta: float = 1, *, key_column: str = "id",
+             cap: Optional[float] = None, where: Optional[Dict[str, Any]] = None,
+             touch: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Add `delta` to table.column on the row where key_column == key (and every
+        `where` column equals its value at flush time).  cap bounds the result;
+        touch columns are set to the latest value passed (e.g. last_run).
+        """
+        t = _table(table)
+        for col in (key_column, column, *(where or ()), *(touch or ())):
+            if col not in t.c:
+                raise ValueError(f"unknown column {table}.{col}")
+        row = _Pending(deltas={column: delta}, caps={} if cap is None else {column: cap},
+                       touch=dict(touch or {}), events=1)
+        rk = (table, key_column, key, tuple(sorted((where or {}).items())))
+        telemetry.incr("db_counter_events_total")
+        if not self._started:
+            self._write({rk: row})
+            return
+        with self._lock:
+            cur = self._pending.get(rk)
+            if cur is None:
+                self._pending[rk] = row
+            else:
+                cur.deltas[column] = cur.deltas.get(column, 0) + delta
+                cur.caps.update(row.caps)
+                cur.touch.update(row.touch)
+                cur.events += 1
+            full = len(self._pending) >= max(1, int(settings.counter_max_pending))
+        if full:
+            self.flush()
+
+    def discard(self, table: str, key: Any, column: str) -> int:
+        """
+        Drop the pending increments of table.column on the row where the key is
+        `key` (under any `where` guard), for a caller about to set the column
+        outright.  Waits out a flush in progress so none of them can land after
+        that write.  Returns how many pending rows lost an increment.
+        """
+        dropped = 0
+        with self._flush_lock, self._lock:
+            for rk in [rk for rk in self._pending if rk[0] == table and rk[2] == key]:
+                row = self._pending[rk]
+                if column not in row.deltas:
+                    continue
+                del row.deltas[column]
+                row.caps.pop(column, None)
+                if not row.deltas:
+                    del self._pending[rk]
+                dropped += 1
+        return dropped
+
+    # ── Flush ─────────────────────────────────────────────────────────────────
+
+    def flush(self) -> dict:
+        """Write every pending increment in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return {"rows": 0, "events": 0}
+            started = time.monotonic()
+            try:
+                statements = self._write(batch)
+            except Exception as e:
+                with self._lock:                   # keep the increments for the next flush
+                    for rk, row in batch.items():
+                        newer = self._pending.get(rk)
+                        if newer is not None:
+                            newer.merge(row)
+                        else:
+                            self._pending[rk] = row
+                self._totals["failures"] += 1
+                telemetry.incr("db_counter_flush_failures_total")
+                logger.warning("counter flush failed (%s rows kept for retry): %s", len(batch), e)
+                self._last_flush = {"at": datetime.now(timezone.utc).isoformat(), "rows": len(batch),
+                                    "error": str(e)}
+                return self._last_flush
+            elapsed = time.monotonic() - started
+            events = sum(r.events for r in batch.values())
+            self._totals["rows"] += len(batch)
+            self._totals["events"] += events
+            self._totals["flushes"] += 1
+            telemetry.incr("db_counter_flush_total")
+            telemetry.incr("db_counter_rows_total", len(batch))
+            telemetry.timing("db_counter_flush", elapsed)
+            self._last_flush = {"at": datetime.now(timezone.utc).isoformat(), "rows": len(batch),
+                                "events": events, "statements": statements,
+                                "elapsed_ms": round(elapsed * 1000, 3)}
+            return self._last_flush
+
+    def _write(self, batch: Dict[_RowKey, _Pending]) -> int:
+        """One transaction; rows sharing a statement shape go out as one executemany."""
+        from .session import session_scope
+        groups: Dict[tuple, List[dict]] = {}
+        for (table, key_column, key, guards), row in batch.items():
+            shape = (table, key_column, tuple(c for c, _ in guards), tuple(sorted(row.deltas)),
+                     tuple(sorted(row.caps)), tuple(sorted(row.touch)))
+            params: Dict[str, Any] = {"k": key}
+            params.update({f"g_{c}": v for c, v in guards})
+            params.update({f"d_{c}": d for c, d in row.deltas.items()})
+            params.update({f"c_{c}": v for c, v in row.caps.items()})
+            params.update({f"t_{c}": v for c, v in row.touch.items()})
+            groups.setdefault(shape, []).append(params)
+        with session_scope(shared=False) as db:
+            for shape, params in groups.items():
+                db.execute(counter_update(*shape), params)
+            db.commit()
+        return len(groups)
+
+
+counter_coalescer = CounterCoalescer()
@@ -0,0 +1,483 @@
+"""
+ArcHillx — Index advisor
+========================
+Proposes composite / covering indexes for a query workload and measures them.
+
+Input is a workload of statement fingerprints with their weight: the
+/v1/admin/db/profile snapshot (see profiler.py), a JSON file in the same
+shape, or DEFAULT_WORKLOAD — the hot query shapes of the audit, task, goal
+and memory paths compiled from the ORM.
+
+Per fingerprint the WHERE / ORDER BY clauses give equality columns, range
+columns and sort columns; the candidate index is
+
+  equality columns + (range column [+ the ORDER BY it leads] | ORDER BY columns)
+
+minus a trailing primary key (InnoDB and SQLite indexes already carry it),
+widened to cover the SELECT list when that is at most COVER_MAX_EXTRA columns
+away.  Candidates already served by an existing index prefix are dropped;
+a candidate that is a prefix of another on the same table is merged into it,
+and existing single-purpose indexes that become a strict prefix of a proposal
+are reported as superseded.
+
+render_migration() turns proposals into an alembic revision; benchmark()
+loads generated data into a scratch SQLite file and times every workload
+statement with and without the proposals (plus EXPLAIN QUERY PLAN).
+
+CLI: scripts/index_advisor.py
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import string
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .profiler import fingerprint
+
+COVER_MAX_EXTRA = 2
+
+_CLAUSE_END = r"(?=\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|\bHAVING\b|\bOFFSET\b|$)"
+_WHERE = re.compile(r"\bWHERE\b(.*?)" + _CLAUSE_END, re.I | re.S)
+_ORDER = re.compile(r"\bORDER BY\b(.*?)(?=\bLIMIT\b|\bOFFSET\b|$)", re.I | re.S)
+_SELECT = re.compile(r"^\s*SELECT\b(.*?)\bFROM\b", re.I | re.S)
+_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.I)
+_COL = r"(?:(\w+)\.)?(\w+)"
+_BIND = re.compile(
+    r"(?P<between>" + _COL + r"\s+BETWEEN\s+\?\s+AND\s+\?)"
+    r"|(?P<inlist>" + _COL + r"\s+(?P<notin>NOT\s+)?IN\s*\(\?\+?\))"
+    r"|(?P<pred>" + _COL + r"\s*(?P<op><=|>=|<>|!=|=|<|>|NOT\s+LIKE|LIKE)\s*\?)"
+    r"|(?P<limit>\bLIMIT\s+\?)|(?P<offset>\bOFFSET\s+\?)",
+    re.I,
+)
+_ISNULL = re.compile(_COL + r"\s+IS\s+NULL\b", re.I)
+
+
+@dataclass
+class Shape:
+    """What one statement needs from an index on its (single) table."""
+    sql: str
+    table: str
+    equality: List[str] = field(default_factory=list)
+    ranges: List[str] = field(default_factory=list)
+    order: List[str] = field(default_factory=list)
+    selected: Optional[List[str]] = None             # None = whole row (ORM entity) or unparsed
+    binds: List[Tuple[str, Optional[str]]] = field(default_factory=list)   # (kind, column) per ?
+
+
+@dataclass
+class Proposal:
+    table: str
+    columns: List[str]
+    weight: float = 0.0
+    covering: bool = False
+    fingerprints: List[str] = field(default_factory=list)
+    supersedes: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{'_'.join(self.columns)}"[:64]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "table": self.table, "columns": list(self.columns),
+                "weight": round(self.weight, 3), "covering": self.covering,
+                "supersedes": list(self.supersedes), "fingerprints": list(self.fingerprints)}
+
+
+# ── Workload ──────────────────────────────────────────────────────────────────
+
+def default_workload() -> List[Dict[str, Any]]:
+    """Hot ORM query shapes (audit filters, session tasks, active goals, memory hot set) as fingerprints."""
+    from sqlalchemy import desc, select
+    from sqlalchemy.dialects import sqlite
+    from .schema import AHAuditLog, AHGoal, AHMemory, AHTask
+    since = datetime(2026, 1, 1)
+    shapes = [
+        (select(AHAuditLog).where(AHAuditLog.action == "x").order_by(desc(AHAuditLog.created_at)).limit(50).offset(0), 400),
+        (select(AHAuditLog).where(AHAuditLog.action.like("skill%"), AHAuditLog.created_at >= since)
+         .order_by(desc(AHAuditLog.created_at)).limit(50).offset(0), 100),
+        (select(AHTask).where(AHTask.session_id == 1, AHTask.status == "executing"), 300),
+        (select(AHGoal).where(AHGoal.status == "active").order_by(AHGoal.priority), 300),
+        (select(AHMemory).order_by(AHMemory.importance.desc(), AHMemory.created_at.desc(), AHMemory.id.desc())
+         .limit(256), 100),
+        (select(AHMemory).where(AHMemory.importance >= 0.5)
+         .order_by(AHMemory.importance.desc(), AHMemory.created_at.desc()).limit(50), 200),
+    ]
+    dialect = sqlite.dialect()
+    return [{"fingerprint": fingerprint(str(stmt.compile(dialect=dialect))), "count": n, "total_ms": float(n)}
+            for stmt, n in shapes]
+
+
+def load_workload(source: Any) -> List[Dict[str, Any]]:
+    """
+    Normalise a workload: a profile snapshot ({"fingerprints": [...]}), a list of
+    {"fingerprint"|"sql", "count", "total_ms"} entries, or a path to such JSON.
+    """
+    if isinstance(source, (str, Path)):
+        source = json.loads(Path(source).read_text(encoding="utf-8"))
+    if isinstance(source, dict):
+        source = source.get("fingerprints") or []
+    out = []
+    for item in source:
+        sql = item.get("fingerprint") or item.get("sql")
+        if not sql:
+            continue
+        count = float(item.get("count") or 1)
+        out.append({"fingerprint": fingerprint(sql), "count": count,
+                    "total_ms": float(item.get("total_ms") or count)})
+    return out
+
+
+# ── Analysis ──────────────────────────────────────────────────────────────────
+
+def parse(sql: str) -> Optional[Shape]:
+    """Index-relevant shape of a single-table SELECT fingerprint; None for anything else."""
+    if not re.match(r"\s*SELECT\b", sql, re.I):
+        return None
+    tables = list(dict.fromkeys(t for t in _TABLES.findall(sql)))
+    if len(tables) != 1:
+        return None
+    table = tables[0]
+
+    def own(qual: Optional[str], col: str) -> Optional[str]:
+        return col if (not qual or qual == table) else None
+
+    shape = Shape(sql=sql, table=table)
+    where = _WHERE.search(sql)
+    where_sql = where.group(1) if where else ""
+    for m in _BIND.finditer(sql):
+        inside = where is not None and where.start(1) <= m.start() < where.end(1)
+        if m.group("limit"):
+            shape.binds.append(("limit", None))
+        elif m.group("offset"):
+            shape.binds.append(("offset", None))
+        elif m.group("between"):
+            col = own(m.group(2), m.group(3))
+            shape.binds += [("low", col), ("high", col)]
+            if inside and col:
+                shape.ranges.append(col)
+        elif m.group("inlist"):
+            col = own(m.group(5), m.group(6))
+            shape.binds.append(("in", col))
+            if inside and col and not m.group("notin"):
+                shape.equality.append(col)
+        else:
+            col = own(m.group(9), m.group(10))
+            op = re.sub(r"\s+", " ", m.group("op").upper())
+            shape.binds.append((op, col))
+            if not inside or not col:
+                continue
+            if op == "=":
+                shape.equality.append(col)
+            elif op in ("<", ">", "<=", ">=", "LIKE"):
+                shape.ranges.append(col)
+    for q, col in _ISNULL.findall(where_sql):
+        if own(q, col):
+            shape.equality.append(col)
+    order = _ORDER.search(sql)
+    if order:
+        for part in order.group(1).split(","):
+            m = re.match(r"\s*" + _COL + r"(?:\s+(?:ASC|DESC))?\s*$", part, re.I)
+            if not m or not own(m.group(1), m.group(2)):
+                break
+            shape.order.append(m.group(2))
+    select = _SELECT.search(sql)
+    if select:
+        cols = [c.strip() for c in select.group(1).split(",")]
+        if all(re.fullmatch(r"count\(\*\)|" + _COL, c, re.I) for c in cols):
+            shape.selected = [c.split(".")[-1] for c in cols if not c.lower().startswith("count(")]
+    shape.equality = list(dict.fromkeys(shape.equality))
+    shape.ranges = [c for c in dict.fromkeys(shape.ranges) if c not in shape.equality]
+    return shape
+
+
+def existing_indexes(metadata: Any = None) -> Dict[str, List[Tuple[str, List[str], bool]]]:
+    """{table: [(index name, columns, unique)]} from the ORM metadata, primary keys included."""
+    if metadata is None:
+        from .schema import Base
+        metadata = Base.metadata
+    out: Dict[str, List[Tuple[str, List[str], bool]]] = {}
+    for table in metadata.tables.values():
+        entries = [(f"pk_{table.name}", [c.name for c in table.primary_key.columns], True)]
+        entries += [(ix.name, [c.name for c in ix.columns], bool(ix.unique)) for ix in table.indexes]
+        out[table.name] = entries
+    return out
+
+
+def _primary_key(table: str, indexes: Dict[str, List[Tuple[str, List[str], bool]]]) -> List[str]:
+    for name, cols, _unique in indexes.get(table, []):
+        if name == f"pk_{table}":
+            return cols
+    return []
+
+
+def candidate(shape: Shape, indexes: Dict[str, List[Tuple[str, List[str], bool]]]) -> Tuple[List[str], bool]:
+    cols = list(shape.equality)
+    if shape.ranges:
+        lead = shape.ranges[0]
+        cols.append(lead)
+        if shape.order and shape.order[0] == lead:
+            cols += [c for c in shape.order[1:] if c not in cols]
+    else:
+        cols += [c for c in shape.order if c not in cols]
+    pk = _primary_key(shape.table, indexes)
+    while cols and len(cols) > 1 and cols[-1] in pk:
+        cols.pop()
+    covering = False
+    if shape.selected is not None and cols:
+        extra = [c for c in shape.selected if c not in cols and c not in pk]
+        if len(extra) <= COVER_MAX_EXTRA:
+            cols += extra
+            covering = True
+    return cols, covering
+
+
+def advise(workload: Iterable[Dict[str, Any]], indexes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Proposals for a workload, strongest first, plus the statements that needed nothing."""
+    indexes = indexes if indexes is not None else existing_indexes()
+    raw: List[Proposal] = []
+    served: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    for item in workload:
+        shape = parse(item["fingerprint"])
+        if shape is None or shape.table not in indexes:
+            skipped.append(item["fingerprint"])
+            continue
+        cols, covering = candidate(shape, indexes)
+        if not cols:
+            skipped.append(item["fingerprint"])
+            continue
+        hit = next((name for name, existing, _u in indexes[shape.table] if existing[:len(cols)] == cols), None)
+        if hit:
+            served.append({"fingerprint": item["fingerprint"], "index": hit})
+            continue
+        raw.append(Proposal(shape.table, cols, float(item.get("total_ms") or item.get("count") or 1.0),
+                            covering, [item["fingerprint"]]))
+
+    merged: List[Proposal] = []
+    for p in sorted(raw, key=lambda p: -len(p.columns)):
+        into = next((m for m in merged if m.table == p.table and m.columns[:len(p.columns)] == p.columns), None)
+        if into is None:
+            merged.append(p)
+            continue
+        into.weight += p.weight
+        into.fingerprints += p.fingerprints
+    for p in merged:
+        p.supersedes = [name for name, cols, unique in indexes[p.table]
+                        if not unique and len(cols) < len(p.columns) and p.columns[:len(cols)] == cols]
+    merged.sort(key=lambda p: -p.weight)
+    return {"proposals": [p.as_dict() for p in merged], "served": served, "skipped": skipped}
+
+
+# ── Migration ─────────────────────────────────────────────────────────────────
+
+def render_migration(proposals: List[Dict[str, Any]], revision: str, down_revision: str,
+                     message: str = "composite indexes for hot query shapes",
+                     indexes: Optional[Dict[str, Any]] = None) -> str:
+    """Alembic revision creating the proposals and dropping the indexes they supersede."""
+    indexes = indexes if indexes is not None else existing_indexes()
+    created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    up, down = [], []
+    for p in proposals:
+        up.append(f'    op.create_index("{p["name"]}", "{p["table"]}", {json.dumps(p["columns"])}, unique=False)')
+    for p in proposals:
+        for name in p["supersedes"]:
+            cols = next(c for n, c, _u in indexes[p["table"]] if n == name)
+            up.append(f'    op.drop_index("{name}", table_name="{p["table"]}")')
+            down.append(f'    op.create_index("{name}", "{p["table"]}", {json.dumps(cols)}, unique=False)')
+    for p in reversed(proposals):
+        down.append(f'    op.drop_index("{p["name"]}", table_name="{p["table"]}")')
+    return (
+        f'"""{message}\n\nRevision ID: {revision}\nRevises: {down_revision}\nCreate Date: {created}\n"""\n'
+        "from __future__ import annotations\n\n"
+        "from alembic import op\n\n"
+        "# revision identifiers, used by Alembic.\n"
+        f'revision = "{revision}"\n'
+        f'down_revision = "{down_revision}"\n'
+        "branch_labels = None\n"
+        "depends_on = None\n\n\n"
+        "def upgrade() -> None:\n" + ("\n".join(up) or "    pass") + "\n\n\n"
+        "def downgrade() -> None:\n" + ("\n".join(down) or "    pass") + "\n"
+    )
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────────
+
+_VOCAB = {
+    "status": ["active", "closed", "failed", "executing", "completed", "paused", "abandoned"],
+    "decision": ["APPROVED", "WARNED", "BLOCKED"],
+    "action": [f"{verb}:{noun}" for verb in ("skill_invoke", "sandbox_execute", "agent_run", "cron")
+               for noun in ("web_search", "file_ops", "code_exec", "notify", "summarize")],
+    "source": ["agent", "user", "system", "cron", "skill"],
+}
+
+
+def _value(col: Any, rng: random.Random, rows: int, now: datetime) -> Any:
+    from sqlalchemy import Boolean, DateTime, Float, Integer
+    name = col.name
+    if isinstance(col.type, DateTime):
+        return now - timedelta(seconds=rng.randint(0, 180 * 86400))
+    if isinstance(col.type, Boolean):
+        return rng.random() < 0.5
+    if isinstance(col.type, Float):
+        return round(rng.random(), 4)
+    if isinstance(col.type, Integer):
+        if name.endswith("_id"):
+            return rng.randint(1, max(1, rows // 20))
+        if name in ("priority",):
+            return rng.randint(1, 10)
+        return rng.randint(0, 100)
+    vocab = _VOCAB.get(name)
+    if vocab:
+        return rng.choice(vocab)
+    length = getattr(col.type, "length", None) or 48
+    return "".join(rng.choices(string.ascii_lowercase + " ", k=min(length, 48))).strip() or "x"
+
+
+def _seed(engine: Any, table: Any, rows: int, rng: random.Random, now: datetime) -> Dict[str, List[Any]]:
+    from sqlalchemy import insert
+    cols = [c for c in table.columns if not (c.primary_key and c.autoincrement)]
+    samples: Dict[str, List[Any]] = {c.name: [] for c in cols}
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            row = {c.name: _value(c, rng, rows, now) for c in cols}
+            if i % 97 == 0:
+                for k, v in row.items():
+                    samples[k].append(v)
+            batch.append(row)
+            if len(batch) >= 5000:
+                conn.execute(insert(table), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+    return samples
+
+
+def _bind(shape: Shape, samples: Dict[str, List[Any]], rng: random.Random) -> Optional[Tuple[str, list]]:
+    sql = re.sub(r"\(\?\+\)", "(?)", shape.sql)
+    if sql.count("?") != len(shape.binds):
+        return None
+    params: list = []
+    for kind, col in shape.binds:
+        if kind == "limit":
+            params.append(50)
+            continue
+        if kind == "offset":
+            params.append(0)
+            continue
+        pool = samples.get(col or "") or []
+        if not pool:
+            return None
+        ordered = sorted(pool)
+        if kind in (">", ">=", "low"):
+            params.append(ordered[len(ordered) * 3 // 4])       # top quarter: a selective lower bound
+        elif kind in ("<", "<=", "high"):
+            params.append(ordered[len(ordered) // 4])
+        elif kind == "LIKE":
+            params.append(str(rng.choice(pool))[:6] + "%")
+        else:
+            params.append(rng.choice(pool))
+    return sql, params
+
+
+def _time(conn: Any, sql: str, params: list, repeat: int) -> float:
+    cur = conn.cursor()
+    cur.execute(sql, params).fetchall()                          # warm the page cache
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(sql, params).fetchall()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def _plan(conn: Any, sql: str, params: list) -> str:
+    return " | ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+
+def benchmark(proposals: List[Dict[str, Any]], workload: List[Dict[str, Any]], *, rows: int = 50_000,
+              repeat: int = 15, seed: int = 7, workdir: str | Path | None = None,
+              indexes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Time every bindable workload statement on generated data without, then with,
+    the proposals (superseded indexes present before, dropped after).
+    """
+    from sqlalchemy import create_engine
+    from ..config import settings
+    from .schema import Base
+
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="archillx_ixbench_")
+        workdir = tmp.name
+    db_path = Path(workdir) / f"index_advisor_{rows}.db"
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}", future=True)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    try:
+        indexes = indexes if indexes is not None else existing_indexes()
+        shapes = [s for s in (parse(w["fingerprint"]) for w in workload) if s is not None]
+        tables = sorted({s.table for s in shapes} | {p["table"] for p in proposals})
+        Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[t] for t in tables])
+        samples = {t: _seed(engine, Base.metadata.tables[t], rows, rng, now) for t in tables}
+        raw = engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            # "before" = the schema as it was: proposals absent, superseded indexes present
+            for p in proposals:
+                conn.execute(f"DROP INDEX IF EXISTS {p['name']}")
+                for name in p["supersedes"]:
+                    cols = next((c for n, c, _u in indexes[p["table"]] if n == name), None)
+                    if cols:
+                        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {p['table']} ({', '.join(cols)})")
+            conn.execute("ANALYZE")
+            bound = []
+            for shape in shapes:
+                b = _bind(shape, samples.get(shape.table, {}), rng)
+                if b is not None:
+                    bound.append((shape, b))
+            before = [(_time(conn, sql, params, repeat), _plan(conn, sql, params)) for _s, (sql, params) in bound]
+            for p in proposals:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {p['name']} ON {p['table']} ({', '.join(p['columns'])})")
+                for name in p["supersedes"]:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute("ANALYZE")
+            after = [(_time(conn, sql, params, repeat), _plan(conn, sql, params)) for _s, (sql, params) in bound]
+        finally:
+            raw.close()
+        results = []
+        for (shape, _b), (t0, plan0), (t1, plan1) in zip(bound, before, after):
+            results.append({
+                "fingerprint": shape.sql,
+                "before_ms": round(t0 * 1000, 4),
+                "after_ms": round(t1 * 1000, 4),
+                "speedup": round(t0 / t1, 2) if t1 else None,
+                "plan_before": plan0,
+                "plan_after": plan1,
+            })
+        total0 = sum(r["before_ms"] for r in results)
+        total1 = sum(r["after_ms"] for r in results)
+        return {
+            "benchmark": "index_advisor",
+            "version": settings.app_version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "params": {"rows": rows, "repeat": repeat, "seed": seed},
+            "proposals": proposals,
+            "results": results,
+            "unbound": [s.sql for s in shapes if all(s is not b[0] for b in bound)],
+            "speedup": round(total0 / total1, 2) if total1 else None,
+        }
+    finally:
+        engine.dispose()
+        if tmp is not None:
+            tmp.cleanup()
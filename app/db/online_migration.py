@@ -0,0 +1,518 @@
+"""
+ArcHillx — Online migrations
+============================
+Chunked, resumable, throttled data backfills for schema changes on large
+tables (ah_audit_log, ah_memory, ...), in the expand / contract pattern:
+
+  1. expand    alembic revision (or Backfill.expand steps) adds the new,
+               nullable column / table / index — cheap, no table rewrite;
+               code that writes both shapes ships with it.
+  2. backfill  OnlineMigrator.run() walks the table by primary key in short
+               transactions, `UPDATE t SET <set> WHERE key in (lo, hi] AND <pending>`
+               (or set(db, lo, hi) when the rows need Python, e.g. tokenizing),
+               committing the cursor with each chunk; it halves the chunk when
+               one runs past DB_BACKFILL_MAX_BATCH_MS, sleeps DB_BACKFILL_SLEEP_MS
+               between chunks and waits while the read replica lags.
+  3. contract  once no row matches <pending>, Backfill.contract steps (or an
+               alembic revision guarded by require_backfilled()) tighten the
+               schema / drop what the old code needed.
+
+Progress lives in ah_schema_backfills: a killed run resumes at last_key, and
+a lease (owner + heartbeat) keeps two runners off the same backfill.
+estimate() is the dry run: rows left, chunks, and the time one sample chunk
+takes inside a rolled-back transaction.
+
+CLI: scripts/online_migrate.py — status at /v1/admin/db/backfills.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..config import settings
+from ..utils.logging_utils import structured_log
+from ..utils.telemetry import telemetry
+
+logger = logging.getLogger("archillx.db.migration")
+
+Step = Union[str, Callable[[Any], None]]
+Apply = Union[str, Callable[[Any, int, int], int]]
+
+MIN_BATCH = 50
+MAX_PASSES = 3
+
+
+@dataclass(frozen=True)
+class Backfill:
+    name: str
+    table: str
+    set: Apply                            # SET clause, e.g. "hit_count = 1", or fn(db, lo, hi) -> rows written
+    pending: str                          # rows that still need it, e.g. "hit_count IS NULL"
+    key: str = "id"                       # integer primary key walked in order
+    expand: Tuple[Step, ...] = ()
+    contract: Tuple[Step, ...] = ()
+    description: str = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "table": self.table, "set": _describe(self.set), "pending": self.pending,
+                "key": self.key, "expand": [_describe(s) for s in self.expand],
+                "contract": [_describe(s) for s in self.contract], "description": self.description}
+
+
+BACKFILLS: Dict[str, Backfill] = {}
+
+
+def register(spec: Backfill) -> Backfill:
+    BACKFILLS[spec.name] = spec
+    return spec
+
+
+# ── Idempotent DDL steps ──────────────────────────────────────────────────────
+
+def _keyed(spec: Backfill) -> Any:
+    """Lightweight table() construct for spec.table with its key column, so the dialect renders paging."""
+    from sqlalchemy import column, table
+    return table(spec.table, column(spec.key))
+
+
+def _describe(step: Union[Step, Apply]) -> str:
+    return step if isinstance(step, str) else getattr(step, "__doc__", None) or repr(step)
+
+
+def _columns(conn: Any, table: str) -> set:
+    from sqlalchemy import inspect
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn: Any, table: str) -> set:
+    from sqlalchemy import inspect
+    return {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def add_column(table: str, column: Any) -> Step:
+    """Expand step: ALTER TABLE ADD COLUMN unless it exists (column must be nullable or defaulted)."""
+    def step(conn: Any) -> None:
+        from sqlalchemy import MetaData, Table
+        from sqlalchemy.schema import CreateColumn
+        if column.name not in _columns(conn, table):
+            bound = column._copy()
+            Table(table, MetaData(), bound)                # mssql renders DDL only for Table-bound columns
+            ddl = CreateColumn(bound).compile(dialect=conn.dialect)
+            add = "ADD" if conn.dialect.name == "mssql" else "ADD COLUMN"      # T-SQL has no COLUMN keyword
+            conn.exec_driver_sql(f"ALTER TABLE {table} {add} {ddl}")
+    step.__doc__ = f"add column {table}.{column.name}"
+    return step
+
+
+def drop_column(table: str, name: str) -> Step:
+    def step(conn: Any) -> None:
+        if name in _columns(conn, table):
+            conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {name}")
+    step.__doc__ = f"drop column {table}.{name}"
+    return step
+
+
+def create_index(name: str, table: str, columns: List[str]) -> Step:
+    def step(conn: Any) -> None:
+        if name not in _indexes(conn, table):
+            conn.exec_driver_sql(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+    step.__doc__ = f"create index {name} on {table} ({', '.join(columns)})"
+    return step
+
+
+def drop_index(name: str, table: str) -> Step:
+    def step(conn: Any) -> None:
+        if name in _indexes(conn, table):
+            conn.exec_driver_sql(f"DROP INDEX {name} ON {table}" if conn.dialect.name in ("mysql", "mssql")
+                                 else f"DROP INDEX {name}")
+    step.__doc__ = f"drop index {name}"
+    return step
+
+
+def require_backfilled(name: str, bind: Any = None) -> None:
+    """
+    Guard for a contract alembic revision: raise unless the backfill finished.
+    bind defaults to the alembic connection (op.get_bind()).
+    """
+    from sqlalchemy import text
+    if bind is None:
+        from alembic import op
+        bind = op.get_bind()
+    phase = bind.execute(text("SELECT phase FROM ah_schema_backfills WHERE name = :n"), {"n": name}).scalar()
+    if phase not in ("backfilled", "contracted"):
+        raise RuntimeError(
+            f"backfill {name!r} is {phase or 'not started'}; run scripts/online_migrate.py run {name} first"
+        )
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+class BackfillBusy(RuntimeError):
+    pass
+
+
+class OnlineMigrator:
+    def __init__(self) -> None:
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._lock = threading.Lock()
+
+    def policy(self) -> dict:
+        return {
+            "batch_size": int(settings.db_backfill_batch_size),
+            "sleep_ms": int(settings.db_backfill_sleep_ms),
+            "max_batch_ms": int(settings.db_backfill_max_batch_ms),
+            "lease_s": int(settings.db_backfill_lease_s),
+        }
+
+    def spec(self, name: str) -> Backfill:
+        """The registered Backfill; KeyError for an unknown name."""
+        return BACKFILLS[name]
+
+    def status(self) -> dict:
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        with session_scope(shared=False) as db:
+            rows = {r.name: r for r in db.query(AHSchemaBackfill).all()}
+            items = []
+            for name in sorted(set(BACKFILLS) | set(rows)):
+                entry = BACKFILLS[name].as_dict() if name in BACKFILLS else {"name": name, "registered": False}
+                entry["progress"] = _progress(rows.get(name))
+                items.append(entry)
+        return {"policy": self.policy(), "backfills": items}
+
+    # ── Dry run ───────────────────────────────────────────────────────────────
+
+    def estimate(self, name: str, *, batch_size: Optional[int] = None, sample: bool = True) -> dict:
+        """Rows and chunks left from the saved cursor and, with sample, the time that takes."""
+        from sqlalchemy import text
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        spec = self.spec(name)
+        batch = max(MIN_BATCH, int(batch_size or settings.db_backfill_batch_size))
+        sleep_ms = max(0, int(settings.db_backfill_sleep_ms))
+        with session_scope(shared=False) as db:
+            row = db.get(AHSchemaBackfill, name)
+            last_key = int(row.last_key) if row is not None else 0
+            scan = db.execute(text(f"SELECT COUNT(*) FROM {spec.table} WHERE {spec.key} > :lo"),
+                              {"lo": last_key}).scalar() or 0
+            expanded = self._expanded(spec)
+            pending = self._pending(spec) if expanded else None
+            out: Dict[str, Any] = {
+                "name": name, "table": spec.table, "progress": _progress(row),
+                "rows_to_scan": int(scan), "rows_pending": pending,
+                "batch_size": batch, "batches": math.ceil(scan / batch) if scan else 0,
+                "sleep_ms": sleep_ms, "expand": [_describe(s) for s in spec.expand],
+                "contract": [_describe(s) for s in spec.contract], "dry_run": True,
+            }
+            if sample and scan and expanded:
+                hi = self._boundary(db, spec, last_key, batch)
+                t0 = time.perf_counter()
+                touched = self._apply(db, spec, last_key, hi)
+                ms = (time.perf_counter() - t0) * 1000.0
+                db.rollback()                                   # the sample never commits
+                out["sample"] = {"rows_scanned": min(batch, int(scan)), "rows_updated": touched,
+                                 "ms": round(ms, 3)}
+                out["est_seconds"] = round(out["batches"] * (ms + sleep_ms) / 1000.0, 1)
+            elif scan:
+                out["est_seconds"] = None
+            else:
+                out["est_seconds"] = 0.0
+        return out
+
+    # ── Run ───────────────────────────────────────────────────────────────────
+
+    def run(self, name: str, *, contract: bool = False, batch_size: Optional[int] = None,
+            sleep_ms: Optional[int] = None, max_batches: Optional[int] = None,
+            max_seconds: Optional[float] = None, stop: Optional[threading.Event] = None) -> dict:
+        """
+        Take the lease and advance the backfill: expand → chunks → (contract when asked).
+        Stops early at max_batches / max_seconds / stop with the cursor saved; call again to resume.
+        """
+        spec = self.spec(name)
+        if not self._lock.acquire(blocking=False):
+            return {"name": name, "skipped": True, "reason": "already_running"}
+        started = time.monotonic()
+        try:
+            if not self._claim(spec):
+                return {"name": name, "skipped": True, "reason": "leased"}
+            phase = self._phase(name)
+            result: Dict[str, Any] = {"name": name, "table": spec.table, "rows": 0, "batches": 0}
+            try:
+                if phase == "pending":
+                    self._ddl(spec.expand)
+                    phase = self._set_phase(name, "expanded")
+                if phase in ("expanded", "backfilling", "failed"):
+                    phase = self._backfill(spec, result, batch_size, sleep_ms, max_batches, max_seconds, stop)
+                if contract and phase == "backfilled":
+                    if self._pending(spec):
+                        raise RuntimeError(f"rows matching {spec.pending!r} reappeared; re-run the backfill")
+                    self._ddl(spec.contract)
+                    phase = self._set_phase(name, "contracted", finished=True)
+            except BackfillBusy:
+                raise                                       # the new lease holder owns the phase now
+            except Exception as e:
+                self._set_phase(name, "failed", error=str(e))
+                structured_log(logger, logging.ERROR, "db_backfill_failed", name=name, error=str(e))
+                raise
+            result["phase"] = phase
+            result["elapsed_s"] = round(time.monotonic() - started, 3)
+            structured_log(logger, logging.INFO, "db_backfill_run", **result)
+            return result
+        finally:
+            self._release(name)
+            self._lock.release()
+
+    def _backfill(self, spec: Backfill, result: dict, batch_size: Optional[int], sleep_ms: Optional[int],
+                  max_batches: Optional[int], max_seconds: Optional[float],
+                  stop: Optional[threading.Event]) -> str:
+        from .session import session_scope
+        target = max(MIN_BATCH, int(batch_size or settings.db_backfill_batch_size))
+        pause = max(0, int(settings.db_backfill_sleep_ms if sleep_ms is None else sleep_ms)) / 1000.0
+        slow_ms = max(1, int(settings.db_backfill_max_batch_ms))
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        batch = target
+        passes = 0
+        pass_rows = 0
+        self._set_phase(spec.name, "backfilling")
+        while True:
+            if (max_batches is not None and result["batches"] >= max_batches) or (stop and stop.is_set()) \
+                    or (deadline and time.monotonic() >= deadline):
+                result["paused"] = True
+                return "backfilling"
+            t0 = time.perf_counter()
+            with session_scope(shared=False) as db:
+                lo = self._cursor(db, spec.name)
+                hi = self._boundary(db, spec, lo, batch)
+                if hi is None:
+                    db.rollback()
+                    remaining = self._pending(spec)
+                    if remaining and passes and not pass_rows and callable(spec.set):
+                        # a whole re-pass wrote nothing: what is left has nothing to write (no index terms, ...)
+                        result["left_pending"] = remaining
+                        remaining = 0
+                    if not remaining:
+                        return self._set_phase(spec.name, "backfilled", finished=True)
+                    passes += 1                     # rows written behind the cursor by pre-expand code
+                    if passes >= MAX_PASSES:
+                        raise RuntimeError(f"{remaining} rows still match {spec.pending!r} after {passes} passes; "
+                                           "is the expand-phase code deployed everywhere?")
+                    self._advance(db, spec.name, 0, 0, reset=True)
+                    db.commit()
+                    pass_rows = 0
+                    continue
+                touched = self._apply(db, spec, lo, hi)
+                if not self._advance(db, spec.name, hi, touched):
+                    db.rollback()
+                    raise BackfillBusy(f"lease on {spec.name} lost to another runner")
+                db.commit()
+            ms = (time.perf_counter() - t0) * 1000.0
+            result["rows"] += touched
+            result["batches"] += 1
+            pass_rows += touched
+            telemetry.incr("db_backfill_rows_total", touched)
+            telemetry.timing("db_backfill_batch_ms", ms)
+            if ms > slow_ms and batch > MIN_BATCH:
+                batch = max(MIN_BATCH, batch // 2)
+            elif ms < slow_ms / 4 and batch < target:
+                batch = min(target, batch * 2)
+            result["batch_size"] = batch
+            self._wait(pause, deadline, stop)
+
+    def _wait(self, pause: float, deadline: Optional[float], stop: Optional[threading.Event]) -> None:
+        """Inter-chunk throttle, stretched while the read replica is out of rotation for lag."""
+        from .replica import _replica_engine, replica_monitor
+        replica = _replica_engine()
+        while True:
+            if stop is not None:
+                stop.wait(pause)
+            elif pause:
+                time.sleep(pause)
+            if replica is None or replica_monitor.usable() is not None:
+                return
+            if (stop and stop.is_set()) or (deadline and time.monotonic() >= deadline):
+                return
+            telemetry.incr("db_backfill_lag_waits_total")
+            pause = max(pause, float(settings.db_replica_lag_check_s))
+
+    # ── SQL ───────────────────────────────────────────────────────────────────
+
+    def _boundary(self, db: Any, spec: Backfill, lo: int, batch: int) -> Optional[int]:
+        """Upper key of the next chunk (lo, hi] — an index range scan on the primary key."""
+        from sqlalchemy import func, select
+        key = _keyed(spec).c[spec.key]
+        hi = db.execute(select(key).where(key > lo).order_by(key).offset(batch - 1).limit(1)).scalar()
+        if hi is None:
+            hi = db.execute(select(func.max(key)).where(key > lo)).scalar()
+        return int(hi) if hi is not None else None
+
+    def _apply(self, db: Any, spec: Backfill, lo: int, hi: Optional[int]) -> int:
+        from sqlalchemy import text
+        if hi is None:
+            return 0
+        if callable(spec.set):
+            return max(0, int(spec.set(db, lo, hi) or 0))
+        res = db.execute(text(f"UPDATE {spec.table} SET {spec.set} "
+                              f"WHERE {spec.key} > :lo AND {spec.key} <= :hi AND ({spec.pending})"),
+                         {"lo": lo, "hi": hi})
+        return max(0, int(res.rowcount or 0))
+
+    def _pending(self, spec: Backfill) -> int:
+        from sqlalchemy import text
+        from .session import session_scope
+        with session_scope(shared=False) as db:
+            return int(db.execute(text(f"SELECT COUNT(*) FROM {spec.table} WHERE {spec.pending}")).scalar() or 0)
+
+    def _expanded(self, spec: Backfill) -> bool:
+        """Whether the pending predicate can run yet (expand steps may still have to add its columns)."""
+        from sqlalchemy import literal_column, select, text
+        from .session import session_scope
+        try:
+            with session_scope(shared=False) as db:
+                db.execute(select(literal_column("1")).select_from(_keyed(spec))
+                           .where(text(spec.pending)).limit(1))
+            return True
+        except Exception:
+            return False
+
+    def _ddl(self, steps: Tuple[Step, ...]) -> None:
+        from .session import session_scope
+        if not steps:
+            return
+        with session_scope(shared=False) as db:
+            conn = db.connection()
+            for step in steps:
+                if isinstance(step, str):
+                    conn.exec_driver_sql(step)
+                else:
+                    step(conn)
+            db.commit()
+
+    # ── Progress row / lease ──────────────────────────────────────────────────
+
+    def _claim(self, spec: Backfill) -> bool:
+        from sqlalchemy import or_, update
+        from sqlalchemy.exc import IntegrityError
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        now = datetime.utcnow()
+        with session_scope(shared=False) as db:
+            if db.get(AHSchemaBackfill, spec.name) is None:
+                db.add(AHSchemaBackfill(name=spec.name, table_name=spec.table, phase="pending", last_key=0,
+                                        rows_done=0, batches=0, started_at=now))
+                try:
+                    db.commit()
+                except IntegrityError:                      # another runner created it first
+                    db.rollback()
+            expiry = now - timedelta(seconds=max(1, int(settings.db_backfill_lease_s)))
+            res = db.execute(
+                update(AHSchemaBackfill)
+                .where(AHSchemaBackfill.name == spec.name)
+                .where(or_(AHSchemaBackfill.owner.is_(None), AHSchemaBackfill.owner == self.owner,
+                           AHSchemaBackfill.heartbeat_at < expiry))
+                .values(owner=self.owner, heartbeat_at=now)
+            )
+            db.commit()
+            return bool(res.rowcount)
+
+    def _release(self, name: str) -> None:
+        from sqlalchemy import update
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        try:
+            with session_scope(shared=False) as db:
+                db.execute(update(AHSchemaBackfill)
+                           .where(AHSchemaBackfill.name == name, AHSchemaBackfill.owner == self.owner)
+                           .values(owner=None))
+                db.commit()
+        except Exception as e:
+            logger.warning("backfill lease release failed for %s: %s", name, e)
+
+    def _cursor(self, db: Any, name: str) -> int:
+        from sqlalchemy import select
+        from .schema import AHSchemaBackfill
+        return int(db.execute(select(AHSchemaBackfill.last_key).where(AHSchemaBackfill.name == name)).scalar() or 0)
+
+    def _advance(self, db: Any, name: str, last_key: int, rows: int, reset: bool = False) -> bool:
+        """Move the cursor in the chunk's own transaction; False if the lease is no longer ours."""
+        from sqlalchemy import update
+        from .schema import AHSchemaBackfill
+        values: Dict[str, Any] = {"last_key": last_key, "heartbeat_at": datetime.utcnow()}
+        if not reset:
+            values["rows_done"] = AHSchemaBackfill.rows_done + rows
+            values["batches"] = AHSchemaBackfill.batches + 1
+        res = db.execute(update(AHSchemaBackfill)
+                         .where(AHSchemaBackfill.name == name, AHSchemaBackfill.owner == self.owner)
+                         .values(**values))
+        return bool(res.rowcount)
+
+    def _phase(self, name: str) -> str:
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        with session_scope(shared=False) as db:
+            row = db.get(AHSchemaBackfill, name)
+            return row.phase if row is not None else "pending"
+
+    def _set_phase(self, name: str, phase: str, *, finished: bool = False, error: Optional[str] = None) -> str:
+        from sqlalchemy import update
+        from .schema import AHSchemaBackfill
+        from .session import session_scope
+        values: Dict[str, Any] = {"phase": phase, "error": error}
+        if finished:
+            values["finished_at"] = datetime.utcnow()
+        with session_scope(shared=False) as db:
+            db.execute(update(AHSchemaBackfill).where(AHSchemaBackfill.name == name).values(**values))
+            db.commit()
+        return phase
+
+
+def _progress(row: Any) -> Dict[str, Any]:
+    if row is None:
+        return {"phase": "pending", "last_key": 0, "rows_done": 0, "batches": 0}
+    return {
+        "phase": row.phase,
+        "last_key": int(row.last_key or 0),
+        "rows_done": int(row.rows_done or 0),
+        "batches": int(row.batches or 0),
+        "owner": row.owner,
+        "heartbeat_at": row.heartbeat_at.isoformat() if row.heartbeat_at else None,
+        "error": row.error,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+    }
+
+
+online_migrator = OnlineMigrator()
+
+
+# ── Registered backfills ──────────────────────────────────────────────────────
+
+register(Backfill(
+    name="memory_hit_count",
+    table="ah_memory",
+    set="hit_count = 1",
+    pending="hit_count IS NULL",
+    description="ah_memory.hit_count was added nullable (20261018_000003); rows from before it read as NULL.",
+))
+
+
+def _index_memory_terms(db: Any, lo: int, hi: int) -> int:
+    """index the chunk's ah_memory rows that have no ah_memory_terms yet"""
+    from ..memory.store import memory_store
+    return memory_store.index_missing(db, lo, hi)
+
+
+register(Backfill(
+    name="memory_terms",
+    table="ah_memory",
+    set=_index_memory_terms,
+    pending="NOT EXISTS (SELECT 1 FROM ah_memory_terms WHERE ah_memory_terms.memory_id = ah_memory.id)",
+    description="ah_memory_terms (20261018_000002) starts empty; rows written before it are only reachable "
+                "through the ILIKE fallback until indexed. Rows whose content yields no terms stay pending.",
+))
@@ -0,0 +1,430 @@
+"""
+ArcHillx — Query profiler
+=========================
+Cursor-level SQL accounting on the application engines:
+
+  fingerprints   every statement is normalised (literals → ?, IN / VALUES lists
+                 collapsed) and timed into latency buckets with call count,
+                 total / max time and rows returned
+  units          track(label) opens a unit of work — an HTTP request, an OODA
+                 run, a cron job — and every query made inside it (executor
+                 threads included, via contextvars) is charged to it and to the
+                 units around it; on exit the unit is folded into per-label
+                 cost (queries / DB time per unit)
+  N+1            a fingerprint repeated DB_N_PLUS_ONE_THRESHOLD+ times inside one
+                 unit is reported under "n_plus_one" with the unit's label
+  slow log       statements over DB_SLOW_QUERY_MS log a db_slow_query line
+                 carrying the request / session / task ids from logging_utils
+
+Rows are the driver's rowcount where it reports one (DML; SELECT on MySQL),
+else the ORM instances loaded from the statement's result.
+
+Exposed at /v1/admin/db/profile and appended to /metrics.
+"""
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from ..utils.logging_utils import get_request_context, structured_log
+from ..utils.telemetry import telemetry
+
+logger = logging.getLogger("archillx.db")
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+OTHER = "<other>"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LIST = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_PYFORMAT = re.compile(r"%\(\w+\)s|%s")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and bind-parameter lists collapsed."""
+    s = _STRING.sub("?", statement)
+    s = _NUMBER.sub("?", s)
+    s = _PYFORMAT.sub("?", s)
+    s = _PARAM_LIST.sub("(?+)", s)
+    s = _ROW_LIST.sub("(?+), ...", s)
+    return _SPACE.sub(" ", s).strip()[:1000]
+
+
+def fingerprint_id(fp: str) -> str:
+    return hashlib.sha1(fp.encode("utf-8")).hexdigest()[:12]
+
+
+class _Stat:
+    __slots__ = ("count", "total_s", "max_s", "rows", "buckets", "cache_hits")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.cache_hits = 0
+
+
+class Unit:
+    __slots__ = ("label", "parent", "queries", "db_s", "rows", "per_fp", "started")
+
+    def __init__(self, label: str, parent: Optional["Unit"]) -> None:
+        self.label = label
+        self.parent = parent
+        self.queries = 0
+        self.db_s = 0.0
+        self.rows = 0
+        self.per_fp: Counter = Counter()
+        self.started = time.monotonic()
+
+
+class _LabelStat:
+    __slots__ = ("units", "queries", "queries_max", "db_s", "rows")
+
+    def __init__(self) -> None:
+        self.units = 0
+        self.queries = 0
+        self.queries_max = 0
+        self.db_s = 0.0
+        self.rows = 0
+
+
+_unit: contextvars.ContextVar[Optional[Unit]] = contextvars.ContextVar("db_profile_unit", default=None)
+
+
+class QueryProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Any] = {}
+        self._stats: Dict[str, _Stat] = {}
+        self._labels: Dict[str, _LabelStat] = {}
+        self._n_plus_one: Dict[tuple, Dict[str, Any]] = {}
+        self._recent: deque = deque(maxlen=50)
+        self._cache: Counter = Counter()      # engine compiled-cache outcome: hit | miss | uncached
+        self._last = threading.local()        # statement whose result the ORM is loading on this thread
+        self._started = time.time()
+
+    # ── Collection ────────────────────────────────────────────────────────────
+
+    def install(self, engine: Any, name: str = "primary") -> None:
+        """Attach cursor listeners to `engine` (idempotent per name and engine)."""
+        with self._lock:
+            if self._engines.get(name) is engine:
+                return
+            self._engines[name] = engine
+
+        def before(conn, _cursor, _statement, _parameters, _context, _executemany):
+            conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, _parameters, context, _executemany):
+            stack = conn.info.get("profile_t0")
+            if not stack:
+                return
+            elapsed = time.perf_counter() - stack.pop()
+            rowcount = getattr(cursor, "rowcount", -1)
+            self.record(statement, elapsed, rowcount if isinstance(rowcount, int) and rowcount >= 0 else None,
+                        engine=name, cache=_cache_outcome(context))
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+
+    def record(self, statement: str, elapsed_s: float, rows: Optional[int] = None, engine: str = "primary",
+               cache: Optional[str] = None) -> None:
+        """Charge one executed statement to its fingerprint and the open units."""
+        from ..config import settings
+        if not settings.db_profile:
+            return
+        fp = fingerprint(statement)
+        units: List[Unit] = []
+        unit = _unit.get()
+        while unit is not None:
+            units.append(unit)
+            unit = unit.parent
+        n = rows or 0
+        ratio = None
+        with self._lock:
+            stat = self._stats.get(fp)
+            if stat is None:
+                if len(self._stats) >= max(1, settings.db_profile_max_fingerprints):
+                    fp = OTHER
+                stat = self._stats.setdefault(fp, _Stat())
+            stat.count += 1
+            stat.total_s += elapsed_s
+            stat.max_s = max(stat.max_s, elapsed_s)
+            stat.rows += n
+            stat.buckets[_bucket(elapsed_s)] += 1
+            if cache is not None:
+                self._cache[cache] += 1
+                stat.cache_hits += cache == "hit"
+                compiled = self._cache["hit"] + self._cache["miss"]
+                if compiled:
+                    ratio = self._cache["hit"] / compiled
+            for u in units:
+                u.queries += 1
+                u.db_s += elapsed_s
+                u.rows += n
+                u.per_fp[fp] += 1
+        self._last.entry = (stat, units) if rows is None else None
+        telemetry.incr("db_queries_total")
+        if cache is not None:
+            telemetry.incr(f"db_compile_cache_{_CACHE_COUNTERS[cache]}_total")
+            if ratio is not None:
+                telemetry.gauge("db_compile_cache_hit_ratio", round(ratio, 4))
+        if elapsed_s * 1000.0 >= settings.db_slow_query_ms:
+            telemetry.incr("db_slow_queries_total")
+            structured_log(
+                logger, logging.WARNING, "db_slow_query",
+                engine=engine, elapsed_ms=round(elapsed_s * 1000.0, 3), rows=rows,
+                fingerprint=fp[:500], fingerprint_id=fingerprint_id(fp),
+                unit=units[0].label if units else None, **get_request_context(),
+            )
+
+    def _on_load(self, _target, _context) -> None:
+        entry = getattr(self._last, "entry", None)
+        if entry is None:
+            return
+        stat, units = entry
+        with self._lock:
+            stat.rows += 1
+            for u in units:
+                u.rows += 1
+
+    @contextmanager
+    def track(self, label: str) -> Iterator[Unit]:
+        """
+        Charge the queries made inside the block to a unit named `label`
+        (the label may be changed on the yielded Unit before the block ends).
+        """
+        unit = Unit(label, _unit.get())
+        token = _unit.set(unit)
+        try:
+            yield unit
+        finally:
+            _unit.reset(token)
+            self._finish(unit)
+
+    def _finish(self, unit: Unit) -> None:
+        from ..config import settings
+        if not settings.db_profile:
+            return
+        threshold = max(2, settings.db_n_plus_one_threshold)
+        ctx = get_request_context()
+        with self._lock:
+            ls = self._labels.setdefault(unit.label, _LabelStat())
+            ls.units += 1
+            ls.queries += unit.queries
+            ls.queries_max = max(ls.queries_max, unit.queries)
+            ls.db_s += unit.db_s
+            ls.rows += unit.rows
+            repeated = [(fp, n) for fp, n in unit.per_fp.items() if n >= threshold and fp != OTHER]
+            for fp, n in repeated:
+                hit = self._n_plus_one.setdefault((unit.label, fp), {"units": 0, "max_repeats": 0})
+                hit["units"] += 1
+                hit["max_repeats"] = max(hit["max_repeats"], n)
+                hit["last_request_id"] = ctx.get("request_id")
+            if unit.queries:
+                self._recent.append({
+                    "label": unit.label,
+                    "request_id": ctx.get("request_id"),
+                    "task_id": ctx.get("task_id"),
+                    "queries": unit.queries,
+                    "db_ms": round(unit.db_s * 1000.0, 3),
+                    "rows": unit.rows,
+                    "elapsed_ms": round((time.monotonic() - unit.started) * 1000.0, 3),
+                    "top_repeat": unit.per_fp.most_common(1)[0][1],
+                })
+        for _ in repeated:
+            telemetry.incr("db_n_plus_one_total")
+
+    # ── Reporting ─────────────────────────────────────────────────────────────
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._labels.clear()
+            self._n_plus_one.clear()
+            self._recent.clear()
+            self._cache.clear()
+            self._started = time.time()
+
+    def snapshot(self, top: int = 20, sort: str = "total") -> Dict[str, Any]:
+        """Top fingerprints by `sort` (total|count|max|avg|rows), per-label cost, N+1 suspects, recent units."""
+        from ..config import settings
+        keys = {
+            "total": lambda s: s.total_s, "count": lambda s: s.count, "max": lambda s: s.max_s,
+            "avg": lambda s: s.total_s / s.count if s.count else 0.0, "rows": lambda s: s.rows,
+        }
+        key = keys.get(sort, keys["total"])
+        with self._lock:
+            ranked = sorted(self._stats.items(), key=lambda kv: -key(kv[1]))[:max(1, top)]
+            fingerprints = [_stat_dict(fp, s) for fp, s in ranked]
+            units = {
+                label: {
+                    "units": ls.units,
+                    "queries": ls.queries,
+                    "queries_avg": round(ls.queries / ls.units, 2) if ls.units else 0.0,
+                    "queries_max": ls.queries_max,
+                    "db_ms_avg": round(ls.db_s * 1000.0 / ls.units, 3) if ls.units else 0.0,
+                    "rows": ls.rows,
+                }
+                for label, ls in sorted(self._labels.items(), key=lambda kv: -kv[1].queries)
+            }
+            n_plus_one = sorted(
+                ({"label": label, "fingerprint": fp, "fingerprint_id": fingerprint_id(fp), **hit}
+                 for (label, fp), hit in self._n_plus_one.items()),
+                key=lambda x: -x["max_repeats"],
+            )
+            totals = {
+                "queries": sum(s.count for s in self._stats.values()),
+                "db_s": round(sum(s.total_s for s in self._stats.values()), 6),
+                "fingerprints": len(self._stats),
+            }
+            recent = list(self._recent)[-20:]
+            cache = dict(self._cache)
+        return {
+            "enabled": bool(settings.db_profile),
+            "since": self._started,
+            "slow_query_ms": settings.db_slow_query_ms,
+            "n_plus_one_threshold": settings.db_n_plus_one_threshold,
+            "buckets_s": list(BUCKETS),
+            "totals": totals,
+            "fingerprints": fingerprints,
+            "units": units,
+            "n_plus_one": n_plus_one,
+            "recent": recent,
+            "compile_cache": self.compile_cache(cache),
+        }
+
+    def compile_cache(self, outcomes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Compiled-statement cache effectiveness: per-outcome counts, hit ratio, engine cache fill, prepared statements."""
+        from . import statements
+        if outcomes is None:
+            with self._lock:
+                outcomes = dict(self._cache)
+        hits, misses = outcomes.get("hit", 0), outcomes.get("miss", 0)
+        engines = {}
+        for name, engine in list(self._engines.items()):
+            lru = getattr(engine, "_compiled_cache", None)
+            engines[name] = {"size": len(lru), "capacity": getattr(lru, "capacity", None)} if lru is not None \
+                else {"size": 0, "capacity": 0}
+        return {
+            "hits": hits,
+            "misses": misses,
+            "uncached": outcomes.get("uncached", 0),
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "engines": engines,
+            "statements": statements.stats(),
+        }
+
+    def as_prometheus(self, top: int = 20) -> str:
+        """Latency histogram over all statements, top fingerprints and per-label query counts."""
+        with self._lock:
+            merged = [0] * (len(BUCKETS) + 1)
+            total_s = 0.0
+            count = rows = 0
+            for s in self._stats.values():
+                for i, n in enumerate(s.buckets):
+                    merged[i] += n
+                total_s += s.total_s
+                count += s.count
+                rows += s.rows
+            ranked = sorted(self._stats.items(), key=lambda kv: -kv[1].total_s)[:top]
+            top_fp = [(fingerprint_id(fp), s.count, s.total_s) for fp, s in ranked]
+            labels = [(label, ls.units, ls.queries) for label, ls in sorted(self._labels.items())]
+            hits, misses = self._cache["hit"], self._cache["miss"]
+        lines = ["# TYPE archillx_db_query_duration_seconds histogram"]
+        cumulative = 0
+        for bound, n in zip(BUCKETS, merged):
+            cumulative += n
+            lines.append(f'archillx_db_query_duration_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'archillx_db_query_duration_seconds_bucket{{le="+Inf"}} {count}')
+        lines.append(f"archillx_db_query_duration_seconds_sum {total_s}")
+        lines.append(f"archillx_db_query_duration_seconds_count {count}")
+        lines.append("# TYPE archillx_db_query_rows_total counter")
+        lines.append(f"archillx_db_query_rows_total {rows}")
+        lines.append("# TYPE archillx_db_fingerprint_seconds_total counter")
+        for fid, _n, secs in top_fp:
+            lines.append(f'archillx_db_fingerprint_seconds_total{{fingerprint_id="{fid}"}} {secs}')
+        lines.append("# TYPE archillx_db_fingerprint_calls_total counter")
+        for fid, n, _secs in top_fp:
+            lines.append(f'archillx_db_fingerprint_calls_total{{fingerprint_id="{fid}"}} {n}')
+        lines.append("# TYPE archillx_db_unit_queries_total counter")
+        for label, _units, queries in labels:
+            lines.append(f'archillx_db_unit_queries_total{{unit="{_escape(label)}"}} {queries}')
+        lines.append("# TYPE archillx_db_units_total counter")
+        for label, units, _queries in labels:
+            lines.append(f'archillx_db_units_total{{unit="{_escape(label)}"}} {units}')
+        if hits + misses:
+            lines.append("# TYPE archillx_db_compile_cache_hit_ratio gauge")
+            lines.append(f"archillx_db_compile_cache_hit_ratio {hits / (hits + misses)}")
+        return "\n".join(lines) + "\n"
+
+
+def _bucket(elapsed_s: float) -> int:
+    for i, bound in enumerate(BUCKETS):
+        if elapsed_s <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def _stat_dict(fp: str, s: _Stat) -> Dict[str, Any]:
+    return {
+        "fingerprint": fp,
+        "fingerprint_id": fingerprint_id(fp),
+        "count": s.count,
+        "total_ms": round(s.total_s * 1000.0, 3),
+        "avg_ms": round(s.total_s * 1000.0 / s.count, 3) if s.count else 0.0,
+        "max_ms": round(s.max_s * 1000.0, 3),
+        "rows": s.rows,
+        "cache_hit_ratio": round(s.cache_hits / s.count, 4) if s.count else None,
+        "buckets": {("+Inf" if i == len(BUCKETS) else str(BUCKETS[i])): n for i, n in enumerate(s.buckets) if n},
+    }
+
+
+_CACHE_COUNTERS = {"hit": "hits", "miss": "misses", "uncached": "uncached"}
+
+
+def _cache_outcome(context: Any) -> Optional[str]:
+    """hit / miss / uncached from the execution context's compiled-cache stat (None for raw driver SQL)."""
+    from sqlalchemy.engine import default
+    stat = getattr(context, "cache_hit", None)
+    if stat is None:
+        return None
+    if stat is default.CACHE_HIT:
+        return "hit"
+    if stat is default.CACHE_MISS:
+        return "miss"
+    return "uncached"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+query_profiler = QueryProfiler()
+
+
+def install_query_profiler() -> None:
+    """Profile the application engines and count ORM-loaded rows."""
+    from . import schema
+    query_profiler.install(schema.engine, "primary")
+    if schema.writer_engine is not None:
+        query_profiler.install(schema.writer_engine, "writer")
+    if schema.replica_engine is not None:
+        query_profiler.install(schema.replica_engine, "replica")
+    if not event.contains(schema.Base, "load", query_profiler._on_load):
+        event.listen(schema.Base, "load", query_profiler._on_load, propagate=True)
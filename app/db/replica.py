@@ -0,0 +1,172 @@
+"""
+ArcHillx — Read-replica routing
+===============================
+Reporting endpoints (/v1/audit/*, /v1/lmf/stats) scan tables the OODA loop
+is writing to.  With DB_READ_REPLICA=true they read through replica_scope(),
+whose session sends reads to schema.replica_engine and anything that writes
+to the primary (see RoutingSession), so report load queues on its own pool
+instead of the one agent runs check out of.
+
+  replica_scope()     unit of work for read-mostly reporting code; a plain
+                      session_scope() when there is no usable replica
+  replica_monitor     cached lag probe; a replica behind by more than
+                      DB_REPLICA_MAX_LAG_S, or one that fails the probe, is
+                      skipped until the next check (DB_REPLICA_LAG_CHECK_S)
+
+Lag probes per dialect:
+  sqlite      0 — the mode=ro pool reads the primary file itself
+  mysql       SHOW REPLICA STATUS → Seconds_Behind_Source (NULL = replication stopped)
+  postgresql  now() - pg_last_xact_replay_timestamp(), 0 when fully replayed
+  otherwise   SELECT 1 reachability only
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from ..utils.telemetry import telemetry
+from .session import session_scope
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger("archillx.db")
+
+_PG_LAG = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def _replica_engine() -> Any:
+    try:
+        from .schema import replica_engine
+    except ImportError:
+        return None
+    return replica_engine
+
+
+def probe_lag(engine: Any) -> Optional[float]:
+    """Replica lag in seconds; None when the replica reports replication stopped."""
+    from sqlalchemy import text
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            conn.execute(text("SELECT 1"))
+            return 0.0
+        if dialect == "mysql":
+            try:
+                row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+            except Exception:                       # MySQL < 8.0.22
+                row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+            if row is None:                         # not a replica: a standalone reader is never behind
+                return 0.0
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+            return None if lag is None else float(lag)
+        if dialect == "postgresql":
+            lag = conn.execute(text(_PG_LAG)).scalar()
+            return 0.0 if lag is None else max(0.0, float(lag))
+        conn.execute(text("SELECT 1"))
+        return 0.0
+
+
+class ReplicaMonitor:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._checked_at: Optional[float] = None
+        self._lag_s: Optional[float] = None
+        self._error: Optional[str] = None
+        self._healthy = False
+
+    def invalidate(self) -> None:
+        """Force a fresh probe before the next replica read."""
+        self._checked_at = None
+
+    def _stale(self, interval_s: float) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= interval_s
+
+    def check(self, engine: Any) -> bool:
+        """Probe now and return whether the replica is within DB_REPLICA_MAX_LAG_S."""
+        from ..config import settings
+        try:
+            lag, error = probe_lag(engine), None
+        except Exception as e:
+            lag, error = None, str(e)
+        healthy = lag is not None and lag <= float(settings.db_replica_max_lag_s)
+        with self._lock:
+            was = self._healthy
+            self._lag_s, self._error, self._healthy = lag, error, healthy
+            self._checked_at = time.monotonic()
+        if lag is not None:
+            telemetry.gauge("db_replica_lag_s", lag)
+        telemetry.gauge("db_replica_healthy", 1 if healthy else 0)
+        if was != healthy:
+            logger.warning("db replica %s: lag=%s error=%s",
+                           "in rotation" if healthy else "out of rotation", lag, error)
+        return healthy
+
+    def usable(self) -> Optional[Any]:
+        """The replica engine if reads may go to it right now, else None."""
+        from ..config import settings
+        engine = _replica_engine()
+        if engine is None:
+            return None
+        interval = float(settings.db_replica_lag_check_s)
+        if self._stale(interval):
+            with self._lock:
+                stale = self._stale(interval)
+                if stale:                           # one prober; the rest use the last verdict
+                    self._checked_at = time.monotonic()
+            if stale:
+                self.check(engine)
+        return engine if self._healthy else None
+
+    def status(self) -> Dict[str, Any]:
+        from ..config import settings
+        engine = _replica_engine()
+        with self._lock:
+            checked = self._checked_at
+            return {
+                "enabled": engine is not None,
+                "healthy": self._healthy if engine is not None else False,
+                "lag_s": self._lag_s,
+                "max_lag_s": float(settings.db_replica_max_lag_s),
+                "error": self._error,
+                "checked_s_ago": round(time.monotonic() - checked, 3) if checked is not None else None,
+            }
+
+
+replica_monitor = ReplicaMonitor()
+
+
+@contextmanager
+def replica_scope() -> Iterator[Session]:
+    """
+    Yield a session whose reads go to the read replica when one is configured
+    and current; otherwise (or for anything that writes) the primary.
+    Replica sessions are independent — they never join an open unit of work.
+    """
+    engine = replica_monitor.usable()
+    if engine is None:
+        if _replica_engine() is not None:
+            telemetry.incr("db_replica_fallback_total")
+        with session_scope() as db:
+            yield db
+        return
+    from .schema import SessionLocal
+    db = SessionLocal()
+    db.info["replica_engine"] = engine
+    telemetry.incr("db_replica_reads_total")
+    try:
+        yield db
+    except Exception as e:
+        db.rollback()
+        from sqlalchemy.exc import DBAPIError
+        if isinstance(e, DBAPIError):              # replica may have gone away: re-probe before reuse
+            replica_monitor.invalidate()
+        raise
+    finally:
+        db.close()
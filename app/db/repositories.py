@@ -0,0 +1,122 @@
+"""
+ArcHillx — Async repositories for the hot tables
+================================================
+Awaitable wrappers over the synchronous managers for ah_tasks, ah_sessions,
+ah_goals, ah_memory and ah_audit_log.  Each method runs the existing sync
+implementation on the DB executor (see app/db/aio.py), so routes keep one
+source of truth for queries while no longer blocking the event loop.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .aio import run_db
+
+
+class TaskRepository:
+
+    async def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        from ..runtime.lifecycle import lifecycle
+        return await run_db(lifecycle.tasks.get, task_id)
+
+    async def list_recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        from ..runtime.lifecycle import lifecycle
+        return await run_db(lifecycle.tasks.list_recent, limit)
+
+
+class SessionRepository:
+
+    async def create(self, name: str, context: Optional[dict] = None) -> int:
+        from ..runtime.lifecycle import lifecycle
+        return await run_db(lifecycle.sessions.create, name, context)
+
+    async def list_active(self) -> List[Dict[str, Any]]:
+        from ..runtime.lifecycle import lifecycle
+        return await run_db(lifecycle.sessions.list_active)
+
+    async def end(self, session_id: int) -> None:
+        from ..runtime.lifecycle import lifecycle
+        await run_db(lifecycle.sessions.end, session_id)
+
+
+class GoalRepository:
+
+    async def create(self, title: str, description: str = "", priority: int = 5,
+                     context: Optional[dict] = None) -> int:
+        from ..loop.goal_tracker import goal_tracker
+        return await run_db(goal_tracker.create, title, description, priority, context)
+
+    async def get(self, goal_id: int) -> Optional[Dict[str, Any]]:
+        from ..loop.goal_tracker import goal_tracker
+        return await run_db(goal_tracker.get, goal_id)
+
+    async def list(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        from ..loop.goal_tracker import goal_tracker
+        return await run_db(goal_tracker.list_active if active_only else goal_tracker.list_all)
+
+    async def update(self, goal_id: int, progress: Optional[float] = None, notes: Optional[str] = None,
+                     status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Apply a progress and/or status change in one executor hop; returns the goal."""
+        from ..loop.goal_tracker import goal_tracker
+
+        def apply() -> Optional[Dict[str, Any]]:
+            if progress is not None:
+                goal_tracker.update_progress(goal_id, progress, notes)
+            transition = {"paused": goal_tracker.pause, "active": goal_tracker.resume,
+                          "abandoned": goal_tracker.abandon, "completed": goal_tracker.complete}.get(status or "")
+            if transition is not None:
+                transition(goal_id)
+            return goal_tracker.get(goal_id)
+
+        return await run_db(apply)
+
+    async def abandon(self, goal_id: int) -> None:
+        from ..loop.goal_tracker import goal_tracker
+        await run_db(goal_tracker.abandon, goal_id)
+
+
+class MemoryRepository:
+
+    async def add(self, content: str, source: str = "archillx", tags: Optional[list] = None,
+                  importance: float = 0.5, metadata: Optional[dict] = None) -> int:
+        from ..memory.store import memory_store
+        return await run_db(memory_store.add, content, source, tags, importance, metadata)
+
+    async def query(self, q: str, **kwargs: Any) -> List[Dict[str, Any]]:
+        from ..memory.store import memory_store
+        return await run_db(memory_store.query, q, **kwargs)
+
+    async def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        from ..memory.store import memory_store
+        return await run_db(memory_store.get_recent, limit)
+
+    async def page(self, limit: int = 50, cursor: Optional[str] = None,
+                   source: Optional[str] = None) -> Dict[str, Any]:
+        from ..memory.store import memory_store
+        return await run_db(memory_store.list_page, limit=limit, cursor=cursor, source=source)
+
+
+class AuditRepository:
+
+    async def list(self, *, limit: int = 50, offset: int = 0, **filters: Any) -> List[Dict[str, Any]]:
+        from ..security.audit_store import list_audit
+        return await run_db(list_audit, limit=limit, offset=offset, **filters)
+
+    async def export(self, *, limit: int = 100, offset: int = 0, **filters: Any) -> List[Dict[str, Any]]:
+        from ..security.audit_store import export_audit
+        return await run_db(export_audit, limit=limit, offset=offset, **filters)
+
+    async def summary(self, **filters: Any) -> Dict[str, Any]:
+        from ..security.audit_store import summarize_audit
+        return await run_db(summarize_audit, **filters)
+
+    async def count_by(self, field: str, **filters: Any) -> Dict[str, int]:
+        from ..security.audit_store import count_audit_by
+        return await run_db(count_audit_by, field, **filters)
+
+
+tasks = TaskRepository()
+sessions = SessionRepository()
+goals = GoalRepository()
+memory = MemoryRepository()
+audit = AuditRepository()
@@ -5,7 +5,8 @@ Engine factory mirrors the MGIS multi-DB pattern.
 
 Tables:
   Core:   ah_sessions, ah_tasks, ah_agents, ah_goals, ah_skills,
-          ah_cron_jobs, ah_browser_sessions, ah_memory, ah_audit_log
+          ah_cron_jobs, ah_browser_sessions, ah_memory, ah_memory_terms,
+          ah_memory_archive, ah_audit_log
   LMF:    ah_lmf_episodic, ah_lmf_semantic, ah_lmf_procedural,
           ah_lmf_working, ah_lmf_causal, ah_lmf_wal,
           ah_lmf_risk_profiles, ah_lmf_risk_profile_history,
@@ -22,7 +23,7 @@ from functools import lru_cache
 from typing import Generator
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, Float, Index, Integer, LargeBinary,
+    BigInteger, Boolean, Column, DateTime, Float, Index, Integer, LargeBinary,
     String, Text, create_engine, event
 )
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
@@ -36,6 +37,8 @@ def _make_engine():
     """
     Create the SQLAlchemy engine based on DB_TYPE in settings.
     Cached so the same engine is reused across the process lifetime.
+    With SQLITE_POOL_MODE=pooled this is the read-only reader pool; writes go
+    through writer_engine (see RoutingSession).
     """
     from ..config import settings
 
@@ -51,12 +54,13 @@ def _make_engine():
             pool_timeout=settings.db_pool_timeout,
             pool_recycle=settings.db_pool_recycle,
             pool_pre_ping=True,
+            query_cache_size=settings.db_query_cache_size,
             future=True,
         )
 
     if db_type == "mssql":
         # Enterprise: basic engine (MSSQL driver handles pooling)
-        return create_engine(db_url, future=True)
+        return create_engine(db_url, query_cache_size=settings.db_query_cache_size, future=True)
 
     if db_type == "sqlite_memory":
         # In-memory SQLite for testing — StaticPool keeps single connection alive
@@ -64,6 +68,20 @@ def _make_engine():
             db_url,
             connect_args={"check_same_thread": False},
             poolclass=StaticPool,
+            query_cache_size=settings.db_query_cache_size,
+            future=True,
+        )
+
+    if settings.sqlite_pool_mode == "pooled":
+        # SQLite file, pooled: bounded set of long-lived query_only reader connections
+        return create_engine(
+            db_url,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=max(1, settings.sqlite_reader_pool_size),
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout,
+            query_cache_size=settings.db_query_cache_size,
             future=True,
         )
 
@@ -72,28 +90,167 @@ def _make_engine():
         db_url,
         connect_args={"check_same_thread": False},
         poolclass=NullPool,
+        query_cache_size=settings.db_query_cache_size,
+        future=True,
+    )
+
+
+@lru_cache()
+def _make_writer_engine():
+    """
+    The single serialized writer connection for SQLITE_POOL_MODE=pooled, else None.
+    A one-slot QueuePool is the write queue: sessions that need to write wait
+    their turn for the connection (up to SQLITE_WRITER_TIMEOUT_S) instead of
+    racing each other into "database is locked".
+    """
+    from ..config import settings
+
+    if settings.db_type != "sqlite" or settings.sqlite_pool_mode != "pooled":
+        return None
+    return create_engine(
+        settings.database_url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.sqlite_writer_timeout_s,
+        query_cache_size=settings.db_query_cache_size,
+        future=True,
+    )
+
+
+@lru_cache()
+def _make_replica_engine():
+    """
+    Read-replica engine for reporting reads (DB_READ_REPLICA=true), else None.
+    On SQLite without DB_REPLICA_URL this is a separate pool of mode=ro
+    connections to the primary file, so dashboard scans never take a slot
+    from the pool the agent loop writes through.
+    """
+    from ..config import settings
+
+    if not settings.db_read_replica or settings.db_type == "sqlite_memory":
+        return None
+    url = settings.database_replica_url
+    if not url:
+        return None
+    if url.startswith("sqlite"):
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=max(1, settings.sqlite_reader_pool_size),
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout,
+            query_cache_size=settings.db_query_cache_size,
+            future=True,
+        )
+    return create_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+        query_cache_size=settings.db_query_cache_size,
         future=True,
     )
 
 
 engine = _make_engine()
+writer_engine = _make_writer_engine()
+replica_engine = _make_replica_engine()
 
 
 # ── SQLite-only PRAGMA setup ──────────────────────────────────────────────────
 
+def sqlite_pragmas(conn, query_only: bool = False, read_only: bool = False) -> None:
+    """Apply the SQLite PRAGMAs to a raw DBAPI connection (read_only: mode=ro, skip the writing ones)."""
+    from ..config import settings
+    if not read_only:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    conn.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    conn.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    conn.execute(f"PRAGMA temp_store={settings.sqlite_temp_store.upper()}")
+    if query_only:
+        conn.execute("PRAGMA query_only=ON")
+
+
 @event.listens_for(engine, "connect")
 def _configure_connection(conn, _record):
     """Apply SQLite PRAGMAs; silently skip for MySQL / MSSQL."""
     from ..config import settings
     if settings.db_type in ("sqlite", "sqlite_memory"):
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA foreign_keys=ON")
-        conn.execute("PRAGMA synchronous=NORMAL")
+        sqlite_pragmas(conn, query_only=writer_engine is not None)
+
+
+if writer_engine is not None:
+    event.listen(writer_engine, "connect", lambda conn, _record: sqlite_pragmas(conn))
+
+if replica_engine is not None and replica_engine.dialect.name == "sqlite":
+    event.listen(replica_engine, "connect",
+                 lambda conn, _record: sqlite_pragmas(conn, query_only=True, read_only=True))
 
 
 # ── Session factory ───────────────────────────────────────────────────────────
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+_WRITE_VERBS = frozenset({"insert", "update", "delete", "replace", "create", "drop", "alter", "pragma"})
+
+
+def _is_write(clause) -> bool:
+    if clause is None:                                  # Session.connection(): caller may do anything
+        return True
+    if getattr(clause, "is_dml", False) or getattr(clause, "is_ddl", False):
+        return True
+    if getattr(clause, "_for_update_arg", None) is not None:
+        return True
+    text = getattr(clause, "text", None)
+    if isinstance(text, str):
+        words = text.split(None, 1)
+        return bool(words) and words[0].lower() in _WRITE_VERBS
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Session that splits pooled-SQLite traffic: statements run on a reader
+    connection until the transaction first writes (flush, DML, locking
+    select, raw connection), after which everything up to commit/rollback,
+    reads included, runs on the writer so the session sees its own changes.
+    Without a writer_engine in .info it is a plain Session.
+
+    A replica_engine in .info (set by replica_scope) takes the reads instead;
+    the first write moves the transaction to the writer / primary the same way.
+
+    The writer is one connection per process: a thread holding it in an open
+    transaction must not open a second session that writes, or it waits for
+    itself until SQLITE_WRITER_TIMEOUT_S.
+    """
+
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        writer = self.info.get("writer_engine")
+        replica = self.info.get("replica_engine")
+        if (writer is not None or replica is not None) and (self._writing or self._flushing or _is_write(clause)):
+            self._writing = True
+            return writer if writer is not None else super().get_bind(mapper, clause=clause, **kw)
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+
+SessionLocal = sessionmaker(bind=engine, class_=RoutingSession, autocommit=False, autoflush=False,
+                            info={"writer_engine": writer_engine})
 
 
 class Base(DeclarativeBase):
@@ -121,7 +278,7 @@ class AHSession(Base):
 class AHTask(Base):
     __tablename__ = "ah_tasks"
     id           = Column(Integer, primary_key=True, autoincrement=True)
-    session_id   = Column(Integer, nullable=True, index=True)
+    session_id   = Column(Integer, nullable=True)
     title        = Column(String(256), nullable=False)
     skill_name   = Column(String(128), nullable=True)
     task_type    = Column(String(64), default="general")
@@ -139,6 +296,7 @@ class AHTask(Base):
 
     __table_args__ = (
         Index("ix_ah_tasks_status", "status"),
+        Index("ix_ah_tasks_session_id_status", "session_id", "status"),
         Index("ix_ah_tasks_skill_name", "skill_name"),
         Index("ix_ah_tasks_task_type", "task_type"),
         Index("ix_ah_tasks_created_at", "created_at"),
@@ -171,7 +329,7 @@ class AHGoal(Base):
     updated_at  = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
-        Index("ix_ah_goals_status", "status"),
+        Index("ix_ah_goals_status_priority", "status", "priority"),   # active goals by priority
         Index("ix_ah_goals_priority", "priority"),
     )
 
@@ -229,12 +387,46 @@ class AHMemory(Base):
     tags       = Column(Text, default="[]")                   # JSON list of strings
     importance = Column(Float, default=0.5)                   # 0.0–1.0
     metadata_  = Column(Text, default="{}")                   # JSON
+    hit_count  = Column(Integer, default=1)                   # collapsed near-duplicates
+    last_seen_at = Column(DateTime, nullable=True)            # newest collapsed duplicate
+    decayed_at = Column(DateTime, nullable=True)              # last importance decay
     created_at = Column(DateTime, default=datetime.utcnow)
 
     __table_args__ = (
         Index("ix_ah_memory_source", "source"),
-        Index("ix_ah_memory_importance", "importance"),
-        Index("ix_ah_memory_created_at", "created_at"),
+        Index("ix_ah_memory_importance_created_at", "importance", "created_at"),   # hot set order
+        Index("ix_ah_memory_created_id", "created_at", "id"),   # keyset pagination
+    )
+
+
+class AHMemoryTerm(Base):
+    """Inverted term index for ah_memory (see app.memory.tokenizer)."""
+    __tablename__ = "ah_memory_terms"
+    id         = Column(Integer, primary_key=True, autoincrement=True)
+    memory_id  = Column(Integer, nullable=False, index=True)
+    term       = Column(String(64), nullable=False)
+
+    __table_args__ = (
+        Index("ix_ah_memory_terms_term_memory", "term", "memory_id"),
+    )
+
+
+class AHMemoryArchive(Base):
+    """Cold tier for ah_memory rows moved out by the compaction job."""
+    __tablename__ = "ah_memory_archive"
+    id          = Column(Integer, primary_key=True, autoincrement=True)
+    memory_id   = Column(Integer, nullable=False, index=True)  # original ah_memory.id
+    content     = Column(Text, nullable=False)
+    source      = Column(String(64), default="archillx")
+    tags        = Column(Text, default="[]")                   # JSON list of strings
+    importance  = Column(Float, default=0.0)
+    metadata_   = Column(Text, default="{}")                   # JSON
+    hit_count   = Column(Integer, default=1)
+    created_at  = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ah_memory_archive_archived_at", "archived_at"),
     )
 
 
@@ -250,6 +442,7 @@ class AHAuditLog(Base):
 
     __table_args__ = (
         Index("ix_ah_audit_log_decision", "decision"),
+        Index("ix_ah_audit_log_action_created_at", "action", "created_at"),
         Index("ix_ah_audit_log_created_at", "created_at"),
     )
 
@@ -280,6 +473,30 @@ class AHLMFEpisodic(Base):
     )
 
 
+class AHLMFEpisodicCold(Base):
+    """Cold tier for episodic rows folded into semantic memory by the consolidator."""
+    __tablename__ = "ah_lmf_episodic_cold"
+    id              = Column(Integer, primary_key=True, autoincrement=True)
+    episodic_id     = Column(Integer, nullable=False, index=True)  # original ah_lmf_episodic.id
+    event_type      = Column(String(64), nullable=False)
+    content         = Column(Text, nullable=False)
+    content_hash    = Column(String(64), nullable=True)
+    source          = Column(String(64), default="archillx")
+    task_id         = Column(Integer, nullable=True)
+    session_id      = Column(Integer, nullable=True)
+    importance      = Column(Float, default=0.5)
+    tags            = Column(Text, default="[]")
+    metadata_       = Column(Text, default="{}")
+    created_at      = Column(DateTime, nullable=True)
+    semantic_id     = Column(Integer, nullable=True, index=True)    # ah_lmf_semantic row it was merged into
+    concept         = Column(String(256), nullable=True)
+    consolidated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ah_lmf_episodic_cold_consolidated_at", "consolidated_at"),
+    )
+
+
 class AHLMFSemantic(Base):
     """Semantic memory: concepts, entities, facts with optional vector hint."""
     __tablename__ = "ah_lmf_semantic"
@@ -291,11 +508,12 @@ class AHLMFSemantic(Base):
     tags         = Column(Text, default="[]")                  # JSON
     embedding_hint = Column(Text, nullable=True)               # JSON float list (optional)
     metadata_    = Column(Text, default="{}")                  # JSON
+    evidence_count = Column(Integer, nullable=False, default=1)  # upserts that supported this concept
     created_at   = Column(DateTime, default=datetime.utcnow)
     updated_at   = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
-        Index("ix_ah_lmf_semantic_concept", "concept"),
+        Index("ux_ah_lmf_semantic_concept", "concept", unique=True),
         Index("ix_ah_lmf_semantic_source", "source"),
     )
 
@@ -331,6 +549,7 @@ class AHLMFWorking(Base):
 
     __table_args__ = (
         Index("ix_ah_lmf_working_task_key", "task_id", "key"),
+        Index("ix_ah_lmf_working_expires_at", "expires_at"),
     )
 
 
@@ -367,6 +586,43 @@ class AHLMFWal(Base):
     )
 
 
+class AHLMFStats(Base):
+    """Per-layer LMF counters, maintained by the store write paths (see lmf/core/stats.py)."""
+    __tablename__ = "ah_lmf_stats"
+    layer         = Column(String(32), primary_key=True)       # episodic|semantic|procedural|working|causal|wal
+    row_count     = Column(BigInteger, nullable=False, default=0)
+    byte_count    = Column(BigInteger, nullable=False, default=0)
+    last_write_at = Column(DateTime, nullable=True)
+    recounted_at  = Column(DateTime, nullable=True)
+    updated_at    = Column(DateTime, default=datetime.utcnow)
+
+
+class AHLMFWalApplied(Base):
+    """wal_id -> row it produced, written in the row's transaction so WAL replay never duplicates it."""
+    __tablename__ = "ah_lmf_wal_applied"
+    wal_id     = Column(String(64), primary_key=True)
+    layer      = Column(String(32), nullable=False)
+    row_id     = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AHLMFBlob(Base):
+    """Content-addressed blob index: files live under lmf_blob_dir, rows carry only the digest."""
+    __tablename__ = "ah_lmf_blobs"
+    digest       = Column(String(64), primary_key=True)         # SHA-256 of the uncompressed bytes
+    size         = Column(BigInteger, nullable=False)
+    stored_size  = Column(BigInteger, nullable=True)
+    compression  = Column(String(16), default="none")           # none|zlib
+    refcount     = Column(Integer, nullable=False, default=0)
+    zero_since   = Column(DateTime, nullable=True)              # set while refcount == 0 (GC grace)
+    last_ref_at  = Column(DateTime, nullable=True)
+    created_at   = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ah_lmf_blobs_refcount_zero", "refcount", "zero_since"),
+    )
+
+
 class AHLMFRiskProfile(Base):
     """Risk profiles for adaptive governor (EvolutionLoop)."""
     __tablename__ = "ah_lmf_risk_profiles"
@@ -490,11 +746,29 @@ class AHSprintPlan(Base):
     created_at  = Column(DateTime, default=datetime.utcnow)
 
 
+class AHSchemaBackfill(Base):
+    """Progress of online-migration backfills (see db/online_migration.py)."""
+    __tablename__ = "ah_schema_backfills"
+    name          = Column(String(128), primary_key=True)
+    table_name    = Column(String(128), nullable=False)
+    phase         = Column(String(16), nullable=False, default="pending")
+    # pending | expanded | backfilling | backfilled | contracted | failed
+    last_key      = Column(BigInteger, nullable=False, default=0)   # keyset cursor: rows <= last_key are done
+    rows_done     = Column(BigInteger, nullable=False, default=0)
+    batches       = Column(Integer, nullable=False, default=0)
+    owner         = Column(String(128), nullable=True)              # runner holding the lease
+    heartbeat_at  = Column(DateTime, nullable=True)
+    error         = Column(Text, nullable=True)
+    started_at    = Column(DateTime, nullable=True)
+    finished_at   = Column(DateTime, nullable=True)
+    updated_at    = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # ── DB lifecycle ──────────────────────────────────────────────────────────────
 
 def init_db() -> None:
     """Create all tables (idempotent — skips existing tables)."""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=writer_engine or engine)
 
 
 def get_db() -> Generator[Session, None, None]:
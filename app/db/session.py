@@ -0,0 +1,362 @@
+"""
+ArcHillx — DB unit of work
+==========================
+  session_scope()    context-managed session: rolled back on error, closed by the
+                     outermost scope.  Nested scopes on the same thread join the open
+                     unit of work through a contextvar instead of checking out a
+                     second connection, inside a SAVEPOINT of their own; other
+                     threads get their own session.
+  request_scope()    one lazily-created Session per HTTP request (or job), reused by
+                     every session_scope() on the thread that opened the scope.
+  pool_monitor       checkout / checkin bookkeeping on the engines: pool occupancy
+                     gauges for /metrics, and a warning for every connection held
+                     longer than DB_LEAK_WARN_S (scanned on checkout, on every
+                     /metrics scrape and on every status() call).
+
+Commit semantics of nested scopes:
+
+    with session_scope() as db:          # outermost: owns the transaction
+        ...
+        with session_scope() as inner:   # same session, SAVEPOINT
+            inner.commit()               # releases the savepoint only — durable
+                                         # once the outermost scope commits; closing
+                                         # that one without commit logs a warning
+            raise ValueError             # rolls back to the savepoint; the
+                                         # outer work survives if the caller
+                                         # catches the error
+        db.commit()                      # the only commit that reaches the database
+
+Replaces the `db = next(get_db())` idiom, whose generator was never exhausted
+and so only gave its connection back when the session was garbage collected.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import sysconfig
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..utils.telemetry import telemetry
+
+logger = logging.getLogger("archillx.db")
+
+
+class _Scope:
+    __slots__ = ("session", "depth", "thread_id", "nested")
+
+    def __init__(self) -> None:
+        self.session: Optional[Session] = None
+        self.depth = 0
+        self.thread_id = threading.get_ident()
+        self.nested = False                     # a savepoint was opened in this unit of work
+
+
+_scope: contextvars.ContextVar[Optional[_Scope]] = contextvars.ContextVar("db_scope", default=None)
+
+
+def _new_session() -> Session:
+    from .schema import SessionLocal
+    return SessionLocal()
+
+
+# routed like any read, so opening a savepoint never moves a pooled-SQLite
+# session onto the writer connection; the first write still does
+_READ = text("SELECT 1")
+
+
+def _sqlite_begin(conn: Any) -> None:
+    # pysqlite defers BEGIN to the first DML; a SAVEPOINT opened before it
+    # becomes the transaction itself and its RELEASE would commit
+    if conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN")
+
+
+@event.listens_for(Session, "after_begin")
+def _begin_under_savepoint(session, transaction, connection):
+    if session.info.get("savepoints"):          # e.g. the writer, first used inside a nested scope
+        _sqlite_begin(connection)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_released(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("released_savepoints", None)
+
+
+class _Savepoint:
+    """
+    A nested scope's SAVEPOINT, opened on the connection the session already
+    uses.  While it is open, commit() / rollback() on the shared session
+    release / roll back the savepoint and open a fresh one, so helpers that
+    commit their own work never commit their caller's.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.saved = {k: db.__dict__[k] for k in ("commit", "rollback") if k in db.__dict__}
+        db.info["savepoints"] = db.info.get("savepoints", 0) + 1
+        try:
+            _sqlite_begin(db.connection(bind_arguments={"clause": _READ}))
+            self.tx = db.begin_nested()
+        except Exception:
+            db.info["savepoints"] -= 1
+            raise
+        db.commit, db.rollback = self.commit, self.rollback
+
+    def commit(self) -> None:
+        self.tx.commit()
+        # durable only if the outermost scope commits too; it warns when it does not
+        self.db.info["released_savepoints"] = self.db.info.get("released_savepoints", 0) + 1
+        self.tx = self.db.begin_nested()
+
+    def rollback(self) -> None:
+        self.tx.rollback()
+        self.tx = self.db.begin_nested()
+
+    def close(self, ok: bool) -> None:
+        for k in ("commit", "rollback"):
+            if k in self.saved:
+                setattr(self.db, k, self.saved[k])
+            else:
+                self.db.__dict__.pop(k, None)
+        try:
+            if ok and self.tx.is_active:
+                self.tx.commit()                # may flush, and so take the writer, still under the savepoint
+            else:                               # also a savepoint a failed flush deactivated
+                self.tx.rollback()
+        finally:
+            self.db.info["savepoints"] -= 1
+
+
+@contextmanager
+def session_scope(shared: bool = True) -> Iterator[Session]:
+    """
+    Yield a session for one unit of work; commit is left to the caller.
+    A scope opened inside another on the same thread shares its session (so
+    nested helpers never hold a second connection) but runs in a SAVEPOINT:
+    its commit() only hands its changes to the enclosing unit of work and an
+    exception escaping it rolls back its own changes, not the caller's.  The
+    outermost scope's commit() is the durable one; it also closes the
+    session, handing the connection back to the pool.
+    shared=False opens an independent session that nothing joins — for
+    generators, whose body runs interleaved with the consumer's code.
+    """
+    if not shared:
+        db = _new_session()
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return
+    outer = _scope.get()
+    scope = outer
+    if scope is None or scope.thread_id != threading.get_ident():
+        scope = _Scope()
+        _scope.set(scope)
+    if scope.session is None:
+        scope.session = _new_session()
+    db = scope.session
+    savepoint = _Savepoint(db) if scope.depth > 0 else None
+    scope.nested = scope.nested or savepoint is not None
+    scope.depth += 1
+    ok = False
+    try:
+        yield db
+        ok = True
+    except Exception:
+        if savepoint is None:
+            db.rollback()
+        raise
+    finally:
+        if savepoint is not None:
+            savepoint.close(ok)
+        scope.depth -= 1
+        if scope.depth == 0:
+            if scope.nested:
+                _warn_discarded(db)
+                scope.nested = False
+            db.close()
+        if scope is not outer:
+            _scope.set(outer)
+
+
+def _warn_discarded(db: Session) -> None:
+    """The outermost scope is closing: nested commit()s it never committed are about to be rolled back."""
+    released = db.info.get("released_savepoints")
+    if released and db.in_transaction():
+        telemetry.incr("db_savepoint_commits_discarded_total", released)
+        logger.warning("outermost session scope closed without commit; %d nested commit(s) rolled back:\n%s",
+                       released, "".join(traceback.format_stack(limit=6)[:-2]))
+
+
+@contextmanager
+def request_scope() -> Iterator[None]:
+    """
+    Reuse one Session object for every session_scope() made on this thread
+    inside the block.  Connections are still returned at the end of each
+    outermost unit of work, never held across an await.
+    """
+    scope = _Scope()
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+        if scope.session is not None:
+            scope.session.close()
+
+
+def current_session() -> Optional[Session]:
+    """The session of the unit of work open on this thread, if any."""
+    scope = _scope.get()
+    if scope is None or scope.thread_id != threading.get_ident() or scope.depth == 0:
+        return None
+    return scope.session
+
+
+# ── Pool monitoring ───────────────────────────────────────────────────────────
+
+class _Checkout:
+    __slots__ = ("since", "thread", "origin", "reported")
+
+    def __init__(self, origin: Optional[str]) -> None:
+        self.since = time.monotonic()
+        self.thread = threading.current_thread().name
+        self.origin = origin
+        self.reported = False
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"].replace("\\", "/")
+
+
+def _origin() -> Optional[str]:
+    """Innermost caller frame outside app/db, SQLAlchemy and the stdlib that asked for the connection."""
+    for frame in reversed(traceback.extract_stack(limit=40)[:-2]):
+        path = frame.filename.replace("\\", "/")
+        if path.startswith(("<", _STDLIB)) or "/app/db/" in path or "/sqlalchemy/" in path:
+            continue
+        return f"{os.path.relpath(path)}:{frame.lineno} {frame.name}"
+    return None
+
+
+class PoolMonitor:
+    SCAN_INTERVAL_S = 10.0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Any] = {}
+        self._out: Dict[str, Dict[int, _Checkout]] = {}
+        self._last_scan = 0.0
+
+    def install(self, engine: Any, name: str = "primary") -> None:
+        """Attach checkout / checkin listeners to `engine` (idempotent per name and engine)."""
+        with self._lock:
+            if self._engines.get(name) is engine:
+                return
+            self._engines[name] = engine
+            self._out[name] = {}
+
+        def on_checkout(_dbapi_conn, record, _proxy):
+            from ..config import settings
+            entry = _Checkout(_origin() if settings.db_leak_trace else None)
+            with self._lock:
+                out = self._out[name]
+                out[id(record)] = entry
+                n = len(out)
+            telemetry.incr(f"db_pool_{name}_checkout_total")
+            telemetry.gauge(f"db_pool_{name}_checked_out", n)
+            if entry.since - self._last_scan >= self.SCAN_INTERVAL_S:
+                self.report_leaks()
+
+        def on_checkin(_dbapi_conn, record):
+            with self._lock:
+                out = self._out[name]
+                entry = out.pop(id(record), None)
+                n = len(out)
+            telemetry.gauge(f"db_pool_{name}_checked_out", n)
+            if entry is not None:
+                telemetry.timing(f"db_pool_{name}_hold", time.monotonic() - entry.since)
+
+        event.listen(engine, "checkout", on_checkout)
+        event.listen(engine, "checkin", on_checkin)
+
+    def leaks(self, older_than_s: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Connections checked out longer than older_than_s (default DB_LEAK_WARN_S), oldest first."""
+        from ..config import settings
+        limit = float(settings.db_leak_warn_s if older_than_s is None else older_than_s)
+        now = time.monotonic()
+        with self._lock:
+            found = [
+                {"engine": name, "age_s": round(now - c.since, 3), "thread": c.thread, "origin": c.origin}
+                for name, out in self._out.items() for c in out.values() if now - c.since >= limit
+            ]
+        return sorted(found, key=lambda x: -x["age_s"])
+
+    def report_leaks(self) -> int:
+        """Log (once each) and count connections held past DB_LEAK_WARN_S; returns how many are held."""
+        from ..config import settings
+        now = time.monotonic()
+        self._last_scan = now
+        limit = float(settings.db_leak_warn_s)
+        fresh: List[tuple] = []
+        held = 0
+        with self._lock:
+            for name, out in self._out.items():
+                for c in out.values():
+                    if now - c.since < limit:
+                        continue
+                    held += 1
+                    if not c.reported:
+                        c.reported = True
+                        fresh.append((name, now - c.since, c.thread, c.origin))
+        telemetry.gauge("db_connections_held_past_limit", held)
+        for name, age, thread, origin in fresh:
+            telemetry.incr("db_connection_leaks_total")
+            logger.warning("db connection held %.0fs: engine=%s thread=%s origin=%s",
+                           age, name, thread, origin or "- (set DB_LEAK_TRACE=true)")
+        return held
+
+    def status(self) -> Dict[str, Any]:
+        self.report_leaks()
+        now = time.monotonic()
+        with self._lock:
+            engines = dict(self._engines)
+            ages = {name: [now - c.since for c in out.values()] for name, out in self._out.items()}
+        out: Dict[str, Any] = {}
+        for name, engine in engines.items():
+            pool = engine.pool
+            info: Dict[str, Any] = {
+                "pool": type(pool).__name__,
+                "checked_out": len(ages[name]),
+                "oldest_s": round(max(ages[name]), 3) if ages[name] else 0.0,
+            }
+            for attr in ("size", "overflow", "checkedin"):
+                fn = getattr(pool, attr, None)
+                if callable(fn):
+                    info[attr] = fn()
+            out[name] = info
+        return {"engines": out, "leaks": self.leaks()}
+
+
+pool_monitor = PoolMonitor()
+
+
+def install_pool_monitor() -> None:
+    """Monitor the application engines (the writer and read replica too when configured)."""
+    from . import schema
+    pool_monitor.install(schema.engine, "primary")
+    if schema.writer_engine is not None:
+        pool_monitor.install(schema.writer_engine, "writer")
+    if schema.replica_engine is not None:
+        pool_monitor.install(schema.replica_engine, "replica")
@@ -0,0 +1,163 @@
+"""
+ArcHillx — Prepared statements for ORM hot paths
+================================================
+Task / session / goal lookups, the skill enabled check and the memory recall
+candidate queries run many times per request or OODA cycle.  Built through
+Session.query() each call, they pay for constructing the Query, generating
+its cache key and ORM compile-state setup every time — on SQLite that Python
+work costs more than the statement itself.
+
+Here each shape is built once, with bindparam() placeholders, and kept
+(bakery-style) keyed on the builder's arguments; a statement object memoizes
+its own cache key, so every later execution goes straight to the engine's
+compiled cache.  Callers pass values as execute() parameters:
+
+    t = one(db, statements.task_by_id(), id=tid)
+
+stats() reports how often each builder was served from the registry; the
+engine compiled-cache hit ratio is counted by the query profiler
+(db_compile_cache_* in telemetry and /v1/admin/db/profile).
+"""
+from __future__ import annotations
+
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import Integer, bindparam, select
+
+_BUILDERS: Dict[str, Any] = {}
+
+
+def prepared(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Build the statement once per distinct argument tuple."""
+    cached = lru_cache(maxsize=None)(fn)
+    _BUILDERS[fn.__name__] = cached
+    return wraps(fn)(cached)
+
+
+def one(db: Any, stmt: Any, **params: Any) -> Any:
+    """First ORM entity (or scalar column) for `stmt`, or None."""
+    return db.execute(stmt, params).scalars().first()
+
+
+def all_(db: Any, stmt: Any, **params: Any) -> List[Any]:
+    return db.execute(stmt, params).scalars().all()
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    out = {}
+    for name, fn in sorted(_BUILDERS.items()):
+        info = fn.cache_info()
+        out[name] = {"hits": info.hits, "builds": info.misses, "variants": info.currsize}
+    return out
+
+
+def _limit() -> Any:
+    return bindparam("limit", type_=Integer)
+
+
+# ── Sessions / tasks ──────────────────────────────────────────────────────────
+
+@prepared
+def session_by_id() -> Any:
+    from .schema import AHSession
+    return select(AHSession).where(AHSession.id == bindparam("id"))
+
+
+@prepared
+def sessions_by_status() -> Any:
+    from .schema import AHSession
+    return select(AHSession).where(AHSession.status == bindparam("status"))
+
+
+@prepared
+def task_by_id() -> Any:
+    from .schema import AHTask
+    return select(AHTask).where(AHTask.id == bindparam("id"))
+
+
+@prepared
+def tasks_recent() -> Any:
+    from .schema import AHTask
+    return select(AHTask).order_by(AHTask.created_at.desc()).limit(_limit())
+
+
+# ── Goals ─────────────────────────────────────────────────────────────────────
+
+@prepared
+def goal_by_id() -> Any:
+    from .schema import AHGoal
+    return select(AHGoal).where(AHGoal.id == bindparam("id"))
+
+
+@prepared
+def goals_by_status() -> Any:
+    from .schema import AHGoal
+    return select(AHGoal).where(AHGoal.status == bindparam("status")).order_by(AHGoal.priority)
+
+
+@prepared
+def goals_all() -> Any:
+    from .schema import AHGoal
+    return select(AHGoal).order_by(AHGoal.priority, AHGoal.created_at)
+
+
+# ── Skills ────────────────────────────────────────────────────────────────────
+
+@prepared
+def skill_by_name() -> Any:
+    from .schema import AHSkill
+    return select(AHSkill).where(AHSkill.name == bindparam("name"))
+
+
+@prepared
+def skill_enabled() -> Any:
+    """Just the flag: no entity load for the per-invoke check."""
+    from .schema import AHSkill
+    return select(AHSkill.enabled).where(AHSkill.name == bindparam("name"))
+
+
+# ── Memory recall ─────────────────────────────────────────────────────────────
+
+@prepared
+def memory_candidates(source: bool = False, min_importance: bool = False, watermark: bool = False,
+                      floor: bool = False, terms: bool = False, like: int = 0) -> Any:
+    """
+    Cold-tier recall candidates.  Flags switch the optional filters on (bind
+    names: source, min_importance, w_imp / w_created / w_id, floor); terms=True
+    ranks by ah_memory_terms hits for the expanding `tokens` list, otherwise
+    like=n ORs ILIKE over p0..p{n-1}.  At most 2^4 * 10 variants.
+    """
+    from sqlalchemy import and_, func, or_
+    from .schema import AHMemory, AHMemoryTerm
+    stmt = select(AHMemory)
+    if source:
+        stmt = stmt.where(AHMemory.source == bindparam("source"))
+    if min_importance:
+        stmt = stmt.where(AHMemory.importance >= bindparam("min_importance"))
+    if watermark:
+        w_imp, w_created, w_id = bindparam("w_imp"), bindparam("w_created"), bindparam("w_id")
+        stmt = stmt.where(or_(
+            AHMemory.importance < w_imp,
+            and_(AHMemory.importance == w_imp, or_(
+                AHMemory.created_at < w_created,
+                and_(AHMemory.created_at == w_created, AHMemory.id < w_id),
+            )),
+        ))
+    if floor:
+        stmt = stmt.where(AHMemory.importance >= bindparam("floor"))
+    if terms:
+        hits = (
+            select(AHMemoryTerm.memory_id.label("memory_id"), func.count(AHMemoryTerm.id).label("hits"))
+            .where(AHMemoryTerm.term.in_(bindparam("tokens", expanding=True)))
+            .group_by(AHMemoryTerm.memory_id)
+            .subquery()
+        )
+        return (
+            stmt.join(hits, hits.c.memory_id == AHMemory.id)
+            .order_by(hits.c.hits.desc(), AHMemory.importance.desc(), AHMemory.created_at.desc())
+            .limit(_limit())
+        )
+    if like:
+        stmt = stmt.where(or_(*[AHMemory.content.ilike(bindparam(f"p{i}")) for i in range(like)]))
+    return stmt.order_by(AHMemory.importance.desc(), AHMemory.created_at.desc()).limit(_limit())
@@ -133,16 +133,17 @@ class Governor:
     def _log(self, action: str, decision: str, score: int,
              reason: str, ctx: dict) -> None:
         try:
-            from ..db.schema import AHAuditLog, get_db
-            db = next(get_db())
-            db.add(AHAuditLog(
-                action=action[:256],
-                decision=decision,
-                risk_score=score,
-                reason=reason,
-                context=json.dumps(ctx),
-            ))
-            db.commit()
+            from ..db.schema import AHAuditLog
+            from ..db.session import session_scope
+            with session_scope() as db:
+                db.add(AHAuditLog(
+                    action=action[:256],
+                    decision=decision,
+                    risk_score=score,
+                    reason=reason,
+                    context=json.dumps(ctx),
+                ))
+                db.commit()
         except Exception as e:
             logger.debug("audit_log write failed: %s", e)
 
@@ -0,0 +1,399 @@
+"""
+ArcHillx LMF — Content-Addressed Blob Store
+===========================================
+Large artifacts (tool output, diffs, evidence) live on disk under their SHA-256
+digest; DB rows and WAL records keep only the digest.
+
+  layout     <lmf_blob_dir>/ab/cd/<digest>      raw bytes
+             <lmf_blob_dir>/ab/cd/<digest>.z    zlib-compressed (only when it saves ≥10%)
+  digest     canonicalize_and_hash() for text (CRLF → LF), so it matches the
+             evidence hashes used elsewhere; plain sha256 for bytes.  The digest
+             always covers the stored (uncompressed) bytes.
+  writes     file_utils.atomic_write_bytes — a blob is either complete or absent
+  dedup      identical content maps to the same file; put() only bumps refcount
+  refcounts  ah_lmf_blobs.refcount, updated in the caller's transaction when a
+             session is passed, so a row and its blob reference commit together
+  reads      read_range() mmaps raw blobs; compressed blobs are inflated
+             incrementally only up to the requested end
+  gc         rows at refcount 0 for longer than lmf_blob_gc_grace_s are deleted
+             one by one, and only the files of rows actually deleted are removed,
+             before the commit, so a put / incref racing it waits on the row lock;
+             files with no row at all are removed after the same grace period.
+             put() rewrites a file that is missing once its reference is taken
+
+put / gc in one process are serialized; with several writer processes keep the
+grace period well above the longest write transaction.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ...config import settings
+from ...utils.background import IntervalJob
+from .file_utils import atomic_write_bytes
+from .hasher import canonicalize_and_hash
+
+logger = logging.getLogger(__name__)
+
+BLOB_REF_KEY = "$blob"
+PREVIEW_CHARS = 512
+_COMPRESSED_SUFFIX = ".z"
+_INFLATE_CHUNK = 64 * 1024
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+
+class BlobNotFound(LookupError):
+    pass
+
+
+class BlobStore:
+    def __init__(self, root: str, compression: str = "zlib", compress_min_bytes: int = 1024,
+                 gc_grace_s: int = 3600):
+        if compression not in ("none", "zlib"):
+            raise ValueError(f"unknown blob compression {compression!r}")
+        self.root = os.path.abspath(root)
+        self.compression = compression
+        self.compress_min_bytes = max(0, int(compress_min_bytes))
+        self.gc_grace_s = max(0, int(gc_grace_s))
+        self._lock = threading.Lock()
+
+    # ── layout ────────────────────────────────────────────────────────────────
+
+    def _dir(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4])
+
+    def _locate(self, digest: str) -> Tuple[Optional[str], bool]:
+        """(path, compressed) of an existing blob file, or (None, False)."""
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError("invalid blob digest")
+        base = os.path.join(self._dir(digest), digest)
+        if os.path.exists(base):
+            return base, False
+        if os.path.exists(base + _COMPRESSED_SUFFIX):
+            return base + _COMPRESSED_SUFFIX, True
+        return None, False
+
+    @staticmethod
+    def digest_of(data: Union[str, bytes]) -> Tuple[str, bytes]:
+        if isinstance(data, str):
+            return canonicalize_and_hash(data), data.replace("\r\n", "\n").encode("utf-8", errors="replace")
+        return hashlib.sha256(data).hexdigest(), bytes(data)
+
+    # ── writes ────────────────────────────────────────────────────────────────
+
+    def _write_file(self, digest: str, raw: bytes) -> Tuple[int, str]:
+        """Ensure the blob file exists; returns (stored_size, compression)."""
+        path, compressed = self._locate(digest)
+        if path is not None:
+            return os.path.getsize(path), "zlib" if compressed else "none"
+        os.makedirs(self._dir(digest), exist_ok=True)
+        base = os.path.join(self._dir(digest), digest)
+        if self.compression == "zlib" and len(raw) >= self.compress_min_bytes:
+            packed = zlib.compress(raw, 6)
+            if len(packed) <= len(raw) * 0.9:
+                atomic_write_bytes(base + _COMPRESSED_SUFFIX, packed)
+                return len(packed), "zlib"
+        atomic_write_bytes(base, raw)
+        return len(raw), "none"
+
+    def put(self, data: Union[str, bytes], db: Any = None) -> str:
+        """Store content (deduplicated) and take one reference to it; returns the digest."""
+        digest, raw = self.digest_of(data)
+        with self._lock:
+            stored, compression = self._write_file(digest, raw)
+            self._adjust(digest, +1, db, size=len(raw), stored=stored, compression=compression)
+            if self._locate(digest)[0] is None:         # gc in another process unlinked it meanwhile
+                self._write_file(digest, raw)
+        return digest
+
+    def incref(self, digest: str, db: Any = None) -> None:
+        self._adjust(digest, +1, db)
+
+    def decref(self, digest: str, db: Any = None) -> None:
+        self._adjust(digest, -1, db)
+
+    def _adjust(self, digest: str, delta: int, db: Any, *, size: Optional[int] = None,
+                stored: Optional[int] = None, compression: Optional[str] = None) -> None:
+        from sqlalchemy import case, update
+        from ...db.schema import AHLMFBlob, SessionLocal
+        own = db is None
+        session = SessionLocal() if own else db
+        try:
+            now = datetime.utcnow()
+            new_count = AHLMFBlob.refcount + delta
+            res = session.execute(
+                update(AHLMFBlob)
+                .where(AHLMFBlob.digest == digest)
+                .values(refcount=case((new_count < 0, 0), else_=new_count),
+                        zero_since=case((new_count <= 0, now), else_=None),
+                        last_ref_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if res.rowcount == 0:
+                if size is None:
+                    raise BlobNotFound(digest)
+                session.add(AHLMFBlob(digest=digest, size=size, stored_size=stored, compression=compression,
+                                      refcount=max(delta, 0), created_at=now, last_ref_at=now,
+                                      zero_since=None if delta > 0 else now))
+                session.flush()
+            if own:
+                session.commit()
+        except Exception:
+            if own:
+                session.rollback()
+            raise
+        finally:
+            if own:
+                session.close()
+
+    # ── reads ─────────────────────────────────────────────────────────────────
+
+    def exists(self, digest: str) -> bool:
+        return self._locate(digest)[0] is not None
+
+    def size(self, digest: str) -> int:
+        """Uncompressed size of a blob."""
+        path, compressed = self._locate(digest)
+        if path is None:
+            raise BlobNotFound(digest)
+        if not compressed:
+            return os.path.getsize(path)
+        return sum(len(chunk) for chunk in self._inflate(path))
+
+    def get(self, digest: str, verify: bool = False) -> bytes:
+        path, compressed = self._locate(digest)
+        if path is None:
+            raise BlobNotFound(digest)
+        with open(path, "rb") as f:
+            data = f.read()
+        if compressed:
+            data = zlib.decompress(data)
+        if verify and hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"blob {digest} failed verification")
+        return data
+
+    def get_text(self, digest: str) -> str:
+        return self.get(digest).decode("utf-8", errors="replace")
+
+    def read_range(self, digest: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Bytes [offset, offset+length) of the uncompressed blob."""
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("offset and length must be non-negative")
+        path, compressed = self._locate(digest)
+        if path is None:
+            raise BlobNotFound(digest)
+        end = None if length is None else offset + length
+        if compressed:
+            out = bytearray()
+            pos = 0
+            for chunk in self._inflate(path):
+                lo, hi = max(offset - pos, 0), len(chunk) if end is None else min(end - pos, len(chunk))
+                if hi > lo:
+                    out += chunk[lo:hi]
+                pos += len(chunk)
+                if end is not None and pos >= end:
+                    break
+            return bytes(out)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return m[offset:end]
+
+    @staticmethod
+    def _inflate(path: str) -> Iterator[bytes]:
+        d = zlib.decompressobj()
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(_INFLATE_CHUNK)
+                if not block:
+                    break
+                out = d.decompress(block)
+                if out:
+                    yield out
+        tail = d.flush()
+        if tail:
+            yield tail
+
+    # ── gc ────────────────────────────────────────────────────────────────────
+
+    def _iter_files(self) -> Iterator[Tuple[str, str]]:
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                digest = name[:-len(_COMPRESSED_SUFFIX)] if name.endswith(_COMPRESSED_SUFFIX) else name
+                if len(digest) == 64:
+                    yield digest, os.path.join(dirpath, name)
+
+    def gc(self, now: Optional[datetime] = None, batch_size: int = 1000) -> Dict[str, Any]:
+        from ...db.schema import AHLMFBlob, SessionLocal
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.gc_grace_s)
+        report: Dict[str, Any] = {"started_at": datetime.now(timezone.utc).isoformat(),
+                                  "deleted": 0, "freed_bytes": 0, "orphans": 0}
+        with self._lock:
+            db = SessionLocal()
+            try:
+                while True:
+                    dead = (
+                        db.query(AHLMFBlob.digest)
+                        .filter(AHLMFBlob.refcount <= 0, AHLMFBlob.zero_since < cutoff)
+                        .limit(max(1, batch_size)).all()
+                    )
+                    if not dead:
+                        break
+                    digests = [d for (d,) in dead]
+                    gone = [d for d in digests
+                            if db.query(AHLMFBlob)
+                            .filter(AHLMFBlob.digest == d, AHLMFBlob.refcount <= 0, AHLMFBlob.zero_since < cutoff)
+                            .delete(synchronize_session=False)]     # 0 when a put / incref revived it
+                    for digest in gone:
+                        report["freed_bytes"] += self._unlink(digest)
+                        report["deleted"] += 1
+                    db.commit()
+                    if len(digests) < batch_size:
+                        break
+                known = set()
+                files = list(self._iter_files())
+                for i in range(0, len(files), 500):
+                    chunk = [d for d, _ in files[i:i + 500]]
+                    known.update(d for (d,) in db.query(AHLMFBlob.digest).filter(AHLMFBlob.digest.in_(chunk)).all())
+                for digest, path in files:
+                    if digest in known:
+                        continue
+                    try:
+                        if datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                            report["freed_bytes"] += os.path.getsize(path)
+                            os.remove(path)
+                            report["orphans"] += 1
+                    except FileNotFoundError:
+                        pass
+            finally:
+                db.close()
+        report["elapsed_s"] = round(time.monotonic() - started, 4)
+        return report
+
+    def _unlink(self, digest: str) -> int:
+        path, _ = self._locate(digest)
+        if path is None:
+            return 0
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        from sqlalchemy import func
+        from ...db.schema import AHLMFBlob, SessionLocal
+        db = SessionLocal()
+        try:
+            count, size, stored, refs = db.query(
+                func.count(), func.coalesce(func.sum(AHLMFBlob.size), 0),
+                func.coalesce(func.sum(AHLMFBlob.stored_size), 0),
+                func.coalesce(func.sum(AHLMFBlob.refcount), 0),
+            ).one()
+            unreferenced = db.query(func.count()).select_from(AHLMFBlob).filter(AHLMFBlob.refcount <= 0).scalar()
+        finally:
+            db.close()
+        return {"root": self.root, "blobs": int(count), "bytes": int(size), "stored_bytes": int(stored),
+                "references": int(refs), "unreferenced": int(unreferenced or 0)}
+
+    # ── payload helpers ───────────────────────────────────────────────────────
+
+    def externalize(self, payload: Dict[str, Any], min_bytes: int) -> Tuple[Dict[str, Any], List[str]]:
+        """Replace top-level strings of at least min_bytes with blob refs; returns (payload, digests)."""
+        out: Dict[str, Any] = {}
+        digests: List[str] = []
+        for key, value in payload.items():
+            if isinstance(value, str) and len(value) >= min_bytes and len(value.encode("utf-8")) >= min_bytes:
+                digest = self.put(value)
+                digests.append(digest)
+                out[key] = {BLOB_REF_KEY: digest, "size": len(value)}
+            else:
+                out[key] = value
+        return out, digests
+
+    def internalize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: self.get_text(v[BLOB_REF_KEY]) if is_blob_ref(v) else v for k, v in payload.items()}
+
+    def release(self, payload: Dict[str, Any]) -> None:
+        """Drop the references a payload's blob refs hold (best effort)."""
+        for value in payload.values():
+            if is_blob_ref(value):
+                try:
+                    self.decref(value[BLOB_REF_KEY])
+                except Exception as e:
+                    logger.warning("blob decref failed for %s: %s", value[BLOB_REF_KEY], e)
+
+
+def preview(text: str) -> str:
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "…"
+
+
+_blob_store: Optional[BlobStore] = None
+_blob_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Process blob store at settings.lmf_blob_dir (reads work even with enable_lmf_blob off)."""
+    global _blob_store
+    with _blob_lock:
+        root = os.path.abspath(settings.lmf_blob_dir)
+        if _blob_store is None or _blob_store.root != root:
+            _blob_store = BlobStore(root, compression=settings.lmf_blob_compression,
+                                    compress_min_bytes=settings.lmf_blob_compress_min_bytes,
+                                    gc_grace_s=settings.lmf_blob_gc_grace_s)
+        return _blob_store
+
+
+def blobs_enabled() -> bool:
+    return bool(settings.enable_lmf_blob)
+
+
+class LMFBlobCollector(IntervalJob):
+    job_id = "lmf_blob_gc"
+    label = "LMF blob GC"
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_lmf and settings.enable_lmf_blob)
+
+    def interval_s(self) -> float:
+        return int(settings.lmf_blob_gc_interval_s)
+
+    def status(self) -> Dict[str, Any]:
+        return {"started": self._started, "running": self._lock.locked(),
+                "interval_s": int(settings.lmf_blob_gc_interval_s), "last_run": self._last_run}
+
+    def run_once(self) -> Dict[str, Any]:
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already_running"}
+        try:
+            self._last_run = get_blob_store().gc()
+            logger.info("LMF blob GC done: %s", self._last_run)
+            return self._last_run
+        except Exception as e:
+            logger.exception("LMF blob GC failed")
+            self._last_run = {"error": str(e), "started_at": datetime.now(timezone.utc).isoformat()}
+            raise
+        finally:
+            self._lock.release()
+
+
+lmf_blob_collector = LMFBlobCollector()
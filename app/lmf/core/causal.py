@@ -0,0 +1,258 @@
+"""
+ArcHillx LMF — Causal Graph Engine
+==================================
+Graph queries over ah_lmf_causal, where each node points at its cause through
+parent_id (a forest: one parent per node, any number of children).
+
+Every walk is a single recursive CTE (WITH RECURSIVE on SQLite / MySQL 8 /
+PostgreSQL, plain recursive WITH on MSSQL — SQLAlchemy renders the dialect),
+so a 10-level root-cause chain is one round-trip instead of ten.  Walks are
+bounded by max_depth, which also stops runaway recursion should a cycle ever
+reach the table; add_edges refuses links that would create one.
+
+  ancestors(id)            node → … → root, nearest first
+  descendants(id)          breadth-first effects below a node
+  shortest_path(a, b)      through the lowest common ancestor (one CTE over both chains)
+  subgraph(id)             ancestors + descendants as {nodes, edges} for export
+  add_nodes([...])         batch insert; children may reference parents in the same batch by "ref"
+  add_edges([...])         batch re-parenting in one transaction, cycle-checked
+"""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .stats import record_write, row_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DEPTH = 32
+MAX_DEPTH_LIMIT = 256
+MAX_NODES = 10_000
+
+
+def _clamp_depth(max_depth: Optional[int]) -> int:
+    return max(0, min(int(max_depth if max_depth is not None else DEFAULT_MAX_DEPTH), MAX_DEPTH_LIMIT))
+
+
+def _node(row: Any, depth: Optional[int] = None) -> Dict[str, Any]:
+    out = {
+        "id": row.id,
+        "node_type": row.node_type,
+        "description": row.description,
+        "parent_id": row.parent_id,
+        "confidence": row.confidence,
+        "evidence": json.loads(row.evidence or "[]"),
+        "task_id": row.task_id,
+        "metadata": json.loads(row.metadata_ or "{}"),
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+    if depth is not None:
+        out["depth"] = depth
+    return out
+
+
+class CausalGraph:
+
+    # ── walks ─────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _ancestor_cte(start_ids: List[int], max_depth: int) -> Any:
+        """(origin, id, parent_id, depth) for every node on the chains above start_ids."""
+        from sqlalchemy import literal, select
+        from ...db.schema import AHLMFCausal
+        c = AHLMFCausal.__table__.c
+        base = select(
+            c.id.label("origin"), c.id.label("id"), c.parent_id.label("parent_id"), literal(0).label("depth"),
+        ).where(c.id.in_(start_ids))
+        chain = base.cte("causal_up", recursive=True)
+        step = select(
+            chain.c.origin, c.id, c.parent_id, (chain.c.depth + 1).label("depth"),
+        ).where(c.id == chain.c.parent_id, chain.c.depth < max_depth)
+        return chain.union_all(step)
+
+    def ancestors(self, node_id: int, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The node and its causes up to the root, nearest first."""
+        from sqlalchemy import select
+        from ...db.schema import AHLMFCausal, SessionLocal
+        chain = self._ancestor_cte([node_id], _clamp_depth(max_depth))
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(AHLMFCausal, chain.c.depth)
+                .join(chain, AHLMFCausal.id == chain.c.id)
+                .order_by(chain.c.depth)
+            ).all()
+            return [_node(r, d) for r, d in rows]
+        finally:
+            db.close()
+
+    def descendants(self, node_id: int, max_depth: Optional[int] = None,
+                    limit: int = 1000) -> List[Dict[str, Any]]:
+        """The node and everything it caused, breadth-first (depth, id)."""
+        from sqlalchemy import literal, select
+        from ...db.schema import AHLMFCausal, SessionLocal
+        c = AHLMFCausal.__table__.c
+        depth = _clamp_depth(max_depth)
+        base = select(c.id.label("id"), literal(0).label("depth")).where(c.id == node_id)
+        tree = base.cte("causal_down", recursive=True)
+        tree = tree.union_all(
+            select(c.id, (tree.c.depth + 1).label("depth"))
+            .where(c.parent_id == tree.c.id, tree.c.depth < depth)
+        )
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(AHLMFCausal, tree.c.depth)
+                .join(tree, AHLMFCausal.id == tree.c.id)
+                .order_by(tree.c.depth, AHLMFCausal.id)
+                .limit(max(1, min(int(limit), MAX_NODES)))
+            ).all()
+            return [_node(r, d) for r, d in rows]
+        finally:
+            db.close()
+
+    def shortest_path(self, from_id: int, to_id: int,
+                      max_depth: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Nodes from `from_id` to `to_id` through their lowest common ancestor, or None
+        if they are not connected within max_depth.  In a forest this is the only path.
+        """
+        from sqlalchemy import select
+        from ...db.schema import AHLMFCausal, SessionLocal
+        chain = self._ancestor_cte(list({from_id, to_id}), _clamp_depth(max_depth))
+        db = SessionLocal()
+        try:
+            hops = db.execute(select(chain.c.origin, chain.c.id, chain.c.depth)).all()
+            up: Dict[int, Dict[int, int]] = {from_id: {}, to_id: {}}
+            for origin, nid, d in hops:
+                up[origin].setdefault(nid, d)
+            common = [n for n in up[from_id] if n in up[to_id]]
+            if not common:
+                return None
+            lca = min(common, key=lambda n: up[from_id][n] + up[to_id][n])
+            left = sorted((n for n in up[from_id] if up[from_id][n] <= up[from_id][lca]),
+                          key=lambda n: up[from_id][n])
+            right = sorted((n for n in up[to_id] if up[to_id][n] < up[to_id][lca]),
+                           key=lambda n: -up[to_id][n])
+            ids = left + right
+            rows = {r.id: r for r in db.query(AHLMFCausal).filter(AHLMFCausal.id.in_(ids)).all()}
+            return [_node(rows[i]) for i in ids]
+        finally:
+            db.close()
+
+    def subgraph(self, node_id: int, up: Optional[int] = None, down: Optional[int] = None,
+                 limit: int = 1000) -> Dict[str, Any]:
+        """Ancestors and descendants of a node as an exportable {nodes, edges} document."""
+        nodes: Dict[int, Dict[str, Any]] = {}
+        for n in self.ancestors(node_id, up):
+            n["depth"] = -n["depth"]
+            nodes[n["id"]] = n
+        for n in self.descendants(node_id, down, limit):
+            nodes.setdefault(n["id"], n)
+        edges = [
+            {"cause": n["parent_id"], "effect": n["id"]}
+            for n in nodes.values() if n["parent_id"] is not None and n["parent_id"] in nodes
+        ]
+        return {"root": node_id, "nodes": sorted(nodes.values(), key=lambda n: (n["depth"], n["id"])),
+                "edges": edges}
+
+    # ── writes ────────────────────────────────────────────────────────────────
+
+    def add_nodes(self, nodes: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert nodes in one transaction; returns their ids in input order.
+        Each item: node_type, description, and optionally ref (batch-local key),
+        parent_id (existing node) or parent_ref (a ref earlier or later in the batch),
+        confidence, evidence, task_id, metadata.
+        """
+        from ...db.schema import AHLMFCausal, SessionLocal
+        if len(nodes) > MAX_NODES:
+            raise ValueError(f"at most {MAX_NODES} nodes per batch")
+        refs = [n.get("ref") for n in nodes if n.get("ref") is not None]
+        if len(refs) != len(set(refs)):
+            raise ValueError("duplicate ref in batch")
+        missing = {n["parent_ref"] for n in nodes if n.get("parent_ref") is not None} - set(refs)
+        if missing:
+            raise ValueError(f"unknown parent_ref: {sorted(missing)}")
+        db = SessionLocal()
+        try:
+            rows = [
+                AHLMFCausal(
+                    node_type=n["node_type"],
+                    description=n["description"],
+                    parent_id=n.get("parent_id"),
+                    confidence=n.get("confidence", 1.0),
+                    evidence=json.dumps(n.get("evidence") or []),
+                    task_id=n.get("task_id"),
+                    metadata_=json.dumps(n.get("metadata") or {}),
+                )
+                for n in nodes
+            ]
+            db.add_all(rows)
+            db.flush()
+            by_ref = {n["ref"]: row.id for n, row in zip(nodes, rows) if n.get("ref") is not None}
+            relinked = []
+            for n, row in zip(nodes, rows):
+                if n.get("parent_ref") is not None:
+                    row.parent_id = by_ref[n["parent_ref"]]
+                    relinked.append(row.id)
+            db.flush()
+            if relinked:
+                self._reject_cycles(db, relinked)
+            record_write(db, "causal", rows=len(rows), nbytes=sum(row_bytes("causal", r) for r in rows))
+            db.commit()
+            return [r.id for r in rows]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def add_edges(self, edges: List[Tuple[int, Optional[int]]]) -> int:
+        """Set parent_id for each (effect_id, cause_id) in one transaction; returns edges applied."""
+        from ...db.schema import AHLMFCausal, SessionLocal
+        if len(edges) > MAX_NODES:
+            raise ValueError(f"at most {MAX_NODES} edges per batch")
+        parents = dict(edges)
+        if any(child == parent for child, parent in parents.items()):
+            raise ValueError("a node cannot cause itself")
+        db = SessionLocal()
+        try:
+            wanted = set(parents) | {p for p in parents.values() if p is not None}
+            found = {r[0] for r in db.query(AHLMFCausal.id).filter(AHLMFCausal.id.in_(wanted)).all()}
+            if wanted - found:
+                raise LookupError(f"unknown causal node(s): {sorted(wanted - found)}")
+            for child, parent in parents.items():
+                db.query(AHLMFCausal).filter(AHLMFCausal.id == child) \
+                    .update({AHLMFCausal.parent_id: parent}, synchronize_session=False)
+            self._reject_cycles(db, list(parents))
+            record_write(db, "causal")
+            db.commit()
+            return len(parents)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _reject_cycles(self, db: Any, changed: List[int]) -> None:
+        """One CTE: walk up from every changed node; meeting the start again means a cycle."""
+        from sqlalchemy import select
+        chain = self._ancestor_cte(changed, MAX_DEPTH_LIMIT)
+        hit = db.execute(
+            select(chain.c.origin).where(chain.c.id == chain.c.origin, chain.c.depth > 0).limit(1)
+        ).first()
+        if hit is not None:
+            raise ValueError(f"edge would create a causal cycle through node {hit[0]}")
+
+
+_causal_graph: Optional[CausalGraph] = None
+
+
+def get_causal_graph() -> CausalGraph:
+    global _causal_graph
+    if _causal_graph is None:
+        _causal_graph = CausalGraph()
+    return _causal_graph
@@ -0,0 +1,307 @@
+"""
+ArcHillx LMF — Episodic → Semantic Consolidator
+===============================================
+Periodic job (enable_lmf + enable_lmf_consolidator) that keeps ah_lmf_episodic
+small without losing what it learned:
+
+  1. take the oldest batch of episodic rows older than lmf_consolidator_min_age_s
+     and below lmf_consolidator_keep_importance (important events stay hot)
+  2. cluster them per (event_type, lmf_consolidator_window_s bucket) by term
+     overlap (Jaccard ≥ lmf_consolidator_similarity, leader clustering)
+  3. summarize each cluster — rule-based, or via the model router when
+     lmf_consolidator_summarizer=model (falls back to rules on failure) — and
+     merge it into _SemanticStore.upsert under a concept derived from the
+     cluster's shared terms
+  4. move the source rows to ah_lmf_episodic_cold, stamped with the semantic
+     id / concept they were folded into
+
+Processed rows leave the hot table, so a run resumes wherever the last one
+stopped.  Semantic merges remember the episode ids of their last merge, so a
+batch replayed after a crash between steps 3 and 4 is not counted twice.
+Throughput per run is capped at batch_size × max_batches rows.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from ...config import settings
+from ...memory import tokenizer
+from ...utils.background import IntervalJob
+from .stats import record_write, row_bytes
+
+logger = logging.getLogger(__name__)
+
+MAX_LABEL_TERMS = 4
+MAX_EXAMPLES = 3
+MAX_TAGS = 20
+_EXAMPLE_CHARS = 200
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _terms(content: str) -> frozenset:
+    return frozenset(t for t in tokenizer.index_terms(content) if not t.isdigit())
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _Cluster:
+    def __init__(self, event_type: str, leader: Any, terms: frozenset):
+        self.event_type = event_type
+        self.terms = terms
+        self.rows: List[Any] = [leader]
+        self.term_counts: Counter = Counter(terms)
+        # label tie-break: reading order in the leader, so a concept name is stable across processes
+        self._order = {t: i for i, t in enumerate(tokenizer.index_terms(leader.content or ""))}
+
+    def add(self, row: Any, terms: frozenset) -> None:
+        self.rows.append(row)
+        self.term_counts.update(terms)
+
+    def label(self) -> List[str]:
+        """Terms shared by at least half the members, most frequent first."""
+        quorum = max(1, (len(self.rows) + 1) // 2)
+        shared = [t for t, n in self.term_counts.items() if n >= quorum]
+        shared.sort(key=lambda t: (-self.term_counts[t], self._order.get(t, len(self._order)), t))
+        return (shared or sorted(self.terms))[:MAX_LABEL_TERMS]
+
+    @property
+    def concept(self) -> str:
+        return f"{self.event_type}: {' '.join(self.label())}"[:256]
+
+
+def cluster_rows(rows: List[Any], window_s: int, threshold: float) -> List[_Cluster]:
+    """Greedy leader clustering within each (event_type, time window) bucket."""
+    window_s = max(1, int(window_s))
+    buckets: Dict[tuple, List[_Cluster]] = {}
+    out: List[_Cluster] = []
+    for row in rows:
+        created = row.created_at or datetime.utcnow()
+        key = (row.event_type, int((created - _EPOCH).total_seconds()) // window_s)
+        terms = _terms(row.content or "")
+        best, best_sim = None, threshold
+        for c in buckets.get(key, []):
+            sim = _jaccard(c.terms, terms)
+            if sim >= best_sim:
+                best, best_sim = c, sim
+        if best is None:
+            best = _Cluster(row.event_type, row, terms)
+            buckets.setdefault(key, []).append(best)
+            out.append(best)
+        else:
+            best.add(row, terms)
+    return out
+
+
+def _rule_summary(concept: str, count: int, first: datetime, last: datetime, examples: List[str]) -> str:
+    span = first.date().isoformat() if first.date() == last.date() \
+        else f"{first.date().isoformat()} – {last.date().isoformat()}"
+    text = f"{concept} — observed {count} time{'s' if count != 1 else ''} ({span})."
+    if examples:
+        text += " e.g. " + " | ".join(examples)
+    return text
+
+
+def _model_summary(concept: str, rows: List[Any]) -> Optional[str]:
+    try:
+        from ...utils.model_router import model_router
+        events = "\n".join(f"- {(r.content or '')[:300]}" for r in rows[:20])
+        resp = model_router.complete(
+            prompt=(f"These {len(rows)} events were grouped under '{concept}'.\n{events}\n\n"
+                    "State the durable fact they establish in one or two sentences. Reply with the fact only."),
+            task_type="summarize",
+            budget="low",
+            max_tokens=200,
+        )
+        text = (resp.content or "").strip()
+        return text[:2000] or None
+    except Exception as e:
+        logger.warning("consolidator model summary failed, using rules: %s", e)
+        return None
+
+
+class LMFConsolidator(IntervalJob):
+    job_id = "lmf_consolidator"
+    label = "LMF consolidator"
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_lmf and settings.enable_lmf_consolidator)
+
+    def interval_s(self) -> float:
+        return int(settings.lmf_consolidator_interval_s)
+
+    def policy(self) -> Dict[str, Any]:
+        return {
+            "interval_s": int(settings.lmf_consolidator_interval_s),
+            "min_age_s": int(settings.lmf_consolidator_min_age_s),
+            "window_s": int(settings.lmf_consolidator_window_s),
+            "batch_size": int(settings.lmf_consolidator_batch_size),
+            "max_batches": int(settings.lmf_consolidator_max_batches),
+            "similarity": float(settings.lmf_consolidator_similarity),
+            "keep_importance": float(settings.lmf_consolidator_keep_importance),
+            "summarizer": settings.lmf_consolidator_summarizer,
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": bool(settings.enable_lmf and settings.enable_lmf_consolidator),
+            "started": self._started,
+            "running": self._lock.locked(),
+            "policy": self.policy(),
+            "last_run": self._last_run,
+        }
+
+    # ── Run ───────────────────────────────────────────────────────────────────
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already_running"}
+        try:
+            started = time.monotonic()
+            now = now or datetime.utcnow()
+            result: Dict[str, Any] = {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "batches": 0, "episodes": 0, "clusters": 0, "concepts": 0, "model_summaries": 0,
+            }
+            for _ in range(max(1, int(settings.lmf_consolidator_max_batches))):
+                moved = self._run_batch(now, result)
+                if moved == 0:
+                    break
+                result["batches"] += 1
+            result["elapsed_s"] = round(time.monotonic() - started, 4)
+            self._last_run = result
+            logger.info("LMF consolidation done: %s", json.dumps(result, default=str))
+            return result
+        except Exception as e:
+            logger.exception("LMF consolidation failed")
+            self._last_run = {"error": str(e), "started_at": datetime.now(timezone.utc).isoformat()}
+            raise
+        finally:
+            self._lock.release()
+
+    def _run_batch(self, now: datetime, result: Dict[str, Any]) -> int:
+        from ...db.schema import AHLMFEpisodic, SessionLocal
+        cutoff = now - timedelta(seconds=max(0, int(settings.lmf_consolidator_min_age_s)))
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(AHLMFEpisodic)
+                .filter(AHLMFEpisodic.created_at < cutoff,
+                        AHLMFEpisodic.importance < float(settings.lmf_consolidator_keep_importance))
+                .order_by(AHLMFEpisodic.id.asc())
+                .limit(max(1, int(settings.lmf_consolidator_batch_size)))
+                .all()
+            )
+            db.expunge_all()
+        finally:
+            db.close()
+        if not rows:
+            return 0
+
+        clusters = cluster_rows(rows, settings.lmf_consolidator_window_s,
+                                float(settings.lmf_consolidator_similarity))
+        by_concept: Dict[str, List[_Cluster]] = {}
+        for c in clusters:
+            by_concept.setdefault(c.concept, []).append(c)
+
+        placement: Dict[int, tuple] = {}
+        for concept, group in by_concept.items():
+            members = [r for c in group for r in c.rows]
+            semantic_id = self._merge_into_semantic(concept, group[0].event_type, members, result)
+            for r in members:
+                placement[r.id] = (semantic_id, concept)
+
+        self._move_to_cold(rows, placement, now)
+        result["episodes"] += len(rows)
+        result["clusters"] += len(clusters)
+        result["concepts"] += len(by_concept)
+        return len(rows)
+
+    def _merge_into_semantic(self, concept: str, event_type: str, rows: List[Any],
+                             result: Dict[str, Any]) -> int:
+        from ...db.schema import AHLMFSemantic, SessionLocal
+        from .stores import get_semantic_store
+        db = SessionLocal()
+        try:
+            existing = db.query(AHLMFSemantic).filter(AHLMFSemantic.concept == concept).first()
+            meta = json.loads(existing.metadata_ or "{}") if existing else {}
+            old_tags = json.loads(existing.tags or "[]") if existing else []
+        finally:
+            db.close()
+        consolidation = dict(meta.get("consolidation") or {})
+
+        ids = sorted(r.id for r in rows)
+        merged_before = set(consolidation.get("last_merge_ids") or [])
+        fresh = [r for r in rows if r.id not in merged_before]
+        times = [r.created_at for r in rows if r.created_at] or [datetime.utcnow()]
+        for key in ("first_seen", "last_seen"):
+            if consolidation.get(key):
+                times.append(datetime.fromisoformat(consolidation[key]))
+        first, last = min(times), max(times)
+        count = int(consolidation.get("episodes") or 0) + len(fresh)
+        ranked = sorted(rows, key=lambda r: (r.importance or 0.0, r.created_at or datetime.min), reverse=True)
+        examples = [(r.content or "")[:_EXAMPLE_CHARS] for r in ranked]
+        examples = list(dict.fromkeys(examples + list(consolidation.get("examples") or [])))[:MAX_EXAMPLES]
+
+        content = None
+        if settings.lmf_consolidator_summarizer == "model":
+            content = _model_summary(concept, ranked)
+            if content:
+                result["model_summaries"] += 1
+        if not content:
+            content = _rule_summary(concept, count, first, last, examples)
+
+        tags = list(dict.fromkeys(old_tags + [t for r in rows for t in json.loads(r.tags or "[]")] + ["consolidated"]))
+        consolidation.update({
+            "event_type": event_type,
+            "episodes": count,
+            "first_seen": first.isoformat(),
+            "last_seen": last.isoformat(),
+            "examples": examples,
+            "last_merge_ids": ids,
+        })
+        meta["consolidation"] = consolidation
+        return get_semantic_store().upsert(
+            concept=concept,
+            content=content,
+            source="lmf_consolidator",
+            confidence=round(min(1.0, 0.5 + 0.05 * count), 3),
+            tags=tags[:MAX_TAGS],
+            metadata=meta,
+        )
+
+    def _move_to_cold(self, rows: List[Any], placement: Dict[int, tuple], now: datetime) -> None:
+        from ...db.schema import AHLMFEpisodic, AHLMFEpisodicCold, SessionLocal
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(AHLMFEpisodicCold, [
+                {
+                    "episodic_id": r.id, "event_type": r.event_type, "content": r.content,
+                    "content_hash": r.content_hash, "source": r.source, "task_id": r.task_id,
+                    "session_id": r.session_id, "importance": r.importance, "tags": r.tags,
+                    "metadata_": r.metadata_, "created_at": r.created_at,
+                    "semantic_id": placement[r.id][0], "concept": placement[r.id][1],
+                    "consolidated_at": now,
+                }
+                for r in rows
+            ])
+            db.query(AHLMFEpisodic).filter(AHLMFEpisodic.id.in_([r.id for r in rows])) \
+                .delete(synchronize_session=False)
+            record_write(db, "episodic", rows=-len(rows), nbytes=-sum(row_bytes("episodic", r) for r in rows))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+lmf_consolidator = LMFConsolidator()
@@ -22,6 +22,15 @@ if sys.platform == 'win32':
             msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
             file_obj.seek(pos)
 
+    def try_lock_exclusive(file_obj):
+        """Non-blocking exclusive lock, held until the file is closed; False if another process holds it."""
+        file_obj.seek(0)
+        try:
+            msvcrt.locking(file_obj.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
 else:
     import fcntl
 
@@ -35,6 +44,48 @@ else:
         finally:
             fcntl.flock(file_obj, fcntl.LOCK_UN)
 
+    def try_lock_exclusive(file_obj):
+        """Non-blocking exclusive flock, held until the file is closed; False if another process holds it."""
+        try:
+            fcntl.flock(file_obj, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+
+def _replace(temp_path: str, path: str):
+    max_retries = 10
+    if sys.platform == 'win32':
+        for i in range(max_retries):
+            try:
+                os.replace(temp_path, path)
+                break
+            except OSError:
+                if i == max_retries - 1:
+                    raise
+                time.sleep(0.05)
+    else:
+        os.replace(temp_path, path)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write bytes to a file atomically using temp file, fsync and rename."""
+    dir_name = os.path.dirname(path) or "."
+    temp_path = os.path.join(dir_name, f".{os.path.basename(path)}.{uuid.uuid4()}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except Exception:
+                pass
+        raise
+
 
 def atomic_write_json(path: str, data: str):
     """Write string data to a file atomically using temp file and rename."""
@@ -50,18 +101,7 @@ def atomic_write_json(path: str, data: str):
             f.flush()
             os.fsync(f.fileno())
 
-        max_retries = 10
-        if sys.platform == 'win32':
-            for i in range(max_retries):
-                try:
-                    os.replace(temp_path, path)
-                    break
-                except OSError:
-                    if i == max_retries - 1:
-                        raise
-                    time.sleep(0.05)
-        else:
-            os.replace(temp_path, path)
+        _replace(temp_path, path)
 
     except Exception as e:
         if os.path.exists(temp_path):
@@ -0,0 +1,302 @@
+"""
+ArcHillx LMF — WAL Crash Recovery
+=================================
+Replays the write-ahead log at startup:
+
+  1. stream the WAL once (segmented layout: index lookup of PENDING ids only),
+     torn tails are already truncated when the WAL is opened, other corrupt
+     lines are counted and skipped
+  2. verify payload_hash of every unresolved PENDING record
+  3. re-apply verified records against the LMF stores; episodic / procedural /
+     semantic rows record their wal_id in ah_lmf_wal_applied in the same transaction, so
+     a record that already reached the DB before the crash is found by primary
+     key instead of duplicated — then append a COMMITTED record
+  4. records that fail verification or cannot be applied are compensated with a
+     DISCARDED / ROLLED_BACK record so they are not retried forever
+
+The LMF stores route live writes through wal_write() / logged_write() when
+enable_lmf_wal is on, so the same apply path serves both live writes and
+replay.  Map rows of committed writes are deleted in batches; a run drops the
+ones older than itself once every PENDING record is resolved.  With enable_lmf_blob, large payload strings are logged as blob refs;
+the record holds one reference until it is committed or compensated.
+run() never raises; failures are reported in the result dict.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ..models.common import MemoryStatus
+from ..models.wal import WALRecord
+from .blob_store import blobs_enabled, get_blob_store, is_blob_ref
+from .hasher import canonicalize_and_hash
+from .wal import WALManager
+
+logger = logging.getLogger(__name__)
+
+WAL_ID_KEY = "wal_id"
+
+
+def _payload_hash(payload: Dict[str, Any]) -> str:
+    return canonicalize_and_hash(json.dumps(payload, sort_keys=True, default=str))
+
+
+def _tagged(payload: Dict[str, Any], wal_id: str) -> Dict[str, Any]:
+    out = dict(payload)
+    meta = dict(out.get("metadata") or {})
+    meta[WAL_ID_KEY] = wal_id
+    out["metadata"] = meta
+    return out
+
+
+def _find_applied(wal_id: str) -> Optional[int]:
+    from ...db.schema import AHLMFWalApplied, SessionLocal
+    db = SessionLocal()
+    try:
+        row = db.get(AHLMFWalApplied, wal_id)
+        return row.row_id if row else None
+    finally:
+        db.close()
+
+
+def _apply_episodic(payload: Dict[str, Any], wal_id: str) -> str:
+    from .stores import get_episodic_store
+    existing = _find_applied(wal_id)
+    if existing is not None:
+        return str(existing)
+    return str(get_episodic_store().add(**_tagged(payload, wal_id), wal_id=wal_id))
+
+
+def _apply_procedural(payload: Dict[str, Any], wal_id: str) -> str:
+    from .stores import get_procedural_store
+    existing = _find_applied(wal_id)
+    if existing is not None:
+        return str(existing)
+    return str(get_procedural_store().log(**_tagged(payload, wal_id), wal_id=wal_id))
+
+
+def _apply_semantic(payload: Dict[str, Any], wal_id: str) -> str:
+    from .stores import get_semantic_store
+    existing = _find_applied(wal_id)            # evidence_count accumulates, so a re-upsert is not a no-op
+    if existing is not None:
+        return str(existing)
+    return str(get_semantic_store().upsert(**_tagged(payload, wal_id), wal_id=wal_id))
+
+
+def _apply_working(payload: Dict[str, Any], wal_id: str) -> str:
+    from .stores import get_working_store
+    get_working_store().set(**payload)
+    return f"{payload.get('task_id')}:{payload.get('key')}"
+
+
+APPLIERS: Dict[str, Callable[[Dict[str, Any], str], str]] = {
+    "episodic": _apply_episodic,
+    "procedural": _apply_procedural,
+    "semantic": _apply_semantic,
+    "working": _apply_working,
+}
+
+
+def logged_write(wal: WALManager, *, task_id: str, item_type: str, payload: Dict[str, Any],
+                 evidence_hashes: Optional[List[str]] = None) -> str:
+    """WAL-protected LMF write: log PENDING → apply → log COMMITTED; returns store_result."""
+    applier = APPLIERS[item_type]
+    evidence = evidence_hashes or []
+    logged = payload
+    if blobs_enabled():
+        from ...config import settings
+        logged, _ = get_blob_store().externalize(payload, settings.lmf_blob_inline_max_bytes)
+    wal_id = wal.log_start(task_id, item_type, logged, evidence)
+    try:
+        result = applier(payload, wal_id)
+    except Exception:
+        wal.log_rollback(wal_id)
+        _release(logged)
+        raise
+    wal.log_commit_with_payload(wal_id, result, logged, task_id, item_type, evidence)
+    _release(logged)
+    if item_type in MAPPED:
+        _forget_applied(wal_id)
+    return result
+
+
+def wal_write(item_type: str, payload: Dict[str, Any], *, task_id: Any = None) -> str:
+    """logged_write() against the process WAL (the LMF stores' entry point when enable_lmf_wal is on)."""
+    from .wal import get_wal_manager
+    return logged_write(get_wal_manager(), task_id=str(task_id or ""), item_type=item_type, payload=payload)
+
+
+# layers whose rows carry an ah_lmf_wal_applied entry; committed ones are deleted in batches
+MAPPED = ("episodic", "procedural", "semantic")
+PRUNE_BATCH = 256
+_committed: List[str] = []
+_committed_lock = threading.Lock()
+
+
+def _forget_applied(wal_id: str) -> None:
+    with _committed_lock:
+        _committed.append(wal_id)
+        if len(_committed) < PRUNE_BATCH:
+            return
+        batch = list(_committed)
+        _committed.clear()
+    try:
+        from ...db.schema import AHLMFWalApplied, SessionLocal
+        db = SessionLocal()
+        try:
+            db.query(AHLMFWalApplied).filter(AHLMFWalApplied.wal_id.in_(batch)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    except Exception as e:                  # leftovers are dropped by the next recovery run
+        logger.debug("WAL applied-map prune failed: %s", e)
+
+
+def _prune_applied(before: datetime) -> int:
+    from ...db.schema import AHLMFWalApplied, SessionLocal
+    db = SessionLocal()
+    try:
+        n = db.query(AHLMFWalApplied).filter(AHLMFWalApplied.created_at < before).delete(synchronize_session=False)
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+def _has_blobs(payload: Dict[str, Any]) -> bool:
+    return any(is_blob_ref(v) for v in payload.values())
+
+
+def _release(payload: Dict[str, Any]) -> None:
+    if _has_blobs(payload):
+        get_blob_store().release(payload)
+
+
+class WALRecovery:
+    def __init__(self, wal: WALManager,
+                 appliers: Optional[Dict[str, Callable[[Dict[str, Any], str], str]]] = None):
+        self.wal = wal
+        self.appliers = appliers or APPLIERS
+
+    def _pending(self, report: Dict[str, Any]) -> List[Dict[str, Any]]:
+        indexed = self.wal.pending_records()
+        if indexed is not None:
+            report["scanned"] = len(indexed)
+            return indexed
+        pending: Dict[str, Dict[str, Any]] = {}
+
+        def on_corrupt(offset: int, exc: Exception) -> None:
+            report["corrupt"] += 1
+            logger.error("WAL recovery: skipping corrupt record at offset %d: %s", offset, exc)
+
+        for data in self.wal.iter_raw(on_corrupt=on_corrupt):
+            report["scanned"] += 1
+            wal_id = data.get("wal_id")
+            if not wal_id:
+                report["corrupt"] += 1
+                continue
+            if data.get("status") == MemoryStatus.PENDING.value:
+                pending[wal_id] = data
+            else:
+                pending.pop(wal_id, None)
+        return list(pending.values())
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        cutoff = datetime.utcnow()
+        stats = self.wal.stats()
+        report: Dict[str, Any] = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "scanned": 0, "pending": 0, "replayed": 0, "compensated": 0,
+            "hash_mismatch": 0, "corrupt": int(stats.get("corrupt_records") or 0),
+            "truncated_bytes": int(stats.get("truncated_bytes") or 0),
+            "errors": [],
+        }
+        try:
+            pending = self._pending(report)
+        except Exception as e:
+            logger.exception("WAL recovery: scan failed")
+            report["errors"].append({"stage": "scan", "error": str(e)})
+            pending = []
+        report["pending"] = len(pending)
+
+        for data in pending:
+            wal_id = data.get("wal_id", "?")
+            try:
+                record = WALRecord(**data)
+            except Exception as e:
+                report["corrupt"] += 1
+                report["errors"].append({"wal_id": wal_id, "error": f"invalid record: {e}"})
+                continue
+            if _payload_hash(record.payload) != record.payload_hash:
+                report["hash_mismatch"] += 1
+                self._compensate(record, MemoryStatus.DISCARDED, report)
+                continue
+            applier = self.appliers.get(record.item_type)
+            if applier is None:
+                self._compensate(record, MemoryStatus.ROLLED_BACK, report)
+                report["errors"].append({"wal_id": wal_id, "error": f"no applier for {record.item_type!r}"})
+                continue
+            try:
+                payload = get_blob_store().internalize(record.payload) if _has_blobs(record.payload) \
+                    else record.payload
+                result = applier(payload, record.wal_id)
+                self.wal.log_commit_with_payload(record.wal_id, result, record.payload, record.task_id,
+                                                 record.item_type, record.evidence_hashes)
+                _release(record.payload)
+                report["replayed"] += 1
+            except Exception as e:
+                logger.exception("WAL recovery: replay failed for %s", wal_id)
+                report["errors"].append({"wal_id": wal_id, "error": str(e)})
+                self._compensate(record, MemoryStatus.ROLLED_BACK, report)
+
+        if not report["errors"]:
+            try:
+                report["applied_pruned"] = _prune_applied(cutoff)
+            except Exception as e:
+                report["errors"].append({"stage": "prune", "error": str(e)})
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        report["elapsed_s"] = round(elapsed, 4)
+        report["scanned_per_s"] = round(report["scanned"] / elapsed, 1)
+        report["replayed_per_s"] = round(report["replayed"] / elapsed, 1)
+        report["errors"] = report["errors"][:50]
+        return report
+
+    def _compensate(self, record: WALRecord, status: MemoryStatus, report: Dict[str, Any]) -> None:
+        try:
+            record.status = status
+            self.wal._append_record(record)
+            _release(record.payload)
+            report["compensated"] += 1
+        except Exception as e:
+            report["errors"].append({"wal_id": record.wal_id, "error": f"compensation failed: {e}"})
+
+
+_last_report: Optional[Dict[str, Any]] = None
+_report_lock = threading.Lock()
+
+
+def recover_on_startup() -> Optional[Dict[str, Any]]:
+    """Run recovery against the process WAL when LMF + WAL are enabled; never raises."""
+    global _last_report
+    from ...config import settings
+    if not (settings.enable_lmf and settings.enable_lmf_wal):
+        return None
+    try:
+        from .wal import get_wal_manager
+        report = WALRecovery(get_wal_manager()).run()
+    except Exception as e:
+        logger.exception("WAL recovery failed to start")
+        report = {"error": str(e), "started_at": datetime.now(timezone.utc).isoformat()}
+    logger.info("WAL recovery: %s", json.dumps(report, default=str))
+    with _report_lock:
+        _last_report = report
+    return report
+
+
+def last_recovery_report() -> Optional[Dict[str, Any]]:
+    with _report_lock:
+        return _last_report
@@ -0,0 +1,179 @@
+"""
+ArcHillx LMF — Native semantic upsert
+=====================================
+One upsert statement per chunk against the unique key on ah_lmf_semantic.concept:
+
+  sqlite / postgresql   INSERT … ON CONFLICT (concept) DO UPDATE … RETURNING
+  mysql                 INSERT … ON DUPLICATE KEY UPDATE
+  mssql                 MERGE … WITH (HOLDLOCK) … OUTPUT
+  anything else         row-by-row select / update inside one transaction
+
+Each chunk also reads the sizes of the rows it will overwrite (for the
+ah_lmf_stats deltas) and, where the dialect has no RETURNING/OUTPUT (mysql,
+sqlite before 3.35, the fallback), selects the ids afterwards: two statements
+per chunk, three without RETURNING.  The size read is not locked, so a
+concurrent writer inserting the same concept in between makes new_rows /
+byte_delta approximate; LMFStatsReconciler's recount() corrects the drift.
+
+On conflict content, source, tags and metadata take the incoming value,
+evidence_count adds up, and confidence is either the greater of the two
+(merge=True) or the incoming value.  Duplicate concepts inside one batch are
+folded in Python first, since PostgreSQL and MERGE reject touching a row twice
+in a single statement.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+CHUNK_ROWS = 500
+MSSQL_CHUNK_ROWS = 200          # 9 params per row, SQL Server caps a statement at 2100
+_COLUMNS = ("concept", "content", "source", "confidence", "tags", "metadata_",
+            "evidence_count", "created_at", "updated_at")
+
+
+def normalize(item: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Map an upsert() keyword dict to an ah_lmf_semantic row dict."""
+    return {
+        "concept": item["concept"],
+        "content": item["content"],
+        "source": item.get("source") or "archillx",
+        "confidence": float(item.get("confidence", 1.0)),
+        "tags": json.dumps(item.get("tags") or []),
+        "metadata_": json.dumps(item.get("metadata") or {}),
+        "evidence_count": int(item.get("evidence_count", 1)),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def fold(rows: List[Dict[str, Any]], merge: bool) -> List[Dict[str, Any]]:
+    """Collapse repeated concepts with the same rules the SQL applies on conflict."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        prev = out.get(row["concept"])
+        if prev is None:
+            out[row["concept"]] = dict(row)
+            continue
+        confidence = max(prev["confidence"], row["confidence"]) if merge else row["confidence"]
+        prev.update(row, confidence=confidence, evidence_count=prev["evidence_count"] + row["evidence_count"],
+                    created_at=prev["created_at"])
+    return list(out.values())
+
+
+def _set_clause(table: Any, incoming: Any, merge: bool) -> Dict[str, Any]:
+    from sqlalchemy import case, func
+    current = func.coalesce(table.c.confidence, 0.0)
+    return {
+        "content": incoming.content,
+        "source": incoming.source,
+        "tags": incoming.tags,
+        "metadata_": incoming.metadata_,
+        "updated_at": incoming.updated_at,
+        "confidence": case((incoming.confidence > current, incoming.confidence), else_=current)
+        if merge else incoming.confidence,
+        "evidence_count": func.coalesce(table.c.evidence_count, 0) + incoming.evidence_count,
+    }
+
+
+def build_statement(dialect: str, table: Any, rows: List[Dict[str, Any]], merge: bool,
+                    returning: bool = False) -> Any:
+    """
+    The native upsert for `dialect`, or None when there is none.  returning=True
+    makes sqlite / postgresql / mssql hand back (concept, id) for every row.
+    """
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.concept],
+                                          set_=_set_clause(table, stmt.excluded, merge))
+        return stmt.returning(table.c.concept, table.c.id) if returning else stmt
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(**_set_clause(table, stmt.inserted, merge))
+    if dialect == "mssql":
+        return _mssql_merge(rows, merge, returning)
+    return None
+
+
+def _mssql_merge(rows: List[Dict[str, Any]], merge: bool, returning: bool = False) -> Any:
+    from sqlalchemy import text
+    params: Dict[str, Any] = {}
+    values = []
+    for i, row in enumerate(rows):
+        names = []
+        for col in _COLUMNS:
+            params[f"{col}_{i}"] = row[col]
+            names.append(f":{col}_{i}")
+        values.append(f"({', '.join(names)})")
+    confidence = ("CASE WHEN s.confidence > COALESCE(t.confidence, 0) THEN s.confidence "
+                  "ELSE COALESCE(t.confidence, 0) END") if merge else "s.confidence"
+    sql = (
+        "MERGE ah_lmf_semantic WITH (HOLDLOCK) AS t "
+        f"USING (VALUES {', '.join(values)}) AS s ({', '.join(_COLUMNS)}) "
+        "ON t.concept = s.concept "
+        "WHEN MATCHED THEN UPDATE SET t.content = s.content, t.source = s.source, t.tags = s.tags, "
+        f"t.metadata_ = s.metadata_, t.updated_at = s.updated_at, t.confidence = {confidence}, "
+        "t.evidence_count = COALESCE(t.evidence_count, 0) + s.evidence_count "
+        f"WHEN NOT MATCHED THEN INSERT ({', '.join(_COLUMNS)}) "
+        f"VALUES ({', '.join('s.' + c for c in _COLUMNS)})"
+        f"{' OUTPUT inserted.concept, inserted.id' if returning else ''};"
+    )
+    return text(sql).bindparams(**params)
+
+
+def chunks(dialect: str, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    size = MSSQL_CHUNK_ROWS if dialect == "mssql" else CHUNK_ROWS
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def upsert_rows(db: Any, rows: List[Dict[str, Any]], merge: bool) -> Tuple[Dict[str, int], int, int]:
+    """
+    Upsert folded rows in the caller's session; returns ({concept: id}, new_rows, byte_delta).
+    The two counts are approximate under concurrent writers (see module docstring).
+    """
+    from sqlalchemy import select
+    from ...db.schema import AHLMFSemantic
+    from .stats import measure, row_bytes
+    table = AHLMFSemantic.__table__
+    bind_dialect = db.get_bind().dialect
+    dialect = bind_dialect.name
+    returning = dialect in ("sqlite", "postgresql", "mssql") and bool(getattr(bind_dialect, "insert_returning", False))
+    ids: Dict[str, int] = {}
+    new_rows = byte_delta = 0
+    for chunk in chunks(dialect, rows):
+        concepts = [r["concept"] for r in chunk]
+        existing, old_bytes = measure(db, "semantic", AHLMFSemantic.concept.in_(concepts))
+        stmt = build_statement(dialect, table, chunk, merge, returning=returning)
+        fetched = False
+        if stmt is not None:
+            result = db.execute(stmt)
+            if returning:
+                ids.update(result.all())
+                fetched = True
+        else:
+            _fallback(db, chunk, merge)
+        new_rows += len(chunk) - existing
+        byte_delta += sum(row_bytes("semantic", r) for r in chunk) - old_bytes
+        if not fetched:
+            ids.update(db.execute(select(table.c.concept, table.c.id).where(table.c.concept.in_(concepts))).all())
+    return ids, new_rows, byte_delta
+
+
+def _fallback(db: Any, rows: List[Dict[str, Any]], merge: bool) -> None:
+    from ...db.schema import AHLMFSemantic
+    for r in rows:
+        row = db.query(AHLMFSemantic).filter(AHLMFSemantic.concept == r["concept"]).first()
+        if row is None:
+            db.add(AHLMFSemantic(**r))
+            continue
+        row.content, row.source, row.tags, row.metadata_ = r["content"], r["source"], r["tags"], r["metadata_"]
+        row.updated_at = r["updated_at"]
+        row.confidence = max(row.confidence or 0.0, r["confidence"]) if merge else r["confidence"]
+        row.evidence_count = (row.evidence_count or 0) + r["evidence_count"]
+    db.flush()
@@ -0,0 +1,211 @@
+"""
+ArcHillx LMF — Incremental Layer Statistics
+===========================================
+ah_lmf_stats keeps one row per LMF layer (row_count, byte_count, last_write_at)
+so get_lmf_stats() reads six rows instead of running COUNT(*) over six tables.
+
+  * write paths call record_write(db, layer, rows=±n, nbytes=±b) inside their
+    own session, after the data change and before commit — the counter moves
+    in the same transaction as the rows it describes
+  * byte_count is the UTF-8 size of each layer's payload columns (PAYLOAD_COLUMNS)
+  * a layer without a stats row is bootstrapped by recount() on first read;
+    until then record_write is a no-op for it
+  * recount() takes the stats row first, then counts, so concurrent writers
+    serialize behind it and no delta is lost or applied twice; the
+    LMFStatsReconciler job runs it every lmf_stats_recount_interval_s
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ...config import settings
+from ...utils.background import IntervalJob
+
+logger = logging.getLogger(__name__)
+
+LAYERS: Tuple[str, ...] = ("episodic", "semantic", "procedural", "working", "causal", "wal")
+
+PAYLOAD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "episodic":   ("content", "tags", "metadata_"),
+    "semantic":   ("concept", "content", "tags", "metadata_"),
+    "procedural": ("invocation", "error_msg", "metadata_"),
+    "working":    ("key", "value"),
+    "causal":     ("description", "evidence", "metadata_"),
+    "wal":        ("payload",),
+}
+
+# column used to seed last_write_at when a layer is first counted
+_LAST_WRITE_COLUMN = {"semantic": "updated_at"}
+
+
+def _model(layer: str) -> Any:
+    from ...db import schema
+    return {
+        "episodic":   schema.AHLMFEpisodic,
+        "semantic":   schema.AHLMFSemantic,
+        "procedural": schema.AHLMFProcedural,
+        "working":    schema.AHLMFWorking,
+        "causal":     schema.AHLMFCausal,
+        "wal":        schema.AHLMFWal,
+    }[layer]
+
+
+def row_bytes(layer: str, obj: Any) -> int:
+    """Payload size of one ORM row (or any object / dict with the same attributes)."""
+    total = 0
+    for col in PAYLOAD_COLUMNS[layer]:
+        value = obj.get(col) if isinstance(obj, dict) else getattr(obj, col, None)
+        if value is not None:
+            total += len(str(value).encode("utf-8"))
+    return total
+
+
+def _octets(col: Any, dialect: str) -> Any:
+    from sqlalchemy import LargeBinary, cast, func
+    value = func.coalesce(col, "")
+    if dialect == "sqlite":
+        return func.length(cast(value, LargeBinary))
+    return func.octet_length(value)
+
+
+def measure(db: Any, layer: str, *criteria: Any) -> Tuple[int, int]:
+    """(rows, bytes) of the layer's rows matching `criteria` — for bulk deletes."""
+    from sqlalchemy import func
+    model = _model(layer)
+    dialect = db.get_bind().dialect.name
+    size = sum((_octets(getattr(model, c), dialect) for c in PAYLOAD_COLUMNS[layer]), start=0)
+    rows, nbytes = (
+        db.query(func.count(), func.coalesce(func.sum(size), 0))
+        .select_from(model).filter(*criteria).one()
+    )
+    return int(rows or 0), int(nbytes or 0)
+
+
+def record_write(db: Any, layer: str, *, rows: int = 0, nbytes: int = 0) -> None:
+    """Apply a delta to the layer's counters in the caller's transaction."""
+    from sqlalchemy import update
+    from ...db.schema import AHLMFStats
+    now = datetime.utcnow()
+    db.execute(
+        update(AHLMFStats)
+        .where(AHLMFStats.layer == layer)
+        .values(row_count=AHLMFStats.row_count + rows,
+                byte_count=AHLMFStats.byte_count + nbytes,
+                last_write_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _serialize(row: Any) -> Dict[str, Any]:
+    return {
+        "rows": int(row.row_count or 0),
+        "bytes": int(row.byte_count or 0),
+        "last_write_at": row.last_write_at.isoformat() if row.last_write_at else None,
+        "recounted_at": row.recounted_at.isoformat() if row.recounted_at else None,
+    }
+
+
+def read_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every layer; layers never counted are recounted once here."""
+    from ...db.replica import replica_scope
+    from ...db.schema import AHLMFStats
+    with replica_scope() as db:
+        found = {r.layer: _serialize(r) for r in db.query(AHLMFStats).all()}
+    missing = [layer for layer in LAYERS if layer not in found]
+    if missing:
+        found.update({k: v for k, v in recount(missing).items() if k in LAYERS})
+    return {layer: found[layer] for layer in LAYERS}
+
+
+def recount(layers: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Full COUNT(*) / byte scan per layer; overwrites the counters and reports drift."""
+    from sqlalchemy import func
+    from sqlalchemy.exc import IntegrityError
+    from ...db.schema import SessionLocal, AHLMFStats
+    out: Dict[str, Any] = {}
+    for layer in list(layers or LAYERS):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            stats = (
+                db.query(AHLMFStats).filter(AHLMFStats.layer == layer)
+                .with_for_update().first()
+            )
+            if stats is None:
+                stats = AHLMFStats(layer=layer, row_count=0, byte_count=0)
+                db.add(stats)
+                db.flush()
+                before = None
+            else:
+                stats.updated_at = now   # take the row (write lock on SQLite) before counting
+                db.flush()
+                before = (int(stats.row_count or 0), int(stats.byte_count or 0))
+            rows, nbytes = measure(db, layer)
+            if before is None:
+                col = getattr(_model(layer), _LAST_WRITE_COLUMN.get(layer, "created_at"))
+                stats.last_write_at = db.query(func.max(col)).scalar()
+            stats.row_count = rows
+            stats.byte_count = nbytes
+            stats.recounted_at = now
+            db.commit()
+            entry = _serialize(stats)
+            if before is not None:
+                entry["drift_rows"] = rows - before[0]
+                entry["drift_bytes"] = nbytes - before[1]
+            out[layer] = entry
+        except IntegrityError:
+            # another process bootstrapped the row first; its count is as good as ours
+            db.rollback()
+            row = db.query(AHLMFStats).filter(AHLMFStats.layer == layer).first()
+            if row is not None:
+                out[layer] = _serialize(row)
+        finally:
+            db.close()
+    return out
+
+
+class LMFStatsReconciler(IntervalJob):
+    job_id = "lmf_stats_recount"
+    label = "LMF stats recount"
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_lmf)
+
+    def interval_s(self) -> float:
+        return int(settings.lmf_stats_recount_interval_s)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "started": self._started,
+            "running": self._lock.locked(),
+            "interval_s": int(settings.lmf_stats_recount_interval_s),
+            "last_run": self._last_run,
+        }
+
+    def run_once(self) -> Dict[str, Any]:
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already_running"}
+        try:
+            started = time.monotonic()
+            result: Dict[str, Any] = {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "layers": recount(),
+            }
+            result["elapsed_s"] = round(time.monotonic() - started, 4)
+            self._last_run = result
+            drift = {k: v.get("drift_rows") for k, v in result["layers"].items() if v.get("drift_rows")}
+            if drift:
+                logger.warning("LMF stats drift corrected: %s", drift)
+            return result
+        except Exception as e:
+            logger.exception("LMF stats recount failed")
+            self._last_run = {"error": str(e), "started_at": datetime.now(timezone.utc).isoformat()}
+            raise
+        finally:
+            self._lock.release()
+
+
+lmf_stats_reconciler = LMFStatsReconciler()
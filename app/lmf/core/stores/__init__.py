@@ -11,7 +11,18 @@ Stores:
   ProceduralStore  → ah_lmf_procedural
   WorkingStore     → ah_lmf_working
 
-get_lmf_stats() returns row counts for all tiers.
+Episodic content above lmf_blob_inline_max_bytes is stored in the blob store
+when enable_lmf_blob is on; the row keeps a preview and metadata.content_blob.
+
+Every write path moves the layer's counters in ah_lmf_stats within the same
+transaction (stats.record_write), so get_lmf_stats() never scans the tiers.
+
+With enable_lmf_wal, episodic / procedural / single semantic writes go through
+recovery.logged_write (PENDING → apply → COMMITTED).  The apply call carries the
+wal_id; episodic and procedural rows record it in ah_lmf_wal_applied in the
+same transaction, so replay finds the row by primary key instead of writing it
+twice.  Working memory (transient, own write-behind tier) and bulk semantic
+imports are not logged.
 """
 from __future__ import annotations
 
@@ -20,9 +31,28 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+from ....config import settings
+from ..blob_store import blobs_enabled, get_blob_store, preview as blob_preview
+from ..stats import measure, read_stats, record_write, row_bytes
+from ..working_cache import get_working_cache
+
 logger = logging.getLogger(__name__)
 
 
+def _wal_active() -> bool:
+    return bool(settings.enable_lmf and settings.enable_lmf_wal)
+
+
+def _mark_applied(db: Any, wal_id: Optional[str], layer: str, row: Any) -> None:
+    """row: the ORM row just added, or the id of a row written through Core."""
+    if wal_id:
+        from ....db.schema import AHLMFWalApplied
+        if not isinstance(row, int):
+            db.flush()
+            row = row.id
+        db.add(AHLMFWalApplied(wal_id=wal_id, layer=layer, row_id=row))
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  Episodic Store
 # ══════════════════════════════════════════════════════════════════════════════
@@ -41,12 +71,24 @@ class _EpisodicStore:
         importance: float = 0.5,
         tags: List[str] = None,
         metadata: Dict[str, Any] = None,
+        wal_id: Optional[str] = None,
     ) -> int:
-        from ...db.schema import SessionLocal, AHLMFEpisodic
+        if wal_id is None and _wal_active():
+            from ..recovery import wal_write
+            return int(wal_write("episodic", {
+                "event_type": event_type, "content": content, "source": source, "task_id": task_id,
+                "session_id": session_id, "importance": importance, "tags": tags, "metadata": metadata,
+            }, task_id=task_id))
+        from ....db.schema import SessionLocal, AHLMFEpisodic
         import hashlib
         content_hash = hashlib.sha256(content.encode()).hexdigest()
         db = SessionLocal()
         try:
+            if blobs_enabled() and len(content.encode("utf-8")) > settings.lmf_blob_inline_max_bytes:
+                # row keeps a searchable preview; the full text lives in the blob store
+                digest = get_blob_store().put(content, db=db)
+                metadata = {**(metadata or {}), "content_blob": {"digest": digest, "size": len(content)}}
+                content = blob_preview(content)
             row = AHLMFEpisodic(
                 event_type=event_type,
                 content=content,
@@ -59,6 +101,8 @@ class _EpisodicStore:
                 metadata_=json.dumps(metadata or {}),
             )
             db.add(row)
+            _mark_applied(db, wal_id, "episodic", row)
+            record_write(db, "episodic", rows=1, nbytes=row_bytes("episodic", row))
             db.commit()
             db.refresh(row)
             return row.id
@@ -72,7 +116,7 @@ class _EpisodicStore:
         event_type: Optional[str] = None,
         limit: int = 20,
     ) -> List[Dict[str, Any]]:
-        from ...db.schema import SessionLocal, AHLMFEpisodic
+        from ....db.schema import SessionLocal, AHLMFEpisodic
         from sqlalchemy import desc
         db = SessionLocal()
         try:
@@ -118,41 +162,51 @@ class _SemanticStore:
         confidence: float = 1.0,
         tags: List[str] = None,
         metadata: Dict[str, Any] = None,
+        wal_id: Optional[str] = None,
     ) -> int:
-        from ...db.schema import SessionLocal, AHLMFSemantic
+        """Insert or replace one concept (confidence is overwritten, not merged)."""
+        if wal_id is None and _wal_active():
+            from ..recovery import wal_write
+            return int(wal_write("semantic", {
+                "concept": concept, "content": content, "source": source, "confidence": confidence,
+                "tags": tags, "metadata": metadata,
+            }))
+        item = {"concept": concept, "content": content, "source": source, "confidence": confidence,
+                "tags": tags, "metadata": metadata}
+        return self.upsert_many([item], merge=False, wal_id=wal_id)[0]
+
+    def upsert_many(self, items: List[Dict[str, Any]], *, merge: bool = True,
+                    wal_id: Optional[str] = None) -> List[int]:
+        """
+        Bulk upsert in one transaction using the dialect's native upsert (see semantic_upsert).
+        Items take upsert()'s keywords plus optional evidence_count; returns ids in input order.
+        merge=True keeps the higher confidence; evidence_count always accumulates, so
+        upsert()'s WAL replay finds its wal_id in ah_lmf_wal_applied (written here, in the
+        same transaction) instead of applying twice.  Bulk calls are not WAL-logged even with
+        enable_lmf_wal: they commit before returning, so nothing acknowledged is lost to a
+        crash, but a batch retried by the caller counts its evidence again.
+        """
+        from ....db.schema import SessionLocal
+        from .. import semantic_upsert
+        if not items:
+            return []
+        now = datetime.utcnow()
+        rows = semantic_upsert.fold([semantic_upsert.normalize(i, now) for i in items], merge)
         db = SessionLocal()
         try:
-            row = (
-                db.query(AHLMFSemantic)
-                .filter(AHLMFSemantic.concept == concept)
-                .first()
-            )
-            if row:
-                row.content = content
-                row.source = source
-                row.confidence = confidence
-                row.tags = json.dumps(tags or [])
-                row.metadata_ = json.dumps(metadata or {})
-                row.updated_at = datetime.now(timezone.utc)
-                db.commit()
-                return row.id
-            row = AHLMFSemantic(
-                concept=concept,
-                content=content,
-                source=source,
-                confidence=confidence,
-                tags=json.dumps(tags or []),
-                metadata_=json.dumps(metadata or {}),
-            )
-            db.add(row)
+            ids, new_rows, byte_delta = semantic_upsert.upsert_rows(db, rows, merge)
+            _mark_applied(db, wal_id, "semantic", int(ids[items[0]["concept"]]))
+            record_write(db, "semantic", rows=new_rows, nbytes=byte_delta)
             db.commit()
-            db.refresh(row)
-            return row.id
+            return [ids[i["concept"]] for i in items]
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
 
     def search(self, *, q: str = "", limit: int = 20) -> List[Dict[str, Any]]:
-        from ...db.schema import SessionLocal, AHLMFSemantic
+        from ....db.schema import SessionLocal, AHLMFSemantic
         from sqlalchemy import desc
         db = SessionLocal()
         try:
@@ -170,6 +224,7 @@ class _SemanticStore:
                     "content": r.content,
                     "source": r.source,
                     "confidence": r.confidence,
+                    "evidence_count": r.evidence_count,
                     "tags": json.loads(r.tags or "[]"),
                     "metadata": json.loads(r.metadata_ or "{}"),
                     "created_at": r.created_at.isoformat(),
@@ -198,8 +253,16 @@ class _ProceduralStore:
         output_hash: Optional[str] = None,
         error_msg: Optional[str] = None,
         metadata: Dict[str, Any] = None,
+        wal_id: Optional[str] = None,
     ) -> int:
-        from ...db.schema import SessionLocal, AHLMFProcedural
+        if wal_id is None and _wal_active():
+            from ..recovery import wal_write
+            return int(wal_write("procedural", {
+                "skill_name": skill_name, "invocation": invocation, "outcome": outcome,
+                "duration_ms": duration_ms, "output_hash": output_hash, "error_msg": error_msg,
+                "metadata": metadata,
+            }))
+        from ....db.schema import SessionLocal, AHLMFProcedural
         db = SessionLocal()
         try:
             row = AHLMFProcedural(
@@ -212,6 +275,8 @@ class _ProceduralStore:
                 metadata_=json.dumps(metadata or {}),
             )
             db.add(row)
+            _mark_applied(db, wal_id, "procedural", row)
+            record_write(db, "procedural", rows=1, nbytes=row_bytes("procedural", row))
             db.commit()
             db.refresh(row)
             return row.id
@@ -225,7 +290,7 @@ class _ProceduralStore:
         outcome: Optional[str] = None,
         limit: int = 20,
     ) -> List[Dict[str, Any]]:
-        from ...db.schema import SessionLocal, AHLMFProcedural
+        from ....db.schema import SessionLocal, AHLMFProcedural
         from sqlalchemy import desc
         db = SessionLocal()
         try:
@@ -258,7 +323,11 @@ class _ProceduralStore:
 # ══════════════════════════════════════════════════════════════════════════════
 
 class _WorkingStore:
-    """DB-backed transient working memory (task-scoped, auto-expires)."""
+    """DB-backed transient working memory (task-scoped, auto-expires).
+
+    With enable_lmf_working_cache every call is served by the in-process
+    write-behind tier in working_cache instead.
+    """
 
     def set(
         self,
@@ -268,7 +337,11 @@ class _WorkingStore:
         value: Any,
         ttl_seconds: Optional[int] = None,
     ) -> None:
-        from ...db.schema import SessionLocal, AHLMFWorking
+        cache = get_working_cache()
+        if cache is not None:
+            cache.set(task_id, key, value, ttl_seconds)
+            return
+        from ....db.schema import SessionLocal, AHLMFWorking
         import datetime as dt
         db = SessionLocal()
         try:
@@ -281,8 +354,10 @@ class _WorkingStore:
             if ttl_seconds:
                 expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + dt.timedelta(seconds=ttl_seconds)
             if row:
+                old_bytes = row_bytes("working", row)
                 row.value = json.dumps(value)
                 row.expires_at = expires_at
+                record_write(db, "working", nbytes=row_bytes("working", row) - old_bytes)
             else:
                 row = AHLMFWorking(
                     task_id=task_id,
@@ -291,12 +366,16 @@ class _WorkingStore:
                     expires_at=expires_at,
                 )
                 db.add(row)
+                record_write(db, "working", rows=1, nbytes=row_bytes("working", row))
             db.commit()
         finally:
             db.close()
 
     def get(self, task_id: int, key: str) -> Optional[Any]:
-        from ...db.schema import SessionLocal, AHLMFWorking
+        cache = get_working_cache()
+        if cache is not None:
+            return cache.get(task_id, key)
+        from ....db.schema import SessionLocal, AHLMFWorking
         db = SessionLocal()
         try:
             row = (
@@ -308,6 +387,7 @@ class _WorkingStore:
                 return None
             if row.expires_at and row.expires_at < datetime.utcnow():
                 db.delete(row)
+                record_write(db, "working", rows=-1, nbytes=-row_bytes("working", row))
                 db.commit()
                 return None
             return json.loads(row.value)
@@ -315,7 +395,10 @@ class _WorkingStore:
             db.close()
 
     def get_all(self, task_id: int) -> List[Dict[str, Any]]:
-        from ...db.schema import SessionLocal, AHLMFWorking
+        cache = get_working_cache()
+        if cache is not None:
+            return cache.get_all(task_id)
+        from ....db.schema import SessionLocal, AHLMFWorking
         db = SessionLocal()
         try:
             rows = db.query(AHLMFWorking).filter(AHLMFWorking.task_id == task_id).all()
@@ -335,10 +418,17 @@ class _WorkingStore:
             db.close()
 
     def clear(self, task_id: int) -> None:
-        from ...db.schema import SessionLocal, AHLMFWorking
+        cache = get_working_cache()
+        if cache is not None:
+            cache.clear(task_id)
+            return
+        from ....db.schema import SessionLocal, AHLMFWorking
         db = SessionLocal()
         try:
+            rows, nbytes = measure(db, "working", AHLMFWorking.task_id == task_id)
             db.query(AHLMFWorking).filter(AHLMFWorking.task_id == task_id).delete()
+            if rows:
+                record_write(db, "working", rows=-rows, nbytes=-nbytes)
             db.commit()
         finally:
             db.close()
@@ -348,24 +438,15 @@ class _WorkingStore:
 #  Aggregated stats
 # ══════════════════════════════════════════════════════════════════════════════
 
-def get_lmf_stats() -> Dict[str, int]:
-    """Return row counts across all LMF tiers."""
-    from ...db.schema import (
-        SessionLocal, AHLMFEpisodic, AHLMFSemantic,
-        AHLMFProcedural, AHLMFWorking, AHLMFCausal, AHLMFWal,
-    )
-    db = SessionLocal()
-    try:
-        return {
-            "episodic":   db.query(AHLMFEpisodic).count(),
-            "semantic":   db.query(AHLMFSemantic).count(),
-            "procedural": db.query(AHLMFProcedural).count(),
-            "working":    db.query(AHLMFWorking).count(),
-            "causal":     db.query(AHLMFCausal).count(),
-            "wal":        db.query(AHLMFWal).count(),
-        }
-    finally:
-        db.close()
+def get_lmf_stats(detail: bool = False) -> Dict[str, Any]:
+    """
+    Return row counts across all LMF tiers from ah_lmf_stats (no table scans).
+    detail=True returns {layer: {rows, bytes, last_write_at, recounted_at}} instead.
+    """
+    stats = read_stats()
+    if detail:
+        return stats
+    return {layer: s["rows"] for layer, s in stats.items()}
 
 
 # ── Singletons ────────────────────────────────────────────────────────────────
@@ -3,35 +3,556 @@ ArcHillx LMF — Write-Ahead Log (WAL)
 ====================================
 Standalone port from MGIS.  All MGIS store references removed.
 Uses local file-based append-only JSONL log with cross-platform file locking.
+
+Durability levels:
+  record — lock + write + fsync per record (default, original behaviour)
+  group  — a flusher thread batches records arriving within a short window
+           (or up to N bytes) into a single write + fsync, callers block on a
+           commit future until their batch is durable
+  os     — same batching, but no fsync; records survive a process crash, not a
+           power loss
+
+Layouts:
+  single file (segment_max_bytes=0) — storage_path is one JSONL file, shared
+           between processes via flock
+  segmented (segment_max_bytes>0)   — storage_path is a directory of
+           wal-NNNNNNNN.jsonl segments plus checkpoint.json (replay position and
+           the wal_id -> (segment, offset, status) index).  Segments entirely
+           before the checkpoint with no PENDING entries, and no start record a
+           live ref commit points at, are archived or deleted.  Single writer
+           process per directory, enforced by an exclusive flock on <dir>/LOCK.
+
+Formats (see wal_codec): jsonl (default) or binary — CRC32-framed, optionally
+compressed records whose commit / rollback entries reference the start record
+instead of repeating the payload.  convert_wal() translates between them.
+
+A torn trailing record (crash mid-write) is truncated when the log is opened,
+so it can never be glued to the next append.
 """
 import json
+import logging
 import os
+import queue
+import threading
+import time
 import uuid
-from typing import List, Optional, Dict, Any
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Callable, List, Optional, Dict, Any, Iterator, Tuple
 
 from ..models.wal import WALRecord
 from ..models.common import MemoryStatus
-from .file_utils import file_lock
+from .file_utils import file_lock, atomic_write_json, try_lock_exclusive
+from .wal_codec import detect_format, get_codec
+
+SEGMENT_PREFIX = "wal-"
+CHECKPOINT_FILE = "checkpoint.json"
+LOCK_FILE = "LOCK"
+ARCHIVE_DIR = "archive"
+
+logger = logging.getLogger(__name__)
+
+# (encoded record, wal_id, status, segment of the start record a ref commit points at)
+_Item = Tuple[bytes, str, str, Optional[int]]
+# (segment, byte offset); segment is 0 in single-file layout
+Position = Tuple[int, int]
+
+
+class Durability(str, Enum):
+    RECORD = "record"
+    GROUP = "group"
+    OS = "os"
+
+
+def _resolve(start: Dict[str, Any], ref: Dict[str, Any]) -> Dict[str, Any]:
+    """Full record for a ref-style status record, given its start record."""
+    out = dict(start)
+    out["status"] = ref["status"]
+    out["store_result"] = ref.get("store_result")
+    return out
+
+
+class _FileLog:
+    """Original single-file layout; flock per batch so several processes can append."""
+
+    segmented = False
+
+    def __init__(self, path: str, fsync: bool, codec: Any):
+        found = detect_format(path)
+        if found is not None and found != codec.name:
+            raise RuntimeError(f"WAL {path} is {found}, configured format is {codec.name}; "
+                               f"convert it with scripts/convert_lmf_wal.py")
+        self.path = path
+        self.codec = codec
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self.truncated_bytes = codec.repair_tail(path)
+        self._f = open(path, "ab")
+        if self._f.seek(0, 2) == 0 and codec.header:
+            self._f.write(codec.header)
+            self._f.flush()
+
+    def append(self, items: List[_Item]) -> List[Position]:
+        with self._lock:
+            with file_lock(self._f):
+                self._f.seek(0, 2)
+                pos = self._f.tell()
+                self._f.write(b"".join(item[0] for item in items))
+                self._f.flush()
+                if self._fsync:
+                    os.fsync(self._f.fileno())
+        out = []
+        for data, *_ in items:
+            out.append((0, pos))
+            pos += len(data)
+        return out
+
+    def iter_raw(self, on_corrupt: Optional[Callable[[int, Exception], None]] = None
+                 ) -> Iterator[Dict[str, Any]]:
+        for _, data in self.codec.scan(self.path, on_corrupt=on_corrupt):
+            yield data
+
+    def read_at(self, position: Position) -> Dict[str, Any]:
+        return self.codec.read_at(self.path, position[1])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"layout": "file", "format": self.codec.name, "truncated_bytes": self.truncated_bytes}
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _SegmentedLog:
+    """Size-rotated segments with a persisted wal_id index and checkpoints."""
+
+    segmented = True
+
+    def __init__(self, directory: str, fsync: bool, segment_max_bytes: int,
+                 checkpoint_every: int, retire_mode: str, codec: Any):
+        if retire_mode not in ("archive", "delete"):
+            raise ValueError(f"retire_mode must be 'archive' or 'delete', got {retire_mode!r}")
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "a+b")
+        if not try_lock_exclusive(self._lock_file):
+            self._lock_file.close()
+            raise RuntimeError(f"WAL directory {directory} is in use by another process ({LOCK_FILE} is locked); "
+                               "a segmented WAL allows one writer process")
+        try:
+            self._init(directory, fsync, segment_max_bytes, checkpoint_every, retire_mode, codec)
+        except Exception:
+            self._lock_file.close()
+            raise
+
+    def _init(self, directory: str, fsync: bool, segment_max_bytes: int,
+              checkpoint_every: int, retire_mode: str, codec: Any) -> None:
+        self.dir = directory
+        self.codec = codec
+        foreign = [n for n in os.listdir(directory)
+                   if n.startswith(SEGMENT_PREFIX) and not n.endswith(codec.suffix)]
+        if foreign:
+            raise RuntimeError(f"WAL directory {directory} holds segments in another format "
+                               f"({foreign[0]}); convert it with scripts/convert_lmf_wal.py")
+        self._fsync = fsync
+        self.segment_max_bytes = segment_max_bytes
+        self.checkpoint_every = checkpoint_every
+        self.retire_mode = retire_mode
+        self._lock = threading.RLock()
+        self.index: Dict[str, Tuple[int, int, str]] = {}
+        self.refs: Dict[str, int] = {}        # wal_id -> start segment, while its latest record is a ref
+        self.checkpoint_pos: Position = (0, 0)
+        self.retired = 0
+        self.corrupt = 0
+        self._since_checkpoint = 0
+        existing = self.segments()
+        self.truncated_bytes = codec.repair_tail(self.segment_path(existing[-1])) if existing else 0
+        self.replayed_on_open = self._load()
+        segments = self.segments()
+        self.active = segments[-1] if segments else 1
+        self._open_active()
+
+    def _open_active(self) -> None:
+        self._f = open(self.segment_path(self.active), "ab")
+        self._size = self._f.seek(0, 2)
+        if self._size == 0 and self.codec.header:
+            self._f.write(self.codec.header)
+            self._f.flush()
+            self._size = len(self.codec.header)
+
+    # ── layout ──────────────────────────────────────────────────────────────
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.dir, f"{SEGMENT_PREFIX}{segment:08d}{self.codec.suffix}")
+
+    def segments(self) -> List[int]:
+        out = []
+        for name in os.listdir(self.dir):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(self.codec.suffix):
+                try:
+                    out.append(int(name[len(SEGMENT_PREFIX):-len(self.codec.suffix)]))
+                except ValueError:
+                    continue
+        return sorted(out)
+
+    def _load(self) -> int:
+        """Restore index from the checkpoint, then replay only segments after it."""
+        cp_path = os.path.join(self.dir, CHECKPOINT_FILE)
+        if os.path.exists(cp_path):
+            with open(cp_path, "r", encoding="utf-8") as f:
+                cp = json.load(f)
+            self.checkpoint_pos = (int(cp["segment"]), int(cp["offset"]))
+            self.index = {k: (v[0], v[1], v[2]) for k, v in cp.get("index", {}).items()}
+            self.refs = {k: int(v) for k, v in cp.get("refs", {}).items()}
+        replayed = 0
+        cp_seg, cp_off = self.checkpoint_pos
+        for seg in self.segments():
+            if seg < cp_seg:
+                continue
+            start = cp_off if seg == cp_seg else 0
+            for offset, data in self.codec.scan(self.segment_path(seg), start, on_corrupt=self._count_corrupt):
+                self.index[data["wal_id"]] = (seg, offset, data.get("status", MemoryStatus.PENDING.value))
+                self._track_ref(data["wal_id"], data["ref"][0] if "ref" in data else None)
+                replayed += 1
+        return replayed
+
+    def _track_ref(self, wal_id: str, ref_segment: Optional[int]) -> None:
+        if ref_segment is None:
+            self.refs.pop(wal_id, None)
+        else:
+            self.refs[wal_id] = int(ref_segment)
+
+    def _count_corrupt(self, offset: int, exc: Exception) -> None:
+        self.corrupt += 1
+        logger.error("WAL: skipping corrupt record at offset %d: %s", offset, exc)
+
+    # ── write path ──────────────────────────────────────────────────────────
+    def append(self, items: List[_Item]) -> List[Position]:
+        with self._lock:
+            if self._size > len(self.codec.header) and self._size >= self.segment_max_bytes:
+                self._rotate()
+            pos = self._size
+            self._f.write(b"".join(item[0] for item in items))
+            self._f.flush()
+            if self._fsync:
+                os.fsync(self._f.fileno())
+            out = []
+            for data, wal_id, status, ref_segment in items:
+                self.index[wal_id] = (self.active, pos, status)
+                self._track_ref(wal_id, ref_segment)
+                out.append((self.active, pos))
+                pos += len(data)
+            self._size = pos
+            self._since_checkpoint += len(items)
+            if self.checkpoint_every and self._since_checkpoint >= self.checkpoint_every:
+                self.checkpoint()
+            return out
+
+    def _rotate(self) -> None:
+        self._f.close()
+        self.active += 1
+        self._open_active()
+        self.checkpoint()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Persist replay position + index, then retire fully-resolved segments."""
+        with self._lock:
+            self.checkpoint_pos = (self.active, self._size)
+            retired = self._retire()
+            atomic_write_json(os.path.join(self.dir, CHECKPOINT_FILE), json.dumps({
+                "version": 1,
+                "segment": self.checkpoint_pos[0],
+                "offset": self.checkpoint_pos[1],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "index": {k: list(v) for k, v in self.index.items()},
+                "refs": self.refs,
+            }, separators=(",", ":")))
+            self._since_checkpoint = 0
+            return {"segment": self.checkpoint_pos[0], "offset": self.checkpoint_pos[1], "retired": retired}
+
+    def _retire(self) -> List[int]:
+        pending = {seg for seg, _, status in self.index.values() if status == MemoryStatus.PENDING.value}
+        candidates = [seg for seg in self.segments()
+                      if seg < self.checkpoint_pos[0] and seg < self.active and seg not in pending]
+        # a ref commit that stays live keeps the segment holding its start record
+        gone = set(candidates)
+        referenced = {start for wal_id, start in self.refs.items()
+                      if wal_id in self.index and self.index[wal_id][0] not in gone}
+        retired = []
+        for seg in candidates:
+            if seg in referenced:
+                continue
+            path = self.segment_path(seg)
+            if self.retire_mode == "archive":
+                archive = os.path.join(self.dir, ARCHIVE_DIR)
+                os.makedirs(archive, exist_ok=True)
+                os.replace(path, os.path.join(archive, os.path.basename(path)))
+            else:
+                os.remove(path)
+            retired.append(seg)
+        if retired:
+            gone = set(retired)
+            self.index = {k: v for k, v in self.index.items() if v[0] not in gone}
+            self.refs = {k: v for k, v in self.refs.items() if k in self.index}
+            self.retired += len(retired)
+        return retired
+
+    # ── read path ───────────────────────────────────────────────────────────
+    def read_at(self, position: Position) -> Dict[str, Any]:
+        return self.codec.read_at(self.segment_path(position[0]), position[1])
+
+    def start_of(self, wal_id: str) -> Optional[Position]:
+        """Position of wal_id's full start record, from the index (None when unknown)."""
+        with self._lock:
+            entry = self.index.get(wal_id)
+            if entry is None:
+                return None
+            latest = self.read_at((entry[0], entry[1]))
+            return tuple(latest["ref"]) if "ref" in latest else (entry[0], entry[1])
+
+    def lookup(self, wal_id: str) -> Optional[Dict[str, Any]]:
+        """O(1) fetch of the latest record for wal_id, refs resolved (live segments only)."""
+        entry = self.index.get(wal_id)
+        if entry is None:
+            return None
+        try:
+            data = self.read_at((entry[0], entry[1]))
+            if "ref" in data:
+                data = _resolve(self.read_at(tuple(data["ref"])), data)
+            return data
+        except (FileNotFoundError, RuntimeError):
+            return None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Latest record of every wal_id still PENDING, via the index (no full scan)."""
+        with self._lock:
+            ids = [k for k, v in self.index.items() if v[2] == MemoryStatus.PENDING.value]
+        return [data for data in (self.lookup(k) for k in ids) if data is not None]
+
+    def iter_raw(self, on_corrupt: Optional[Callable[[int, Exception], None]] = None
+                 ) -> Iterator[Dict[str, Any]]:
+        for seg in self.segments():
+            for _, data in self.codec.scan(self.segment_path(seg), on_corrupt=on_corrupt):
+                yield data
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "layout": "segmented",
+                "format": self.codec.name,
+                "segments": len(self.segments()),
+                "active_segment": self.active,
+                "active_bytes": self._size,
+                "indexed": len(self.index),
+                "checkpoint": {"segment": self.checkpoint_pos[0], "offset": self.checkpoint_pos[1]},
+                "records_since_checkpoint": self._since_checkpoint,
+                "replayed_on_open": self.replayed_on_open,
+                "retired_segments": self.retired,
+                "corrupt_records": self.corrupt,
+                "truncated_bytes": self.truncated_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self.checkpoint()
+            self._f.close()
+            self._lock_file.close()             # releases the writer lock
+
+
+class _GroupCommitWriter:
+    """Background flusher: coalesces queued appends into one log append per batch."""
+
+    def __init__(self, log: Any, window_s: float, max_bytes: int):
+        self._log = log
+        self._window_s = max(0.0, window_s)
+        self._max_bytes = max(1, max_bytes)
+        self._q: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.records = 0
+        self.bytes = 0
+        self._thread = threading.Thread(target=self._run, name="lmf-wal-flusher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: _Item) -> Future:
+        if self._closed:
+            raise RuntimeError("WAL writer is closed")
+        fut: Future = Future()
+        self._q.put((item, fut))
+        return fut
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put(None)
+        self._thread.join()
+        leftover = []
+        while True:
+            try:
+                entry = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                leftover.append(entry)
+        if leftover:
+            self._commit(leftover)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._q.get()
+            if entry is None:
+                return
+            batch = [entry]
+            size = len(entry[0][0])
+            deadline = time.monotonic() + self._window_s
+            stop = False
+            while size < self._max_bytes:
+                try:
+                    remaining = deadline - time.monotonic()
+                    nxt = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+                size += len(nxt[0][0])
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: list) -> None:
+        try:
+            positions = self._log.append([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.records += len(batch)
+        self.bytes += sum(len(item[0]) for item, _ in batch)
+        for (_, fut), pos in zip(batch, positions):
+            fut.set_result(pos)
 
 
 class WALManager:
-    def __init__(self, storage_path: str = "wal.jsonl"):
+    def __init__(
+        self,
+        storage_path: str = "wal.jsonl",
+        durability: Durability = Durability.RECORD,
+        group_window_ms: float = 2.0,
+        group_max_bytes: int = 256 * 1024,
+        commit_timeout_s: float = 30.0,
+        segment_max_bytes: int = 0,
+        checkpoint_every: int = 1000,
+        retire_mode: str = "archive",
+        fmt: str = "jsonl",
+        compression: str = "zlib",
+        body_codec: str = "json",
+    ):
         self.storage_path = storage_path
-        self._ensure_storage()
+        self.durability = Durability(durability)
+        self.commit_timeout_s = commit_timeout_s
+        self._codec = get_codec(fmt, compression, body_codec)
+        fsync = self.durability is not Durability.OS
+        if segment_max_bytes > 0:
+            self._log: Any = _SegmentedLog(storage_path, fsync, segment_max_bytes,
+                                           checkpoint_every, retire_mode, self._codec)
+        else:
+            self._ensure_storage()
+            self._log = _FileLog(storage_path, fsync, self._codec)
+        # wal_id -> position of its start record, for ref-style commit records
+        self._open_starts: Dict[str, Position] = {}
+        self._starts_lock = threading.Lock()
+        self._closed = False
+        self._writer: Optional[_GroupCommitWriter] = None
+        if self.durability is not Durability.RECORD:
+            self._writer = _GroupCommitWriter(
+                self._log,
+                window_s=group_window_ms / 1000.0,
+                max_bytes=group_max_bytes,
+            )
 
     def _ensure_storage(self):
         if not os.path.exists(self.storage_path):
             with open(self.storage_path, "w") as f:
                 pass
 
-    def _append_record(self, record: WALRecord):
-        with open(self.storage_path, "r+b") as f:
-            with file_lock(f):
-                # Seek to end to append
-                f.seek(0, 2)
-                f.write((record.model_dump_json() + "\n").encode('utf-8'))
-                f.flush()
-                os.fsync(f.fileno())
+    def close(self):
+        """Flush pending batches, checkpoint (segmented layout) and release file handles."""
+        if self._closed:
+            return
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._log.close()
+        self._closed = True
+
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Force a checkpoint; no-op for the single-file layout."""
+        return self._log.checkpoint() if self._log.segmented else None
+
+    def stats(self) -> Dict[str, Any]:
+        w = self._writer
+        out = {
+            "durability": self.durability.value,
+            "batches": w.batches if w else None,
+            "records": w.records if w else None,
+            "bytes": w.bytes if w else None,
+        }
+        out.update(self._log.stats())
+        return out
+
+    @property
+    def segmented(self) -> bool:
+        return self._log.segmented
+
+    def iter_raw(self, on_corrupt: Optional[Callable[[int, Exception], None]] = None
+                 ) -> Iterator[Dict[str, Any]]:
+        """Stream raw record dicts in log order (recovery path; no pydantic parsing)."""
+        return self._log.iter_raw(on_corrupt=on_corrupt)
+
+    def pending_records(self) -> Optional[List[Dict[str, Any]]]:
+        """Index-backed PENDING lookup for the segmented layout; None for single-file."""
+        return self._log.pending() if self._log.segmented else None
+
+    def _append(self, data: Dict[str, Any], wal_id: str, status: str) -> Position:
+        if self._closed:
+            raise RuntimeError("WAL is closed")
+        ref = data.get("ref")
+        item = (self._codec.encode(data), wal_id, status, ref[0] if ref else None)
+        if self._writer is not None:
+            return self._writer.submit(item).result(timeout=self.commit_timeout_s)
+        return self._log.append([item])[0]
+
+    def _append_record(self, record: WALRecord) -> Position:
+        return self._append(record.model_dump(mode="json"), record.wal_id, record.status.value)
+
+    def _start_position(self, wal_id: str) -> Optional[Position]:
+        """Where wal_id's full start record lives, if known without scanning."""
+        with self._starts_lock:
+            pos = self._open_starts.pop(wal_id, None)
+        if pos is None and self._log.segmented:
+            pos = self._log.start_of(wal_id)
+        return pos
+
+    def _append_ref(self, wal_id: str, status: MemoryStatus, store_result: Optional[str]) -> bool:
+        """Binary format: status change that points at the start record instead of copying it."""
+        if not self._codec.refs:
+            return False
+        try:
+            pos = self._start_position(wal_id)
+        except (FileNotFoundError, RuntimeError):
+            pos = None
+        if pos is None:
+            return False
+        self._append({
+            "wal_id": wal_id,
+            "status": status.value,
+            "store_result": store_result,
+            "ref": list(pos),
+            "created_at": datetime.now().isoformat(),
+        }, wal_id, status.value)
+        return True
 
     def log_start(
         self,
@@ -56,7 +577,12 @@ class WALManager:
             evidence_hashes=evidence_hashes or [],
             status=MemoryStatus.PENDING,
         )
-        self._append_record(record)
+        pos = self._append_record(record)
+        if self._codec.refs:
+            with self._starts_lock:
+                if len(self._open_starts) >= 100_000:
+                    self._open_starts.pop(next(iter(self._open_starts)))
+                self._open_starts[wal_id] = pos
         return wal_id
 
     def log_commit(self, wal_id: str, store_result: str):
@@ -75,9 +601,14 @@ class WALManager:
         """
         Append-only commit without reading back the file.
         Requires passing original data to reconstruct the record.
+        The binary format writes a ref to the start record instead when its
+        position is known, skipping re-serialisation of the payload.
         """
         from .hasher import canonicalize_and_hash
 
+        if self._append_ref(wal_id, MemoryStatus.COMMITTED, store_result):
+            return
+
         payload_str = json.dumps(original_payload, sort_keys=True, default=str)
         payload_hash = canonicalize_and_hash(payload_str)
 
@@ -94,33 +625,123 @@ class WALManager:
         self._append_record(record)
 
     def log_rollback(self, wal_id: str):
-        records = self.get_all_records()
-        original = next((r for r in records if r.wal_id == wal_id), None)
+        if self._append_ref(wal_id, MemoryStatus.ROLLED_BACK, None):
+            return
+        if self._log.segmented:
+            data = self._log.lookup(wal_id)
+            original = WALRecord(**data) if data else None
+        else:
+            records = self.get_all_records()
+            original = next((r for r in records if r.wal_id == wal_id), None)
         if original:
             original.status = MemoryStatus.ROLLED_BACK
             self._append_record(original)
 
     def get_all_records(self) -> List[WALRecord]:
         records_map = {}
-        if not os.path.exists(self.storage_path):
+        if not self._log.segmented and not os.path.exists(self.storage_path):
             return []
 
-        with open(self.storage_path, "r") as f:
-            for line_num, line in enumerate(f):
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                    rec = WALRecord(**data)
-                    records_map[rec.wal_id] = rec
-                except Exception as e:
-                    print(
-                        f"WAL Warning: Malformed record at line {line_num + 1}. "
-                        f"Possible crash residue. Error: {e}"
-                    )
-                    raise RuntimeError(
-                        f"WAL Corruption detected at line {line_num + 1}: {str(e)}"
-                    )
+        for data in self._log.iter_raw():
+            if "ref" in data:
+                base = records_map.get(data["wal_id"])
+                if base is None:
+                    continue  # start record already retired
+                records_map[base.wal_id] = base.model_copy(update={
+                    "status": MemoryStatus(data["status"]),
+                    "store_result": data.get("store_result"),
+                })
+                continue
+            rec = WALRecord(**data)
+            records_map[rec.wal_id] = rec
 
         return list(records_map.values())
+
+
+_wal_manager: Optional[WALManager] = None
+_wal_lock = threading.Lock()
+
+
+def get_wal_manager() -> WALManager:
+    """Process-wide WAL configured from settings (lmf_wal_*)."""
+    global _wal_manager
+    with _wal_lock:
+        if _wal_manager is None:
+            from ...config import settings
+            path = os.path.abspath(settings.lmf_wal_path)
+            os.makedirs(path if settings.lmf_wal_segment_max_bytes > 0 else os.path.dirname(path), exist_ok=True)
+            _wal_manager = WALManager(
+                path,
+                durability=Durability(settings.lmf_wal_durability),
+                group_window_ms=settings.lmf_wal_group_window_ms,
+                group_max_bytes=settings.lmf_wal_group_max_bytes,
+                segment_max_bytes=settings.lmf_wal_segment_max_bytes,
+                checkpoint_every=settings.lmf_wal_checkpoint_every,
+                retire_mode=settings.lmf_wal_retire_mode,
+                fmt=settings.lmf_wal_format,
+                compression=settings.lmf_wal_compression,
+                body_codec=settings.lmf_wal_body_codec,
+            )
+        return _wal_manager
+
+
+def shutdown_wal_manager() -> None:
+    global _wal_manager
+    with _wal_lock:
+        if _wal_manager is not None:
+            _wal_manager.close()
+            _wal_manager = None
+
+
+def convert_wal(src: str, dst: str, fmt: str = "binary", compression: str = "zlib",
+                body_codec: str = "json") -> Dict[str, Any]:
+    """
+    Re-encode a WAL file (or a segmented WAL directory) into `fmt`.
+    jsonl -> binary turns full commit / rollback records into refs; binary -> jsonl
+    resolves refs back into full records.  The checkpoint is not copied: the
+    converted directory re-indexes itself on first open.
+    """
+    target = get_codec(fmt, compression, body_codec)
+    if os.path.isdir(src):
+        os.makedirs(dst, exist_ok=True)
+        pairs = []
+        for name in sorted(os.listdir(src)):
+            if not name.startswith(SEGMENT_PREFIX):
+                continue
+            seg = int(name[len(SEGMENT_PREFIX):].split(".", 1)[0])
+            pairs.append((seg, os.path.join(src, name),
+                          os.path.join(dst, f"{SEGMENT_PREFIX}{seg:08d}{target.suffix}")))
+    else:
+        pairs = [(0, src, dst)]
+
+    starts: Dict[str, Any] = {}
+    stats = {"records": 0, "refs": 0, "bytes_in": 0, "bytes_out": 0}
+    for seg, in_path, out_path in pairs:
+        source = get_codec(detect_format(in_path) or "jsonl")
+        stats["bytes_in"] += os.path.getsize(in_path)
+        with open(out_path, "wb") as out:
+            out.write(target.header)
+            for _, data in source.scan(in_path):
+                status = data.get("status")
+                if "ref" in data:
+                    start = starts.get(data["wal_id"])
+                    if start is None:
+                        continue
+                    data = _resolve(start[1], data)
+                if target.refs and status != MemoryStatus.PENDING.value and data["wal_id"] in starts:
+                    data = {
+                        "wal_id": data["wal_id"],
+                        "status": status,
+                        "store_result": data.get("store_result"),
+                        "ref": list(starts[data["wal_id"]][0]),
+                        "created_at": data.get("created_at"),
+                    }
+                    stats["refs"] += 1
+                elif status == MemoryStatus.PENDING.value:
+                    starts[data["wal_id"]] = ((seg, out.tell()), data)
+                out.write(target.encode(data))
+                stats["records"] += 1
+            out.flush()
+            os.fsync(out.fileno())
+        stats["bytes_out"] += os.path.getsize(out_path)
+    return stats
@@ -0,0 +1,299 @@
+"""
+ArcHillx LMF — WAL record encodings
+===================================
+jsonl   — original format: one JSON document per line.
+binary  — file starts with MAGIC, then frames of
+              flags:u8 | length:u32 | crc32:u32 | body[length]
+          flags bits 0-1: body codec (0 = compact JSON, 1 = msgpack)
+          flags bits 2-3: compression (0 = none, 1 = zlib, 2 = zstd)
+          Bodies under COMPRESS_MIN_BYTES, or that do not shrink, are stored raw.
+          The body codec is JSON unless msgpack is asked for (LMF_WAL_BODY_CODEC);
+          msgpack / zstd fall back to JSON / zlib when not installed.  Decoding
+          follows the flags, so a log may mix both.
+
+Both codecs expose scan / repair_tail / read_at over raw record dicts.  In the
+binary format commit / rollback records may carry "ref": [segment, offset] of the
+start record instead of repeating the payload; WALManager resolves them.
+"""
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .file_utils import file_lock
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LMFWAL\x01\n"
+_HEADER = struct.Struct(">BII")
+BODY_JSON, BODY_MSGPACK = 0, 1
+COMP_NONE, COMP_ZLIB, COMP_ZSTD = 0, 1, 2
+COMPRESS_MIN_BYTES = 128
+
+OnCorrupt = Optional[Callable[[int, Exception], None]]
+
+
+def detect_format(path: str) -> Optional[str]:
+    """'binary', 'jsonl', or None for a missing / empty file."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(MAGIC))
+    except FileNotFoundError:
+        return None
+    if not head:
+        return None
+    return "binary" if head == MAGIC else "jsonl"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  JSONL
+# ══════════════════════════════════════════════════════════════════════════════
+
+class JsonlCodec:
+    name = "jsonl"
+    suffix = ".jsonl"
+    header = b""
+    refs = False
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def scan(self, path: str, start: int = 0, on_corrupt: OnCorrupt = None
+             ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield (offset, raw record dict) from `start`.
+        A malformed final line is treated as a torn tail and skipped; a malformed line
+        elsewhere raises RuntimeError unless `on_corrupt` is given, in which case it is
+        reported and skipped.
+        """
+        with open(path, "rb") as f:
+            f.seek(start)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    return
+                if not line.strip():
+                    continue
+                try:
+                    yield offset, json.loads(line)
+                except Exception as e:
+                    if on_corrupt is not None:
+                        on_corrupt(offset, e)
+                        continue
+                    if not line.endswith(b"\n") or not f.read(1):
+                        logger.warning("WAL: ignoring torn trailing record in %s at offset %d",
+                                       os.path.basename(path), offset)
+                        return
+                    raise RuntimeError(
+                        f"WAL Corruption detected in {os.path.basename(path)} at offset {offset}: {str(e)}"
+                    )
+
+    def read_at(self, path: str, offset: int) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def repair_tail(self, path: str) -> int:
+        """Truncate a torn / unparseable trailing record left by a crash; returns bytes removed."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r+b") as f:
+            with file_lock(f):
+                end = f.seek(0, 2)
+                cut = end
+                while cut > 0:
+                    start = _line_start(f, cut)
+                    f.seek(start)
+                    line = f.read(cut - start)
+                    if line.endswith(b"\n"):
+                        if not line.strip():
+                            break
+                        try:
+                            json.loads(line)
+                            break
+                        except Exception:
+                            pass
+                    cut = start
+                return _truncate(f, path, end, cut)
+
+
+def _line_start(f: Any, end: int) -> int:
+    """Offset of the line that ends at `end` (exclusive), scanning backwards."""
+    pos = end - 1  # skip the line's own terminator
+    block = 64 * 1024
+    while pos > 0:
+        lo = max(0, pos - block)
+        f.seek(lo)
+        chunk = f.read(pos - lo)
+        idx = chunk.rfind(b"\n")
+        if idx >= 0:
+            return lo + idx + 1
+        pos = lo
+    return 0
+
+
+def _truncate(f: Any, path: str, end: int, cut: int) -> int:
+    if cut < end:
+        f.truncate(cut)
+        f.flush()
+        os.fsync(f.fileno())
+        logger.warning("WAL: truncated %d byte torn tail from %s", end - cut, os.path.basename(path))
+    return end - cut
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  Binary frames
+# ══════════════════════════════════════════════════════════════════════════════
+
+class BinaryCodec:
+    name = "binary"
+    suffix = ".walb"
+    header = MAGIC
+    refs = True
+
+    def __init__(self, compression: str = "zlib", body: str = "json"):
+        if body == "msgpack" and msgpack is None:
+            logger.warning("WAL: msgpack not installed, falling back to JSON bodies")
+            body = "json"
+        if body not in ("json", "msgpack"):
+            raise ValueError(f"unknown WAL body codec {body!r}")
+        self.body = body
+        if compression == "zstd" and zstandard is None:
+            logger.warning("WAL: zstandard not installed, falling back to zlib")
+            compression = "zlib"
+        if compression not in ("none", "zlib", "zstd"):
+            raise ValueError(f"unknown WAL compression {compression!r}")
+        self.compression = compression
+        self._comp = {"none": COMP_NONE, "zlib": COMP_ZLIB, "zstd": COMP_ZSTD}[compression]
+        self._zc = zstandard.ZstdCompressor(level=3) if self._comp == COMP_ZSTD else None
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        if self.body == "msgpack":
+            body, flags = msgpack.packb(data, use_bin_type=True, default=str), BODY_MSGPACK
+        else:
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+            flags = BODY_JSON
+        if self._comp != COMP_NONE and len(body) >= COMPRESS_MIN_BYTES:
+            packed = self._zc.compress(body) if self._comp == COMP_ZSTD else zlib.compress(body, 6)
+            if len(packed) < len(body):
+                body = packed
+                flags |= self._comp << 2
+        return _HEADER.pack(flags, len(body), zlib.crc32(body)) + body
+
+    @staticmethod
+    def _decode(flags: int, body: bytes) -> Dict[str, Any]:
+        comp = (flags >> 2) & 0b11
+        if comp == COMP_ZLIB:
+            body = zlib.decompress(body)
+        elif comp == COMP_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("WAL frame is zstd-compressed but zstandard is not installed")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        if flags & 0b11 == BODY_MSGPACK:
+            if msgpack is None:
+                raise RuntimeError("WAL frame is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False)
+        return json.loads(body)
+
+    def _read_frame(self, f: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Exception], bool]:
+        """(record, error, complete) for the frame at the current position."""
+        hdr = f.read(_HEADER.size)
+        if len(hdr) < _HEADER.size:
+            return None, None, False
+        flags, length, crc = _HEADER.unpack(hdr)
+        body = f.read(length)
+        if len(body) < length:
+            return None, None, False
+        if zlib.crc32(body) != crc:
+            return None, ValueError("CRC mismatch"), True
+        try:
+            return self._decode(flags, body), None, True
+        except Exception as e:
+            return None, e, True
+
+    def scan(self, path: str, start: int = 0, on_corrupt: OnCorrupt = None
+             ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            f.seek(max(start, len(MAGIC)))
+            if start == 0:
+                f.seek(0)
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise RuntimeError(f"{os.path.basename(path)} is not a binary WAL file")
+            while True:
+                offset = f.tell()
+                if offset >= size:
+                    return
+                data, err, complete = self._read_frame(f)
+                if not complete or (err is not None and f.tell() >= size):
+                    logger.warning("WAL: ignoring torn trailing frame in %s at offset %d",
+                                   os.path.basename(path), offset)
+                    return
+                if err is not None:
+                    if on_corrupt is not None:
+                        on_corrupt(offset, err)
+                        continue
+                    raise RuntimeError(
+                        f"WAL Corruption detected in {os.path.basename(path)} at offset {offset}: {str(err)}"
+                    )
+                yield offset, data
+
+    def read_at(self, path: str, offset: int) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data, err, complete = self._read_frame(f)
+        if data is None:
+            raise RuntimeError(f"WAL frame at offset {offset} unreadable: {err or 'truncated'}")
+        return data
+
+    def repair_tail(self, path: str) -> int:
+        """Walk frame headers (seeking over bodies), verify the last frame, truncate if torn."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r+b") as f:
+            with file_lock(f):
+                end = f.seek(0, 2)
+                if end == 0:
+                    return 0
+                f.seek(0)
+                if f.read(len(MAGIC)) != MAGIC:
+                    return 0
+                pos = last = len(MAGIC)
+                while pos < end:
+                    f.seek(pos)
+                    hdr = f.read(_HEADER.size)
+                    if len(hdr) < _HEADER.size:
+                        break
+                    _, length, _ = _HEADER.unpack(hdr)
+                    if pos + _HEADER.size + length > end:
+                        break
+                    last = pos
+                    pos += _HEADER.size + length
+                cut = pos
+                if last < cut:
+                    f.seek(last)
+                    data, err, complete = self._read_frame(f)
+                    if data is None:
+                        cut = last
+                return _truncate(f, path, end, cut)
+
+
+def get_codec(fmt: str, compression: str = "zlib", body: str = "json") -> Any:
+    if fmt == "jsonl":
+        return JsonlCodec()
+    if fmt == "binary":
+        return BinaryCodec(compression, body)
+    raise ValueError(f"unknown WAL format {fmt!r}")
@@ -0,0 +1,444 @@
+"""
+ArcHillx — LMF Working Memory Cache
+===================================
+In-process tier in front of ah_lmf_working (enable_lmf_working_cache):
+
+  * get / set / get_all are served from a per-task LRU namespace; a namespace
+    is read through from the DB once, on first access
+  * writes are write-behind: dirty keys and namespace clears are flushed to the
+    DB in batches by a background thread (clears first, then upserts)
+  * TTLs are tracked on a hashed timer wheel; expired entries leave RAM on the
+    tick they expire, and expired rows are deleted from the DB in bulk
+  * clear(task_id) and task close / fail drop the task's whole namespace
+
+Values are kept as their JSON text, so callers get a fresh object on every get
+exactly as with the DB path.  Up to one flush interval of writes can be lost on
+a hard crash; each process has its own cache, so run a single worker (or pin
+tasks to workers) when enabling it.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .stats import measure, record_write, row_bytes
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, str]
+_DELETED = object()
+
+
+@dataclass
+class _Entry:
+    value: str                      # JSON text
+    expires_at: Optional[datetime]  # naive UTC, as stored in ah_lmf_working
+    created_at: datetime
+
+
+class _Namespace:
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.complete = True        # False once a key was evicted: misses must go to the DB
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule, one slot inspected per tick."""
+
+    def __init__(self, tick_s: float = 1.0, slots: int = 512):
+        self.tick_s = tick_s
+        self.slots: List[Dict[Key, Tuple[int, datetime]]] = [dict() for _ in range(slots)]
+        self._cursor = 0
+        self._started = time.monotonic()
+        self._ticks_done = 0
+
+    def schedule(self, key: Key, expires_at: datetime, now: datetime) -> None:
+        ticks = max(1, int((expires_at - now).total_seconds() / self.tick_s + 0.999))
+        slot = (self._cursor + ticks) % len(self.slots)
+        rounds = (ticks - 1) // len(self.slots)
+        self.slots[slot][key] = (rounds, expires_at)
+
+    def advance(self) -> List[Tuple[Key, datetime]]:
+        """Process every tick that elapsed since the last call; returns due (key, expires_at)."""
+        due_ticks = max(int((time.monotonic() - self._started) / self.tick_s) - self._ticks_done, 0)
+        fired: List[Tuple[Key, datetime]] = []
+        n = len(self.slots)
+        # after a stall longer than one revolution a slot is passed several times:
+        # visit it once and take all those rounds off at once
+        for i in range(1, min(due_ticks, n) + 1):
+            bucket = self.slots[(self._cursor + i) % n]
+            passes = (due_ticks - i) // n + 1
+            for key, (rounds, expires_at) in list(bucket.items()):
+                if rounds >= passes:
+                    bucket[key] = (rounds - passes, expires_at)
+                else:
+                    del bucket[key]
+                    fired.append((key, expires_at))
+        self._cursor = (self._cursor + due_ticks) % n
+        self._ticks_done += due_ticks
+        return fired
+
+
+class WorkingMemoryCache:
+    def __init__(self, *, max_tasks: int = 1024, max_keys_per_task: int = 256,
+                 flush_interval_s: float = 0.2, flush_batch: int = 500,
+                 tick_s: float = 1.0, db_sweep_interval_s: float = 60.0):
+        self.max_tasks = max(1, max_tasks)
+        self.max_keys = max(1, max_keys_per_task)
+        self.flush_interval_s = flush_interval_s
+        self.flush_batch = max(1, flush_batch)
+        self.db_sweep_interval_s = db_sweep_interval_s
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._tasks: "OrderedDict[int, _Namespace]" = OrderedDict()
+        self._dirty: "OrderedDict[Key, Any]" = OrderedDict()   # _Entry or _DELETED
+        self._cleared: set[int] = set()
+        self._inflight: Dict[Key, Any] = {}
+        self._inflight_cleared: set[int] = set()
+        self._wheel = TimerWheel(tick_s=tick_s)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_db_sweep = time.monotonic()
+        self.stats_counters = {"hits": 0, "misses": 0, "flushed": 0, "flushes": 0,
+                               "expired": 0, "db_swept": 0, "evicted_keys": 0, "evicted_tasks": 0}
+
+    # ── lifecycle ─────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="lmf-working-cache", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=min(self.flush_interval_s, self._wheel.tick_s))
+            self._wake.clear()
+            try:
+                self.sweep()
+                self.flush()
+            except Exception:
+                logger.exception("working memory cache background cycle failed")
+
+    # ── public API (mirrors _WorkingStore) ────────────────────────────────────
+    def set(self, task_id: int, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds) if ttl_seconds else None
+        text = json.dumps(value)
+        with self._lock:
+            ns = self._namespace(task_id)
+            old = ns.entries.pop(key, None)
+            entry = _Entry(text, expires_at, old.created_at if old else now)
+            ns.entries[key] = entry
+            self._evict_keys(task_id, ns)
+            self._dirty[(task_id, key)] = entry
+            self._dirty.move_to_end((task_id, key))
+            if expires_at is not None:
+                self._wheel.schedule((task_id, key), expires_at, now)
+            if len(self._dirty) >= self.flush_batch:
+                self._wake.set()
+
+    def get(self, task_id: int, key: str) -> Optional[Any]:
+        with self._lock:
+            ns = self._namespace(task_id)
+            entry = ns.entries.get(key)
+            if entry is None and not ns.complete:
+                entry = self._load_key(task_id, key)
+                if entry is not None:
+                    ns.entries[key] = entry
+                    self._evict_keys(task_id, ns)
+            if entry is None:
+                self.stats_counters["misses"] += 1
+                return None
+            if entry.expires_at and entry.expires_at < datetime.utcnow():
+                self._expire((task_id, key), entry.expires_at)
+                return None
+            ns.entries.move_to_end(key)
+            self.stats_counters["hits"] += 1
+            return json.loads(entry.value)
+
+    def get_all(self, task_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            ns = self._namespace(task_id)
+            if not ns.complete:  # some keys only live in the DB: read the whole set uncached
+                ns = self._load_namespace(task_id, bounded=False)
+            now = datetime.utcnow()
+            return [
+                {
+                    "key": k,
+                    "value": json.loads(e.value),
+                    "expires_at": e.expires_at.isoformat() if e.expires_at else None,
+                    "created_at": e.created_at.isoformat(),
+                }
+                for k, e in ns.entries.items()
+                if not (e.expires_at and e.expires_at < now)
+            ]
+
+    def clear(self, task_id: int) -> None:
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            for k in [k for k in self._dirty if k[0] == task_id]:
+                del self._dirty[k]
+            self._cleared.add(task_id)
+            self._tasks[task_id] = _Namespace()   # known-empty until someone sets again
+            self._wake.set()
+
+    def release(self, task_id: int) -> None:
+        """Task ended: flush its pending writes and drop the namespace from RAM."""
+        with self._lock:
+            if task_id not in self._tasks and not any(k[0] == task_id for k in self._dirty):
+                return
+        self.flush()
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tasks": len(self._tasks),
+                "keys": sum(len(ns.entries) for ns in self._tasks.values()),
+                "dirty": len(self._dirty),
+                "pending_clears": len(self._cleared),
+                **self.stats_counters,
+            }
+
+    # ── namespaces ────────────────────────────────────────────────────────────
+    def _namespace(self, task_id: int) -> _Namespace:
+        ns = self._tasks.get(task_id)
+        if ns is not None:
+            self._tasks.move_to_end(task_id)
+            return ns
+        ns = self._load_namespace(task_id)
+        self._tasks[task_id] = ns
+        while len(self._tasks) > self.max_tasks:
+            self._tasks.popitem(last=False)
+            self.stats_counters["evicted_tasks"] += 1
+        return ns
+
+    def _evict_keys(self, task_id: int, ns: _Namespace) -> None:
+        while len(ns.entries) > self.max_keys:
+            ns.entries.popitem(last=False)
+            ns.complete = False
+            self.stats_counters["evicted_keys"] += 1
+
+    def _overlay(self, task_id: int) -> Tuple[bool, Dict[str, Any]]:
+        """(db rows are void, pending writes) for a task, newest state winning."""
+        void = task_id in self._cleared or task_id in self._inflight_cleared
+        pending: Dict[str, Any] = {}
+        for source in (self._inflight, self._dirty):
+            for (tid, k), v in source.items():
+                if tid == task_id:
+                    pending[k] = v
+        return void, pending
+
+    def _load_namespace(self, task_id: int, bounded: bool = True) -> _Namespace:
+        from ...db.schema import SessionLocal, AHLMFWorking
+        ns = _Namespace()
+        void, pending = self._overlay(task_id)
+        rows = []
+        if not void:
+            db = SessionLocal()
+            try:
+                rows = db.query(AHLMFWorking).filter(AHLMFWorking.task_id == task_id).all()
+            finally:
+                db.close()
+        now = datetime.utcnow()
+        for r in rows:
+            ns.entries[r.key] = _Entry(r.value, r.expires_at, r.created_at or now)
+            if r.expires_at:
+                self._wheel.schedule((task_id, r.key), r.expires_at, now)
+        for k, v in pending.items():
+            if v is _DELETED:
+                ns.entries.pop(k, None)
+            else:
+                ns.entries[k] = v
+        self.stats_counters["misses"] += 1
+        if bounded:
+            self._evict_keys(task_id, ns)
+        return ns
+
+    def _load_key(self, task_id: int, key: str) -> Optional[_Entry]:
+        from ...db.schema import SessionLocal, AHLMFWorking
+        void, pending = self._overlay(task_id)
+        if key in pending:
+            v = pending[key]
+            return None if v is _DELETED else v
+        if void:
+            return None
+        db = SessionLocal()
+        try:
+            r = (
+                db.query(AHLMFWorking)
+                .filter(AHLMFWorking.task_id == task_id, AHLMFWorking.key == key)
+                .first()
+            )
+            return _Entry(r.value, r.expires_at, r.created_at or datetime.utcnow()) if r else None
+        finally:
+            db.close()
+
+    # ── expiry ────────────────────────────────────────────────────────────────
+    def _expire(self, key: Key, expires_at: datetime) -> None:
+        ns = self._tasks.get(key[0])
+        entry = ns.entries.get(key[1]) if ns else None
+        if entry is not None and entry.expires_at == expires_at:
+            del ns.entries[key[1]]
+            self.stats_counters["expired"] += 1
+        pending = self._dirty.get(key)
+        if pending is not None and pending is not _DELETED and pending.expires_at == expires_at:
+            del self._dirty[key]
+
+    def sweep(self) -> int:
+        """Advance the timer wheel; every db_sweep_interval_s also bulk-delete expired rows."""
+        with self._lock:
+            fired = self._wheel.advance()
+            now = datetime.utcnow()
+            for key, expires_at in fired:
+                if expires_at <= now:
+                    self._expire(key, expires_at)
+                else:  # clock skew between wheel ticks and wall time
+                    self._wheel.schedule(key, expires_at, now)
+        if time.monotonic() - self._last_db_sweep >= self.db_sweep_interval_s:
+            self._last_db_sweep = time.monotonic()
+            return self.sweep_db()
+        return 0
+
+    def sweep_db(self) -> int:
+        from ...db.schema import SessionLocal, AHLMFWorking
+        db = SessionLocal()
+        try:
+            expired = (AHLMFWorking.expires_at.isnot(None), AHLMFWorking.expires_at < datetime.utcnow())
+            rows, nbytes = measure(db, "working", *expired)
+            n = db.query(AHLMFWorking).filter(*expired).delete(synchronize_session=False)
+            if n:
+                record_write(db, "working", rows=-rows, nbytes=-nbytes)
+            db.commit()
+        finally:
+            db.close()
+        self.stats_counters["db_swept"] += n
+        return n
+
+    # ── write-behind ──────────────────────────────────────────────────────────
+    def flush(self) -> int:
+        """Write pending clears and dirty keys to ah_lmf_working; returns rows written."""
+        from ...db.schema import SessionLocal, AHLMFWorking
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty and not self._cleared:
+                    return 0
+                batch: Dict[Key, Any] = {}
+                while self._dirty and len(batch) < self.flush_batch:
+                    k, v = self._dirty.popitem(last=False)
+                    batch[k] = v
+                cleared = set(self._cleared)
+                self._cleared.clear()
+                self._inflight = batch
+                self._inflight_cleared = cleared
+            db = SessionLocal()
+            try:
+                rows_delta = bytes_delta = 0
+                if cleared:
+                    in_cleared = AHLMFWorking.task_id.in_(cleared)
+                    rows_delta, bytes_delta = measure(db, "working", in_cleared)
+                    rows_delta, bytes_delta = -rows_delta, -bytes_delta
+                    db.query(AHLMFWorking).filter(in_cleared).delete(synchronize_session=False)
+                by_task: Dict[int, Dict[str, Any]] = {}
+                for (tid, k), v in batch.items():
+                    by_task.setdefault(tid, {})[k] = v
+                for tid, items in by_task.items():
+                    existing = {
+                        r.key: r for r in db.query(AHLMFWorking)
+                        .filter(AHLMFWorking.task_id == tid, AHLMFWorking.key.in_(list(items)))
+                        .all()
+                    }
+                    for k, v in items.items():
+                        row = existing.get(k)
+                        if row is not None:
+                            bytes_delta -= row_bytes("working", row)
+                        if v is _DELETED:
+                            if row is not None:
+                                db.delete(row)
+                                rows_delta -= 1
+                            continue
+                        if row is not None:
+                            row.value = v.value
+                            row.expires_at = v.expires_at
+                        else:
+                            row = AHLMFWorking(task_id=tid, key=k, value=v.value,
+                                               expires_at=v.expires_at, created_at=v.created_at)
+                            db.add(row)
+                            rows_delta += 1
+                        bytes_delta += row_bytes("working", row)
+                if rows_delta or bytes_delta:
+                    record_write(db, "working", rows=rows_delta, nbytes=bytes_delta)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    # put the batch back behind anything written since, keep the clears
+                    for k, v in batch.items():
+                        self._dirty.setdefault(k, v)
+                    self._cleared |= cleared
+                raise
+            finally:
+                db.close()
+                with self._lock:
+                    self._inflight = {}
+                    self._inflight_cleared = set()
+            self.stats_counters["flushes"] += 1
+            self.stats_counters["flushed"] += len(batch)
+            return len(batch)
+
+
+_cache: Optional[WorkingMemoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_working_cache() -> Optional[WorkingMemoryCache]:
+    """Process-wide cache, or None when enable_lmf_working_cache is off."""
+    global _cache
+    from ...config import settings
+    if not settings.enable_lmf_working_cache:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = WorkingMemoryCache(
+                max_tasks=settings.lmf_working_cache_max_tasks,
+                max_keys_per_task=settings.lmf_working_cache_max_keys_per_task,
+                flush_interval_s=settings.lmf_working_flush_interval_ms / 1000.0,
+                flush_batch=settings.lmf_working_flush_batch,
+                db_sweep_interval_s=settings.lmf_working_db_sweep_interval_s,
+            )
+            _cache.start()
+        return _cache
+
+
+def release_task(task_id: int) -> None:
+    """Task finished: free its working-memory namespace (no-op without a live cache)."""
+    if _cache is not None:
+        try:
+            _cache.release(task_id)
+        except Exception:
+            logger.exception("working memory release failed for task %s", task_id)
+
+
+def shutdown_working_cache() -> None:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.stop()
+            _cache = None
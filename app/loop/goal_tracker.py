@@ -16,33 +16,47 @@ class GoalTracker:
 
     def create(self, title: str, description: str = "",
                priority: int = 5, context: dict | None = None) -> int:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        g = AHGoal(title=title, description=description, priority=priority,
-                   status="active", progress=0.0,
-                   context=json.dumps(context or {}))
-        db.add(g)
-        db.commit()
-        db.refresh(g)
-        logger.info("goal created: id=%d", g.id)
-        return g.id
+        from ..db.schema import AHGoal
+        from ..db.session import session_scope
+        with session_scope() as db:
+            g = AHGoal(title=title, description=description, priority=priority,
+                       status="active", progress=0.0,
+                       context=json.dumps(context or {}))
+            db.add(g)
+            db.commit()
+            db.refresh(g)
+            logger.info("goal created: id=%d", g.id)
+            return g.id
 
     def update_progress(self, gid: int, progress: float,
                         notes: str | None = None) -> None:
-        from ..db.schema import AHGoal, get_db
+        """Set progress outright; advance() increments still buffered for the goal are dropped first."""
+        from ..db import statements
+        from ..db.counters import counter_coalescer
+        from ..db.session import session_scope
         progress = max(0.0, min(1.0, progress))
-        db = next(get_db())
-        g = db.query(AHGoal).filter_by(id=gid).first()
-        if g:
-            g.progress = progress
-            if progress >= 1.0:
-                g.status = "completed"
-            if notes:
-                ctx = json.loads(g.context or "{}")
-                ctx.setdefault("notes", []).append(
-                    {"ts": datetime.utcnow().isoformat(), "note": notes})
-                g.context = json.dumps(ctx)
-            db.commit()
+        counter_coalescer.discard("ah_goals", gid, "progress")
+        with session_scope() as db:
+            g = statements.one(db, statements.goal_by_id(), id=gid)
+            if g:
+                g.progress = progress
+                if progress >= 1.0:
+                    g.status = "completed"
+                if notes:
+                    ctx = json.loads(g.context or "{}")
+                    ctx.setdefault("notes", []).append(
+                        {"ts": datetime.utcnow().isoformat(), "note": notes})
+                    g.context = json.dumps(ctx)
+                db.commit()
+
+    def advance(self, gid: int, delta: float, cap: float = 0.99) -> None:
+        """
+        Add `delta` to an active goal's progress, never past `cap`.  Coalesced
+        with other counter writes; completing a goal stays with update_progress().
+        """
+        from ..db.counters import counter_coalescer
+        counter_coalescer.incr("ah_goals", gid, "progress", delta, cap=min(cap, 1.0),
+                               where={"status": "active"})
 
     def pause(self, gid: int) -> None:
         self._status(gid, "paused")
@@ -54,32 +68,35 @@ class GoalTracker:
         self._status(gid, "abandoned")
 
     def complete(self, gid: int) -> None:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        g = db.query(AHGoal).filter_by(id=gid).first()
-        if g:
-            g.status = "completed"
-            g.progress = 1.0
-            db.commit()
+        from ..db import statements
+        from ..db.session import session_scope
+        with session_scope() as db:
+            g = statements.one(db, statements.goal_by_id(), id=gid)
+            if g:
+                g.status = "completed"
+                g.progress = 1.0
+                db.commit()
 
     def get(self, gid: int) -> dict | None:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        g = db.query(AHGoal).filter_by(id=gid).first()
-        return self._d(g) if g else None
+        from ..db import statements
+        from ..db.session import session_scope
+        with session_scope() as db:
+            g = statements.one(db, statements.goal_by_id(), id=gid)
+            return self._d(g) if g else None
 
     def list_active(self) -> list[dict]:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        rows = db.query(AHGoal).filter_by(status="active") \
-                               .order_by(AHGoal.priority).all()
-        return [self._d(r) for r in rows]
+        from ..db import statements
+        from ..db.session import session_scope
+        with session_scope() as db:
+            rows = statements.all_(db, statements.goals_by_status(), status="active")
+            return [self._d(r) for r in rows]
 
     def list_all(self) -> list[dict]:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        rows = db.query(AHGoal).order_by(AHGoal.priority, AHGoal.created_at).all()
-        return [self._d(r) for r in rows]
+        from ..db import statements
+        from ..db.session import session_scope
+        with session_scope() as db:
+            rows = statements.all_(db, statements.goals_all())
+            return [self._d(r) for r in rows]
 
     def sync_to_memory(self, gid: int) -> None:
         g = self.get(gid)
@@ -97,12 +114,13 @@ class GoalTracker:
             logger.debug("sync_to_memory failed: %s", e)
 
     def _status(self, gid: int, status: str) -> None:
-        from ..db.schema import AHGoal, get_db
-        db = next(get_db())
-        g = db.query(AHGoal).filter_by(id=gid).first()
-        if g:
-            g.status = status
-            db.commit()
+        from ..db import statements
+        from ..db.session import session_scope
+        with session_scope() as db:
+            g = statements.one(db, statements.goal_by_id(), id=gid)
+            if g:
+                g.status = status
+                db.commit()
 
     def _d(self, g: Any) -> dict:
         return {"id": g.id, "title": g.title, "description": g.description,
@@ -41,6 +41,11 @@ class LoopResult:
 class MainLoop:
 
     def run(self, inp: LoopInput) -> LoopResult:
+        from ..db.profiler import query_profiler
+        with query_profiler.track("ooda"):
+            return self._run(inp)
+
+    def _run(self, inp: LoopInput) -> LoopResult:
         from ..runtime.lifecycle import lifecycle
         from ..runtime.skill_manager import skill_manager
         from ..utils.model_router import model_router
@@ -135,10 +140,7 @@ class MainLoop:
                     str(output)[:200] if output else "", tokens_used,
                 )
                 if inp.goal_id:
-                    g = goal_tracker.get(inp.goal_id)
-                    if g and g["status"] == "active":
-                        goal_tracker.update_progress(
-                            inp.goal_id, min(g["progress"] + 0.1, 0.99))
+                    goal_tracker.advance(inp.goal_id, 0.1, cap=0.99)
             else:
                 lifecycle.tasks.fail(task_id, error or "unknown")
                 feedback.on_task_failure(
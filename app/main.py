@@ -16,6 +16,8 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .config import settings
+from .db.profiler import query_profiler
+from .db.session import request_scope
 from .utils.logging_utils import clear_request_context, configure_logging, set_request_context, structured_log
 from .utils.rate_limit import rate_limiter
 from .utils.telemetry import telemetry
@@ -30,9 +32,16 @@ async def lifespan(app: FastAPI):
     logger.info("ArcHillx v%s starting up...", settings.app_version)
 
     from .db.schema import init_db
+    from .db.profiler import install_query_profiler
+    from .db.session import install_pool_monitor
     init_db()
+    install_pool_monitor()
+    install_query_profiler()
     logger.info("Database ready: %s", settings.database_url)
 
+    from .lmf.core.recovery import recover_on_startup
+    recover_on_startup()
+
     from .runtime.skill_manager import skill_manager
     skill_manager.startup()
 
@@ -42,6 +51,24 @@ async def lifespan(app: FastAPI):
     from .evolution.auto_scheduler import evolution_scheduler
     evolution_scheduler.startup()
 
+    from .memory.compaction import memory_compactor
+    memory_compactor.startup()
+
+    from .security.audit_partitions import audit_partitioner
+    audit_partitioner.startup()
+
+    from .db.counters import counter_coalescer
+    counter_coalescer.startup()
+
+    from .lmf.core.stats import lmf_stats_reconciler
+    lmf_stats_reconciler.startup()
+
+    from .lmf.core.consolidator import lmf_consolidator
+    lmf_consolidator.startup()
+
+    from .lmf.core.blob_store import lmf_blob_collector
+    lmf_blob_collector.startup()
+
     from .utils.model_router import model_router
     providers = model_router.list_providers()
     logger.info("AI providers: %s",
@@ -67,10 +94,28 @@ async def lifespan(app: FastAPI):
     logger.info("ArcHillx v%s ready.", settings.app_version)
     yield
 
+    from .lmf.core.blob_store import lmf_blob_collector
+    lmf_blob_collector.shutdown()
+    from .lmf.core.consolidator import lmf_consolidator
+    lmf_consolidator.shutdown()
+    from .lmf.core.stats import lmf_stats_reconciler
+    lmf_stats_reconciler.shutdown()
+    from .memory.compaction import memory_compactor
+    memory_compactor.shutdown()
+    from .security.audit_partitions import audit_partitioner
+    audit_partitioner.shutdown()
     from .evolution.auto_scheduler import evolution_scheduler
     evolution_scheduler.shutdown()
     from .runtime.cron import cron_system
     cron_system.shutdown()
+    from .db.counters import counter_coalescer
+    counter_coalescer.shutdown()                  # after cron / skills stop producing increments
+    from .lmf.core.working_cache import shutdown_working_cache
+    shutdown_working_cache()
+    from .lmf.core.wal import shutdown_wal_manager
+    shutdown_wal_manager()
+    from .db.aio import shutdown_db_executor
+    shutdown_db_executor()
     logger.info("ArcHillx shutdown complete.")
 
 
@@ -89,6 +134,16 @@ app = FastAPI(
 )
 
 
+def _route_template(request: Request) -> str:
+    """Matched route path with its include_router prefix ("/v1/goals/{goal_id}"), bounded for metrics."""
+    template = getattr(request.scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    parts = request.url.path.split("/")
+    depth = len(template.split("/")) - 1
+    return "/".join(parts[:max(1, len(parts) - depth)]) + template
+
+
 @app.middleware("http")
 async def request_context_middleware(request: Request, call_next):
     request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
@@ -96,7 +151,13 @@ async def request_context_middleware(request: Request, call_next):
     request.state.request_id = request_id
     tokens = set_request_context(request_id=request_id)
     try:
-        response = await call_next(request)
+        with query_profiler.track("http") as unit:
+            if settings.db_request_scoped_session:
+                with request_scope():
+                    response = await call_next(request)
+            else:
+                response = await call_next(request)
+            unit.label = f"{request.method} {_route_template(request)}"
         elapsed_ms = int((time.monotonic() - start) * 1000)
         response.headers["x-request-id"] = request_id
         response.headers["x-elapsed-ms"] = str(elapsed_ms)
@@ -255,4 +316,6 @@ async def readyz():
 async def metrics_root():
     if not settings.enable_metrics:
         return JSONResponse({"detail": {"code": "METRICS_DISABLED", "message": "Metrics are disabled"}}, status_code=503)
+    from .db.session import pool_monitor
+    pool_monitor.report_leaks()
     return PlainTextResponse(telemetry.as_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,313 @@
+"""
+ArcHillx — Memory Recall Benchmark
+合成資料產生器 + 召回基準測試，量測 MemoryStore.query / get_recent 與 LMF episodic search
+在 10k / 100k / 1M 筆規模下的表現。
+
+- 語料：英文 / 中文 / 中英混合句子，Zipf 分佈 tags，偏低的 importance 分佈
+- 每個 query 埋入 3 筆相關文件（ground truth）與 2 筆只含部分關鍵字的干擾文件
+- 指標：p50 / p99 延遲、每次召回回傳的候選筆數（candidate_limit 截斷後，不是掃描筆數）、recall@k
+- 結果為 JSON，可用 compare() 與前一版比較
+
+CLI：scripts/bench_memory_recall.py
+"""
+from __future__ import annotations
+
+import json
+import math
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from . import tokenizer
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+RELEVANT_PER_QUERY = 3
+DISTRACTORS_PER_QUERY = 2
+
+_EN_WORDS = (
+    "task agent memory cron deploy backup server request error retry queue worker "
+    "database index report metric latency budget review release rollback sandbox skill "
+    "goal session audit policy signal pipeline cache config model provider token status"
+).split()
+_ZH_WORDS = (
+    "任務 代理 記憶 排程 部署 備份 伺服器 請求 錯誤 重試 佇列 資料庫 索引 報表 指標 "
+    "延遲 預算 審查 發布 回滾 沙箱 技能 目標 會話 稽核 政策 訊號 管線 快取 設定 模型"
+).split()
+_TAGS = ("ops", "cron", "deploy", "task_success", "task_failure", "goal_progress", "governor_blocked",
+         "api", "research", "backup", "planner", "evolution")
+_SOURCES = ("archillx", "user", "cron", "api")
+_EVENT_TYPES = ("TASK_COMPLETE", "TOOL_CALL", "DECISION", "ERROR", "CHECKPOINT")
+
+# Rare vocabularies used only for planted topics, so ground truth is exact.
+_SYLLABLES = ("vel", "dra", "kin", "mor", "zep", "qua", "lux", "tor", "bri", "sol", "nyx", "fae")
+_RARE_HANZI = "鑫淼焱垚犇骉羴猋麤灥厵靐飝龘掱嫑孖嘦"
+
+
+@dataclass
+class Corpus:
+    rows: int
+    seed: int
+    queries: list[dict[str, Any]] = field(default_factory=list)
+    # position (0-based insertion order) → planted content
+    planted: dict[int, str] = field(default_factory=dict)
+
+
+def _pseudo_word(i: int) -> str:
+    n = len(_SYLLABLES)
+    return _SYLLABLES[i % n] + _SYLLABLES[(i // n) % n] + _SYLLABLES[(i // (n * n)) % n]
+
+
+def _pseudo_hanzi(i: int) -> str:
+    n = len(_RARE_HANZI)
+    return _RARE_HANZI[i % n] + _RARE_HANZI[(i // n) % n] + _RARE_HANZI[(i // (n * n)) % n]
+
+
+def _sentence(rng: random.Random, lang: str) -> str:
+    if lang == "en":
+        return " ".join(rng.choice(_EN_WORDS) for _ in range(rng.randint(6, 14)))
+    if lang == "zh":
+        return "".join(rng.choice(_ZH_WORDS) for _ in range(rng.randint(5, 10)))
+    return f"{''.join(rng.choice(_ZH_WORDS) for _ in range(3))} {rng.choice(_EN_WORDS)} " \
+           f"{rng.choice(_EN_WORDS)} {''.join(rng.choice(_ZH_WORDS) for _ in range(3))}"
+
+
+def build_corpus(rows: int, n_queries: int = 100, seed: int = 7) -> Corpus:
+    """Pick query topics and the insertion positions of their relevant / distractor rows."""
+    rng = random.Random(seed)
+    per_query = RELEVANT_PER_QUERY + DISTRACTORS_PER_QUERY
+    n_queries = max(1, min(n_queries, 800, rows // (per_query * 4) or 1))
+    positions = rng.sample(range(rows), n_queries * per_query)
+    corpus = Corpus(rows=rows, seed=seed)
+    for qi in range(n_queries):
+        lang = ("en", "zh", "mixed")[qi % 3]
+        a, b = (_pseudo_word(qi * 2), _pseudo_word(qi * 2 + 1)) if lang == "en" else \
+               (_pseudo_hanzi(qi * 2), _pseudo_hanzi(qi * 2 + 1))
+        if lang == "mixed":
+            a = _pseudo_word(qi * 2)
+        query = f"{a} {b}" if lang != "zh" else f"{a}{b}"
+        mine = positions[qi * per_query:(qi + 1) * per_query]
+        relevant, distractors = mine[:RELEVANT_PER_QUERY], mine[RELEVANT_PER_QUERY:]
+        for pos in relevant:
+            corpus.planted[pos] = f"{_sentence(rng, lang)} {query} {_sentence(rng, lang)}"
+        for pos in distractors:
+            corpus.planted[pos] = f"{_sentence(rng, lang)} {a} {_sentence(rng, lang)}"
+        corpus.queries.append({"query": query, "lang": lang, "relevant_positions": relevant})
+    return corpus
+
+
+def iter_rows(corpus: Corpus, now: datetime | None = None) -> Iterator[dict[str, Any]]:
+    rng = random.Random(corpus.seed + 1)
+    now = now or datetime.utcnow()
+    for pos in range(corpus.rows):
+        lang = rng.choices(("en", "zh", "mixed"), weights=(5, 3, 2))[0]
+        content = corpus.planted.get(pos) or _sentence(rng, lang)
+        n_tags = min(int(rng.paretovariate(1.5)), 3)
+        tags = sorted({_TAGS[min(int(rng.paretovariate(1.2)) - 1, len(_TAGS) - 1)] for _ in range(n_tags)})
+        yield {
+            "content": content,
+            "source": rng.choices(_SOURCES, weights=(6, 2, 1, 1))[0],
+            "tags": json.dumps(tags),
+            "importance": round(rng.betavariate(2, 5), 4),
+            "metadata_": "{}",
+            "hit_count": 1,
+            "created_at": now - timedelta(seconds=rng.randint(0, 180 * 86400)),
+        }
+
+
+def load_corpus(engine: Any, corpus: Corpus, chunk: int = 5000, lmf: bool = True) -> dict[int, int]:
+    """Bulk-load ah_memory (+ terms, + ah_lmf_episodic); returns position → ah_memory.id."""
+    from ..db.schema import Base
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(corpus.seed + 2)
+    ids: dict[int, int] = {}
+    with engine.begin() as conn:
+        next_id = (conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM ah_memory").scalar() or 0) + 1
+        buf: list[dict[str, Any]] = []
+        for pos, row in enumerate(iter_rows(corpus)):
+            row["id"] = next_id + pos
+            if pos in corpus.planted:
+                ids[pos] = row["id"]
+            buf.append(row)
+            if len(buf) >= chunk:
+                _flush(conn, buf, lmf, rng)
+                buf = []
+        if buf:
+            _flush(conn, buf, lmf, rng)
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+    return ids
+
+
+def _flush(conn: Any, buf: list[dict[str, Any]], lmf: bool, rng: random.Random) -> None:
+    from sqlalchemy import insert
+    from ..db.schema import AHLMFEpisodic, AHMemory, AHMemoryTerm
+    conn.execute(insert(AHMemory), buf)
+    terms = [{"memory_id": r["id"], "term": t} for r in buf for t in tokenizer.index_terms(r["content"])]
+    if terms:
+        conn.execute(insert(AHMemoryTerm), terms)
+    if lmf:
+        conn.execute(insert(AHLMFEpisodic), [
+            {
+                "id": r["id"], "event_type": rng.choice(_EVENT_TYPES), "content": r["content"],
+                "source": r["source"], "importance": r["importance"], "tags": r["tags"],
+                "metadata_": "{}", "created_at": r["created_at"],
+            }
+            for r in buf
+        ])
+
+
+@contextmanager
+def bind_engine(engine: Any) -> Iterator[None]:
+    """Point app.db.schema session factories at the benchmark engine for the duration."""
+    from sqlalchemy.orm import sessionmaker
+    from ..db import schema
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def _get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    saved = (schema.SessionLocal, schema.get_db)
+    schema.SessionLocal, schema.get_db = factory, _get_db
+    try:
+        yield
+    finally:
+        schema.SessionLocal, schema.get_db = saved
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summarize(latencies: list[float], candidates: list[float] | None, recalls: list[float] | None) -> dict:
+    out: dict[str, Any] = {
+        "calls": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+    }
+    if candidates is not None:
+        out["candidates_returned_mean"] = round(sum(candidates) / len(candidates), 2) if candidates else 0.0
+        out["candidates_returned_p99"] = percentile(candidates, 99)
+    if recalls is not None:
+        out["recall_at_k"] = round(sum(recalls) / len(recalls), 4) if recalls else 0.0
+    return out
+
+
+def _recall(returned: list[int], relevant: set[int], k: int) -> float:
+    return len(set(returned[:k]) & relevant) / float(min(k, len(relevant)) or 1)
+
+
+def run_size(rows: int, *, n_queries: int = 100, top_k: int = 5, seed: int = 7,
+             workdir: str | Path | None = None, lmf: bool = True) -> dict[str, Any]:
+    from sqlalchemy import create_engine
+    from ..utils.telemetry import telemetry
+    from .store import MemoryStore
+
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="archillx_bench_")
+        workdir = tmp.name
+    db_path = Path(workdir) / f"memory_bench_{rows}.db"
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, future=True)
+    try:
+        corpus = build_corpus(rows, n_queries=n_queries, seed=seed)
+        started = time.perf_counter()
+        ids = load_corpus(engine, corpus, lmf=lmf)
+        load_s = time.perf_counter() - started
+
+        store = MemoryStore()
+        targets: dict[str, Any] = {}
+        with bind_engine(engine):
+            store.query(corpus.queries[0]["query"], top_k=top_k)  # warm-up
+
+            lat, cand, rec = [], [], []
+            for q in corpus.queries:
+                relevant = {ids[p] for p in q["relevant_positions"]}
+                before = telemetry.snapshot()["counters"].get("memory_recall_candidates_total", 0.0)
+                t0 = time.perf_counter()
+                hits = store.query(q["query"], top_k=top_k)
+                lat.append(time.perf_counter() - t0)
+                cand.append(telemetry.snapshot()["counters"].get("memory_recall_candidates_total", 0.0) - before)
+                rec.append(_recall([h["id"] for h in hits], relevant, top_k))
+            targets["memory_query"] = _summarize(lat, cand, rec)
+
+            lat = []
+            for _ in range(len(corpus.queries)):
+                t0 = time.perf_counter()
+                store.get_recent(limit=top_k * 2)
+                lat.append(time.perf_counter() - t0)
+            targets["memory_recent"] = _summarize(lat, None, None)
+
+            if lmf:
+                from ..lmf.core.stores import _EpisodicStore
+                episodic = _EpisodicStore()
+                lat, rec = [], []
+                for q in corpus.queries:
+                    relevant = {ids[p] for p in q["relevant_positions"]}
+                    t0 = time.perf_counter()
+                    hits = episodic.search(q=q["query"], limit=top_k)
+                    lat.append(time.perf_counter() - t0)
+                    rec.append(_recall([h["id"] for h in hits], relevant, top_k))
+                targets["lmf_episodic_search"] = _summarize(lat, None, rec)
+
+        return {
+            "rows": rows,
+            "queries": len(corpus.queries),
+            "load_s": round(load_s, 3),
+            "db_bytes": db_path.stat().st_size if db_path.exists() else None,
+            "targets": targets,
+        }
+    finally:
+        engine.dispose()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+def run(sizes: tuple[int, ...] = DEFAULT_SIZES, *, n_queries: int = 100, top_k: int = 5, seed: int = 7,
+        workdir: str | Path | None = None, lmf: bool = True) -> dict[str, Any]:
+    from ..config import settings
+    return {
+        "benchmark": "memory_recall",
+        "version": settings.app_version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "params": {"sizes": list(sizes), "queries": n_queries, "top_k": top_k, "seed": seed, "lmf": lmf},
+        "results": [run_size(n, n_queries=n_queries, top_k=top_k, seed=seed, workdir=workdir, lmf=lmf)
+                    for n in sizes],
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Per-size, per-target deltas (current − baseline) for latency and recall metrics."""
+    base = {r["rows"]: r for r in baseline.get("results", [])}
+    out: dict[str, Any] = {"baseline_version": baseline.get("version"), "current_version": current.get("version"),
+                           "sizes": {}}
+    for res in current.get("results", []):
+        prev = base.get(res["rows"])
+        if not prev:
+            continue
+        sized: dict[str, Any] = {}
+        for name, metrics in res["targets"].items():
+            old = prev["targets"].get(name) or {}
+            sized[name] = {
+                key: round(metrics[key] - old[key], 4)
+                for key in ("p50_ms", "p99_ms", "candidates_returned_mean", "recall_at_k")
+                if key in metrics and key in old
+            }
+        out["sizes"][str(res["rows"])] = sized
+    return out
@@ -0,0 +1,386 @@
+"""
+ArcHillx — Memory Compaction
+背景壓實 ah_memory，並對 LMF episodic 套用保留層級：
+1. SimHash 收斂完全 / 近似重複 → 保留最早一筆並累加 hit_count
+2. importance 依半衰期衰減（以 decayed_at 為錨點，重跑不會重複衰減）
+3. 冷且低重要度的資料移入 ah_memory_archive 或 gzip JSONL 歸檔檔
+
+Policy 全部來自 settings.memory_* ；狀態由 /v1/memory/compaction 提供。
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from ..config import settings
+from ..utils.background import IntervalJob
+from . import tokenizer
+
+logger = logging.getLogger("archillx.memory.compaction")
+
+_FP_BITS = 64
+_MIN_BANDS = 4                   # threshold+1 bands (at least 4×16 bits): a pair within threshold bits shares one
+_MAX_HAMMING = 15                # 16×4-bit bands; wider thresholds would make nearly every row a candidate
+_MAX_FEATURES = 64
+_DECAY_MIN_INTERVAL = timedelta(days=1)
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over tokenizer index terms (CJK n-grams / Latin stems).
+    Digit runs are masked first so rows differing only by task ids / counters collide.
+    """
+    text = _DIGITS_RE.sub("0", text or "")
+    features = tokenizer.index_terms(text)[:_MAX_FEATURES] or [text.strip().lower()]
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for f in features
+    ]
+    half = len(bits) / 2.0
+    out = 0
+    for col in zip(*bits):
+        out = (out << 1) | (1 if col.count("1") > half else 0)
+    return out
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(threshold: int) -> list[tuple[int, int]]:
+    """
+    (shift, mask) per band.  Pigeonhole: with threshold+1 bands, two prints at most
+    threshold bits apart agree on at least one whole band, so no near-duplicate is missed.
+    """
+    count = max(_MIN_BANDS, threshold + 1)
+    bands = []
+    shift = 0
+    for i in range(count):
+        width = _FP_BITS // count + (1 if i < _FP_BITS % count else 0)
+        bands.append((shift, (1 << width) - 1))
+        shift += width
+    return bands
+
+
+def _band_keys(source: str | None, fp: int, bands: list[tuple[int, int]]) -> list[tuple[str | None, int, int]]:
+    return [(source, i, (fp >> shift) & mask) for i, (shift, mask) in enumerate(bands)]
+
+
+def _dedup_threshold() -> int:
+    threshold = max(0, int(settings.memory_dedup_hamming_threshold))
+    if threshold > _MAX_HAMMING:
+        logger.warning("memory_dedup_hamming_threshold=%d clamped to %d", threshold, _MAX_HAMMING)
+        threshold = _MAX_HAMMING
+    return threshold
+
+
+def _archive_dir() -> Path:
+    p = Path(settings.evidence_dir).resolve() / "memory_archive"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def _append_archive_file(kind: str, records: list[dict[str, Any]], now: datetime) -> str:
+    path = _archive_dir() / f"{kind}_{now:%Y%m}.jsonl.gz"
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False, sort_keys=True, default=str) + "\n")
+    return str(path)
+
+
+def _internalize_episodic(row: Any) -> tuple[str, str, str | None]:
+    """(content, metadata_, digest) for the archive record; blob-backed rows get their full text back."""
+    try:
+        meta = json.loads(row.metadata_ or "{}")
+    except (TypeError, ValueError):
+        return row.content, row.metadata_, None
+    ref = meta.get("content_blob") if isinstance(meta, dict) else None
+    if not isinstance(ref, dict) or not ref.get("digest"):
+        return row.content, row.metadata_, None
+    from ..lmf.core.blob_store import get_blob_store
+    digest = str(ref["digest"])
+    try:
+        content = get_blob_store().get_text(digest)
+    except Exception as e:
+        # archive the preview rather than keep a cold row alive over a missing blob
+        logger.warning("episodic %s: blob %s unreadable, archiving preview: %s", row.id, digest, e)
+        return row.content, row.metadata_, digest
+    meta.pop("content_blob")
+    return content, json.dumps(meta), digest
+
+
+def _release_blobs(db: Any, digests: list[str]) -> None:
+    from ..lmf.core.blob_store import BlobNotFound, get_blob_store
+    store = get_blob_store()
+    for digest in digests:
+        try:
+            store.decref(digest, db=db)
+        except BlobNotFound:
+            logger.warning("blob %s has no refcount row; nothing to release", digest)
+
+
+class MemoryCompactor(IntervalJob):
+    job_id = "memory_compaction"
+    label = "memory compaction"
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_memory_compaction)
+
+    def interval_s(self) -> float:
+        return int(settings.memory_compaction_interval_s)
+
+    def policy(self) -> dict:
+        return {
+            "interval_s": int(settings.memory_compaction_interval_s),
+            "batch_size": int(settings.memory_compaction_batch_size),
+            "dedup_hamming_threshold": int(settings.memory_dedup_hamming_threshold),
+            "importance_half_life_days": float(settings.memory_importance_half_life_days),
+            "archive_after_days": int(settings.memory_archive_after_days),
+            "archive_max_importance": float(settings.memory_archive_max_importance),
+            "archive_mode": settings.memory_archive_mode,
+            "include_lmf_episodic": bool(settings.memory_compaction_include_lmf_episodic),
+        }
+
+    def status(self) -> dict:
+        return {
+            "enabled": bool(settings.enable_memory_compaction),
+            "started": self._started,
+            "running": self._lock.locked(),
+            "policy": self.policy(),
+            "next_run": self.next_run(),
+            "last_run": self._last_run,
+        }
+
+    # ── Run ───────────────────────────────────────────────────────────────────
+
+    def run_once(self) -> dict:
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already_running"}
+        try:
+            started = time.monotonic()
+            now = datetime.utcnow()
+            result: dict[str, Any] = {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "dedup": self.collapse_duplicates(),
+                "decay": self.decay_importance(now),
+                "archive": self.archive_cold(now),
+            }
+            if settings.memory_compaction_include_lmf_episodic:
+                result["lmf_episodic"] = self.archive_cold_episodic(now)
+            result["elapsed_s"] = round(time.monotonic() - started, 4)
+            self._last_run = result
+            logger.info("memory compaction done: %s", json.dumps(result, default=str))
+            return result
+        except Exception as e:
+            logger.exception("memory compaction failed")
+            self._last_run = {"error": str(e), "started_at": datetime.now(timezone.utc).isoformat()}
+            raise
+        finally:
+            from .store import memory_store
+            memory_store.invalidate_hot_set()
+            self._lock.release()
+
+    def collapse_duplicates(self) -> dict:
+        """Fold exact / near-duplicate rows (same source) into the oldest survivor."""
+        from ..db.schema import AHMemory, AHMemoryTerm, SessionLocal
+        threshold = _dedup_threshold()
+        layout = _bands(threshold)
+        batch_size = max(1, int(settings.memory_compaction_batch_size))
+        bands: dict[tuple, list[int]] = {}
+        prints: dict[int, int] = {}
+        scanned = collapsed = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                rows = (
+                    db.query(AHMemory)
+                    .filter(AHMemory.id > last_id)
+                    .order_by(AHMemory.id.asc())
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                doomed: list[int] = []
+                for row in rows:
+                    scanned += 1
+                    fp = simhash(row.content)
+                    keys = _band_keys(row.source, fp, layout)
+                    match = None
+                    for key in keys:
+                        match = next((c for c in bands.get(key, ()) if hamming(fp, prints[c]) <= threshold), None)
+                        if match is not None:
+                            break
+                    if match is None:
+                        prints[row.id] = fp
+                        for key in keys:
+                            bands.setdefault(key, []).append(row.id)
+                        continue
+                    self._merge(db.get(AHMemory, match), row)
+                    doomed.append(row.id)
+                if doomed:
+                    db.query(AHMemoryTerm).filter(AHMemoryTerm.memory_id.in_(doomed)).delete(synchronize_session=False)
+                    db.query(AHMemory).filter(AHMemory.id.in_(doomed)).delete(synchronize_session=False)
+                    collapsed += len(doomed)
+                db.commit()
+                db.expunge_all()
+            return {"scanned": scanned, "collapsed": collapsed, "survivors": len(prints)}
+        finally:
+            db.close()
+
+    def decay_importance(self, now: datetime) -> dict:
+        """importance *= 0.5 ** (elapsed_days / half_life), at most once per day per row."""
+        from sqlalchemy import func
+        from ..db.schema import AHMemory, SessionLocal
+        half_life = float(settings.memory_importance_half_life_days)
+        if half_life <= 0:
+            return {"enabled": False, "updated": 0}
+        batch_size = max(1, int(settings.memory_compaction_batch_size))
+        anchor = func.coalesce(AHMemory.decayed_at, AHMemory.last_seen_at, AHMemory.created_at)
+        cutoff = now - _DECAY_MIN_INTERVAL
+        updated = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                rows = (
+                    db.query(AHMemory)
+                    .filter(AHMemory.id > last_id, anchor < cutoff, AHMemory.importance > 0)
+                    .order_by(AHMemory.id.asc())
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                for row in rows:
+                    since = row.decayed_at or row.last_seen_at or row.created_at or now
+                    days = max((now - since).total_seconds() / 86400.0, 0.0)
+                    row.importance = round(float(row.importance or 0.0) * 0.5 ** (days / half_life), 6)
+                    row.decayed_at = now
+                updated += len(rows)
+                db.commit()
+                db.expunge_all()
+            return {"enabled": True, "updated": updated}
+        finally:
+            db.close()
+
+    def archive_cold(self, now: datetime) -> dict:
+        """Move cold, low-importance rows out of ah_memory (table or gzip file tier)."""
+        from sqlalchemy import func
+        from ..db.schema import AHMemory, AHMemoryArchive, AHMemoryTerm, SessionLocal
+        batch_size = max(1, int(settings.memory_compaction_batch_size))
+        cutoff = now - timedelta(days=max(0, int(settings.memory_archive_after_days)))
+        mode = settings.memory_archive_mode
+        seen_at = func.coalesce(AHMemory.last_seen_at, AHMemory.created_at)
+        archived = 0
+        path = None
+        db = SessionLocal()
+        try:
+            while True:
+                rows = (
+                    db.query(AHMemory)
+                    .filter(seen_at < cutoff, AHMemory.importance <= float(settings.memory_archive_max_importance))
+                    .order_by(AHMemory.id.asc())
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                records = [
+                    {
+                        "memory_id": r.id, "content": r.content, "source": r.source,
+                        "tags": r.tags, "importance": r.importance, "metadata_": r.metadata_,
+                        "hit_count": r.hit_count or 1, "created_at": r.created_at, "archived_at": now,
+                    }
+                    for r in rows
+                ]
+                if mode == "file":
+                    path = _append_archive_file("memory", records, now)
+                else:
+                    db.bulk_insert_mappings(AHMemoryArchive, records)
+                ids = [r.id for r in rows]
+                db.query(AHMemoryTerm).filter(AHMemoryTerm.memory_id.in_(ids)).delete(synchronize_session=False)
+                db.query(AHMemory).filter(AHMemory.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+                db.expunge_all()
+                archived += len(rows)
+            return {"mode": mode, "archived": archived, "path": path}
+        finally:
+            db.close()
+
+    def archive_cold_episodic(self, now: datetime) -> dict:
+        """
+        Retention tier for ah_lmf_episodic: cold low-importance events go to a gzip archive file.
+
+        Rows whose content lives in the blob store are archived with the full
+        text and their blob reference is dropped in the same transaction as
+        the delete, so gc() can reclaim the blob once the rows are gone.
+        """
+        from ..db.schema import AHLMFEpisodic, SessionLocal
+        from ..lmf.core.stats import record_write, row_bytes
+        batch_size = max(1, int(settings.memory_compaction_batch_size))
+        cutoff = now - timedelta(days=max(0, int(settings.memory_archive_after_days)))
+        archived = 0
+        path = None
+        db = SessionLocal()
+        try:
+            while True:
+                rows = (
+                    db.query(AHLMFEpisodic)
+                    .filter(AHLMFEpisodic.created_at < cutoff,
+                            AHLMFEpisodic.importance <= float(settings.memory_archive_max_importance))
+                    .order_by(AHLMFEpisodic.id.asc())
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                records, digests = [], []
+                for r in rows:
+                    content, metadata_, digest = _internalize_episodic(r)
+                    if digest:
+                        digests.append(digest)
+                    records.append({
+                        "id": r.id, "event_type": r.event_type, "content": content,
+                        "content_hash": r.content_hash, "source": r.source, "task_id": r.task_id,
+                        "session_id": r.session_id, "importance": r.importance, "tags": r.tags,
+                        "metadata_": metadata_, "created_at": r.created_at, "archived_at": now,
+                    })
+                path = _append_archive_file("lmf_episodic", records, now)
+                db.query(AHLMFEpisodic).filter(AHLMFEpisodic.id.in_([r.id for r in rows])).delete(synchronize_session=False)
+                if digests:
+                    _release_blobs(db, digests)
+                record_write(db, "episodic", rows=-len(rows), nbytes=-sum(row_bytes("episodic", r) for r in rows))
+                db.commit()
+                db.expunge_all()
+                archived += len(rows)
+            return {"archived": archived, "path": path}
+        finally:
+            db.close()
+
+    @staticmethod
+    def _merge(survivor: Any, dup: Any) -> None:
+        survivor.hit_count = int(survivor.hit_count or 1) + int(dup.hit_count or 1)
+        survivor.importance = max(float(survivor.importance or 0.0), float(dup.importance or 0.0))
+        seen = [t for t in (survivor.last_seen_at, survivor.created_at, dup.last_seen_at, dup.created_at) if t]
+        if seen:
+            survivor.last_seen_at = max(seen)
+        tags = json.loads(survivor.tags or "[]")
+        for tag in json.loads(dup.tags or "[]"):
+            if tag not in tags:
+                tags.append(tag)
+        survivor.tags = json.dumps(tags)
+
+
+memory_compactor = MemoryCompactor()
@@ -0,0 +1,118 @@
+"""
+ArcHillx — Memory Hot Set
+行程內常駐的 ah_memory 工作集：依 (importance, created_at, id) 排名取前 N 筆，
+由 MemoryStore 寫入路徑即時維護，召回時先在 RAM 打分，DB 只需查 watermark 以下的冷資料。
+
+不變式：排名 >= watermark 的每一筆都在 hot set 內；watermark 為 None 代表整張表都在 RAM。
+其他行程 / compaction 的變更不會推送到這裡，靠 invalidate() 與 TTL 重新載入收斂。
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable
+
+from . import tokenizer
+
+Rank = tuple[float, datetime, int]
+
+
+@dataclass
+class HotEntry:
+    """Detached snapshot of an ah_memory row; attribute names mirror AHMemory."""
+    id: int
+    content: str
+    source: str | None
+    tags: str
+    importance: float
+    metadata_: str
+    hit_count: int
+    created_at: datetime | None
+    terms: frozenset[str] = field(default_factory=frozenset)
+    tag_set: frozenset[str] = field(default_factory=frozenset)
+
+    @classmethod
+    def from_row(cls, row: Any) -> "HotEntry":
+        content = row.content or ""
+        tags = row.tags or "[]"
+        return cls(
+            id=row.id,
+            content=content,
+            source=row.source,
+            tags=tags,
+            importance=float(row.importance or 0.0),
+            metadata_=row.metadata_ or "{}",
+            hit_count=int(row.hit_count or 1),
+            created_at=row.created_at,
+            terms=frozenset(tokenizer.index_terms(content)),
+            tag_set=frozenset(json.loads(tags)),
+        )
+
+    @property
+    def rank(self) -> Rank:
+        return (self.importance, self.created_at or datetime.min, self.id)
+
+
+class MemoryHotSet:
+    def __init__(self, loader: Callable[[int], list[Any]], size: int, ttl_s: float):
+        self._loader = loader
+        self.size = max(1, int(size))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        self._entries: dict[int, HotEntry] = {}
+        self._watermark: Rank | None = None
+        self._loaded_at: float | None = None
+
+    def snapshot(self) -> tuple[list[HotEntry], Rank | None]:
+        """Current members and watermark, (re)loading first if stale."""
+        with self._lock:
+            if self._loaded_at is None or (self.ttl_s > 0 and time.monotonic() - self._loaded_at > self.ttl_s):
+                self._load()
+            return list(self._entries.values()), self._watermark
+
+    def offer(self, row: Any) -> None:
+        """Write path: admit a new / updated row if it ranks at or above the watermark."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            entry = HotEntry.from_row(row)
+            self._entries.pop(entry.id, None)
+            if self._watermark is not None and entry.rank < self._watermark:
+                return
+            self._entries[entry.id] = entry
+            if len(self._entries) > self.size:
+                coldest = min(self._entries.values(), key=lambda e: e.rank)
+                del self._entries[coldest.id]
+                self._watermark = min(e.rank for e in self._entries.values())
+
+    def discard(self, memory_id: int) -> None:
+        with self._lock:
+            self._entries.pop(memory_id, None)
+            if self._loaded_at is not None and len(self._entries) < self.size // 2 and self._watermark is not None:
+                self._loaded_at = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self.size,
+                "complete": self._loaded_at is not None and self._watermark is None,
+                "watermark": None if self._watermark is None else {
+                    "importance": self._watermark[0],
+                    "created_at": self._watermark[1].isoformat(),
+                    "id": self._watermark[2],
+                },
+            }
+
+    def _load(self) -> None:
+        rows = self._loader(self.size)
+        self._entries = {r.id: HotEntry.from_row(r) for r in rows}
+        self._watermark = min(e.rank for e in self._entries.values()) if len(rows) >= self.size else None
+        self._loaded_at = time.monotonic()
@@ -1,35 +1,66 @@
 """
 ArcHillx v1.0.0 — Lightweight Memory Store
 Keyword + importance 搜尋，不需要 vector DB 或外部依賴。
+召回走 ah_memory_terms 倒排索引（CJK n-gram + 拉丁字 stemming，見 tokenizer.py），
+索引無命中時退回 ILIKE 掃描。
+列表走 (created_at, id) keyset 分頁（不透明 cursor），全量匯出走 server-side cursor 串流。
 若 OLLAMA 可用則自動升級為向量搜尋（未來擴充點）。
 """
 from __future__ import annotations
 
+import base64
 import json
 import logging
+import math
 import re
+import time
 from collections import Counter
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Iterator
+
+from . import tokenizer
+from .hotset import MemoryHotSet
+from ..config import settings
+from ..utils.telemetry import telemetry
 
 logger = logging.getLogger("archillx.memory")
 
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime | None, memory_id: int) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, int(memory_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, memory_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), int(memory_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
 
 class MemoryStore:
     """
     輕量記憶儲存：
-    - 寫入 ah_memory 表
-    - 以關鍵字召回 + 重要度/新鮮度重排序
+    - 寫入 ah_memory 表，同步寫入 ah_memory_terms 倒排索引
+    - 以索引 term 命中數召回 + 重要度/新鮮度重排序
     - 支援 tag / source / min_importance 過濾
+    - 可選的行程內 hot set（enable_memory_hot_set），見 hotset.py
     """
 
+    def __init__(self) -> None:
+        self._hot: MemoryHotSet | None = None
+
     def add(self, content: str, source: str = "archillx",
             tags: list[str] | None = None,
             importance: float = 0.5,
             metadata: dict | None = None) -> int:
-        from ..db.schema import AHMemory, get_db
-        db = next(get_db())
-        try:
+        from ..db.schema import AHMemory
+        from ..db.session import session_scope
+        with session_scope() as db:
             m = AHMemory(
                 content=content,
                 source=source,
@@ -38,12 +69,14 @@ class MemoryStore:
                 metadata_=json.dumps(metadata or {}),
             )
             db.add(m)
+            db.flush()
+            self._index(db, m.id, m.content)
             db.commit()
             db.refresh(m)
+            if self._hot is not None:
+                self._hot.offer(m)
             logger.debug("Memory added: id=%d source=%s tags=%s", m.id, source, tags)
             return m.id
-        finally:
-            db.close()
 
     def query(self, query: str, top_k: int = 5,
               tags: list[str] | None = None,
@@ -51,90 +84,281 @@ class MemoryStore:
               source: str | None = None) -> list[dict]:
         """
         關鍵字搜尋記憶。
-        舊版為 token AND + LIKE，容易越搜越窄。
-        新版改為：
-        1. token OR 召回候選
-        2. phrase / token-hit / importance / recency 綜合打分
-        3. tag / source 後過濾
+        1. 啟用 hot set 時先在 RAM 對常駐工作集打分；若冷資料（watermark 以下）的
+           分數上界追不上第 k 名則不查 DB，否則 DB 只查 watermark 以下且重要度足夠的列
+        2. query 經 tokenizer 斷詞後查 ah_memory_terms，依 term 命中數取候選
+        3. 索引無命中（例如舊資料尚未 reindex）時退回 token OR + ILIKE
+        4. phrase / term-hit / importance / recency 綜合打分
+        5. tag / source 後過濾
         """
-        from sqlalchemy import or_
-        from ..db.schema import AHMemory, get_db
-        db = next(get_db())
-        try:
-            q = db.query(AHMemory)
-            if source:
-                q = q.filter(AHMemory.source == source)
-            if min_importance > 0:
-                q = q.filter(AHMemory.importance >= min_importance)
+        from ..db import statements
+        from ..db.session import session_scope
+        started = time.perf_counter()
+        norm_query = self._normalize_text(query)
+        tokens = self._tokenize(norm_query)
+        wanted_tags = set(tags or [])
+        scored: list[tuple[float, Any]] = []
 
-            norm_query = self._normalize_text(query)
-            tokens = self._tokenize(norm_query)
+        hot = self.hot_set()
+        watermark = None
+        kth = None
+        hot_ids: set[int] = set()
+        if hot is not None:
+            entries, watermark = hot.snapshot()
+            hot_ids = {e.id for e in entries}
+            for e in entries:
+                if source and e.source != source:
+                    continue
+                if e.importance < min_importance:
+                    continue
+                if wanted_tags and not (wanted_tags & e.tag_set):
+                    continue
+                if norm_query and not self._hot_matches(e, norm_query, tokens):
+                    continue
+                score = self._score_row(e, norm_query, tokens, wanted_tags, content_terms=e.terms)
+                if score <= 0 and norm_query:
+                    continue
+                scored.append((score, e))
+            scored.sort(key=lambda item: item[0], reverse=True)
+            telemetry.incr("memory_hot_set_candidates_total", len(scored))
+
+            kth = scored[top_k - 1][0] if len(scored) >= top_k else None
+            cold_ceiling = None if watermark is None else self._score_ceiling(norm_query, tokens, wanted_tags, watermark[0])
+            if watermark is None or (kth is not None and cold_ceiling <= kth):
+                telemetry.incr("memory_recall_total")
+                telemetry.incr("memory_recall_db_skipped_total")
+                telemetry.timing("memory_recall", time.perf_counter() - started)
+                return [self._to_dict(r, score=round(score, 4)) for score, r in scored[:top_k]]
+
+        try:
+            with session_scope() as db:
+                params: dict[str, Any] = {"limit": max(top_k * 8, 20)}
+                flags = {"source": bool(source), "min_importance": min_importance > 0,
+                         "watermark": watermark is not None, "floor": False}
+                if source:
+                    params["source"] = source
+                if min_importance > 0:
+                    params["min_importance"] = min_importance
+                if watermark is not None:
+                    params["w_imp"], params["w_created"], params["w_id"] = watermark
+                    if kth is not None:
+                        # cold score <= ceiling(importance=0) + 2 * importance
+                        floor = (kth - self._score_ceiling(norm_query, tokens, wanted_tags, 0.0)) / 2.0
+                        if floor > 0:
+                            flags["floor"], params["floor"] = True, floor
 
-            if norm_query:
+                rows: list[Any] = []
                 if tokens:
-                    clauses = [AHMemory.content.ilike(f"%{tok}%") for tok in tokens[:8]]
-                    q = q.filter(or_(*clauses))
-                else:
-                    q = q.filter(AHMemory.content.ilike(f"%{norm_query}%"))
+                    stmt = statements.memory_candidates(terms=True, **flags)
+                    rows = statements.all_(db, stmt, tokens=tokens, **params)
 
-            candidate_limit = max(top_k * 8, 20)
-            rows = q.order_by(AHMemory.importance.desc(), AHMemory.created_at.desc()).limit(candidate_limit).all()
+                if not rows:
+                    if tokens:
+                        telemetry.incr("memory_recall_index_fallback_total")
+                    patterns = []
+                    if norm_query:
+                        patterns = [f"%{tok}%" for tok in tokens[:8]] if tokens else [f"%{norm_query}%"]
+                    params.update({f"p{i}": pat for i, pat in enumerate(patterns)})
+                    rows = statements.all_(db, statements.memory_candidates(like=len(patterns), **flags), **params)
 
-            wanted_tags = set(tags or [])
-            scored: list[tuple[float, Any]] = []
-            for r in rows:
-                row_tags = set(json.loads(r.tags or "[]"))
-                if wanted_tags and not (wanted_tags & row_tags):
-                    continue
-                score = self._score_row(r, norm_query, tokens, wanted_tags)
-                if score <= 0 and norm_query:
-                    continue
-                scored.append((score, r))
+                telemetry.incr("memory_recall_total")
+                telemetry.incr("memory_recall_candidates_total", len(rows))
 
-            scored.sort(key=lambda item: item[0], reverse=True)
-            return [self._to_dict(r, score=round(score, 4)) for score, r in scored[:top_k]]
+                for r in rows:
+                    if r.id in hot_ids:
+                        continue
+                    row_tags = set(json.loads(r.tags or "[]"))
+                    if wanted_tags and not (wanted_tags & row_tags):
+                        continue
+                    score = self._score_row(r, norm_query, tokens, wanted_tags)
+                    if score <= 0 and norm_query:
+                        continue
+                    scored.append((score, r))
+
+                scored.sort(key=lambda item: item[0], reverse=True)
+                return [self._to_dict(r, score=round(score, 4)) for score, r in scored[:top_k]]
         finally:
-            db.close()
+            telemetry.timing("memory_recall", time.perf_counter() - started)
 
     def get_recent(self, limit: int = 10, source: str | None = None) -> list[dict]:
-        from ..db.schema import AHMemory, get_db
-        db = next(get_db())
-        try:
+        return self.list_page(limit=limit, source=source)["items"]
+
+    def list_page(self, limit: int = 50, cursor: str | None = None,
+                  source: str | None = None) -> dict:
+        """
+        由新到舊的 keyset 分頁，排序鍵 (created_at, id)。
+        cursor 為上一頁最後一筆的不透明編碼；深分頁走索引 seek，不做 OFFSET 重掃。
+        created_at 為 NULL 的列排在最後（SQLite / MySQL / MSSQL 的 DESC 都把 NULL 放尾端），
+        其 cursor 只帶 id，之後的頁只在 NULL 區段內以 id 遞減。
+        cursor 格式錯誤時 raise ValueError。
+        """
+        from sqlalchemy import and_, or_
+        from ..db.schema import AHMemory
+        from ..db.session import session_scope
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        with session_scope() as db:
             q = db.query(AHMemory)
             if source:
                 q = q.filter(AHMemory.source == source)
-            rows = q.order_by(AHMemory.created_at.desc()).limit(limit).all()
-            return [self._to_dict(r) for r in rows]
-        finally:
-            db.close()
+            if after:
+                created_at, last_id = after
+                if created_at is None:
+                    q = q.filter(AHMemory.created_at.is_(None), AHMemory.id < last_id)
+                else:
+                    q = q.filter(or_(AHMemory.created_at < created_at,
+                                     and_(AHMemory.created_at == created_at, AHMemory.id < last_id),
+                                     AHMemory.created_at.is_(None)))
+            rows = q.order_by(AHMemory.created_at.desc(), AHMemory.id.desc()).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = None
+            if has_more and rows:
+                next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+            return {"items": [self._to_dict(r) for r in rows], "next_cursor": next_cursor}
+
+    def iter_export(self, source: str | None = None, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        依 id 順序串流整個 ah_memory。
+        使用 stream_results（MySQL/MSSQL 為 server-side cursor），記憶體用量與表大小無關。
+        """
+        from sqlalchemy import select
+        from ..db.schema import AHMemory
+        from ..db.session import session_scope
+        with session_scope(shared=False) as db:
+            stmt = select(AHMemory).order_by(AHMemory.id.asc())
+            if source:
+                stmt = stmt.where(AHMemory.source == source)
+            stmt = stmt.execution_options(stream_results=True, yield_per=batch_size)
+            for r in db.execute(stmt).scalars():
+                yield self._to_dict(r)
 
     def delete(self, memory_id: int) -> bool:
-        from ..db.schema import AHMemory, get_db
-        db = next(get_db())
-        try:
+        from ..db.schema import AHMemory, AHMemoryTerm
+        from ..db.session import session_scope
+        with session_scope() as db:
             m = db.query(AHMemory).filter_by(id=memory_id).first()
             if m:
+                db.query(AHMemoryTerm).filter(AHMemoryTerm.memory_id == memory_id).delete(synchronize_session=False)
                 db.delete(m)
                 db.commit()
+                if self._hot is not None:
+                    self._hot.discard(memory_id)
                 return True
             return False
-        finally:
-            db.close()
+
+    def hot_set(self) -> MemoryHotSet | None:
+        if not settings.enable_memory_hot_set:
+            return None
+        if self._hot is None:
+            self._hot = MemoryHotSet(self._load_hot, settings.memory_hot_set_size,
+                                     settings.memory_hot_set_ttl_s)
+        return self._hot
+
+    def invalidate_hot_set(self) -> None:
+        """Force a reload on next recall (after out-of-band updates such as compaction)."""
+        if self._hot is not None:
+            self._hot.invalidate()
+
+    def _load_hot(self, size: int) -> list[Any]:
+        from ..db.schema import AHMemory
+        from ..db.session import session_scope
+        with session_scope() as db:
+            return (
+                db.query(AHMemory)
+                .order_by(AHMemory.importance.desc(), AHMemory.created_at.desc(), AHMemory.id.desc())
+                .limit(size)
+                .all()
+            )
+
+    def reindex(self, batch_size: int = 500, only_missing: bool = False) -> int:
+        """
+        重建 ah_memory_terms，回傳處理筆數。每批在同一個交易內刪除並重寫該批
+        memory_id 區間的 term（連同已刪除列留下的孤兒），重建期間其餘列照常可召回。
+        only_missing=True 只補尚無 term 的列（升級後回填舊資料用）。
+        """
+        from sqlalchemy import exists
+        from ..db.schema import AHMemory, AHMemoryTerm
+        from ..db.session import session_scope
+        total = 0
+        last_id = 0
+        with session_scope(shared=False) as db:
+            while True:
+                q = db.query(AHMemory.id, AHMemory.content).filter(AHMemory.id > last_id)
+                if only_missing:
+                    q = q.filter(~exists().where(AHMemoryTerm.memory_id == AHMemory.id))
+                rows = q.order_by(AHMemory.id.asc()).limit(batch_size).all()
+                if not rows:
+                    break
+                if only_missing:
+                    stale = AHMemoryTerm.memory_id.in_([memory_id for memory_id, _ in rows])
+                else:
+                    stale = (AHMemoryTerm.memory_id > last_id) & (AHMemoryTerm.memory_id <= rows[-1][0])
+                db.query(AHMemoryTerm).filter(stale).delete(synchronize_session=False)
+                for memory_id, content in rows:
+                    self._index(db, memory_id, content)
+                db.commit()
+                total += len(rows)
+                last_id = rows[-1][0]
+            if not only_missing:
+                db.query(AHMemoryTerm).filter(AHMemoryTerm.memory_id > last_id).delete(synchronize_session=False)
+                db.commit()
+        logger.info("memory term index rebuilt: %d rows (only_missing=%s)", total, only_missing)
+        return total
+
+    def index_missing(self, db: Any, lo: int, hi: int) -> int:
+        """
+        在呼叫端的交易內為 id ∈ (lo, hi] 且尚無 term 的列建立索引，回傳有寫入 term 的筆數
+        （online backfill「memory_terms」的單批工作；內容斷不出 term 的列不計）。
+        """
+        from sqlalchemy import exists
+        from ..db.schema import AHMemory, AHMemoryTerm
+        rows = (db.query(AHMemory.id, AHMemory.content)
+                .filter(AHMemory.id > lo, AHMemory.id <= hi,
+                        ~exists().where(AHMemoryTerm.memory_id == AHMemory.id))
+                .order_by(AHMemory.id.asc())
+                .all())
+        written = 0
+        for memory_id, content in rows:
+            if self._index(db, memory_id, content):
+                written += 1
+        return written
+
+    def _index(self, db: Any, memory_id: int, content: str) -> int:
+        from ..db.schema import AHMemoryTerm
+        terms = tokenizer.index_terms(content, limit=None)
+        if len(terms) > tokenizer.MAX_INDEX_TERMS:
+            telemetry.incr("memory_index_terms_dropped_total", len(terms) - tokenizer.MAX_INDEX_TERMS)
+            logger.debug("memory %s: %d index terms past the cap dropped", memory_id,
+                         len(terms) - tokenizer.MAX_INDEX_TERMS)
+            terms = terms[:tokenizer.MAX_INDEX_TERMS]
+        if terms:
+            db.bulk_insert_mappings(AHMemoryTerm, [{"memory_id": memory_id, "term": t} for t in terms])
+        return len(terms)
 
     def _tokenize(self, text: str) -> list[str]:
-        if not text:
-            return []
-        if " " in text:
-            return [t for t in text.split() if len(t) > 1][:8]
-        chunks = re.findall(r"[一-鿿]{2,4}|[a-z0-9_\-]{2,}", text.lower())
-        if chunks:
-            return chunks[:8]
-        return [text] if len(text) > 1 else []
+        return tokenizer.query_terms(text)
 
     def _normalize_text(self, text: str) -> str:
         return re.sub(r"\s+", " ", (text or "").strip().lower())
 
-    def _score_row(self, row: Any, norm_query: str, tokens: list[str], wanted_tags: set[str]) -> float:
+    def _hot_matches(self, entry: Any, norm_query: str, tokens: list[str]) -> bool:
+        """Same admission rule as the DB path: a term-index hit or a substring match."""
+        content = self._normalize_text(entry.content)
+        if norm_query in content:
+            return True
+        return any(tok in entry.terms or tok in content for tok in tokens)
+
+    def _score_ceiling(self, norm_query: str, tokens: list[str], wanted_tags: set[str],
+                       importance: float) -> float:
+        """Upper bound of _score_row for any row whose importance is <= `importance`."""
+        if not norm_query:
+            return importance
+        return (4.0 + len(set(tokens)) * 1.8 + len(wanted_tags) * 0.6
+                + importance * 2.0 + 0.6 + 0.6)
+
+    def _score_row(self, row: Any, norm_query: str, tokens: list[str], wanted_tags: set[str],
+                   content_terms: Any = None) -> float:
         content = self._normalize_text(row.content or "")
         if not norm_query:
             return float(row.importance or 0)
@@ -143,7 +367,9 @@ class MemoryStore:
         if norm_query and norm_query in content:
             score += 4.0
 
-        hit_counts = Counter(tok for tok in tokens if tok in content)
+        if content_terms is None:
+            content_terms = set(tokenizer.index_terms(content))
+        hit_counts = Counter(tok for tok in tokens if tok in content_terms or tok in content)
         score += sum(1.2 for _ in hit_counts)
         score += sum(min(content.count(tok), 3) * 0.2 for tok in hit_counts)
 
@@ -154,6 +380,7 @@ class MemoryStore:
 
         importance = max(0.0, min(1.0, float(row.importance or 0.0)))
         score += importance * 2.0
+        score += min(math.log2(max(int(row.hit_count or 1), 1)), 3.0) * 0.2
 
         created_at = row.created_at
         if created_at:
@@ -175,6 +402,7 @@ class MemoryStore:
             "tags": json.loads(r.tags or "[]"),
             "importance": r.importance,
             "metadata": json.loads(r.metadata_ or "{}"),
+            "hit_count": r.hit_count or 1,
             "created_at": r.created_at.isoformat() if r.created_at else None,
         }
         if score is not None:
@@ -0,0 +1,90 @@
+"""
+ArcHillx — Memory Tokenizer
+中英混合文字的斷詞管線，供 ah_memory_terms 倒排索引與召回打分共用。
+
+- CJK 連續字串：字元 bigram（索引額外加 trigram），不再把整句當成一個 token
+- 拉丁字母：小寫、停用詞過濾、輕量字尾 stemming
+- 索引與查詢走同一套規則，確保 term 一致
+"""
+from __future__ import annotations
+
+import re
+
+# CJK Unified Ideographs (+Ext A / Compatibility), Hiragana/Katakana, Hangul
+_CJK_RANGES = "㐀-䶿一-鿿豈-﫿぀-ヿ가-힯"
+_SEGMENT_RE = re.compile(rf"[{_CJK_RANGES}]+|[a-z0-9][a-z0-9_\-]*")
+
+MAX_TERM_LEN = 64
+MAX_INDEX_TERMS = 1024           # per memory row; MemoryStore counts what a longer row drops
+MAX_QUERY_TERMS = 16
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have he her his
+i if in into is it its me my no not of on or our she so than that the their them
+then there these they this those to was we were what when where which who will
+with you your
+""".split())
+
+
+def _is_cjk(segment: str) -> bool:
+    return bool(segment) and not segment[0].isascii()
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping (Porter step-1 subset); deterministic, not linguistic."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("ss"):
+        return word
+    for suffix in ("ingly", "edly", "ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            base = word[: -len(suffix)]
+            if len(base) >= 4 and base[-1] == base[-2] and base[-1] not in "lsz":
+                base = base[:-1]
+            return base
+    if word.endswith("s") and not word.endswith("us"):
+        return word[:-1]
+    return word
+
+
+def _cjk_ngrams(run: str, sizes: tuple[int, ...]) -> list[str]:
+    if len(run) == 1:
+        return [run]
+    grams: list[str] = []
+    for n in sizes:
+        if len(run) < n:
+            continue
+        grams.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return grams
+
+
+def _terms(text: str, cjk_sizes: tuple[int, ...]) -> list[str]:
+    out: list[str] = []
+    for segment in _SEGMENT_RE.findall((text or "").lower()):
+        if _is_cjk(segment):
+            out.extend(_cjk_ngrams(segment, cjk_sizes))
+            continue
+        if len(segment) < 2 or segment in STOPWORDS:
+            continue
+        out.append(stem(segment)[:MAX_TERM_LEN])
+    return out
+
+
+def query_terms(text: str) -> list[str]:
+    """Terms used to probe the index: Latin stems + CJK bigrams, order-preserving, deduped."""
+    seen: dict[str, None] = {}
+    for term in _terms(text, (2,)):
+        seen.setdefault(term, None)
+    return list(seen)[:MAX_QUERY_TERMS]
+
+
+def index_terms(text: str, limit: int | None = MAX_INDEX_TERMS) -> list[str]:
+    """Terms written to ah_memory_terms: Latin stems + CJK bigrams and trigrams (limit=None: all)."""
+    seen: dict[str, None] = {}
+    for term in _terms(text, (2, 3)):
+        seen.setdefault(term, None)
+    return list(seen)[:limit]
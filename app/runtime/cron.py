@@ -85,24 +85,25 @@ class CronSystem:
         self._set_enabled(name, False)
 
     def trigger_now(self, name: str) -> dict:
-        from ..db.schema import AHCronJob, get_db
-        db = next(get_db())
-        j = db.query(AHCronJob).filter_by(name=name).first()
-        if not j:
-            raise KeyError(f"Cron job '{name}' not found.")
-        return self._execute(j.skill_name,
-                             json.loads(j.input_data or "{}"),
-                             j.governor_required)
+        from ..db.schema import AHCronJob
+        from ..db.session import session_scope
+        with session_scope() as db:
+            j = db.query(AHCronJob).filter_by(name=name).first()
+            if not j:
+                raise KeyError(f"Cron job '{name}' not found.")
+            skill_name, input_data, governor_required = j.skill_name, j.input_data, j.governor_required
+        return self._execute(skill_name, json.loads(input_data or "{}"), governor_required)
 
     def list_jobs(self) -> list[dict]:
         try:
-            from ..db.schema import AHCronJob, get_db
-            db = next(get_db())
-            return [{"id": j.id, "name": j.name, "skill_name": j.skill_name,
-                     "cron_expr": j.cron_expr, "interval_s": j.interval_s,
-                     "enabled": j.enabled, "run_count": j.run_count,
-                     "last_run": j.last_run.isoformat() if j.last_run else None}
-                    for j in db.query(AHCronJob).all()]
+            from ..db.schema import AHCronJob
+            from ..db.session import session_scope
+            with session_scope() as db:
+                return [{"id": j.id, "name": j.name, "skill_name": j.skill_name,
+                         "cron_expr": j.cron_expr, "interval_s": j.interval_s,
+                         "enabled": j.enabled, "run_count": j.run_count,
+                         "last_run": j.last_run.isoformat() if j.last_run else None}
+                        for j in db.query(AHCronJob).all()]
         except Exception as e:
             logger.warning("cron list_jobs failed: %s", e)
             return []
@@ -130,6 +131,12 @@ class CronSystem:
 
     def _execute(self, skill_name: str, input_data: dict,
                  governor_required: bool, job_name: str | None = None) -> dict:
+        from ..db.profiler import query_profiler
+        with query_profiler.track(f"cron:{job_name or skill_name}"):
+            return self._run_job(skill_name, input_data, governor_required, job_name)
+
+    def _run_job(self, skill_name: str, input_data: dict,
+                 governor_required: bool, job_name: str | None = None) -> dict:
         structured_log(logger, logging.INFO, "cron_execute_start", skill_name=skill_name, job_name=job_name or skill_name)
         metric_job = str(job_name or skill_name).replace("-", "_")
         telemetry.incr("cron_execute_total")
@@ -165,76 +172,75 @@ class CronSystem:
 
     def _restore(self) -> None:
         try:
-            from ..db.schema import AHCronJob, get_db
+            from ..db.schema import AHCronJob
+            from ..db.session import session_scope
             from apscheduler.triggers.cron import CronTrigger
             from apscheduler.triggers.interval import IntervalTrigger
-            db = next(get_db())
-            for j in db.query(AHCronJob).filter_by(enabled=True).all():
-                try:
-                    if j.cron_expr:
-                        p = j.cron_expr.split()
-                        trig = CronTrigger(minute=p[0], hour=p[1], day=p[2],
-                                           month=p[3], day_of_week=p[4], timezone=_tz())
-                    elif j.interval_s:
-                        trig = IntervalTrigger(seconds=j.interval_s)
-                    else:
-                        continue
-                    self._scheduler.add_job(
-                        func=self._execute, trigger=trig, id=j.name, name=j.name,
-                        kwargs={"skill_name": j.skill_name,
-                                "input_data": json.loads(j.input_data or "{}"),
-                                "governor_required": j.governor_required,
-                                "job_name": j.name},
-                        replace_existing=True, misfire_grace_time=60,
-                    )
-                    logger.info("cron restored: %s", j.name)
-                except Exception as e:
-                    logger.warning("cron restore %s failed: %s", j.name, e)
+            with session_scope() as db:
+                for j in db.query(AHCronJob).filter_by(enabled=True).all():
+                    try:
+                        if j.cron_expr:
+                            p = j.cron_expr.split()
+                            trig = CronTrigger(minute=p[0], hour=p[1], day=p[2],
+                                               month=p[3], day_of_week=p[4], timezone=_tz())
+                        elif j.interval_s:
+                            trig = IntervalTrigger(seconds=j.interval_s)
+                        else:
+                            continue
+                        self._scheduler.add_job(
+                            func=self._execute, trigger=trig, id=j.name, name=j.name,
+                            kwargs={"skill_name": j.skill_name,
+                                    "input_data": json.loads(j.input_data or "{}"),
+                                    "governor_required": j.governor_required,
+                                    "job_name": j.name},
+                            replace_existing=True, misfire_grace_time=60,
+                        )
+                        logger.info("cron restored: %s", j.name)
+                    except Exception as e:
+                        logger.warning("cron restore %s failed: %s", j.name, e)
         except Exception as e:
             logger.warning("cron restore all failed: %s", e)
 
     def _persist(self, name, skill_name, cron_expr, interval_s,
                  input_data, governor_required) -> None:
         try:
-            from ..db.schema import AHCronJob, get_db
-            db = next(get_db())
-            j = db.query(AHCronJob).filter_by(name=name).first()
-            if j:
-                j.skill_name = skill_name
-                j.cron_expr = cron_expr
-                j.interval_s = interval_s
-                j.input_data = json.dumps(input_data or {})
-                j.governor_required = governor_required
-                j.enabled = True
-            else:
-                db.add(AHCronJob(name=name, skill_name=skill_name,
-                                 cron_expr=cron_expr, interval_s=interval_s,
-                                 input_data=json.dumps(input_data or {}),
-                                 governor_required=governor_required))
-            db.commit()
+            from ..db.schema import AHCronJob
+            from ..db.session import session_scope
+            with session_scope() as db:
+                j = db.query(AHCronJob).filter_by(name=name).first()
+                if j:
+                    j.skill_name = skill_name
+                    j.cron_expr = cron_expr
+                    j.interval_s = interval_s
+                    j.input_data = json.dumps(input_data or {})
+                    j.governor_required = governor_required
+                    j.enabled = True
+                else:
+                    db.add(AHCronJob(name=name, skill_name=skill_name,
+                                     cron_expr=cron_expr, interval_s=interval_s,
+                                     input_data=json.dumps(input_data or {}),
+                                     governor_required=governor_required))
+                db.commit()
         except Exception as e:
             logger.debug("cron persist failed: %s", e)
 
     def _set_enabled(self, name: str, enabled: bool) -> None:
         try:
-            from ..db.schema import AHCronJob, get_db
-            db = next(get_db())
-            j = db.query(AHCronJob).filter_by(name=name).first()
-            if j:
-                j.enabled = enabled
-                db.commit()
+            from ..db.schema import AHCronJob
+            from ..db.session import session_scope
+            with session_scope() as db:
+                j = db.query(AHCronJob).filter_by(name=name).first()
+                if j:
+                    j.enabled = enabled
+                    db.commit()
         except Exception as e:
             logger.debug("cron run_count update failed for %s: %s", job_name, e)
 
     def _bump_run_count(self, job_name: str) -> None:
         try:
-            from ..db.schema import AHCronJob, get_db
-            db = next(get_db())
-            j = db.query(AHCronJob).filter_by(name=job_name).first()
-            if j:
-                j.run_count += 1
-                j.last_run = datetime.utcnow()
-                db.commit()
+            from ..db.counters import counter_coalescer
+            counter_coalescer.incr("ah_cron_jobs", job_name, "run_count", key_column="name",
+                                   touch={"last_run": datetime.utcnow()})
         except Exception as e:
             logger.debug("cron run_count update failed for %s: %s", job_name, e)
 
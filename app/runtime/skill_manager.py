@@ -97,19 +97,21 @@ class SkillManager:
 
     def _upsert_db(self, name: str, manifest: dict) -> None:
         try:
-            from ..db.schema import AHSkill, get_db
-            db = next(get_db())
-            rec = db.query(AHSkill).filter_by(name=name).first()
-            if rec:
-                rec.manifest = json.dumps(manifest)
-                rec.enabled = manifest.get("enabled", True)
-            else:
-                db.add(AHSkill(name=name,
-                               version=manifest.get("version", "1.0"),
-                               description=manifest.get("description", ""),
-                               enabled=manifest.get("enabled", True),
-                               manifest=json.dumps(manifest)))
-            db.commit()
+            from ..db import statements
+            from ..db.schema import AHSkill
+            from ..db.session import session_scope
+            with session_scope() as db:
+                rec = statements.one(db, statements.skill_by_name(), name=name)
+                if rec:
+                    rec.manifest = json.dumps(manifest)
+                    rec.enabled = manifest.get("enabled", True)
+                else:
+                    db.add(AHSkill(name=name,
+                                   version=manifest.get("version", "1.0"),
+                                   description=manifest.get("description", ""),
+                                   enabled=manifest.get("enabled", True),
+                                   manifest=json.dumps(manifest)))
+                db.commit()
         except Exception as e:
             logger.debug("skill db upsert failed: %s", e)
 
@@ -126,13 +128,14 @@ class SkillManager:
 
     def _assert_enabled(self, name: str) -> None:
         try:
-            from ..db.schema import AHSkill, get_db
-            db = next(get_db())
-            rec = db.query(AHSkill).filter_by(name=name).first()
-            if rec and not rec.enabled:
-                telemetry.incr("skill_disabled_total")
-                telemetry.incr(f"skill_{name}_disabled_total")
-                raise SkillDisabled(f"Skill '{name}' is disabled.")
+            from ..db import statements
+            from ..db.session import session_scope
+            with session_scope() as db:
+                enabled = statements.one(db, statements.skill_enabled(), name=name)
+                if enabled is not None and not enabled:
+                    telemetry.incr("skill_disabled_total")
+                    telemetry.incr(f"skill_{name}_disabled_total")
+                    raise SkillDisabled(f"Skill '{name}' is disabled.")
         except SkillDisabled:
             raise
         except Exception as e:
@@ -205,14 +208,10 @@ class SkillManager:
 
     def _inc(self, name: str, ok: bool) -> None:
         try:
-            from ..db.schema import AHSkill, get_db
-            db = next(get_db())
-            r = db.query(AHSkill).filter_by(name=name).first()
-            if r:
-                r.invoke_count += 1
-                if not ok:
-                    r.error_count += 1
-                db.commit()
+            from ..db.counters import counter_coalescer
+            counter_coalescer.incr("ah_skills", name, "invoke_count", key_column="name")
+            if not ok:
+                counter_coalescer.incr("ah_skills", name, "error_count", key_column="name")
         except Exception as e:
             logger.debug("skill counter update failed for %s: %s", name, e)
 
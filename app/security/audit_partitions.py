@@ -0,0 +1,444 @@
+"""
+ArcHillx — Audit log partitions
+===============================
+ah_audit_log is the hot partition: it only holds the current month plus the
+AUDIT_HOT_MONTHS - 1 before it.  A background roll moves every older month out
+into a compressed segment file and deletes it from the table, so the table —
+and every query on it — stays bounded however long the process has been running.
+
+  evidence/audit_archive/
+    ah_audit_log_YYYYMM.jsonl.gz      one segment per roll of a month, newest row first
+    manifest.json                     segments with row / id / time / risk-score ranges,
+                                      sha256, and per (decision, action, risk bucket) and
+                                      (decision, action, risk score) count and newest row
+
+On MySQL the migration turns ah_audit_log into RANGE COLUMNS(created_at)
+partitions; the roll keeps next month's partition created ahead of time and
+drops a month's partition once it is archived instead of deleting its rows.
+SQLite / MSSQL keep one table and delete in batches.
+
+Segments older than AUDIT_ARCHIVE_RETENTION_MONTHS are removed (0 = keep all).
+The audit queries in audit_store read segments only when the requested time
+range reaches past the hot window; summaries and counts use the manifest
+counts for whole months (the per-score counts when a risk-score filter is
+set) and scan a segment only for partial-month ranges.  Listings skip
+segments whose risk-score range or counts rule out every row.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from ..config import settings
+from ..utils.background import IntervalJob
+from ..utils.telemetry import telemetry
+
+logger = logging.getLogger("archillx.audit")
+
+TABLE = "ah_audit_log"
+MANIFEST = "manifest.json"
+RISK_BUCKETS = ("low", "medium", "high", "critical")
+
+
+def risk_bucket(score: int) -> str:
+    if score >= 90:
+        return "critical"
+    if score >= 70:
+        return "high"
+    if score >= 40:
+        return "medium"
+    return "low"
+
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, n: int) -> datetime:
+    idx = dt.year * 12 + (dt.month - 1) + n
+    return datetime(idx // 12, idx % 12 + 1, 1)
+
+
+def hot_boundary(now: datetime | None = None) -> datetime:
+    """Rows created before this instant belong to archived months."""
+    months = max(1, int(settings.audit_hot_months))
+    return add_months(month_start(now or datetime.utcnow()), -(months - 1))
+
+
+def archive_dir() -> Path:
+    p = Path(settings.evidence_dir).resolve() / "audit_archive"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    from ..lmf.core.file_utils import atomic_write_bytes
+    atomic_write_bytes(str(path), data)
+
+
+# ── Manifest ──────────────────────────────────────────────────────────────────
+
+_manifest_lock = threading.Lock()
+_manifest_cache: tuple[str, float, dict] | None = None
+
+
+def load_manifest() -> dict[str, Any]:
+    """The segment manifest (empty when nothing has been archived); cached by mtime."""
+    global _manifest_cache
+    path = Path(settings.evidence_dir).resolve() / "audit_archive" / MANIFEST
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {"segments": []}
+    cached = _manifest_cache
+    if cached is not None and cached[0] == str(path) and cached[1] == mtime:
+        return cached[2]
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.error("audit manifest unreadable (%s): %s", path, e)
+        return {"segments": []}
+    _manifest_cache = (str(path), mtime, data)
+    return data
+
+
+def _save_manifest(data: dict[str, Any]) -> None:
+    global _manifest_cache
+    data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    _atomic_write(archive_dir() / MANIFEST, json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+    _manifest_cache = None
+
+
+def segments(created_after: datetime | None = None, created_before: datetime | None = None) -> list[dict[str, Any]]:
+    """Archived segments whose month overlaps [created_after, created_before], newest month first."""
+    out = []
+    for seg in load_manifest().get("segments", []):
+        start = datetime.fromisoformat(seg["month_start"])
+        end = add_months(start, 1)
+        if created_after is not None and end <= created_after:
+            continue
+        if created_before is not None and start > created_before:
+            continue
+        out.append(seg)
+    return sorted(out, key=lambda s: (s["month_start"], s["max_id"]), reverse=True)
+
+
+def count_score(agg: dict[tuple[str, str, int], tuple[int, str | None]], rec: dict[str, Any]) -> None:
+    """Add one row (rows arrive newest first) to a per (decision, action, risk score) tally."""
+    created = rec.get("created_at")
+    if isinstance(created, datetime):
+        created = created.isoformat()
+    key = (str(rec.get("decision") or "UNKNOWN"), str(rec.get("action") or "unknown"),
+           int(rec.get("risk_score") or 0))
+    n, newest = agg.get(key, (0, created))
+    agg[key] = (n + 1, newest)
+
+
+def score_stats(agg: dict[tuple[str, str, int], tuple[int, str | None]]) -> dict[str, Any]:
+    """Manifest risk_min / risk_max / scores ([decision, action, score, count, newest]) from a tally."""
+    found = [score for _d, _a, score in agg]
+    return {
+        "risk_min": min(found, default=None),
+        "risk_max": max(found, default=None),
+        "scores": [[d, a, score, n, newest] for (d, a, score), (n, newest) in sorted(agg.items())],
+    }
+
+
+def backfill_score_stats() -> int:
+    """Add score_stats to segments archived before the manifest carried them; returns how many."""
+    with _manifest_lock:
+        pending = [s["file"] for s in load_manifest().get("segments", []) if "scores" not in s]
+    done = 0
+    for name in pending:
+        with _manifest_lock:
+            manifest = load_manifest()
+            seg = next((s for s in manifest.get("segments", []) if s["file"] == name), None)
+            if seg is None or "scores" in seg:
+                continue
+            agg: dict[tuple[str, str, int], tuple[int, str | None]] = {}
+            try:
+                for row in iter_segment(seg):
+                    count_score(agg, row)
+            except OSError as e:
+                logger.warning("audit segment %s unreadable: %s", name, e)
+                continue
+            seg.update(score_stats(agg))
+            _save_manifest(manifest)
+            done += 1
+    return done
+
+
+def iter_segment(seg: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Rows of one segment, newest first, with created_at parsed back to datetime."""
+    path = archive_dir() / seg["file"]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("created_at"):
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+            yield row
+
+
+# ── Roll ──────────────────────────────────────────────────────────────────────
+
+class AuditPartitioner(IntervalJob):
+    job_id = "audit_partitions"
+    label = "audit partition roll"
+
+    def enabled(self) -> bool:
+        return bool(settings.enable_audit_partitioning)
+
+    def interval_s(self) -> float:
+        return int(settings.audit_partition_interval_s)
+
+    def policy(self) -> dict:
+        return {
+            "interval_s": int(settings.audit_partition_interval_s),
+            "hot_months": max(1, int(settings.audit_hot_months)),
+            "retention_months": int(settings.audit_archive_retention_months),
+            "batch_size": int(settings.audit_partition_batch_size),
+        }
+
+    def status(self) -> dict:
+        segs = segments()
+        return {
+            "enabled": bool(settings.enable_audit_partitioning),
+            "started": self._started,
+            "running": self._lock.locked(),
+            "policy": self.policy(),
+            "hot_boundary": hot_boundary().isoformat(),
+            "archived_rows": sum(int(s["rows"]) for s in segs),
+            "archived_bytes": sum(int(s["bytes"]) for s in segs),
+            "segments": segs,
+            "next_run": self.next_run(),
+            "last_run": self._last_run,
+        }
+
+    # ── Run ───────────────────────────────────────────────────────────────────
+
+    def run_once(self, now: datetime | None = None) -> dict:
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already_running"}
+        try:
+            started = time.monotonic()
+            now = now or datetime.utcnow()
+            result: dict[str, Any] = {"at": now.isoformat(), "boundary": hot_boundary(now).isoformat()}
+            try:
+                result["mysql_partitions"] = self.ensure_partitions(now)
+                result["backfilled"] = backfill_score_stats()
+                result["archived"] = self.roll(now)
+                result["expired"] = self.apply_retention(now)
+            except Exception as e:
+                logger.exception("audit partition roll failed")
+                result["error"] = str(e)
+            result["elapsed_s"] = round(time.monotonic() - started, 3)
+            self._last_run = result
+            return result
+        finally:
+            self._lock.release()
+
+    def roll(self, now: datetime) -> list[dict[str, Any]]:
+        """Archive every month before the hot boundary that still has rows in the table."""
+        from sqlalchemy import func
+        from ..db.schema import AHAuditLog
+        from ..db.session import session_scope
+        boundary = hot_boundary(now)
+        out = []
+        while True:
+            with session_scope() as db:
+                oldest = (db.query(func.min(AHAuditLog.created_at))
+                          .filter(AHAuditLog.created_at < boundary).scalar())
+            if oldest is None:
+                return out
+            done = self._archive_month(month_start(oldest))
+            out.append(done)
+            if not done["rows"] and not done.get("cleared"):
+                return out
+
+    def _archive_month(self, start: datetime) -> dict[str, Any]:
+        from ..db.schema import AHAuditLog
+        from ..db.session import session_scope
+        end = add_months(start, 1)
+        batch = max(1, int(settings.audit_partition_batch_size))
+        with _manifest_lock:
+            manifest = load_manifest()
+            done = [s for s in manifest.get("segments", []) if s["month_start"] == start.isoformat()]
+        # a roll interrupted after its manifest write left rows behind that are already archived
+        archived_upto = max((int(s["max_id"]) for s in done), default=0)
+        cleared = self._delete_rows(start, end, archived_upto) if archived_upto else 0
+
+        name = f"{TABLE}_{start:%Y%m}" + (f".{len(done)}" if done else "") + ".jsonl.gz"
+        path = archive_dir() / name
+        tmp = path.with_name(f".{name}.tmp")
+        agg: dict[tuple[str, str, str], tuple[int, str | None]] = {}
+        by_score: dict[tuple[str, str, int], tuple[int, str | None]] = {}
+        rows = 0
+        min_id = max_id = None
+        latest = None
+        last_id = None
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            while True:
+                with session_scope() as db:
+                    q = (db.query(AHAuditLog)
+                         .filter(AHAuditLog.created_at >= start, AHAuditLog.created_at < end,
+                                 AHAuditLog.id > archived_upto))
+                    if last_id is not None:
+                        q = q.filter(AHAuditLog.id < last_id)
+                    chunk = q.order_by(AHAuditLog.id.desc()).limit(batch).all()
+                    records = [{
+                        "id": r.id, "action": r.action, "decision": r.decision,
+                        "risk_score": int(r.risk_score or 0), "reason": r.reason, "context": r.context,
+                        "created_at": r.created_at.isoformat() if r.created_at else None,
+                    } for r in chunk]
+                if not records:
+                    break
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=False, sort_keys=True) + "\n")
+                    key = (str(rec["decision"] or "UNKNOWN"), str(rec["action"] or "unknown"),
+                           risk_bucket(rec["risk_score"]))
+                    n, newest = agg.get(key, (0, rec["created_at"]))
+                    agg[key] = (n + 1, newest)
+                    count_score(by_score, rec)
+                rows += len(records)
+                max_id = records[0]["id"] if max_id is None else max_id
+                min_id = records[-1]["id"]
+                latest = latest or records[0]["created_at"]
+                last_id = min_id
+        if not rows:
+            tmp.unlink(missing_ok=True)
+            return {"month": f"{start:%Y-%m}", "rows": 0, "cleared": cleared}
+        data = tmp.read_bytes()
+        os.replace(tmp, path)
+        seg = {
+            "month_start": start.isoformat(),
+            "file": name,
+            "rows": rows,
+            "min_id": min_id,
+            "max_id": max_id,
+            "latest_created_at": latest,
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "archived_at": datetime.utcnow().isoformat() + "Z",
+            "counts": [[d, a, b, n, newest] for (d, a, b), (n, newest) in sorted(agg.items())],
+            **score_stats(by_score),
+        }
+        with _manifest_lock:
+            manifest = load_manifest()
+            manifest.setdefault("segments", []).append(seg)
+            manifest["table"] = TABLE
+            _save_manifest(manifest)
+        deleted = self._delete_rows(start, end, max_id)
+        telemetry.incr("audit_partition_archived_rows_total", rows)
+        logger.info("audit month %s archived: %d rows → %s", f"{start:%Y-%m}", rows, name)
+        return {"month": f"{start:%Y-%m}", "rows": rows, "file": name, "deleted": deleted}
+
+    def _delete_rows(self, start: datetime, end: datetime, max_id: int) -> int | str:
+        from ..db.schema import AHAuditLog
+        from ..db.session import session_scope
+        if self._drop_mysql_partition(start, max_id):
+            return "partition_dropped"
+        batch = max(1, int(settings.audit_partition_batch_size))
+        deleted = 0
+        while True:
+            with session_scope() as db:
+                ids = [r[0] for r in (db.query(AHAuditLog.id)
+                                      .filter(AHAuditLog.created_at >= start, AHAuditLog.created_at < end,
+                                              AHAuditLog.id <= max_id)
+                                      .limit(batch).all())]
+                if not ids:
+                    return deleted
+                db.query(AHAuditLog).filter(AHAuditLog.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            deleted += len(ids)
+
+    def apply_retention(self, now: datetime) -> list[str]:
+        months = int(settings.audit_archive_retention_months)
+        if months <= 0:
+            return []
+        cutoff = add_months(hot_boundary(now), -months)
+        with _manifest_lock:
+            manifest = load_manifest()
+            keep, drop = [], []
+            for seg in manifest.get("segments", []):
+                (drop if datetime.fromisoformat(seg["month_start"]) < cutoff else keep).append(seg)
+            if not drop:
+                return []
+            manifest["segments"] = keep
+            _save_manifest(manifest)
+        for seg in drop:
+            (archive_dir() / seg["file"]).unlink(missing_ok=True)
+            telemetry.incr("audit_partition_expired_rows_total", int(seg["rows"]))
+        logger.info("audit retention removed %d segment(s) before %s", len(drop), f"{cutoff:%Y-%m}")
+        return [seg["file"] for seg in drop]
+
+    # ── MySQL native partitions ───────────────────────────────────────────────
+
+    @staticmethod
+    def _mysql_partitions(conn: Any) -> dict[str, str]:
+        from sqlalchemy import text
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+        ), {"t": TABLE}).all()
+        return {r[0]: r[1] for r in rows}
+
+    @staticmethod
+    def _writer() -> Any:
+        from ..db import schema
+        engine = schema.writer_engine or schema.engine
+        return engine if engine.dialect.name == "mysql" else None
+
+    def ensure_partitions(self, now: datetime) -> list[str]:
+        """Split pmax so this month and next month have their own partitions (MySQL only)."""
+        from sqlalchemy import text
+        engine = self._writer()
+        if engine is None:
+            return []
+        added = []
+        with engine.begin() as conn:
+            parts = self._mysql_partitions(conn)
+            if "pmax" not in parts:
+                return []
+            for n in (0, 1):
+                start = add_months(month_start(now), n)
+                name = f"p{start:%Y%m}"
+                if name in parts:
+                    continue
+                bound = add_months(start, 1)
+                conn.execute(text(
+                    f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO ("
+                    f"PARTITION {name} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}'), "
+                    f"PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                ))
+                added.append(name)
+        return added
+
+    def _drop_mysql_partition(self, start: datetime, max_id: int) -> bool:
+        """Drop the month's partition when every row in it is archived (MySQL only)."""
+        from sqlalchemy import text
+        engine = self._writer()
+        if engine is None:
+            return False
+        name = f"p{start:%Y%m}"
+        with engine.begin() as conn:
+            if name not in self._mysql_partitions(conn):
+                return False
+            newer = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE} PARTITION ({name}) WHERE id > :m"),
+                                 {"m": max_id}).scalar()
+            if newer:
+                return False
+            conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {name}"))
+        return True
+
+
+audit_partitioner = AuditPartitioner()
@@ -104,16 +104,17 @@ def persist_audit(*, action: str, decision: str, risk_score: int = 0, reason: st
     path = append_jsonl(record)
     record["evidence_path"] = path
     try:
-        from ..db.schema import AHAuditLog, get_db
-        db = next(get_db())
-        db.add(AHAuditLog(
-            action=record["action"],
-            decision=record["decision"],
-            risk_score=record["risk_score"],
-            reason=record["reason"],
-            context=json.dumps(record["context"], ensure_ascii=False, default=str),
-        ))
-        db.commit()
+        from ..db.schema import AHAuditLog
+        from ..db.session import session_scope
+        with session_scope() as db:
+            db.add(AHAuditLog(
+                action=record["action"],
+                decision=record["decision"],
+                risk_score=record["risk_score"],
+                reason=record["reason"],
+                context=json.dumps(record["context"], ensure_ascii=False, default=str),
+            ))
+            db.commit()
     except Exception as e:
         record["db_persisted"] = False
         record["db_error"] = str(e)
@@ -121,3 +122,213 @@ def persist_audit(*, action: str, decision: str, risk_score: int = 0, reason: st
     else:
         record["db_persisted"] = True
     return record
+
+
+# ── ah_audit_log queries ──────────────────────────────────────────────────────
+
+def _audit_query(db: Any, *, decision: str | None = None, action: str | None = None,
+                 action_prefix: str | None = None, risk_score_min: int | None = None,
+                 risk_score_max: int | None = None, created_after: datetime | None = None,
+                 created_before: datetime | None = None) -> Any:
+    from sqlalchemy import desc
+    from ..db.schema import AHAuditLog
+    q = db.query(AHAuditLog).order_by(desc(AHAuditLog.created_at))
+    if decision:
+        q = q.filter(AHAuditLog.decision == decision.upper())
+    if action:
+        q = q.filter(AHAuditLog.action == action)
+    if action_prefix:
+        q = q.filter(AHAuditLog.action.like(f"{action_prefix}%"))
+    if risk_score_min is not None:
+        q = q.filter(AHAuditLog.risk_score >= risk_score_min)
+    if risk_score_max is not None:
+        q = q.filter(AHAuditLog.risk_score <= risk_score_max)
+    if created_after:
+        q = q.filter(AHAuditLog.created_at >= created_after)
+    if created_before:
+        q = q.filter(AHAuditLog.created_at <= created_before)
+    return q
+
+
+def _archived(filters: dict[str, Any]) -> list[dict[str, Any]]:
+    """Archive segments the filters' time range reaches (see audit_partitions)."""
+    from .audit_partitions import segments
+    return segments(filters.get("created_after"), filters.get("created_before"))
+
+
+def _row_matches(row: dict[str, Any], *, decision: str | None = None, action: str | None = None,
+                 action_prefix: str | None = None, risk_score_min: int | None = None,
+                 risk_score_max: int | None = None, created_after: datetime | None = None,
+                 created_before: datetime | None = None) -> bool:
+    """_audit_query's filters applied to an archived row."""
+    if decision and row.get("decision") != decision.upper():
+        return False
+    if action and row.get("action") != action:
+        return False
+    if action_prefix and not str(row.get("action") or "").startswith(action_prefix):
+        return False
+    score = int(row.get("risk_score") or 0)
+    if risk_score_min is not None and score < risk_score_min:
+        return False
+    if risk_score_max is not None and score > risk_score_max:
+        return False
+    created = row.get("created_at")
+    if created_after and (created is None or created < created_after):
+        return False
+    if created_before and (created is None or created > created_before):
+        return False
+    return True
+
+
+def _manifest_rows(seg: dict[str, Any], filters: dict[str, Any]) -> Any:
+    """
+    (decision, action, risk bucket, count, newest) from a segment's manifest
+    counts, or None when the filters need a row scan: a risk-score filter on a
+    segment archived without per-score counts.
+    """
+    from .audit_partitions import risk_bucket
+    lo, hi = filters.get("risk_score_min"), filters.get("risk_score_max")
+    if lo is None and hi is None:
+        entries = seg["counts"]
+    elif "scores" in seg:
+        entries = [(d, a, risk_bucket(score), n, newest) for d, a, score, n, newest in seg["scores"]
+                   if (lo is None or score >= lo) and (hi is None or score <= hi)]
+    else:
+        return None
+    decision, action, prefix = filters.get("decision"), filters.get("action"), filters.get("action_prefix")
+    return [
+        (d, a, bucket, n, newest) for d, a, bucket, n, newest in entries
+        if not (decision and d != decision.upper()) and not (action and a != action)
+        and not (prefix and not a.startswith(prefix))
+    ]
+
+
+def _may_match(seg: dict[str, Any], filters: dict[str, Any]) -> bool:
+    """False when the manifest rules out every row of the segment for these filters."""
+    lo, hi = filters.get("risk_score_min"), filters.get("risk_score_max")
+    if seg.get("risk_max") is not None and lo is not None and seg["risk_max"] < lo:
+        return False
+    if seg.get("risk_min") is not None and hi is not None and seg["risk_min"] > hi:
+        return False
+    counted = _manifest_rows(seg, filters)
+    return counted is None or any(n for _d, _a, _b, n, _newest in counted)
+
+
+def _archived_groups(segs: list[dict[str, Any]], filters: dict[str, Any]) -> Any:
+    """
+    (decision, action, risk bucket, count, newest created_at) groups from archive
+    segments: the manifest counts for whole months, a segment scan otherwise.
+    """
+    from .audit_partitions import add_months, risk_bucket
+    after, before = filters.get("created_after"), filters.get("created_before")
+    for seg in segs:
+        start = datetime.fromisoformat(seg["month_start"])
+        whole = (after is None or after <= start) and (before is None or before >= add_months(start, 1))
+        counted = _manifest_rows(seg, filters) if whole else None
+        if counted is not None:
+            yield from counted
+            continue
+        if not _may_match(seg, filters):
+            continue
+        from .audit_partitions import iter_segment
+        for row in iter_segment(seg):
+            if _row_matches(row, **filters):
+                yield (str(row.get("decision") or "UNKNOWN"), str(row.get("action") or "unknown"),
+                       risk_bucket(int(row.get("risk_score") or 0)), 1,
+                       row["created_at"].isoformat() if row.get("created_at") else None)
+
+
+def list_audit(*, limit: int = 50, offset: int = 0, context: bool = False, **filters: Any) -> list[dict[str, Any]]:
+    """
+    Newest-first audit entries matching the filters of _audit_query, continuing
+    into archived months; context=True adds each entry's context column.
+    """
+    from ..db.replica import replica_scope
+    with replica_scope() as db:
+        q = _audit_query(db, **filters)
+        rows = q.offset(offset).limit(limit).all()
+        entries = [
+            {
+                "id": r.id, "action": r.action, "decision": r.decision,
+                "risk_score": r.risk_score, "reason": r.reason,
+                **({"context": getattr(r, "context", None)} if context else {}),
+                "created_at": r.created_at.isoformat(),
+            }
+            for r in rows
+        ]
+        segs = [s for s in _archived(filters) if _may_match(s, filters)] if len(entries) < limit else []
+        if segs:
+            hot_total = offset + len(entries) if entries or not offset else q.count()
+    if not segs:
+        return entries
+    from .audit_partitions import iter_segment
+    skip = max(0, offset - hot_total)
+    for seg in segs:
+        for row in iter_segment(seg):
+            if not _row_matches(row, **filters):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            entries.append({
+                "id": row["id"], "action": row["action"], "decision": row["decision"],
+                "risk_score": row["risk_score"], "reason": row["reason"],
+                **({"context": row.get("context")} if context else {}),
+                "created_at": row["created_at"].isoformat(), "archived": True,
+            })
+            if len(entries) >= limit:
+                return entries
+    return entries
+
+
+def export_audit(*, limit: int = 100, offset: int = 0, **filters: Any) -> list[dict[str, Any]]:
+    """Newest-first audit entries for /audit/export, context included, archived months too."""
+    return list_audit(limit=limit, offset=offset, context=True, **filters)
+
+
+def summarize_audit(**filters: Any) -> dict[str, Any]:
+    """Totals by decision, action and risk bucket for the matching entries, archived months included."""
+    from ..db.replica import replica_scope
+    from .audit_partitions import risk_bucket
+    with replica_scope() as db:
+        rows = _audit_query(db, **filters).all()
+        groups = [(str(r.decision or "UNKNOWN"), str(r.action or "unknown"), risk_bucket(int(r.risk_score or 0)), 1)
+                  for r in rows]
+        latest = rows[0].created_at.isoformat() if rows else None
+    total = len(groups)
+    by_decision: dict[str, int] = {}
+    by_action: dict[str, int] = {}
+    risk_buckets = {"low": 0, "medium": 0, "high": 0, "critical": 0}
+    for d, a, bucket, n in groups:
+        by_decision[d] = by_decision.get(d, 0) + n
+        by_action[a] = by_action.get(a, 0) + n
+        risk_buckets[bucket] += n
+    for d, a, bucket, n, newest in _archived_groups(_archived(filters), filters):
+        total += n
+        by_decision[d] = by_decision.get(d, 0) + n
+        by_action[a] = by_action.get(a, 0) + n
+        risk_buckets[bucket] += n
+        if newest and (latest is None or newest > latest):
+            latest = newest
+    return {
+        "total": total,
+        "by_decision": by_decision,
+        "by_action": by_action,
+        "risk_buckets": risk_buckets,
+        "latest_created_at": latest,
+    }
+
+
+def count_audit_by(field: str, **filters: Any) -> dict[str, int]:
+    """Entry counts per action or decision for the matching entries, archived months included."""
+    from ..db.replica import replica_scope
+    default = "unknown" if field == "action" else "UNKNOWN"
+    with replica_scope() as db:
+        counts: dict[str, int] = {}
+        for r in _audit_query(db, **filters).all():
+            key = str(getattr(r, field) or default)
+            counts[key] = counts.get(key, 0) + 1
+    for d, a, _bucket, n, _newest in _archived_groups(_archived(filters), filters):
+        key = a if field == "action" else d
+        counts[key] = counts.get(key, 0) + n
+    return counts
@@ -0,0 +1,118 @@
+"""
+ArcHillx — Background maintenance jobs
+======================================
+Memory compaction, the LMF stats recount / consolidator / blob GC, the audit
+partition roll and the counter flush all run on one process-wide APScheduler
+BackgroundScheduler instead of one scheduler (and worker thread pool) each.
+
+A job subclasses IntervalJob and supplies job_id, label, enabled(),
+interval_s() and run_once(); startup() / shutdown() / next_run() come from
+here.  The scheduled call is run_once() itself, added with max_instances=1 and
+coalesce=True, so a slow run is never overlapped and missed ticks collapse
+into one.  The shared scheduler starts with the first job and stops when the
+last one is removed.
+
+    class MemoryCompactor(IntervalJob):
+        job_id, label = "memory_compaction", "memory compaction"
+        def enabled(self): return settings.enable_memory_compaction
+        def interval_s(self): return settings.memory_compaction_interval_s
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Optional
+
+from ..config import settings
+
+logger = logging.getLogger("archillx.background")
+
+_scheduler: Any = None
+_scheduler_lock = threading.Lock()
+
+
+def _add_job(func: Any, job_id: str, seconds: float) -> None:
+    global _scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BackgroundScheduler(timezone=settings.cron_timezone)
+            _scheduler.start()
+        _scheduler.add_job(func, trigger=IntervalTrigger(seconds=seconds), id=job_id, name=job_id,
+                           replace_existing=True, max_instances=1, coalesce=True)
+
+
+def _remove_job(job_id: str) -> None:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            return
+        try:
+            _scheduler.remove_job(job_id)
+        except Exception:
+            pass
+        if not _scheduler.get_jobs():
+            try:
+                _scheduler.shutdown(wait=False)
+            except Exception:
+                pass
+            _scheduler = None
+
+
+def scheduled_jobs() -> list[str]:
+    """Ids of the jobs on the shared scheduler."""
+    with _scheduler_lock:
+        return [job.id for job in _scheduler.get_jobs()] if _scheduler is not None else []
+
+
+class IntervalJob:
+    job_id = ""
+    label = ""
+    min_interval_s = 60.0
+
+    def __init__(self) -> None:
+        self._started = False
+        self._lock = threading.Lock()          # held while run_once works
+        self._last_run: Optional[dict] = None
+
+    def enabled(self) -> bool:
+        return True
+
+    def interval_s(self) -> float:
+        raise NotImplementedError
+
+    def run_once(self) -> Any:
+        raise NotImplementedError
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def startup(self) -> None:
+        """Schedule run_once every interval_s() (at least min_interval_s); a non-positive interval disables it."""
+        interval = float(self.interval_s())
+        if self._started or not self.enabled() or interval <= 0:
+            return
+        interval = max(self.min_interval_s, interval)
+        try:
+            _add_job(self.run_once, self.job_id, interval)
+            self._started = True
+            logger.info("%s started (interval=%ss)", self.label, interval)
+        except ImportError:
+            logger.warning("apscheduler not installed — %s disabled", self.label)
+        except Exception as e:
+            logger.error("%s startup failed: %s", self.label, e)
+
+    def shutdown(self) -> None:
+        if self._started:
+            _remove_job(self.job_id)
+        self._started = False
+
+    def next_run(self) -> Optional[str]:
+        if not self._started:
+            return None
+        with _scheduler_lock:
+            try:
+                job = _scheduler.get_job(self.job_id) if _scheduler is not None else None
+                return job.next_run_time.isoformat() if job and job.next_run_time else None
+            except Exception:
+                return None
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Async route benchmark: concurrent-request throughput with DB work inline on the loop vs on the DB executor."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+EVIDENCE_DIR = ROOT / 'evidence' / 'benchmarks'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ArcHillx async DB route benchmark')
+    parser.add_argument('--rows', type=int, default=20_000, help='rows per hot table')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--db-latency-ms', type=float, default=2.0,
+                        help='simulated DB round-trip per statement (0 = raw in-process SQLite)')
+    parser.add_argument('--workdir', default=None, help='keep the generated SQLite file here (default: temp dir)')
+    parser.add_argument('--out', default=None, help='output path (default: evidence/benchmarks/db_async_<ts>.json)')
+    parser.add_argument('--json', action='store_true', help='print the full JSON report')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)                   # per-request access logs would dominate the run
+
+    from app.db.benchmark import run
+
+    report = run(rows=args.rows, n_requests=args.requests, concurrency=args.concurrency, seed=args.seed,
+                 db_latency_ms=args.db_latency_ms, workdir=args.workdir)
+
+    if args.out:
+        out_path = Path(args.out)
+    else:
+        EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        out_path = EVIDENCE_DIR / f'db_async_{stamp}.json'
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for mode, r in report['results'].items():
+            print(f"{mode:>9}: {r['rps']:>8} req/s  p50={r['p50_ms']}ms  p99={r['p99_ms']}ms  "
+                  f"loop lag p99={r['loop_lag_p99_ms']}ms  errors={r['errors']}")
+        print(f"speedup: {report['speedup']['rps']}x")
+    print(f'OK: wrote {out_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
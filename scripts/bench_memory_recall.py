@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Memory recall benchmark: load synthetic corpora into SQLite and report latency / recall@k as JSON."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+EVIDENCE_DIR = ROOT / 'evidence' / 'benchmarks'
+
+
+def parse_sizes(raw: str) -> tuple[int, ...]:
+    out = []
+    for part in raw.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        mult = 1
+        if part.endswith('k'):
+            mult, part = 1_000, part[:-1]
+        elif part.endswith('m'):
+            mult, part = 1_000_000, part[:-1]
+        out.append(int(float(part) * mult))
+    return tuple(out)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ArcHillx memory recall benchmark')
+    parser.add_argument('--sizes', default='10k,100k,1m', help='comma-separated row counts, e.g. 10k,100k,1m')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workdir', default=None, help='keep generated SQLite files here (default: temp dir)')
+    parser.add_argument('--no-lmf', action='store_true', help='skip the LMF episodic search target')
+    parser.add_argument('--baseline', default=None, help='previous result JSON to diff against')
+    parser.add_argument('--out', default=None, help='output path (default: evidence/benchmarks/memory_recall_<ts>.json)')
+    parser.add_argument('--json', action='store_true', help='print the full JSON report')
+    args = parser.parse_args()
+
+    from app.memory.benchmark import compare, run
+
+    report = run(parse_sizes(args.sizes), n_queries=args.queries, top_k=args.top_k, seed=args.seed,
+                 workdir=args.workdir, lmf=not args.no_lmf)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        report['compare'] = compare(baseline, report)
+
+    if args.out:
+        out_path = Path(args.out)
+    else:
+        EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        out_path = EVIDENCE_DIR / f'memory_recall_{stamp}.json'
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"memory_recall version={report['version']} out={out_path}")
+        for res in report['results']:
+            for name, m in res['targets'].items():
+                extra = ''
+                if 'recall_at_k' in m:
+                    extra += f" recall@{args.top_k}={m['recall_at_k']}"
+                if 'candidates_returned_mean' in m:
+                    extra += f" candidates_returned={m['candidates_returned_mean']}"
+                print(f"[{res['rows']:>9}] {name:<22} p50={m['p50_ms']}ms p99={m['p99_ms']}ms{extra}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
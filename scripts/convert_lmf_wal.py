@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Convert an LMF WAL file or segmented WAL directory between jsonl and binary formats."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ArcHillx LMF WAL format converter')
+    parser.add_argument('src', help='WAL file or segmented WAL directory')
+    parser.add_argument('dst', help='output file or directory (must not be the source)')
+    parser.add_argument('--format', choices=('binary', 'jsonl'), default='binary')
+    parser.add_argument('--compression', choices=('none', 'zlib', 'zstd'), default='zlib')
+    parser.add_argument('--body', choices=('json', 'msgpack'), default='json', help='binary record body codec')
+    args = parser.parse_args()
+
+    if Path(args.src).resolve() == Path(args.dst).resolve():
+        parser.error('dst must differ from src; swap the paths once conversion succeeds')
+
+    from app.lmf.core.wal import convert_wal
+
+    stats = convert_wal(args.src, args.dst, fmt=args.format, compression=args.compression,
+                        body_codec=args.body)
+    if stats['bytes_in']:
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 4)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Index advisor: propose composite/covering indexes for a query workload, emit the migration, benchmark it."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+EVIDENCE_DIR = ROOT / 'evidence' / 'benchmarks'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ArcHillx index advisor')
+    parser.add_argument('--workload', default=None,
+                        help='profile snapshot or fingerprint list JSON (default: built-in hot query shapes)')
+    parser.add_argument('--emit-migration', default=None, metavar='REVISION:DOWN_REVISION',
+                        help='write alembic/versions/<REVISION>_composite_indexes.py for the proposals')
+    parser.add_argument('--benchmark', action='store_true', help='time the workload before/after on generated data')
+    parser.add_argument('--rows', type=int, default=50_000, help='rows per table for --benchmark')
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workdir', default=None, help='keep the generated SQLite file here (default: temp dir)')
+    parser.add_argument('--out', default=None, help='output path (default: evidence/benchmarks/index_advisor_<ts>.json)')
+    parser.add_argument('--json', action='store_true', help='print the full JSON report')
+    args = parser.parse_args()
+
+    from app.db.index_advisor import advise, benchmark, default_workload, load_workload, render_migration
+
+    workload = load_workload(args.workload) if args.workload else default_workload()
+    report = advise(workload)
+    proposals = report['proposals']
+
+    if args.emit_migration:
+        revision, _, down = args.emit_migration.partition(':')
+        if not down:
+            parser.error('--emit-migration expects REVISION:DOWN_REVISION')
+        path = ROOT / 'alembic' / 'versions' / f'{revision}_composite_indexes.py'
+        path.write_text(render_migration(proposals, revision, down), encoding='utf-8')
+        print(f'OK: wrote {path}')
+
+    if args.benchmark:
+        report['benchmark'] = benchmark(proposals, workload, rows=args.rows, repeat=args.repeat,
+                                        seed=args.seed, workdir=args.workdir)
+
+    if args.out:
+        out_path = Path(args.out)
+    else:
+        EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        out_path = EVIDENCE_DIR / f'index_advisor_{stamp}.json'
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for p in proposals:
+            extra = f"  supersedes {', '.join(p['supersedes'])}" if p['supersedes'] else ''
+            print(f"{p['name']}: ({', '.join(p['columns'])}) weight={p['weight']}"
+                  f"{' covering' if p['covering'] else ''}{extra}")
+        for r in report.get('benchmark', {}).get('results', []):
+            print(f"{r['before_ms']:>9}ms -> {r['after_ms']:>9}ms  x{r['speedup']}  {r['fingerprint'][-90:]}")
+        if 'benchmark' in report:
+            print(f"speedup: {report['benchmark']['speedup']}x")
+    print(f'OK: wrote {out_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Online migration runner: resumable, throttled backfills between expand and contract revisions."""
+from __future__ import annotations
+
+import argparse
+import json
+import signal
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ArcHillx online migration runner')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='registered backfills and their progress')
+    est = sub.add_parser('estimate', help='dry run: rows, chunks and time left')
+    est.add_argument('name')
+    est.add_argument('--batch-size', type=int, default=None)
+    est.add_argument('--no-sample', action='store_true', help='skip the timed chunk (no writes at all)')
+    run = sub.add_parser('run', help='expand, backfill (resumes at the saved cursor), optionally contract')
+    run.add_argument('name')
+    run.add_argument('--contract', action='store_true', help='run the contract steps once every row is done')
+    run.add_argument('--batch-size', type=int, default=None)
+    run.add_argument('--sleep-ms', type=int, default=None)
+    run.add_argument('--max-batches', type=int, default=None)
+    run.add_argument('--max-seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    from app.db.online_migration import BACKFILLS, online_migrator
+    from app.db.schema import init_db
+
+    init_db()                                       # ah_schema_backfills on trees not yet at alembic head
+    if args.command == 'status':
+        print(json.dumps(online_migrator.status(), indent=2, ensure_ascii=False))
+        return 0
+    if args.name not in BACKFILLS:
+        print(f'ERROR: unknown backfill {args.name!r}; registered: {", ".join(sorted(BACKFILLS)) or "-"}')
+        return 2
+    if args.command == 'estimate':
+        report = online_migrator.estimate(args.name, batch_size=args.batch_size, sample=not args.no_sample)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())      # Ctrl-C pauses after the current chunk
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    result = online_migrator.run(args.name, contract=args.contract, batch_size=args.batch_size,
+                                 sleep_ms=args.sleep_ms, max_batches=args.max_batches,
+                                 max_seconds=args.max_seconds, stop=stop)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if result.get('skipped'):
+        return 3
+    return 0 if result.get('phase') in ('backfilled', 'contracted') or result.get('paused') else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -198,3 +198,30 @@ def isolated_skill_manager(monkeypatch, tmp_path):
     settings.skills_dir = old_skills_dir
     settings.enable_skill_acl = old_acl
     settings.enable_skill_validation = old_validation
+
+
+@pytest.fixture
+def sqlite_db(monkeypatch):
+    """Fresh in-memory SQLite bound to app.db.schema for DB-backed store tests."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db import schema
+
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool, future=True)
+    schema.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def _get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(schema, 'engine', engine)
+    monkeypatch.setattr(schema, 'SessionLocal', factory)
+    monkeypatch.setattr(schema, 'get_db', _get_db)
+    yield factory
+    engine.dispose()
@@ -3,6 +3,9 @@ from __future__ import annotations
 import types
 
 from app.config import settings
+from app.utils.migration_state import _head_revision
+
+HEAD_REVISION = _head_revision()
 
 
 def test_live_route_returns_alive(client):
@@ -18,7 +21,7 @@ def test_ready_route_returns_ready_with_all_checks_ok(client, install_module):
             if 'alembic_version' in stmt:
                 class _R:
                     def scalar(self):
-                        return '20260227_000001'
+                        return HEAD_REVISION
                 return _R()
             return 1
         def close(self):
@@ -120,7 +123,7 @@ def test_migration_state_route_returns_head_when_current_matches(client, install
         def execute(self, _stmt):
             class _R:
                 def scalar(self):
-                    return '20260227_000001'
+                    return HEAD_REVISION
             return _R()
         def close(self):
             return None
@@ -138,7 +141,7 @@ def test_migration_state_route_returns_head_when_current_matches(client, install
     body = resp.json()
     assert body['status'] == 'head'
     assert body['ok'] is True
-    assert body['current'] == '20260227_000001'
+    assert body['current'] == HEAD_REVISION
 
 
 def test_migration_state_route_returns_503_when_revision_is_behind(client, install_module):
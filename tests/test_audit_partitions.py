@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+import pytest
+
+from app.config import settings
+from app.db import schema
+from app.security import audit_partitions, audit_store
+from app.security.audit_partitions import AuditPartitioner, load_manifest
+
+NOW = datetime(2026, 10, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def audit_months(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'evidence_dir', str(tmp_path / 'evidence'))
+    monkeypatch.setattr(settings, 'audit_hot_months', 1)
+    monkeypatch.setattr(settings, 'audit_archive_retention_months', 0)
+    monkeypatch.setattr(settings, 'audit_partition_batch_size', 7)
+    db = sqlite_db()
+    rows = []
+    for month, n in ((8, 20), (9, 15), (10, 5)):
+        for i in range(n):
+            rows.append(schema.AHAuditLog(
+                action='skill_invoke' if i % 2 else 'sandbox_execute',
+                decision=('BLOCKED', 'WARNED', 'APPROVED')[i % 3],
+                risk_score=(i * 7) % 100, reason=f'm{month}-{i}', context='{}',
+                created_at=datetime(2026, month, 1 + i, 8, 0, 0),
+            ))
+    db.add_all(rows)
+    db.commit()
+    db.close()
+    return sqlite_db
+
+
+def test_roll_archives_old_months_and_keeps_hot_table_small(audit_months):
+    before = audit_store.summarize_audit()
+    result = AuditPartitioner().run_once(now=NOW)
+
+    assert [m['month'] for m in result['archived']] == ['2026-08', '2026-09']
+    assert [m['rows'] for m in result['archived']] == [20, 15]
+    db = audit_months()
+    try:
+        assert db.query(schema.AHAuditLog).count() == 5
+    finally:
+        db.close()
+    segs = load_manifest()['segments']
+    assert {s['file'] for s in segs} == {'ah_audit_log_202608.jsonl.gz', 'ah_audit_log_202609.jsonl.gz'}
+    for seg in segs:
+        data = (audit_partitions.archive_dir() / seg['file']).read_bytes()
+        assert hashlib.sha256(data).hexdigest() == seg['sha256']
+
+    assert audit_store.summarize_audit() == before                      # archive counts stand in for the rows
+    assert AuditPartitioner().run_once(now=NOW)['archived'] == []       # idempotent
+
+
+def test_queries_reach_archived_months_only_when_needed(audit_months, monkeypatch):
+    AuditPartitioner().run_once(now=NOW)
+
+    entries = audit_store.list_audit(limit=100)
+    assert len(entries) == 40
+    assert [e['created_at'] for e in entries] == sorted((e['created_at'] for e in entries), reverse=True)
+    assert [e.get('archived', False) for e in entries[4:6]] == [False, True]
+    page = audit_store.list_audit(limit=3, offset=6)
+    assert [e['reason'] for e in page] == ['m9-13', 'm9-12', 'm9-11']
+
+    assert audit_store.count_audit_by('decision', risk_score_min=50)['BLOCKED'] == sum(
+        1 for m, n in ((8, 20), (9, 15), (10, 5)) for i in range(n) if i % 3 == 0 and (i * 7) % 100 >= 50
+    )
+    sept = audit_store.summarize_audit(created_after=datetime(2026, 9, 1), created_before=datetime(2026, 9, 30, 23))
+    assert sept['total'] == 15
+
+    def boom(_seg):
+        raise AssertionError('archive read for a hot-only range')
+
+    monkeypatch.setattr(audit_partitions, 'iter_segment', boom)
+    assert audit_store.summarize_audit(created_after=datetime(2026, 10, 1))['total'] == 5
+
+
+def test_retention_drops_expired_segments(audit_months, monkeypatch):
+    partitioner = AuditPartitioner()
+    partitioner.run_once(now=NOW)
+    monkeypatch.setattr(settings, 'audit_archive_retention_months', 2)
+    expired = partitioner.run_once(now=datetime(2026, 11, 20))['expired']
+    assert expired == ['ah_audit_log_202608.jsonl.gz']
+    assert not (audit_partitions.archive_dir() / 'ah_audit_log_202608.jsonl.gz').exists()
+    assert [s['month_start'][:7] for s in load_manifest()['segments']] == ['2026-09', '2026-10']
+
+
+def test_risk_filters_and_export_use_the_manifest(audit_months, client, monkeypatch):
+    import json
+
+    AuditPartitioner().run_once(now=NOW)
+    aug = next(s for s in load_manifest()['segments'] if s['month_start'].startswith('2026-08'))
+    assert (aug['risk_min'], aug['risk_max']) == (0, max((i * 7) % 100 for i in range(20)))
+    expected = audit_store.count_audit_by('decision', risk_score_min=50)
+
+    def boom(_seg):
+        raise AssertionError('segment scanned')
+
+    real_iter = audit_partitions.iter_segment
+    monkeypatch.setattr(audit_partitions, 'iter_segment', boom)
+    assert audit_store.count_audit_by('decision', risk_score_min=50) == expected
+    summary = audit_store.summarize_audit(risk_score_min=90)
+    assert summary['total'] == sum(1 for m, n in ((8, 20), (9, 15), (10, 5)) for i in range(n) if (i * 7) % 100 >= 90)
+    assert summary['risk_buckets']['critical'] == summary['total']
+    assert audit_store.list_audit(limit=50, risk_score_min=99) == []                # no segment reaches 99
+
+    monkeypatch.setattr(audit_partitions, 'iter_segment', real_iter)
+    body = client.get('/v1/audit/export', params={'format': 'json', 'limit': 50}).json()
+    assert body['count'] == 40 and sum(1 for e in body['items'] if e.get('archived')) == 35
+    assert all(e['context'] == '{}' for e in body['items'])
+
+    manifest = json.loads((audit_partitions.archive_dir() / 'manifest.json').read_text())
+    for seg in manifest['segments']:                                                # as archived before scores
+        for key in ('risk_min', 'risk_max', 'scores'):
+            seg.pop(key)
+    (audit_partitions.archive_dir() / 'manifest.json').write_text(json.dumps(manifest))
+    audit_partitions._manifest_cache = None
+    assert audit_store.count_audit_by('decision', risk_score_min=50) == expected     # falls back to a scan
+    assert AuditPartitioner().run_once(now=NOW)['backfilled'] == 2
+    assert load_manifest()['segments'][0]['scores'] and audit_store.count_audit_by(
+        'decision', risk_score_min=50) == expected
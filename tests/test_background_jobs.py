@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from app.config import settings
+from app.db.counters import CounterCoalescer
+from app.lmf.core.blob_store import LMFBlobCollector
+from app.memory.compaction import MemoryCompactor
+from app.security.audit_partitions import AuditPartitioner
+from app.utils import background
+
+
+def test_maintenance_jobs_share_one_scheduler(monkeypatch):
+    monkeypatch.setattr(settings, 'enable_memory_compaction', True)
+    monkeypatch.setattr(settings, 'enable_audit_partitioning', True)
+    monkeypatch.setattr(settings, 'enable_counter_coalescing', True)
+    monkeypatch.setattr(settings, 'enable_lmf', True)
+    monkeypatch.setattr(settings, 'enable_lmf_blob', True)
+    monkeypatch.setattr(settings, 'lmf_blob_gc_interval_s', 0)          # non-positive interval: not scheduled
+    monkeypatch.setattr(settings, 'counter_flush_interval_ms', 3_600_000)
+    jobs = [MemoryCompactor(), AuditPartitioner(), CounterCoalescer(), LMFBlobCollector()]
+    for job in jobs:
+        job.startup()
+    try:
+        assert sorted(background.scheduled_jobs()) == ['audit_partitions', 'counter_flush', 'memory_compaction']
+        scheduler = background._scheduler
+        assert [j.status()['started'] for j in jobs] == [True, True, True, False]
+        assert jobs[0].status()['next_run'] and jobs[1].status()['next_run']
+        jobs[0].shutdown()
+        assert background._scheduler is scheduler and 'memory_compaction' not in background.scheduled_jobs()
+        assert jobs[0].status()['next_run'] is None
+    finally:
+        for job in jobs:
+            job.shutdown()
+    assert background._scheduler is None and background.scheduled_jobs() == []
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+from app.config import settings
+from app.db import aio
+from app.db.benchmark import run
+from app.utils.logging_utils import clear_request_context, get_request_context, set_request_context
+
+
+def test_run_db_uses_executor_and_carries_context(monkeypatch):
+    def probe():
+        return threading.current_thread().name, get_request_context()['request_id']
+
+    async def main():
+        tokens = set_request_context(request_id='req-42')
+        try:
+            return await aio.run_db(probe)
+        finally:
+            clear_request_context(tokens)
+
+    name, request_id = asyncio.run(main())
+    assert name.startswith('archillx-db') and request_id == 'req-42'
+
+    monkeypatch.setattr(settings, 'db_async_routes', False)
+    name, _ = asyncio.run(main())
+    assert name == threading.current_thread().name
+
+
+def test_hot_routes_go_through_repositories(client, sqlite_db):
+    resp = client.post('/v1/sessions', json={'name': 'async'})
+    sid = resp.json()['session_id']
+    assert [s['id'] for s in client.get('/v1/sessions').json()['sessions']] == [sid]
+    gid = client.post('/v1/goals', json={'title': 'ship'}).json()['goal_id']
+    goal = client.patch(f'/v1/goals/{gid}', json={'progress': 0.5, 'status': 'paused'}).json()
+    assert (goal['progress'], goal['status']) == (0.5, 'paused')
+    assert client.patch('/v1/goals/999', json={'status': 'paused'}).status_code == 404
+
+    from app.security.audit_store import persist_audit
+    persist_audit(action='skill_invoke', decision='BLOCKED', risk_score=95)
+    persist_audit(action='skill_invoke', decision='APPROVED', risk_score=5)
+    body = client.get('/v1/audit/summary', params={'action_prefix': 'skill_'}).json()
+    assert body['summary']['total'] == 2 and body['summary']['risk_buckets']['critical'] == 1
+    assert client.get('/v1/audit', params={'decision': 'blocked'}).json()['entries'][0]['risk_score'] == 95
+
+
+def test_audit_export_runs_off_the_event_loop(client, sqlite_db, monkeypatch):
+    from app.security import audit_store
+
+    seen = []
+    real = audit_store.export_audit
+
+    def probe(**kw):
+        seen.append(threading.current_thread().name)
+        return real(**kw)
+
+    monkeypatch.setattr(audit_store, 'export_audit', probe)
+    audit_store.persist_audit(action='skill_invoke', decision='BLOCKED', risk_score=95, context={'skill': 'x'})
+    body = client.get('/v1/audit/export', params={'format': 'json', 'decision': 'blocked'}).json()
+    assert body['count'] == 1 and json.loads(body['items'][0]['context'])['skill'] == 'x'
+    assert seen and seen[0].startswith('archillx-db')
+
+
+def test_benchmark_reports_both_modes(tmp_path):
+    report = run(rows=300, n_requests=30, concurrency=6, db_latency_ms=0, workdir=tmp_path)
+    assert set(report['results']) == {'inline', 'executor'}
+    for r in report['results'].values():
+        assert r['requests'] == 30 and r['errors'] == 0 and r['rps'] > 0
+    assert settings.db_async_routes is True
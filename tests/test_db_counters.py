@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.db import schema
+from app.db.counters import CounterCoalescer
+
+
+@pytest.fixture
+def coalescer(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'counter_flush_interval_ms', 3_600_000)   # flushes only when the test asks
+    c = CounterCoalescer()
+    c.startup()
+    assert c.status()['started']
+    yield c
+    c.shutdown()
+
+
+def _writes(engine):
+    seen = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE'):
+            seen.append((statement, executemany))
+    return seen
+
+
+def _rows(model, **by):
+    db = schema.SessionLocal()
+    try:
+        return db.query(model).filter_by(**by).one()
+    finally:
+        db.close()
+
+
+def test_counter_bumps_coalesce_into_one_flush_transaction(coalescer, sqlite_db, monkeypatch):
+    from app.runtime import cron as cron_mod, skill_manager as skill_mod
+
+    db = sqlite_db()
+    db.add_all([schema.AHSkill(name='web_search', version='1', manifest='{}'),
+                schema.AHSkill(name='file_ops', version='1', manifest='{}', invoke_count=5),
+                schema.AHCronJob(name='nightly', skill_name='web_search', interval_s=60)])
+    db.commit()
+    db.close()
+    monkeypatch.setattr('app.db.counters.counter_coalescer', coalescer)
+    writes = _writes(schema.engine)
+
+    for i in range(40):
+        skill_mod.skill_manager._inc('web_search', ok=i % 4 != 0)
+        skill_mod.skill_manager._inc('file_ops', ok=True)
+        cron_mod.cron_system._bump_run_count('nightly')
+    assert writes == [] and coalescer.status()['pending'] == {'rows': 3, 'events': 130}
+
+    result = coalescer.flush()
+    assert (result['rows'], result['events'], result['statements']) == (3, 130, 3)
+    assert len(writes) == 3                                  # one UPDATE per row shape, none per event
+    web, ops = _rows(schema.AHSkill, name='web_search'), _rows(schema.AHSkill, name='file_ops')
+    assert (web.invoke_count, web.error_count, ops.invoke_count, ops.error_count) == (40, 10, 45, 0)
+    job = _rows(schema.AHCronJob, name='nightly')
+    assert job.run_count == 40 and job.last_run is not None
+    assert coalescer.flush() == {'rows': 0, 'events': 0}
+    assert coalescer.status()['totals']['events_per_row'] == round(130 / 3, 2)
+
+
+def test_goal_progress_is_capped_guarded_and_flushed_on_shutdown(coalescer, sqlite_db, monkeypatch):
+    from app.loop.goal_tracker import goal_tracker
+
+    monkeypatch.setattr('app.db.counters.counter_coalescer', coalescer)
+    active, paused = goal_tracker.create('ship'), goal_tracker.create('later')
+    goal_tracker.update_progress(active, 0.75)
+    goal_tracker.pause(paused)
+    for _ in range(5):
+        goal_tracker.advance(active, 0.1, cap=0.99)
+        goal_tracker.advance(paused, 0.1)
+    assert goal_tracker.get(active)['progress'] == 0.75      # still buffered
+
+    coalescer.shutdown()
+    assert coalescer.status()['pending']['rows'] == 0
+    assert goal_tracker.get(active)['progress'] == pytest.approx(0.99)
+    assert goal_tracker.get(paused)['progress'] == 0.0       # status guard: paused goals do not move
+
+    goal_tracker.advance(active, 0.1)                        # stopped: written through, cap still holds
+    assert goal_tracker.get(active)['progress'] == pytest.approx(0.99)
+
+
+def test_pending_bound_flushes_inline_and_failed_flush_keeps_increments(coalescer, sqlite_db, monkeypatch):
+    db = sqlite_db()
+    db.add_all([schema.AHSkill(name=f's{i}', version='1', manifest='{}') for i in range(4)])
+    db.commit()
+    db.close()
+    monkeypatch.setattr(settings, 'counter_max_pending', 3)
+    with pytest.raises(ValueError, match='unknown column'):
+        coalescer.incr('ah_skills', 's0', 'nope', key_column='name')
+
+    real_write = coalescer._write
+    monkeypatch.setattr(coalescer, '_write', lambda batch: (_ for _ in ()).throw(RuntimeError('db down')))
+    for i in range(3):                                       # third distinct row hits the bound
+        coalescer.incr('ah_skills', f's{i}', 'invoke_count', key_column='name')
+    assert coalescer.status()['last_flush']['error'] == 'db down'
+    assert coalescer.status()['pending'] == {'rows': 3, 'events': 3}
+
+    monkeypatch.setattr(coalescer, '_write', real_write)
+    writes = _writes(schema.engine)
+    coalescer.incr('ah_skills', 's0', 'invoke_count', key_column='name')
+    assert coalescer.status()['pending']['rows'] == 0        # still over the bound: flushed inline
+    assert len(writes) == 1 and writes[0][1]                 # same shape: one executemany
+    assert [_rows(schema.AHSkill, name=f's{i}').invoke_count for i in range(4)] == [2, 1, 1, 0]
+    assert coalescer.status()['totals']['failures'] == 1
+
+
+def test_setting_progress_drops_buffered_advances(coalescer, sqlite_db, monkeypatch):
+    from app.loop.goal_tracker import goal_tracker
+
+    monkeypatch.setattr('app.db.counters.counter_coalescer', coalescer)
+    gid, other = goal_tracker.create('ship'), goal_tracker.create('docs')
+    for _ in range(3):
+        goal_tracker.advance(gid, 0.1)
+        goal_tracker.advance(other, 0.1)
+    goal_tracker.update_progress(gid, 0.2)                  # PATCH /goals: the explicit value wins
+    assert coalescer.status()['pending']['rows'] == 1
+    goal_tracker.advance(gid, 0.05)                         # advances after the set still count
+    coalescer.flush()
+    assert goal_tracker.get(gid)['progress'] == pytest.approx(0.25)
+    assert goal_tracker.get(other)['progress'] == pytest.approx(0.3)
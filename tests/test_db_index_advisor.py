@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+
+from app.db.index_advisor import advise, benchmark, default_workload, existing_indexes, parse, render_migration
+
+
+def _legacy_indexes():
+    """The indexes as they stood before 20261019_000011."""
+    md = MetaData()
+    Table('ah_tasks', md, Column('id', Integer, primary_key=True), Column('session_id', Integer),
+          Column('status', String(32)), Index('ix_ah_tasks_session_id', 'session_id'),
+          Index('ix_ah_tasks_status', 'status'))
+    Table('ah_audit_log', md, Column('id', Integer, primary_key=True), Column('action', String(256)),
+          Column('created_at', DateTime), Index('ix_ah_audit_log_created_at', 'created_at'))
+    return existing_indexes(md)
+
+
+def test_parse_splits_equality_range_and_order_columns():
+    shape = parse('SELECT t.id, t.status FROM t WHERE t.a = ? AND t.b IN (?+) AND t.c >= ? AND t.d IS NULL '
+                  'ORDER BY t.c DESC, t.e LIMIT ? OFFSET ?')
+    assert (shape.table, shape.equality, shape.ranges, shape.order) == ('t', ['a', 'b', 'd'], ['c'], ['c', 'e'])
+    assert [k for k, _c in shape.binds] == ['=', 'in', '>=', 'limit', 'offset']
+    assert shape.selected == ['id', 'status']
+    assert parse('SELECT a.x FROM a JOIN b ON a.id = b.a_id') is None
+    assert parse('UPDATE t SET a = ? WHERE id = ?') is None
+
+
+def test_advise_merges_prefixes_supersedes_and_covers():
+    workload = [
+        {'fingerprint': 'SELECT ah_tasks.id FROM ah_tasks WHERE ah_tasks.session_id = ? AND ah_tasks.status = ?',
+         'total_ms': 30.0},
+        {'fingerprint': 'SELECT * FROM ah_tasks WHERE ah_tasks.session_id = ?', 'total_ms': 5.0},
+        {'fingerprint': 'SELECT * FROM ah_tasks WHERE ah_tasks.status = ?', 'total_ms': 5.0},
+        {'fingerprint': 'SELECT * FROM ah_audit_log WHERE ah_audit_log.action = ? '
+                        'ORDER BY ah_audit_log.created_at DESC, ah_audit_log.id DESC LIMIT ?', 'total_ms': 50.0},
+    ]
+    legacy = _legacy_indexes()
+    out = advise(workload, legacy)
+    audit, tasks = out['proposals']
+    assert (audit['name'], audit['columns'], audit['supersedes']) == (
+        'ix_ah_audit_log_action_created_at', ['action', 'created_at'], [])    # trailing pk dropped
+    assert tasks['columns'] == ['session_id', 'status'] and tasks['covering']
+    assert tasks['supersedes'] == ['ix_ah_tasks_session_id'] and tasks['weight'] == 30.0
+    assert [s['index'] for s in out['served']] == ['ix_ah_tasks_session_id', 'ix_ah_tasks_status']
+
+    src = render_migration(out['proposals'], '20990101_000001', '20261019_000011', indexes=legacy)
+    compile(src, 'migration.py', 'exec')
+    assert 'op.drop_index("ix_ah_tasks_session_id", table_name="ah_tasks")' in src
+    assert 'op.create_index("ix_ah_tasks_session_id", "ah_tasks", ["session_id"], unique=False)' in src
+
+
+def test_schema_serves_default_workload_and_benchmark_uses_new_indexes(tmp_path):
+    workload = default_workload()
+    assert advise(workload)['proposals'] == []                       # shipped in 20261019_000011
+
+    proposals = [
+        {'name': 'ix_ah_goals_status_priority', 'table': 'ah_goals', 'columns': ['status', 'priority'],
+         'supersedes': []},
+        {'name': 'ix_ah_audit_log_action_created_at', 'table': 'ah_audit_log',
+         'columns': ['action', 'created_at'], 'supersedes': []},
+    ]
+    goals_audit = [w for w in workload if 'FROM ah_goals' in w['fingerprint'] or 'action = ?' in w['fingerprint']]
+    report = benchmark(proposals, goals_audit, rows=2000, repeat=3, workdir=tmp_path)
+    assert len(report['results']) == 2 and report['unbound'] == []
+    for r in report['results']:
+        assert 'status_priority' not in r['plan_before'] and 'action_created_at' not in r['plan_before']
+        assert 'ix_ah_goals_status_priority' in r['plan_after'] or 'ix_ah_audit_log_action_created_at' in r['plan_after']
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, String, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.db import online_migration, schema
+from app.db.online_migration import Backfill, OnlineMigrator, add_column, create_index, require_backfilled
+
+BUCKETS = Backfill(
+    name='test_audit_risk_bucket',
+    table='ah_audit_log',
+    set="risk_bucket = CASE WHEN risk_score >= 70 THEN 'high' WHEN risk_score >= 30 THEN 'medium' ELSE 'low' END",
+    pending='risk_bucket IS NULL',
+    expand=(add_column('ah_audit_log', Column('risk_bucket', String(8), nullable=True)),),
+    contract=(create_index('ix_ah_audit_log_risk_bucket', 'ah_audit_log', ['risk_bucket']),),
+)
+
+
+@pytest.fixture
+def audit_rows(sqlite_db, monkeypatch):
+    monkeypatch.setitem(online_migration.BACKFILLS, BUCKETS.name, BUCKETS)
+    monkeypatch.setattr(settings, 'db_backfill_sleep_ms', 0)
+    db = sqlite_db()
+    db.add_all([schema.AHAuditLog(action='skill_invoke', decision='APPROVED', risk_score=i % 100, context='{}')
+                for i in range(500)])
+    db.commit()
+    db.close()
+    return sqlite_db
+
+
+def _buckets():
+    with schema.engine.connect() as conn:
+        return dict(conn.execute(text('SELECT risk_bucket, COUNT(*) FROM ah_audit_log GROUP BY risk_bucket')).all())
+
+
+def test_backfill_expands_resumes_after_interruption_and_contracts(audit_rows):
+    first = OnlineMigrator().run(BUCKETS.name, batch_size=50, max_batches=3)
+    assert (first['phase'], first['rows'], first['paused']) == ('backfilling', 150, True)
+    assert _buckets()[None] == 350
+
+    with schema.engine.connect() as conn:
+        with pytest.raises(RuntimeError, match='backfilling'):
+            require_backfilled(BUCKETS.name, bind=conn)
+
+    again = OnlineMigrator()                          # a restarted process picks up at the saved cursor
+    done = again.run(BUCKETS.name, batch_size=50, contract=True)
+    assert (done['phase'], done['rows'], done['batches']) == ('contracted', 350, 7)
+    assert _buckets() == {'low': 150, 'medium': 200, 'high': 150}
+    with schema.engine.connect() as conn:
+        require_backfilled(BUCKETS.name, bind=conn)
+        assert 'ix_ah_audit_log_risk_bucket' in {ix['name'] for ix in inspect(conn).get_indexes('ah_audit_log')}
+    progress = next(b for b in again.status()['backfills'] if b['name'] == BUCKETS.name)['progress']
+    assert (progress['rows_done'], progress['batches'], progress['owner']) == (500, 10, None)
+
+
+def test_live_lease_blocks_a_second_runner(audit_rows):
+    db = audit_rows()
+    db.add(schema.AHSchemaBackfill(name=BUCKETS.name, table_name='ah_audit_log', phase='backfilling',
+                                   last_key=0, rows_done=0, batches=0, owner='other-host:1',
+                                   heartbeat_at=datetime.utcnow()))
+    db.commit()
+    assert OnlineMigrator().run(BUCKETS.name) == {'name': BUCKETS.name, 'skipped': True, 'reason': 'leased'}
+
+    db.query(schema.AHSchemaBackfill).update({'heartbeat_at': datetime.utcnow() - timedelta(hours=1)})
+    db.commit()
+    db.close()
+    with pytest.raises(OperationalError):             # lease expired: taken over, but the column was never added
+        OnlineMigrator().run(BUCKETS.name)
+    progress = next(b for b in OnlineMigrator().status()['backfills'] if b['name'] == BUCKETS.name)['progress']
+    assert (progress['phase'], progress['owner']) == ('failed', None)
+    assert 'risk_bucket' in progress['error']
+
+
+def test_estimate_is_a_dry_run(audit_rows, client):
+    OnlineMigrator().run(BUCKETS.name, batch_size=100, max_batches=1)
+    est = OnlineMigrator().estimate(BUCKETS.name, batch_size=100)
+    assert (est['rows_to_scan'], est['rows_pending'], est['batches']) == (400, 400, 4)
+    assert est['sample']['rows_updated'] == 100 and est['est_seconds'] is not None
+    assert _buckets()[None] == 400                    # the sampled chunk was rolled back
+
+    with schema.engine.begin() as conn:              # a row from before hit_count existed
+        conn.execute(text("INSERT INTO ah_memory (content, source, importance) VALUES ('legacy', 'agent', 0.5)"))
+    body = client.get('/v1/admin/db/backfills/memory_hit_count/estimate', params={'sample': False}).json()
+    assert (body['rows_pending'], body['est_seconds']) == (1, None)
+    assert client.get('/v1/admin/db/backfills/nope/estimate').status_code == 404
+    names = {b['name'] for b in client.get('/v1/admin/db/backfills').json()['backfills']}
+    assert {'memory_hit_count', BUCKETS.name} <= names
+
+
+def test_paging_queries_render_for_every_dialect(monkeypatch):
+    from contextlib import contextmanager
+
+    from sqlalchemy.dialects import mssql, mysql, postgresql
+
+    seen = []
+
+    class _Db:
+        def execute(self, stmt, *_a):
+            seen.append(stmt)
+            return type('R', (), {'scalar': lambda self: 7})()
+
+    @contextmanager
+    def scope(shared=True):
+        yield _Db()
+
+    monkeypatch.setattr('app.db.session.session_scope', scope)
+    migrator = OnlineMigrator()
+    assert migrator._boundary(_Db(), BUCKETS, 100, 50) == 7
+    assert migrator._expanded(BUCKETS) is True
+    boundary, expanded = seen
+    ms = str(boundary.compile(dialect=mssql.dialect()))
+    assert 'ORDER BY ah_audit_log.id' in ms and 'LIMIT' not in ms      # ROW_NUMBER() or OFFSET … FETCH
+    assert str(expanded.compile(dialect=mssql.dialect())).startswith('SELECT TOP ')
+    for dialect in (mysql.dialect(), postgresql.dialect()):
+        assert 'LIMIT' in str(boundary.compile(dialect=dialect))
+        assert 'LIMIT' in str(expanded.compile(dialect=dialect))
+
+
+def test_memory_terms_backfill_indexes_legacy_rows_in_chunks(sqlite_db, monkeypatch):
+    from app.db.schema import AHMemoryTerm
+    from app.memory.store import MemoryStore
+
+    monkeypatch.setattr(settings, 'db_backfill_sleep_ms', 0)
+    with schema.engine.begin() as conn:              # written before ah_memory_terms existed
+        for i in range(120):
+            conn.execute(text("INSERT INTO ah_memory (content, source, importance, hit_count) "
+                              "VALUES (:c, 'agent', 0.5, 1)"), {'c': f'legacy backup runbook {i}'})
+        conn.execute(text("INSERT INTO ah_memory (content, source, importance, hit_count) "
+                          "VALUES ('it is the', 'agent', 0.5, 1)"))          # stopwords only: no terms
+    MemoryStore().add('backup finished on the new cluster')
+
+    done = OnlineMigrator().run('memory_terms', batch_size=50)
+    assert (done['phase'], done['rows'], done['left_pending']) == ('backfilled', 120, 1)
+    db = sqlite_db()
+    try:
+        assert db.query(AHMemoryTerm.memory_id).distinct().count() == 121
+    finally:
+        db.close()
+    assert MemoryStore().query('backup runbook')[0]['content'].startswith('legacy')
+
+
+def test_ddl_steps_render_for_mssql(monkeypatch):
+    from sqlalchemy.dialects import mssql, postgresql
+
+    from app.db.online_migration import drop_column, drop_index
+
+    class _Conn:
+        def __init__(self, dialect):
+            self.dialect, self.sql = dialect, []
+
+        def exec_driver_sql(self, sql):
+            self.sql.append(sql)
+
+    monkeypatch.setattr(online_migration, '_columns', lambda conn, table: {'risk_score'})
+    monkeypatch.setattr(online_migration, '_indexes', lambda conn, table: {'ix_old'})
+    steps = (add_column('ah_audit_log', Column('risk_bucket', String(8), nullable=True)),
+             create_index('ix_new', 'ah_audit_log', ['risk_bucket']),
+             drop_index('ix_old', 'ah_audit_log'),
+             drop_column('ah_audit_log', 'risk_score'))
+    ms, pg = _Conn(mssql.dialect()), _Conn(postgresql.dialect())
+    for step in steps:
+        step(ms)
+        step(pg)
+    assert ms.sql == ['ALTER TABLE ah_audit_log ADD risk_bucket VARCHAR(8) NULL',
+                      'CREATE INDEX ix_new ON ah_audit_log (risk_bucket)',
+                      'DROP INDEX ix_old ON ah_audit_log',
+                      'ALTER TABLE ah_audit_log DROP COLUMN risk_score']
+    assert pg.sql[0] == 'ALTER TABLE ah_audit_log ADD COLUMN risk_bucket VARCHAR(8)'
+    assert pg.sql[2] == 'DROP INDEX ix_old'
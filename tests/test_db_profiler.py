@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db import schema
+from app.db.profiler import QueryProfiler, fingerprint, query_profiler
+
+
+def test_fingerprint_collapses_literals_and_parameter_lists():
+    a = fingerprint("SELECT * FROM ah_tasks WHERE id IN (?, ?, ?) AND status = 'closed' LIMIT 20")
+    b = fingerprint("SELECT *  FROM ah_tasks\n WHERE id IN (?) AND status = 'failed' LIMIT 5")
+    assert a == b == "SELECT * FROM ah_tasks WHERE id IN (?+) AND status = ? LIMIT ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (?+), ..."
+    assert fingerprint("SELECT ah_lmf_v6_x.id FROM ah_lmf_v6_x") == "SELECT ah_lmf_v6_x.id FROM ah_lmf_v6_x"
+
+
+def test_profiler_charges_units_and_flags_repeated_statements(sqlite_db, monkeypatch, caplog):
+    monkeypatch.setattr(settings, 'db_n_plus_one_threshold', 3)
+    monkeypatch.setattr(settings, 'db_slow_query_ms', 0)
+    profiler = QueryProfiler()
+    profiler.install(schema.engine, 'test')
+    event.listen(schema.Base, 'load', profiler._on_load, propagate=True)
+    db = sqlite_db()
+    try:
+        db.add_all([schema.AHGoal(title=f'g{i}', status='active') for i in range(4)])
+        db.commit()
+        with caplog.at_level(logging.WARNING, logger='archillx.db'):
+            with profiler.track('outer') as outer:
+                with profiler.track('per-goal'):
+                    for i in range(1, 5):
+                        db.query(schema.AHGoal).filter(schema.AHGoal.id == i).all()
+                        db.expunge_all()
+    finally:
+        db.close()
+        event.remove(schema.Base, 'load', profiler._on_load)
+
+    assert outer.queries >= 4 and outer.rows >= 4
+    snap = profiler.snapshot(top=5)
+    assert snap['units']['per-goal']['queries'] >= 4
+    assert snap['units']['outer']['units'] == 1
+    suspects = {(x['label'], x['max_repeats']) for x in snap['n_plus_one']}
+    assert ('per-goal', 4) in suspects and ('outer', 4) in suspects
+    top = next(f for f in snap['fingerprints'] if 'WHERE ah_goals.id = ?' in f['fingerprint'])
+    assert top['count'] == 4 and top['rows'] == 4 and sum(top['buckets'].values()) == 4
+    assert 'db_slow_query' in caplog.text
+
+    metrics = profiler.as_prometheus()
+    assert 'archillx_db_query_duration_seconds_bucket{le="+Inf"}' in metrics
+    assert 'archillx_db_unit_queries_total{unit="per-goal"}' in metrics
+
+
+def test_profile_route_attributes_proactive_cycle_queries(client, sqlite_db, monkeypatch):
+    from app.autonomy.proactive import proactive_engine
+
+    monkeypatch.setattr(settings, 'enable_proactive', True)
+    monkeypatch.setattr(settings, 'enable_daily_driver', True)
+    monkeypatch.setattr(settings, 'enable_sprint_planner', False)
+    monkeypatch.setattr(settings, 'db_n_plus_one_threshold', 3)
+    for i in range(4):
+        proactive_engine.create_project(f'p{i}', 'ship it', {})
+    query_profiler.install(schema.engine, 'test')
+    query_profiler.reset()
+    try:
+        assert client.post('/v1/proactive/run').status_code == 200
+        body = client.get('/v1/admin/db/profile', params={'sort': 'count', 'top': 5}).json()
+    finally:
+        query_profiler.reset()
+
+    assert body['units']['POST /v1/proactive/run']['queries'] >= 8
+    assert any(x['label'] == 'POST /v1/proactive/run' and x['max_repeats'] >= 4 for x in body['n_plus_one'])
+    assert body['fingerprints'][0]['count'] >= 4
+    assert client.get('/v1/admin/db/profile', params={'sort': 'bogus'}).status_code == 422
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db import replica, schema
+
+
+@pytest.fixture
+def replica_db(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(settings, 'db_type', 'sqlite')
+    monkeypatch.setattr(settings, 'sqlite_pool_mode', 'null')
+    monkeypatch.setattr(settings, 'db_read_replica', True)
+    monkeypatch.setattr(settings, 'db_replica_url', '')
+    primary = schema._make_engine.__wrapped__()
+    ro = schema._make_replica_engine.__wrapped__()
+    event.listen(primary, 'connect', lambda conn, _r: schema.sqlite_pragmas(conn))
+    event.listen(ro, 'connect', lambda conn, _r: schema.sqlite_pragmas(conn, query_only=True, read_only=True))
+    schema.Base.metadata.create_all(bind=primary)
+    ran: list[str] = []
+    event.listen(primary, 'before_cursor_execute', lambda *_a: ran.append('primary'))
+    event.listen(ro, 'before_cursor_execute', lambda *_a: ran.append('replica'))
+    monkeypatch.setattr(schema, 'replica_engine', ro)
+    monkeypatch.setattr(schema, 'SessionLocal', sessionmaker(bind=primary, class_=schema.RoutingSession,
+                                                             autocommit=False, autoflush=False,
+                                                             info={'writer_engine': None}))
+    monkeypatch.setattr(replica, 'replica_monitor', replica.ReplicaMonitor())
+    yield primary, ro, ran
+    primary.dispose()
+    ro.dispose()
+
+
+def test_replica_scope_reads_from_read_only_pool_and_writes_to_primary(replica_db):
+    primary, ro, ran = replica_db
+    assert settings.database_replica_url.endswith('primary.db?mode=ro&uri=true')
+    with ro.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO ah_sessions (name) VALUES ('x')"))
+
+    ran.clear()
+    with replica.replica_scope() as db:                              # first use runs the lag probe too
+        assert db.query(schema.AHSession).count() == 0
+        assert set(ran) == {'replica'}
+        ran.clear()
+        db.add(schema.AHSession(name='s1'))
+        db.commit()
+        assert ran and set(ran) == {'primary'}
+    ran.clear()
+    with replica.replica_scope() as db:
+        assert db.query(schema.AHSession.name).scalar() == 's1'     # committed writes visible on the ro pool
+    assert ran == ['replica']
+    assert ro.pool.checkedout() == 0
+
+
+def test_replica_scope_falls_back_to_primary_while_lagging(replica_db, monkeypatch):
+    _primary, _ro, ran = replica_db
+    lag = {'value': 30.0}
+    monkeypatch.setattr(replica, 'probe_lag', lambda _engine: lag['value'])
+    monkeypatch.setattr(settings, 'db_replica_max_lag_s', 5.0)
+    monkeypatch.setattr(settings, 'db_replica_lag_check_s', 3600.0)
+
+    ran.clear()
+    with replica.replica_scope() as db:
+        db.query(schema.AHSession).count()
+    assert ran == ['primary']
+    status = replica.replica_monitor.status()
+    assert status['enabled'] is True and status['healthy'] is False and status['lag_s'] == 30.0
+
+    lag['value'] = 1.0
+    ran.clear()
+    with replica.replica_scope() as db:                              # verdict cached until the next check
+        db.query(schema.AHSession).count()
+    assert ran == ['primary']
+
+    replica.replica_monitor.invalidate()
+    ran.clear()
+    with replica.replica_scope() as db:
+        db.query(schema.AHSession).count()
+    assert ran == ['replica']
+
+    def down(_engine):
+        raise OperationalError('SELECT 1', {}, Exception('unreachable'))
+
+    monkeypatch.setattr(replica, 'probe_lag', down)
+    replica.replica_monitor.invalidate()
+    ran.clear()
+    with replica.replica_scope() as db:
+        db.query(schema.AHSession).count()
+    assert ran == ['primary']
+    assert 'unreachable' in replica.replica_monitor.status()['error']
+
+
+def test_replica_scope_without_replica_joins_unit_of_work(sqlite_db):
+    from app.db.session import session_scope
+
+    with session_scope() as outer:
+        with replica.replica_scope() as db:
+            assert db is outer
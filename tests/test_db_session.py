@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.config import settings
+from app.db import session as db_session
+from app.db.schema import AHSession
+from app.db.session import PoolMonitor, request_scope, session_scope
+from app.utils.telemetry import telemetry
+
+
+@pytest.fixture
+def monitor(sqlite_db, monkeypatch):
+    from app.db import schema
+    mon = PoolMonitor()
+    mon.install(schema.engine, 'test')
+    monkeypatch.setattr(db_session, 'pool_monitor', mon)
+    return mon
+
+
+def test_session_scope_returns_connections(monitor):
+    from app.runtime.lifecycle import lifecycle
+    sid = lifecycle.sessions.create('unit-of-work')
+    assert lifecycle.sessions.get(sid)['name'] == 'unit-of-work'
+    lifecycle.sessions.end(sid)
+    assert monitor.status()['engines']['test']['checked_out'] == 0
+
+    with pytest.raises(RuntimeError):
+        with session_scope() as db:
+            db.add(AHSession(name='discarded'))
+            db.flush()
+            raise RuntimeError('boom')
+    with session_scope() as db:
+        assert db.query(AHSession).filter_by(name='discarded').count() == 0
+    assert monitor.status()['engines']['test']['checked_out'] == 0
+
+
+def test_nested_scopes_share_one_unit_of_work(monitor):
+    with session_scope() as outer:
+        outer.add(AHSession(name='outer'))
+        outer.flush()
+        with session_scope() as inner:
+            assert inner is outer and db_session.current_session() is outer
+            assert inner.query(AHSession).filter_by(name='outer').count() == 1
+        assert monitor.status()['engines']['test']['checked_out'] == 1    # inner exit keeps the transaction
+        outer.commit()
+    assert db_session.current_session() is None
+    assert monitor.status()['engines']['test']['checked_out'] == 0
+
+
+def test_request_scope_shares_one_session_per_thread(monitor):
+    seen = {}
+    with request_scope():
+        with session_scope() as a:
+            a.add(AHSession(name='req'))
+            a.commit()
+        assert monitor.status()['engines']['test']['checked_out'] == 0    # not held between units of work
+        with session_scope() as b:
+            assert b is a and db_session.current_session() is a
+
+            def other():
+                with session_scope() as c:
+                    seen['other'] = c
+            t = threading.Thread(target=other)
+            t.start()
+            t.join()
+        assert seen['other'] is not a
+    assert db_session.current_session() is None
+    assert monitor.status()['engines']['test']['checked_out'] == 0
+
+
+def test_leak_detection_reports_held_connections(monitor, monkeypatch):
+    monkeypatch.setattr(settings, 'db_leak_trace', True)
+    monkeypatch.setattr(settings, 'db_leak_warn_s', 0)
+    before = telemetry.snapshot()['counters'].get('db_connection_leaks_total', 0)
+    with session_scope() as db:
+        db.query(AHSession).count()                     # transaction open → connection held
+        leaks = monitor.leaks()
+        assert len(leaks) == 1 and leaks[0]['engine'] == 'test'
+        assert leaks[0]['origin'].startswith('tests/test_db_session.py:')
+        assert monitor.report_leaks() == 1
+        assert monitor.report_leaks() == 1              # still held, but only reported once
+        assert telemetry.snapshot()['gauges']['db_pool_test_checked_out'] == 1
+    assert telemetry.snapshot()['counters']['db_connection_leaks_total'] == before + 1
+    assert monitor.leaks() == []
+
+
+def test_pool_route(client, monitor):
+    with session_scope() as db:
+        db.query(AHSession).count()
+        resp = client.get('/v1/admin/db/pool', params={'older_than_s': 0})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['engines']['test']['pool'] == 'StaticPool'
+    assert len(body['leaks']) == 1
+
+
+def test_nested_scope_commits_and_failures_stay_inside_its_savepoint(monitor):
+    def helper(name, fail=False):
+        with session_scope() as db:
+            db.add(AHSession(name=name))
+            db.commit()                                  # nested: releases its savepoint only
+            if fail:
+                db.add(AHSession(name=name + '-after'))
+                db.flush()
+                raise ValueError(name)
+
+    with session_scope() as db:
+        db.query(AHSession).count()                      # no DML yet on the outer transaction
+        helper('kept')
+        with pytest.raises(ValueError):
+            helper('failed', fail=True)
+        assert {s.name for s in db.query(AHSession)} == {'kept', 'failed'}
+        db.rollback()                                    # the outer scope still owns the transaction
+    with session_scope() as db:
+        assert db.query(AHSession).count() == 0
+
+    with session_scope() as db:
+        db.add(AHSession(name='outer'))
+        db.flush()
+        try:
+            helper('inner', fail=True)
+        except ValueError:
+            pass
+        db.commit()
+    with session_scope() as db:
+        assert sorted(s.name for s in db.query(AHSession)) == ['inner', 'outer']
+        assert 'commit' not in db.__dict__
+    assert monitor.status()['engines']['test']['checked_out'] == 0
+
+
+def test_closing_over_uncommitted_nested_commits_warns(monitor, caplog):
+    before = telemetry.snapshot()['counters'].get('db_savepoint_commits_discarded_total', 0)
+    with session_scope() as db:
+        with session_scope() as inner:
+            inner.add(AHSession(name='lost'))
+            inner.commit()
+    with session_scope() as db:
+        with session_scope() as inner:
+            inner.query(AHSession).count()                  # read-only nesting: nothing to warn about
+        assert db.query(AHSession).count() == 0
+    assert telemetry.snapshot()['counters']['db_savepoint_commits_discarded_total'] == before + 1
+    assert [r.message.split(';')[0] for r in caplog.records if r.name == 'archillx.db'] == \
+        ['outermost session scope closed without commit']
+
+
+def test_leaks_are_reported_without_new_checkouts(client, monitor, monkeypatch):
+    monkeypatch.setattr(settings, 'db_leak_warn_s', 0)
+    monkeypatch.setattr(settings, 'enable_metrics', True)
+    monkeypatch.setattr(db_session, 'pool_monitor', monitor)
+    before = telemetry.snapshot()['counters'].get('db_connection_leaks_total', 0)
+    with session_scope() as db:
+        db.query(AHSession).count()
+        monitor._last_scan = float('inf')               # the checkout hook will not scan again
+        assert client.get('/v1/metrics').status_code == 200
+        assert telemetry.snapshot()['counters']['db_connection_leaks_total'] == before + 1
+        assert telemetry.snapshot()['gauges']['db_connections_held_past_limit'] == 1
+    assert monitor.status()['leaks'] == []
+    assert telemetry.snapshot()['gauges']['db_connections_held_past_limit'] == 0
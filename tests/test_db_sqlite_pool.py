@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db import schema
+
+
+def _pooled(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(settings, 'db_type', 'sqlite')
+    monkeypatch.setattr(settings, 'sqlite_pool_mode', 'pooled')
+    monkeypatch.setattr(settings, 'sqlite_reader_pool_size', 2)
+    reader = schema._make_engine.__wrapped__()
+    writer = schema._make_writer_engine.__wrapped__()
+    event.listen(reader, 'connect', lambda conn, _r: schema.sqlite_pragmas(conn, query_only=True))
+    event.listen(writer, 'connect', lambda conn, _r: schema.sqlite_pragmas(conn))
+    schema.Base.metadata.create_all(bind=writer)
+    factory = sessionmaker(bind=reader, class_=schema.RoutingSession, autocommit=False, autoflush=False,
+                           info={'writer_engine': writer})
+    return reader, writer, factory
+
+
+def test_pooled_sqlite_routes_writes_to_single_writer(tmp_path, monkeypatch):
+    reader, writer, factory = _pooled(tmp_path, monkeypatch)
+    try:
+        with reader.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA query_only').scalar() == 1
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == settings.sqlite_busy_timeout_ms
+        with writer.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA query_only').scalar() == 0
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+
+        db = factory()
+        try:
+            assert db.query(schema.AHSession).count() == 0           # plain read → reader pool
+            assert writer.pool.checkedout() == 0
+            db.add(schema.AHSession(name='s1'))
+            db.flush()
+            assert db.query(schema.AHSession).count() == 1           # sees its own flush via the writer
+            db.execute(text("UPDATE ah_sessions SET status = 'closed'"))
+            db.commit()
+            assert writer.pool.checkedout() == 0                     # released at transaction end
+            assert db.query(schema.AHSession.status).scalar() == 'closed'
+        finally:
+            db.close()
+    finally:
+        reader.dispose()
+        writer.dispose()
+
+
+def test_nested_scopes_take_the_writer_only_when_they_write(tmp_path, monkeypatch):
+    import pytest
+
+    from app.db import session as db_session
+
+    reader, writer, factory = _pooled(tmp_path, monkeypatch)
+    monkeypatch.setattr(db_session, '_new_session', factory)
+    try:
+        with db_session.session_scope() as db:
+            db.query(schema.AHSession).count()
+            with db_session.session_scope() as inner:                # read-only nesting stays on the reader
+                inner.query(schema.AHSession).count()
+            assert writer.pool.checkedout() == 0
+            with db_session.session_scope() as inner:
+                inner.add(schema.AHSession(name='rolled back'))       # first write: the flush at release
+            db.rollback()                                             # must still undo it
+            with db_session.session_scope() as inner:
+                inner.add(schema.AHSession(name='nested'))
+                inner.commit()                                        # savepoint released on the writer
+                assert writer.pool.checkedout() == 1
+            with pytest.raises(ValueError):
+                with db_session.session_scope() as inner:
+                    inner.add(schema.AHSession(name='undone'))
+                    inner.flush()
+                    raise ValueError('undone')
+            db.commit()
+        assert writer.pool.checkedout() == 0
+        with reader.connect() as conn:
+            assert [r[0] for r in conn.exec_driver_sql('SELECT name FROM ah_sessions')] == ['nested']
+    finally:
+        reader.dispose()
+        writer.dispose()
+
+
+def test_pooled_sqlite_serializes_concurrent_writers(tmp_path, monkeypatch):
+    reader, writer, factory = _pooled(tmp_path, monkeypatch)
+    errors: list[Exception] = []
+
+    def work(n: int) -> None:
+        for i in range(25):
+            db = factory()
+            try:
+                db.query(schema.AHSession).filter(schema.AHSession.name == f'w{n}-{i - 1}').first()
+                db.add(schema.AHSession(name=f'w{n}-{i}'))
+                db.commit()
+            except Exception as exc:                                  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+        with reader.connect() as conn:
+            assert conn.exec_driver_sql('SELECT COUNT(*) FROM ah_sessions').scalar() == 200
+        assert reader.pool.size() == 2 and reader.pool.overflow() <= 0
+    finally:
+        reader.dispose()
+        writer.dispose()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+from app.db import schema, statements
+from app.db.profiler import QueryProfiler
+from app.loop.goal_tracker import goal_tracker
+from app.runtime.lifecycle import lifecycle
+
+
+def test_hot_lookups_reuse_one_prepared_statement_and_hit_the_compiled_cache(sqlite_db):
+    profiler = QueryProfiler()
+    profiler.install(schema.engine, 'test')
+    ids = [goal_tracker.create(f'g{i}', priority=p) for i, p in enumerate((5, 1, 9))]
+    goal_tracker.pause(ids[2])
+    tid = lifecycle.tasks.create('t')
+    lifecycle.tasks.start_executing(tid)
+    before = statements.stats()
+
+    for _ in range(5):
+        assert [g['id'] for g in goal_tracker.list_active()] == [ids[1], ids[0]]
+        assert goal_tracker.get(ids[0])['title'] == 'g0'
+        assert lifecycle.tasks.get(tid)['status'] == 'executing'
+    assert [t['id'] for t in lifecycle.tasks.list_recent(limit=1)] == [tid]
+
+    after = statements.stats()
+    for name in ('goal_by_id', 'goals_by_status', 'task_by_id'):
+        calls = sum(after[name][k] - before.get(name, {}).get(k, 0) for k in ('hits', 'builds'))
+        assert calls >= 5 and after[name]['builds'] == after[name]['variants'] == 1
+    cache = profiler.snapshot(top=50)['compile_cache']
+    assert cache['hits'] >= 15 and cache['hit_ratio'] > 0.5
+    assert cache['engines']['test']['size'] >= 3
+    fp = next(f for f in profiler.snapshot(top=50)['fingerprints']
+              if 'WHERE ah_goals.status = ? ORDER BY ah_goals.priority' in f['fingerprint'])
+    assert fp['count'] == 5 and fp['cache_hit_ratio'] >= 0.8
+
+
+def test_skill_enabled_check_reads_only_the_flag(sqlite_db):
+    from app.runtime.skill_manager import SkillDisabled, skill_manager
+
+    db = sqlite_db()
+    db.add(schema.AHSkill(name='off_skill', version='1', enabled=False, manifest='{}'))
+    db.commit()
+    db.close()
+    with pytest.raises(SkillDisabled):
+        skill_manager._assert_enabled('off_skill')
+    skill_manager._assert_enabled('unknown_skill')                # no row: allowed, as before
+
+
+def test_memory_candidate_variants_filter_like_the_query_builder(sqlite_db):
+    from app.memory.store import memory_store
+
+    for i, (text, src, imp) in enumerate((('alpha deploy notes', 'agent', 0.9), ('alpha rollback', 'user', 0.4),
+                                          ('beta deploy', 'agent', 0.2))):
+        memory_store.add(content=text, source=src, importance=imp)
+    assert [r['content'] for r in memory_store.query('alpha', top_k=5)] == ['alpha deploy notes', 'alpha rollback']
+    assert [r['content'] for r in memory_store.query('deploy', source='agent', min_importance=0.5)] == [
+        'alpha deploy notes']
+    assert statements.memory_candidates(terms=True, source=True, min_importance=True) is \
+        statements.memory_candidates(terms=True, source=True, min_importance=True)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.db.schema import AHLMFBlob, AHLMFEpisodic
+from app.lmf.core.blob_store import BlobNotFound, BlobStore, get_blob_store
+from app.lmf.core.hasher import canonicalize_and_hash
+from app.lmf.core.recovery import WALRecovery, logged_write
+from app.lmf.core.stores import get_episodic_store
+from app.lmf.core.wal import WALManager
+
+
+def _refcount(factory, digest: str) -> int:
+    db = factory()
+    try:
+        return db.query(AHLMFBlob).filter_by(digest=digest).one().refcount
+    finally:
+        db.close()
+
+
+def test_put_dedups_compresses_and_serves_ranges(tmp_path, sqlite_db):
+    store = BlobStore(str(tmp_path / 'blobs'), compress_min_bytes=64)
+    text = 'diff --git a/x b/x\r\n' + 'line of tool output\n' * 500
+    digest = store.put(text)
+    assert digest == canonicalize_and_hash(text)
+    assert store.put(text) == digest
+    assert _refcount(sqlite_db, digest) == 2
+
+    files = [f for _, _, fs in os.walk(tmp_path / 'blobs') for f in fs]
+    assert files == [digest + '.z']                      # one compressed copy, sharded path
+    raw = text.replace('\r\n', '\n').encode()
+    assert store.get(digest, verify=True) == raw
+    assert store.read_range(digest, 100, 50) == raw[100:150]
+    assert store.read_range(digest, len(raw) - 5) == raw[-5:]
+
+    binary = os.urandom(4096)                            # incompressible → stored raw, read via mmap
+    bdigest = store.put(binary)
+    assert store.read_range(bdigest, 1000, 24) == binary[1000:1024]
+    with pytest.raises(BlobNotFound):
+        store.read_range('0' * 64)
+
+
+def test_gc_collects_unreferenced_and_orphaned_blobs(tmp_path, sqlite_db):
+    store = BlobStore(str(tmp_path / 'blobs'), gc_grace_s=60)
+    keep = store.put('still referenced')
+    drop = store.put('about to be released')
+    store.decref(drop)
+    orphan_dir = tmp_path / 'blobs' / 'ff' / 'ee'
+    orphan_dir.mkdir(parents=True)
+    (orphan_dir / ('ffee' + '0' * 60)).write_bytes(b'left behind by a crashed write')
+
+    assert store.gc()['deleted'] == 0                    # inside the grace period
+    report = store.gc(now=datetime.utcnow() + timedelta(hours=1))
+    assert (report['deleted'], report['orphans']) == (1, 1)
+    assert store.exists(keep) and not store.exists(drop)
+    assert store.stats()['blobs'] == 1
+
+
+def test_gc_keeps_files_of_rows_revived_after_its_scan(tmp_path, sqlite_db):
+    from sqlalchemy import event, update
+    from sqlalchemy.orm import Session
+
+    store = BlobStore(str(tmp_path / 'blobs'), gc_grace_s=60)
+    digest = store.put('released, then referenced again')
+    store.decref(digest)
+
+    def revive(state):                                   # a put() landing between gc's SELECT and DELETE
+        if state.is_delete:
+            state.session.execute(update(AHLMFBlob).values(refcount=1, zero_since=None))
+
+    event.listen(Session, 'do_orm_execute', revive)
+    try:
+        report = store.gc(now=datetime.utcnow() + timedelta(hours=1))
+    finally:
+        event.remove(Session, 'do_orm_execute', revive)
+    assert report['deleted'] == 0
+    assert store.exists(digest) and _refcount(sqlite_db, digest) == 1
+
+    for _, path in store._iter_files():                  # a row whose file went missing
+        os.remove(path)
+    assert store.put('released, then referenced again') == digest
+    assert store.get_text(digest) == 'released, then referenced again'
+
+
+def test_large_episodic_content_and_wal_payloads_hold_only_digests(tmp_path, sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'enable_lmf_blob', True)
+    monkeypatch.setattr(settings, 'lmf_blob_dir', str(tmp_path / 'blobs'))
+    monkeypatch.setattr(settings, 'lmf_blob_inline_max_bytes', 256)
+    big = 'stack trace frame\n' * 200
+
+    wal = WALManager(str(tmp_path / 'wal.jsonl'))
+    logged_write(wal, task_id='1', item_type='episodic', payload={'event_type': 'TOOL_OUTPUT', 'content': big})
+    pending = wal.log_start('2', 'episodic', get_blob_store().externalize(
+        {'event_type': 'TOOL_OUTPUT', 'content': big + 'tail'}, 256)[0], [])
+    assert WALRecovery(wal).run()['replayed'] == 1
+
+    wal_text = (tmp_path / 'wal.jsonl').read_text()
+    assert 'stack trace frame' not in wal_text and '"$blob"' in wal_text and pending in wal_text
+
+    db = sqlite_db()
+    rows = db.query(AHLMFEpisodic).order_by(AHLMFEpisodic.id).all()
+    db.close()
+    assert len(rows) == 2 and all(len(r.content) < 600 for r in rows)
+    refs = [json.loads(r.metadata_)['content_blob']['digest'] for r in rows]
+    assert get_blob_store().get_text(refs[0]) == big
+    assert get_blob_store().get_text(refs[1]) == big + 'tail'
+    assert [_refcount(sqlite_db, d) for d in refs] == [1, 1]   # WAL references released on commit
+
+    small = get_episodic_store().add(event_type='NOTE', content='short stays inline')
+    assert small and get_blob_store().stats()['blobs'] == 2
+
+
+def test_archiving_blob_backed_episodic_rows_releases_their_blobs(tmp_path, sqlite_db, monkeypatch):
+    import gzip
+
+    from app.memory.compaction import MemoryCompactor
+
+    monkeypatch.setattr(settings, 'enable_lmf_blob', True)
+    monkeypatch.setattr(settings, 'lmf_blob_dir', str(tmp_path / 'blobs'))
+    monkeypatch.setattr(settings, 'lmf_blob_inline_max_bytes', 256)
+    monkeypatch.setattr(settings, 'evidence_dir', str(tmp_path))
+    big = 'captured tool output\n' * 100
+    store = get_episodic_store()
+    cold = store.add(event_type='TOOL_OUTPUT', content=big, importance=0.1)
+    warm = store.add(event_type='TOOL_OUTPUT', content=big, importance=0.9)   # same blob, stays live
+    solo = store.add(event_type='TOOL_OUTPUT', content=big + 'once', importance=0.1)
+    db = sqlite_db()
+    for row in db.query(AHLMFEpisodic).filter(AHLMFEpisodic.id.in_([cold, warm, solo])):
+        row.created_at = datetime.utcnow() - timedelta(days=90)
+    shared, only = (json.loads(db.get(AHLMFEpisodic, i).metadata_)['content_blob']['digest'] for i in (cold, solo))
+    db.commit()
+    db.close()
+    assert (_refcount(sqlite_db, shared), _refcount(sqlite_db, only)) == (2, 1)
+
+    result = MemoryCompactor().archive_cold_episodic(datetime.utcnow())
+    assert result['archived'] == 2
+    with gzip.open(result['path'], 'rt', encoding='utf-8') as f:
+        recs = {r['id']: r for r in map(json.loads, f)}
+    assert recs[cold]['content'] == big and recs[solo]['content'] == big + 'once'
+    assert 'content_blob' not in json.loads(recs[cold]['metadata_'])
+    assert (_refcount(sqlite_db, shared), _refcount(sqlite_db, only)) == (1, 0)
+
+    report = get_blob_store().gc(now=datetime.utcnow() + timedelta(days=2))
+    assert report['deleted'] == 1
+    assert get_blob_store().exists(shared) and not get_blob_store().exists(only)
+    db = sqlite_db()
+    assert [r.id for r in db.query(AHLMFEpisodic).all()] == [warm]
+    db.close()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.lmf.core.causal import CausalGraph
+
+
+def _chain(graph: CausalGraph, depth: int) -> list[int]:
+    nodes = [{'ref': 'n0', 'node_type': 'CAUSE', 'description': 'root: config push'}]
+    nodes += [{'ref': f'n{i}', 'parent_ref': f'n{i - 1}', 'node_type': 'EFFECT', 'description': f'effect level {i}'}
+              for i in range(1, depth + 1)]
+    return graph.add_nodes(nodes)
+
+
+def test_ten_level_root_cause_walk_is_one_round_trip(sqlite_db):
+    from app.db import schema
+    graph = CausalGraph()
+    ids = _chain(graph, 10)
+
+    statements = []
+    listener = lambda *a, **k: statements.append(a[2])
+    event.listen(schema.engine, 'before_cursor_execute', listener)
+    try:
+        chain = graph.ancestors(ids[-1])
+    finally:
+        event.remove(schema.engine, 'before_cursor_execute', listener)
+
+    assert [n['id'] for n in chain] == list(reversed(ids))
+    assert [n['depth'] for n in chain] == list(range(11))
+    assert len(statements) == 1
+    assert len(graph.ancestors(ids[-1], max_depth=3)) == 4
+
+
+def test_descendants_path_and_subgraph(sqlite_db):
+    graph = CausalGraph()
+    root, a, b, a1, b1 = graph.add_nodes([
+        {'ref': 'r', 'node_type': 'CAUSE', 'description': 'disk full'},
+        {'ref': 'a', 'parent_ref': 'r', 'node_type': 'EFFECT', 'description': 'db writes fail'},
+        {'ref': 'b', 'parent_ref': 'r', 'node_type': 'EFFECT', 'description': 'logs stop'},
+        {'parent_ref': 'a', 'node_type': 'EFFECT', 'description': 'api 500s'},
+        {'parent_ref': 'b', 'node_type': 'EFFECT', 'description': 'alerts silent'},
+    ])
+    other = graph.add_nodes([{'node_type': 'CAUSE', 'description': 'unrelated'}])[0]
+
+    assert [n['id'] for n in graph.descendants(root)] == [root, a, b, a1, b1]
+    assert [n['id'] for n in graph.descendants(root, max_depth=1)] == [root, a, b]
+    assert [n['id'] for n in graph.shortest_path(a1, b1)] == [a1, a, root, b, b1]
+    assert [n['id'] for n in graph.shortest_path(a1, root)] == [a1, a, root]
+    assert graph.shortest_path(a1, other) is None
+
+    sub = graph.subgraph(a)
+    assert {n['id'] for n in sub['nodes']} == {root, a, a1}
+    assert {(e['cause'], e['effect']) for e in sub['edges']} == {(root, a), (a, a1)}
+
+
+def test_batched_edges_reject_cycles_atomically(sqlite_db):
+    graph = CausalGraph()
+    x, y, z = graph.add_nodes([{'node_type': 'CAUSE', 'description': d} for d in 'xyz'])
+    assert graph.add_edges([(y, x), (z, y)]) == 2
+    assert [n['id'] for n in graph.ancestors(z)] == [z, y, x]
+
+    with pytest.raises(ValueError):
+        graph.add_edges([(x, z)])
+    with pytest.raises(LookupError):
+        graph.add_edges([(x, 999)])
+    assert graph.ancestors(x)[-1]['id'] == x       # nothing applied
+
+    with pytest.raises(ValueError):
+        graph.add_nodes([{'parent_ref': 'missing', 'node_type': 'EFFECT', 'description': 'orphan'}])
+
+
+def test_causal_routes(client, sqlite_db):
+    settings.enable_lmf = True
+    resp = client.post('/v1/lmf/causal/nodes', json={'nodes': [
+        {'ref': 'r', 'node_type': 'CAUSE', 'description': 'cert expired'},
+        {'ref': 'e', 'parent_ref': 'r', 'node_type': 'EFFECT', 'description': 'tls handshake errors'},
+    ]})
+    assert resp.status_code == 200
+    root, effect = resp.json()['ids']
+
+    body = client.get(f'/v1/lmf/causal/{effect}/ancestors').json()
+    assert body['root_id'] == root and [n['id'] for n in body['ancestors']] == [root]
+    assert client.get(f'/v1/lmf/causal/path?from_id={effect}&to_id={root}').json()['length'] == 1
+    assert client.get(f'/v1/lmf/causal/{root}/subgraph').json()['edges'] == [{'cause': root, 'effect': effect}]
+    assert client.get('/v1/lmf/causal/999/ancestors').status_code == 404
+    assert client.post('/v1/lmf/causal/edges', json={'edges': [{'effect_id': root, 'cause_id': effect}]}).status_code == 400
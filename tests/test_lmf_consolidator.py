@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.db.schema import AHLMFEpisodic, AHLMFEpisodicCold, AHLMFSemantic
+from app.lmf.core.consolidator import LMFConsolidator
+from app.lmf.core.stores import get_episodic_store, get_lmf_stats, get_semantic_store
+
+
+def _age_all(factory, days: int = 2) -> None:
+    db = factory()
+    db.query(AHLMFEpisodic).update({AHLMFEpisodic.created_at: datetime.utcnow() - timedelta(days=days)})
+    db.commit()
+    db.close()
+
+
+def _seed() -> None:
+    store = get_episodic_store()
+    for node in range(4):
+        store.add(event_type='ALERT', content=f'disk usage high on storage node-{node} volume data', importance=0.4,
+                  tags=['disk'])
+    for _ in range(2):
+        store.add(event_type='ALERT', content='certificate expiring soon for api gateway', importance=0.3)
+    store.add(event_type='ALERT', content='disk usage high on storage node-9 volume data', importance=0.95)
+
+
+def test_clusters_are_promoted_and_sources_moved_cold(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'lmf_consolidator_window_s', 10 * 86400)
+    get_lmf_stats()
+    _seed()
+    get_episodic_store().add(event_type='ALERT', content='disk usage high on storage node-5 volume data', importance=0.4)
+    _age_all(sqlite_db)
+    db = sqlite_db()
+    db.query(AHLMFEpisodic).filter(AHLMFEpisodic.content.like('%node-5%')) \
+        .update({AHLMFEpisodic.created_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    db.close()
+
+    result = LMFConsolidator().run_once()
+    assert (result['episodes'], result['concepts']) == (6, 2)
+
+    db = sqlite_db()
+    try:
+        hot = sorted(r.content for r in db.query(AHLMFEpisodic).all())
+        cold = db.query(AHLMFEpisodicCold).all()
+        facts = {r.concept: r for r in db.query(AHLMFSemantic).all()}
+    finally:
+        db.close()
+    # important and recent events stay searchable
+    assert [c for c in hot if 'node-9' in c or 'node-5' in c] == hot and len(hot) == 2
+    assert len(cold) == 6 and all(r.semantic_id in {f.id for f in facts.values()} for r in cold)
+
+    disk = next(f for c, f in facts.items() if 'disk' in c)
+    meta = json.loads(disk.metadata_)['consolidation']
+    assert meta['episodes'] == 4 and 'observed 4 times' in disk.content
+    assert 'consolidated' in json.loads(disk.tags) and 'disk' in json.loads(disk.tags)
+    assert get_lmf_stats()['episodic'] == 2
+
+
+def test_later_runs_accumulate_and_replay_is_not_double_counted(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'lmf_consolidator_batch_size', 3)
+    monkeypatch.setattr(settings, 'lmf_consolidator_max_batches', 1)
+    store = get_episodic_store()
+    for i in range(5):
+        store.add(event_type='SKILL_FAIL', content=f'web_search timeout after retries attempt {i}', importance=0.2)
+    _age_all(sqlite_db)
+
+    consolidator = LMFConsolidator()
+    first = consolidator.run_once()
+    assert first['episodes'] == 3                     # bounded by batch_size × max_batches
+
+    # simulate a crash after the semantic merge of the next batch but before the move
+    original_move = consolidator._move_to_cold
+    consolidator._move_to_cold = lambda *a, **k: (_ for _ in ()).throw(RuntimeError('crash'))
+    try:
+        consolidator.run_once()
+    except RuntimeError:
+        pass
+    consolidator._move_to_cold = original_move
+    consolidator.run_once()
+
+    facts = get_semantic_store().search(q='web_search')
+    assert len(facts) == 1
+    assert facts[0]['metadata']['consolidation']['episodes'] == 5
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql
+
+from app.config import settings
+from app.db.schema import AHLMFSemantic
+from app.lmf.core import semantic_upsert
+from app.lmf.core.stats import recount
+from app.lmf.core.stores import get_lmf_stats, get_semantic_store
+
+
+def test_upsert_many_merges_in_sql(sqlite_db):
+    get_lmf_stats()
+    store = get_semantic_store()
+    first = store.upsert(concept='redis', content='in-memory store', confidence=0.6, tags=['db'])
+    ids = store.upsert_many([
+        {'concept': 'redis', 'content': 'in-memory key/value store', 'confidence': 0.4},
+        {'concept': 'kafka', 'content': 'log broker', 'confidence': 0.7},
+        {'concept': 'kafka', 'content': 'distributed log broker', 'confidence': 0.5},
+    ])
+    assert ids[0] == first and ids[1] == ids[2]
+
+    facts = {f['concept']: f for f in store.search(limit=10)}
+    assert facts['redis']['content'] == 'in-memory key/value store'
+    assert facts['redis']['confidence'] == 0.6                  # merge keeps the higher confidence
+    assert facts['redis']['evidence_count'] == 2
+    assert (facts['kafka']['content'], facts['kafka']['confidence'], facts['kafka']['evidence_count']) == \
+        ('distributed log broker', 0.7, 2)
+
+    assert store.upsert(concept='redis', content='cache', confidence=0.1) == first
+    assert store.search(q='cache')[0]['confidence'] == 0.1      # single upsert still overwrites
+    assert get_lmf_stats()['semantic'] == 2
+    assert all(not v.get('drift_rows') and not v.get('drift_bytes') for v in recount(['semantic']).values())
+
+
+def test_bulk_import_is_chunked(sqlite_db, monkeypatch):
+    monkeypatch.setattr(semantic_upsert, 'CHUNK_ROWS', 64)
+    items = [{'concept': f'host-{i:04d}', 'content': f'inventory entry {i}'} for i in range(300)]
+    ids = get_semantic_store().upsert_many(items)
+    assert len(set(ids)) == 300
+    assert get_semantic_store().upsert_many(items[:10]) == ids[:10]
+    db = sqlite_db()
+    try:
+        assert db.query(AHLMFSemantic).count() == 300
+        assert db.query(AHLMFSemantic).filter_by(concept='host-0003').one().evidence_count == 2
+    finally:
+        db.close()
+
+
+def test_chunk_ids_come_back_from_the_upsert(sqlite_db, monkeypatch):
+    from app.db import schema
+
+    monkeypatch.setattr(semantic_upsert, 'CHUNK_ROWS', 50)
+    seen = []
+
+    @event.listens_for(schema.engine, 'before_cursor_execute')
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if 'ah_lmf_semantic' in statement and 'ah_lmf_stats' not in statement:
+            seen.append(statement.split()[0])
+
+    ids = get_semantic_store().upsert_many([{'concept': f'c{i}', 'content': 'x'} for i in range(120)])
+    event.remove(schema.engine, 'before_cursor_execute', _record)
+    assert len(set(ids)) == 120
+    assert seen == ['SELECT', 'INSERT'] * 3                    # size read + upsert … RETURNING, no id re-read
+
+
+def test_dialect_statements():
+    table = AHLMFSemantic.__table__
+    rows = [semantic_upsert.normalize({'concept': 'a', 'content': 'x'}, __import__('datetime').datetime(2026, 1, 1))]
+    pg = str(semantic_upsert.build_statement('postgresql', table, rows, True).compile(dialect=postgresql.dialect()))
+    assert 'ON CONFLICT (concept) DO UPDATE' in pg and 'RETURNING' not in pg
+    pg = str(semantic_upsert.build_statement('postgresql', table, rows, True, returning=True)
+             .compile(dialect=postgresql.dialect()))
+    assert pg.endswith('RETURNING ah_lmf_semantic.concept, ah_lmf_semantic.id')
+    my = str(semantic_upsert.build_statement('mysql', table, rows, True).compile(dialect=mysql.dialect()))
+    assert 'ON DUPLICATE KEY UPDATE' in my
+    ms = semantic_upsert.build_statement('mssql', table, rows * 2, False)
+    assert str(ms).startswith('MERGE ah_lmf_semantic WITH (HOLDLOCK)') and len(ms.compile().params) == 18
+    assert str(semantic_upsert.build_statement('mssql', table, rows, True, returning=True)) \
+        .endswith('OUTPUT inserted.concept, inserted.id;')
+    assert semantic_upsert.build_statement('oracle', table, rows, True) is None
+
+
+def test_bulk_route(client, sqlite_db):
+    settings.enable_lmf = True
+    resp = client.post('/v1/lmf/semantic/bulk', json={'items': [
+        {'concept': 'nginx', 'content': 'reverse proxy'}, {'concept': 'nginx', 'content': 'web server'},
+    ]})
+    assert resp.status_code == 200
+    assert resp.json()['count'] == 2 and len(set(resp.json()['memory_ids'])) == 1
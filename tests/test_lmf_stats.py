@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from app.db.schema import AHLMFEpisodic
+from app.lmf.core.stats import lmf_stats_reconciler, recount
+from app.lmf.core.stores import (
+    get_episodic_store, get_lmf_stats, get_procedural_store, get_semantic_store, get_working_store,
+)
+from app.lmf.core.working_cache import WorkingMemoryCache
+
+
+def _drift(report: dict) -> dict:
+    return {k: (v['drift_rows'], v['drift_bytes']) for k, v in report.items() if v.get('drift_rows') or v.get('drift_bytes')}
+
+
+def test_counters_bootstrap_then_move_with_store_writes(sqlite_db):
+    db = sqlite_db()
+    db.add(AHLMFEpisodic(event_type='seed', content='pre-existing', tags='[]', metadata_='{}'))
+    db.commit()
+    db.close()
+
+    assert get_lmf_stats()['episodic'] == 1           # first read counts the tables once
+
+    get_episodic_store().add(event_type='obs', content='disk at 91% on node-3', tags=['disk'])
+    get_semantic_store().upsert(concept='node-3', content='storage node')
+    get_semantic_store().upsert(concept='node-3', content='storage node, 2TB, 部署於機房 B')
+    get_procedural_store().log(skill_name='cleanup', invocation={'path': '/tmp'}, outcome='success')
+    stats = get_lmf_stats(detail=True)
+    assert (stats['episodic']['rows'], stats['semantic']['rows'], stats['procedural']['rows']) == (2, 1, 1)
+    assert stats['semantic']['last_write_at'] is not None
+
+    # rows written behind the stores' back are invisible until a recount: reads do not scan
+    db = sqlite_db()
+    db.add(AHLMFEpisodic(event_type='raw', content='bulk import', tags='[]', metadata_='{}'))
+    db.commit()
+    db.close()
+    assert get_lmf_stats()['episodic'] == 2
+    assert _drift(recount()) == {'episodic': (1, len('bulk import[]{}'))}
+    assert get_lmf_stats()['episodic'] == 3
+
+
+def test_working_memory_paths_leave_no_drift(sqlite_db):
+    get_lmf_stats()
+    store = get_working_store()
+    store.set(task_id=1, key='a', value={'x': 1})
+    store.set(task_id=1, key='a', value={'x': 'longer value'})
+    store.set(task_id=1, key='b', value=[1, 2, 3])
+    store.set(task_id=2, key='a', value='keep')
+    store.clear(1)
+
+    cache = WorkingMemoryCache()
+    cache.set(3, 'k', 'v1')
+    cache.set(3, 'k2', 'v2')
+    cache.flush()
+    cache.set(3, 'k', 'a much longer v1')
+    cache.clear(2)
+    cache.flush()
+
+    assert get_lmf_stats()['working'] == 2
+    assert _drift(recount()) == {}
+
+
+def test_reconciler_corrects_drift(sqlite_db):
+    get_lmf_stats()
+    for i in range(3):
+        get_episodic_store().add(event_type='obs', content=f'event {i}')
+    db = sqlite_db()
+    db.query(AHLMFEpisodic).filter(AHLMFEpisodic.content == 'event 0').delete()
+    db.commit()
+    db.close()
+
+    result = lmf_stats_reconciler.run_once()
+    assert result['layers']['episodic']['drift_rows'] == -1
+    assert get_lmf_stats()['episodic'] == 2
+    assert lmf_stats_reconciler.status()['last_run'] is result
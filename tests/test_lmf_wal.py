@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.lmf.core.wal import Durability, WALManager
+
+
+def _write(wal: WALManager, n: int, prefix: str = 't') -> list[str]:
+    return [wal.log_start(f'{prefix}{i}', 'episodic', {'i': i}, []) for i in range(n)]
+
+
+def test_record_mode_appends_and_reads_back(tmp_path):
+    wal = WALManager(str(tmp_path / 'wal.jsonl'))
+    ids = _write(wal, 3)
+    assert {r.wal_id for r in wal.get_all_records()} == set(ids)
+    assert wal.stats()['durability'] == 'record'
+
+
+@pytest.mark.parametrize('durability', [Durability.GROUP, Durability.OS])
+def test_group_commit_batches_concurrent_writers(tmp_path, durability):
+    wal = WALManager(str(tmp_path / 'wal.jsonl'), durability=durability, group_window_ms=20)
+    ids: list[str] = []
+    lock = threading.Lock()
+
+    def worker(k: int) -> None:
+        got = _write(wal, 10, prefix=f'w{k}-')
+        with lock:
+            ids.extend(got)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = wal.stats()
+    assert stats['records'] == 80
+    assert stats['batches'] < 80
+    # acknowledged records are readable before close
+    assert {r.wal_id for r in wal.get_all_records()} == set(ids)
+    wal.close()
+    with pytest.raises(RuntimeError):
+        wal.log_start('late', 'episodic', {}, [])
+
+
+def test_commit_returns_after_record_is_written(tmp_path):
+    path = tmp_path / 'wal.jsonl'
+    wal = WALManager(str(path), durability=Durability.GROUP, group_window_ms=0)
+    wal_id = wal.log_start('task', 'semantic', {'k': 'v'}, ['h1'])
+    assert wal_id in path.read_text(encoding='utf-8')
+    wal.close()
+
+
+def _segmented(tmp_path, **kw) -> WALManager:
+    opts = {'segment_max_bytes': 2048, 'checkpoint_every': 0}
+    opts.update(kw)
+    return WALManager(str(tmp_path / 'wal'), **opts)
+
+
+def test_segments_rotate_and_rollback_uses_index(tmp_path):
+    wal = _segmented(tmp_path)
+    ids = _write(wal, 40)
+    assert wal.stats()['segments'] > 1
+    wal.log_rollback(ids[0])
+    latest = {r.wal_id: r.status.value for r in wal.get_all_records()}
+    assert latest[ids[0]] == 'ROLLED_BACK'
+    assert len(latest) == 40
+
+
+def test_checkpoint_bounds_replay_and_retires_committed_segments(tmp_path):
+    wal = _segmented(tmp_path)
+    ids = _write(wal, 30)
+    for wal_id in ids[1:]:
+        wal.log_commit_with_payload(wal_id, 'r', {}, 't', 'episodic', [])
+    wal.checkpoint()
+    stats = wal.stats()
+    # every segment but the active one and the one holding the PENDING ids[0] is retired
+    assert stats['retired_segments'] > 0
+    assert stats['segments'] == 2
+    assert (tmp_path / 'wal' / 'archive').is_dir()
+    wal.close()
+
+    reopened = _segmented(tmp_path)
+    assert reopened.stats()['replayed_on_open'] == 0
+    _write(reopened, 3, prefix='after')
+    # simulate a crash: no close(), so no checkpoint covers the last 3 records; the OS drops the flock
+    with pytest.raises(RuntimeError, match='another process'):
+        _segmented(tmp_path)
+    reopened._log._lock_file.close()
+    crashed = _segmented(tmp_path)
+    assert crashed.stats()['replayed_on_open'] == 3
+    crashed.log_rollback(ids[0])
+    assert {r.wal_id: r.status.value for r in crashed.get_all_records()}[ids[0]] == 'ROLLED_BACK'
+    crashed.close()
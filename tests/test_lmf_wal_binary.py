@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import pytest
+
+from app.lmf.core.recovery import WALRecovery
+from app.lmf.core.wal import Durability, WALManager, convert_wal
+
+PAYLOAD = {
+    'event_type': 'TASK_COMPLETE',
+    'content': 'Task #%d finished: web_search returned 5 results for "cron status" in 812 ms; '
+               'summary written to evidence/reports and follow-up goal scheduled for review.',
+    'tags': ['task_success', 'web_search', 'cron'],
+    'metadata': {'skill': 'web_search', 'latency_ms': 812, 'agent': 'archillx'},
+}
+
+
+def _workload(wal: WALManager, n: int = 50) -> list[str]:
+    ids = []
+    for i in range(n):
+        payload = dict(PAYLOAD, content=PAYLOAD['content'] % i)
+        wal_id = wal.log_start(f'task-{i}', 'episodic', payload, ['sha256:' + 'ab' * 32])
+        wal.log_commit_with_payload(wal_id, str(i), payload, f'task-{i}', 'episodic', ['sha256:' + 'ab' * 32])
+        ids.append(wal_id)
+    return ids
+
+
+def test_binary_format_roundtrip_and_ref_commits(tmp_path):
+    wal = WALManager(str(tmp_path / 'wal.walb'), fmt='binary')
+    ids = _workload(wal, 5)
+    wal.log_rollback(ids[0])
+    records = {r.wal_id: r for r in wal.get_all_records()}
+    assert records[ids[0]].status.value == 'ROLLED_BACK'
+    assert records[ids[1]].status.value == 'COMMITTED'
+    assert records[ids[1]].store_result == '1'
+    assert records[ids[1]].payload['tags'] == PAYLOAD['tags']
+
+
+def test_binary_format_cuts_bytes_by_more_than_half(tmp_path):
+    jsonl = tmp_path / 'wal.jsonl'
+    binary = tmp_path / 'wal.walb'
+    _workload(WALManager(str(jsonl)))
+    _workload(WALManager(str(binary), fmt='binary'))
+    assert binary.stat().st_size < jsonl.stat().st_size * 0.5
+
+
+@pytest.mark.parametrize('durability', [Durability.RECORD, Durability.GROUP])
+def test_binary_segmented_rollback_and_reopen(tmp_path, durability):
+    path = str(tmp_path / 'wal')
+    wal = WALManager(path, durability=durability, fmt='binary', segment_max_bytes=1024, checkpoint_every=0)
+    ids = _workload(wal, 20)
+    pending = wal.log_start('p', 'episodic', {'event_type': 'X', 'content': 'pending'}, [])
+    wal.log_rollback(ids[-1])
+    assert wal.stats()['segments'] > 1
+
+    wal._log._lock_file.close()                   # a crashed writer's flock goes with its process
+    crashed = WALManager(path, fmt='binary', segment_max_bytes=1024, checkpoint_every=0)
+    assert [r['wal_id'] for r in crashed.pending_records()] == [pending]
+    assert crashed._log.lookup(ids[-1])['status'] == 'ROLLED_BACK'
+    wal.close()
+    crashed.close()
+
+
+def test_binary_torn_tail_and_corrupt_frame(tmp_path, sqlite_db):
+    path = tmp_path / 'wal.walb'
+    wal = WALManager(str(path), fmt='binary')
+    wal.log_start('a', 'episodic', {'event_type': 'X', 'content': 'first'}, [])
+    second = wal.log_start('b', 'episodic', {'event_type': 'X', 'content': 'second'}, [])
+    wal.close()
+    raw = bytearray(path.read_bytes())
+    raw[-3] ^= 0xFF  # flip a byte inside the last frame -> CRC mismatch at the tail
+    path.write_bytes(bytes(raw) + b'\x00\x00\x00')  # plus a torn partial header
+
+    reopened = WALManager(str(path), fmt='binary')
+    assert reopened.stats()['truncated_bytes'] > 3
+    remaining = {r.wal_id for r in reopened.get_all_records()}
+    assert len(remaining) == 1 and second not in remaining
+    report = WALRecovery(reopened).run()
+    assert report['replayed'] == 1
+
+
+def test_convert_jsonl_to_binary_and_back(tmp_path):
+    src = tmp_path / 'wal.jsonl'
+    _workload(WALManager(str(src)), 10)
+    binary = tmp_path / 'wal.walb'
+    stats = convert_wal(str(src), str(binary), fmt='binary')
+    assert stats['records'] == 20 and stats['refs'] == 10
+    assert stats['bytes_out'] < stats['bytes_in'] * 0.5
+
+    back = tmp_path / 'back.jsonl'
+    convert_wal(str(binary), str(back), fmt='jsonl')
+    original = {r.wal_id: r.model_dump() for r in WALManager(str(src)).get_all_records()}
+    restored = {r.wal_id: r.model_dump() for r in WALManager(str(back)).get_all_records()}
+    assert {k: (v['status'], v['payload']) for k, v in original.items()} == \
+        {k: (v['status'], v['payload']) for k, v in restored.items()}
+    assert {r.wal_id: r.status for r in WALManager(str(binary), fmt='binary').get_all_records()} == \
+        {k: v['status'] for k, v in original.items()}
+
+
+def test_format_mismatch_is_rejected(tmp_path):
+    path = tmp_path / 'wal.jsonl'
+    WALManager(str(path)).log_start('a', 'episodic', {}, [])
+    with pytest.raises(RuntimeError, match='convert'):
+        WALManager(str(path), fmt='binary')
+
+
+def test_checkpoint_keeps_segments_that_live_ref_commits_point_at(tmp_path):
+    path = str(tmp_path / 'wal')
+    opts = dict(fmt='binary', segment_max_bytes=512, checkpoint_every=0)
+    wal = WALManager(path, **opts)
+    early = wal.log_start('early', 'episodic', PAYLOAD, [])
+    first_segment = wal.stats()['active_segment']
+    _workload(wal, 10)
+    wal.log_commit_with_payload(early, 'done', PAYLOAD, 'early', 'episodic', [])
+    assert wal.stats()['active_segment'] > first_segment + 1
+
+    wal.checkpoint()
+    assert wal.stats()['retired_segments'] > 0                      # the filler segments went
+    assert (tmp_path / 'wal' / f'wal-{first_segment:08d}.walb').exists()
+    assert wal._log.lookup(early)['store_result'] == 'done'
+    wal.close()
+
+    reopened = WALManager(path, **opts)                              # refs survive the checkpoint file
+    assert reopened._log.lookup(early)['payload'] == PAYLOAD
+    _workload(reopened, 10)                                          # the ref commit's own segment retires
+    reopened.checkpoint()
+    assert not (tmp_path / 'wal' / f'wal-{first_segment:08d}.walb').exists()
+    assert early not in reopened._log.refs
+    reopened.close()
+
+
+def test_body_codec_is_json_unless_configured(monkeypatch):
+    import types
+
+    from app.lmf.core import wal_codec
+
+    def packb(*_a, **_k):
+        raise AssertionError('msgpack used without LMF_WAL_BODY_CODEC=msgpack')
+
+    monkeypatch.setattr(wal_codec, 'msgpack', types.SimpleNamespace(packb=packb))
+    frame = wal_codec.BinaryCodec('none').encode({'wal_id': 'x', 'status': 'PENDING'})
+    assert frame[0] & 0b11 == wal_codec.BODY_JSON
+
+    monkeypatch.setattr(wal_codec, 'msgpack', None)
+    assert wal_codec.BinaryCodec('none', body='msgpack').body == 'json'
+    with pytest.raises(ValueError):
+        wal_codec.BinaryCodec('none', body='cbor')
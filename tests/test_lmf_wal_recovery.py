@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+
+from app.lmf.core import recovery
+from app.lmf.core.recovery import WALRecovery, logged_write
+from app.lmf.core.wal import WALManager
+
+
+def _episode(content: str) -> dict:
+    return {'event_type': 'TASK_COMPLETE', 'content': content, 'tags': ['t']}
+
+
+def _episodic_rows(factory) -> list:
+    from app.db.schema import AHLMFEpisodic
+
+    db = factory()
+    try:
+        return db.query(AHLMFEpisodic).all()
+    finally:
+        db.close()
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    path = tmp_path / 'wal.jsonl'
+    wal = WALManager(str(path))
+    wal.log_start('t', 'episodic', _episode('a'), [])
+    wal.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"wal_id": "torn", "pay')
+
+    reopened = WALManager(str(path))
+    assert reopened.stats()['truncated_bytes'] > 0
+    reopened.log_start('t', 'episodic', _episode('b'), [])
+    assert len(reopened.get_all_records()) == 2
+
+
+def test_recovery_replays_pending_once(tmp_path, sqlite_db):
+    wal = WALManager(str(tmp_path / 'wal.jsonl'))
+    logged_write(wal, task_id='1', item_type='episodic', payload=_episode('committed'))
+    # crash before apply
+    wal.log_start('2', 'episodic', _episode('never applied'), [])
+    # crash after apply, before commit record
+    landed = wal.log_start('3', 'episodic', _episode('applied'), [])
+    recovery.APPLIERS['episodic'](_episode('applied'), landed)
+
+    report = WALRecovery(wal).run()
+    assert report['pending'] == 2
+    assert report['replayed'] == 2
+    assert report['scanned'] == 4
+    assert sorted(r.content for r in _episodic_rows(sqlite_db)) == ['applied', 'committed', 'never applied']
+
+    again = WALRecovery(wal).run()
+    assert again['pending'] == 0
+    assert len(_episodic_rows(sqlite_db)) == 3
+
+
+def test_recovery_compensates_bad_records(tmp_path, sqlite_db):
+    path = tmp_path / 'wal.jsonl'
+    wal = WALManager(str(path))
+    tampered = wal.log_start('1', 'episodic', _episode('x'), [])
+    unknown = wal.log_start('2', 'nonexistent', {'k': 'v'}, [])
+    wal.close()
+    lines = path.read_text(encoding='utf-8').splitlines()
+    rec = json.loads(lines[0])
+    rec['payload']['content'] = 'tampered'
+    lines[0] = json.dumps(rec)
+    lines.insert(1, '{not json')
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    wal = WALManager(str(path))
+    report = WALRecovery(wal).run()
+    assert report['hash_mismatch'] == 1
+    assert report['corrupt'] == 1
+    assert report['compensated'] == 2
+    assert report['replayed'] == 0
+    latest = {r.wal_id: r.status.value for r in _latest(path)}
+    assert latest[tampered] == 'DISCARDED'
+    assert latest[unknown] == 'ROLLED_BACK'
+    assert _episodic_rows(sqlite_db) == []
+
+
+def _latest(path):
+    from app.lmf.models.wal import WALRecord
+
+    out = {}
+    for line in path.read_text(encoding='utf-8').splitlines():
+        try:
+            rec = WALRecord(**json.loads(line))
+        except Exception:
+            continue
+        out[rec.wal_id] = rec
+    return out.values()
+
+
+def test_segmented_recovery_uses_index(tmp_path, sqlite_db):
+    wal = WALManager(str(tmp_path / 'wal'), segment_max_bytes=1024, checkpoint_every=5)
+    for i in range(12):
+        logged_write(wal, task_id=str(i), item_type='episodic', payload=_episode(f'ok {i}'))
+    wal.log_start('x', 'episodic', _episode('pending'), [])
+
+    report = WALRecovery(wal).run()
+    assert report['scanned'] == 1
+    assert report['replayed'] == 1
+    assert len(_episodic_rows(sqlite_db)) == 13
+
+
+def test_recovery_route_reports_last_run(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, 'enable_lmf', True)
+    monkeypatch.setattr(settings, 'enable_lmf_wal', False)
+    monkeypatch.setattr(recovery, '_last_report', {'replayed': 0})
+    resp = client.get('/v1/lmf/wal/recovery')
+    assert resp.status_code == 200
+    assert resp.json() == {'enabled': False, 'last_recovery': {'replayed': 0}, 'wal': None}
+
+
+def test_store_writes_go_through_the_wal_and_replay_looks_up_by_key(tmp_path, sqlite_db, monkeypatch):
+    from sqlalchemy import event
+
+    from app.config import settings
+    from app.db import schema
+    from app.lmf.core import wal as wal_mod
+    from app.lmf.core.stores import get_episodic_store, get_procedural_store
+
+    wal = WALManager(str(tmp_path / 'wal.jsonl'))
+    monkeypatch.setattr(settings, 'enable_lmf', True)
+    monkeypatch.setattr(settings, 'enable_lmf_wal', True)
+    monkeypatch.setattr(wal_mod, '_wal_manager', wal)
+
+    eid = get_episodic_store().add(**_episode('live write'))
+    pid = get_procedural_store().log(skill_name='web_search', invocation={'q': 'x'}, outcome='success')
+    latest = {r.store_result: r.status.value for r in wal.get_all_records()}
+    assert latest == {str(eid): 'COMMITTED', str(pid): 'COMMITTED'}
+
+    landed = wal.log_start('9', 'episodic', _episode('landed before the crash'), [])
+    recovery.APPLIERS['episodic'](_episode('landed before the crash'), landed)
+    statements = []
+    event.listen(schema.engine, 'before_cursor_execute',
+                 lambda conn, cur, stmt, *a: statements.append(stmt))
+    report = WALRecovery(wal).run()
+    assert (report['replayed'], report['applied_pruned']) == (1, 3)
+    assert not any('LIKE' in s for s in statements)
+    assert len(_episodic_rows(sqlite_db)) == 2
+    db = sqlite_db()
+    try:
+        assert db.query(schema.AHLMFWalApplied).count() == 0
+    finally:
+        db.close()
+
+
+def test_semantic_replay_does_not_count_evidence_twice(tmp_path, sqlite_db):
+    from app.db import schema
+
+    wal = WALManager(str(tmp_path / 'wal.jsonl'))
+    payload = {'concept': 'cron', 'content': 'scheduler', 'source': 'archillx', 'confidence': 0.9,
+               'tags': None, 'metadata': None}
+    first = logged_write(wal, task_id='1', item_type='semantic', payload=payload)
+    landed = wal.log_start('2', 'semantic', payload, [])
+    assert recovery.APPLIERS['semantic'](payload, landed) == first      # reached the DB, then the crash
+
+    report = WALRecovery(wal).run()
+    assert report['replayed'] == 1
+    db = sqlite_db()
+    try:
+        row = db.query(schema.AHLMFSemantic).filter_by(concept='cron').one()
+        assert (str(row.id), row.evidence_count) == (first, 2)
+    finally:
+        db.close()
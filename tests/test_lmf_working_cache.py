@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.db.schema import AHLMFWorking
+from app.lmf.core import working_cache
+from app.lmf.core.stores import get_working_store
+from app.lmf.core.working_cache import WorkingMemoryCache
+
+
+def _rows(factory, task_id: int) -> dict:
+    db = factory()
+    try:
+        return {r.key: r.value for r in db.query(AHLMFWorking).filter(AHLMFWorking.task_id == task_id).all()}
+    finally:
+        db.close()
+
+
+def test_writes_are_served_from_ram_and_flushed_in_batches(sqlite_db):
+    cache = WorkingMemoryCache(flush_batch=2)
+    cache.set(1, 'plan', {'step': 1})
+    cache.set(1, 'notes', ['a'])
+    cache.set(2, 'plan', 'other')
+    assert cache.get(1, 'plan') == {'step': 1}
+    assert _rows(sqlite_db, 1) == {}
+
+    assert cache.flush() == 2
+    assert cache.flush() == 1
+    assert _rows(sqlite_db, 1) == {'plan': '{"step": 1}', 'notes': '["a"]'}
+
+    cache.set(1, 'plan', {'step': 2})
+    cache.flush()
+    assert _rows(sqlite_db, 1)['plan'] == '{"step": 2}'
+    assert sorted(e['key'] for e in cache.get_all(1)) == ['notes', 'plan']
+
+
+def test_read_through_clear_and_lru_eviction(sqlite_db):
+    db = sqlite_db()
+    db.add(AHLMFWorking(task_id=7, key='seed', value='"from-db"'))
+    db.commit()
+    db.close()
+
+    cache = WorkingMemoryCache(max_tasks=1, max_keys_per_task=2)
+    assert cache.get(7, 'seed') == 'from-db'
+    cache.set(7, 'a', 1)
+    cache.set(7, 'b', 2)                 # evicts 'seed' from RAM only
+    assert cache.get(7, 'seed') == 'from-db'
+
+    cache.get(8, 'x')                    # second task pushes task 7 out
+    assert cache.stats()['tasks'] == 1
+    assert cache.get(7, 'a') == 1        # dirty write survives namespace eviction
+
+    cache.clear(7)
+    assert cache.get_all(7) == []
+    cache.set(7, 'fresh', True)
+    cache.flush()
+    assert _rows(sqlite_db, 7) == {'fresh': 'true'}
+
+
+def test_expired_entries_leave_ram_and_db(sqlite_db):
+    db = sqlite_db()
+    db.add(AHLMFWorking(task_id=3, key='stale', value='1', expires_at=datetime.utcnow() - timedelta(seconds=5)))
+    db.commit()
+    db.close()
+
+    cache = WorkingMemoryCache(tick_s=0.05, db_sweep_interval_s=0)
+    cache.set(3, 'short', 'x', ttl_seconds=1)
+    cache.set(3, 'long', 'y', ttl_seconds=600)
+    cache.flush()
+    time.sleep(1.1)
+    cache.sweep()
+    assert cache.stats()['keys'] == 1
+    assert cache.get(3, 'short') is None
+    assert set(_rows(sqlite_db, 3)) == {'long'}
+
+
+def test_store_delegates_and_task_end_releases_namespace(sqlite_db, monkeypatch):
+    from app.runtime.lifecycle import TaskManager
+
+    cache = WorkingMemoryCache()
+    monkeypatch.setattr(settings, 'enable_lmf_working_cache', True)
+    monkeypatch.setattr(working_cache, '_cache', cache)
+    tid = TaskManager().create('working memory task')
+
+    store = get_working_store()
+    store.set(task_id=tid, key='ctx', value={'k': 'v'})
+    assert store.get(tid, 'ctx') == {'k': 'v'}
+    assert _rows(sqlite_db, tid) == {}
+
+    TaskManager().close(tid)
+    assert cache.stats()['tasks'] == 0
+    assert _rows(sqlite_db, tid) == {'ctx': '{"k": "v"}'}
+
+
+def test_get_all_includes_keys_evicted_from_ram(sqlite_db):
+    cache = WorkingMemoryCache(max_keys_per_task=2)
+    for i in range(5):
+        cache.set(4, f'k{i}', i)
+    assert sorted(e['value'] for e in cache.get_all(4)) == [0, 1, 2, 3, 4]
+    cache.flush()
+    assert sorted(e['value'] for e in cache.get_all(4)) == [0, 1, 2, 3, 4]
+
+
+def test_timer_wheel_catches_up_after_a_stall_longer_than_one_revolution(monkeypatch):
+    from app.lmf.core.working_cache import TimerWheel
+
+    clock = [1000.0]
+    monkeypatch.setattr(working_cache.time, 'monotonic', lambda: clock[0])
+    wheel = TimerWheel(tick_s=1.0, slots=8)
+    now = datetime(2026, 10, 19, 12, 0, 0)
+    wheel.schedule((1, 'late'), now + timedelta(seconds=20), now)      # two full rounds out
+    wheel.schedule((1, 'soon'), now + timedelta(seconds=3), now)
+
+    clock[0] += 19                                                     # one stall, 2+ revolutions
+    assert [k for k, _ in wheel.advance()] == [(1, 'soon')]
+    clock[0] += 1
+    assert [k for k, _ in wheel.advance()] == [(1, 'late')]
+
+    wheel.schedule((2, 'far'), now + timedelta(seconds=50), now + timedelta(seconds=20))
+    clock[0] += 29
+    assert wheel.advance() == []
+    clock[0] += 1
+    assert [k for k, _ in wheel.advance()] == [(2, 'far')]
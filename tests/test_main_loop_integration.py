@@ -35,6 +35,7 @@ class GoalTrackerStub:
         self.status = status
         self.progress = progress
         self.update_calls = []
+        self.advance_calls = []
 
     def list_active(self):
         return [{"id": 1, "status": self.status, "progress": self.progress}]
@@ -45,6 +46,9 @@ class GoalTrackerStub:
     def update_progress(self, goal_id, progress, notes=None):
         self.update_calls.append({"goal_id": goal_id, "progress": progress, "notes": notes})
 
+    def advance(self, goal_id, delta, cap=0.99):
+        self.advance_calls.append({"goal_id": goal_id, "delta": delta, "cap": cap})
+
 
 class FeedbackStub:
     def __init__(self):
@@ -159,8 +163,7 @@ def test_main_loop_registered_skill_success_updates_goal(monkeypatch, install_mo
         "source": "agent", "role": "system", "session_id": 55, "task_id": 111
     }
     assert env["select_calls"] == [{"task_type": "web_search", "budget": "high"}]
-    assert env["goals"].update_calls[0]["goal_id"] == 9
-    assert env["goals"].update_calls[0]["progress"] == 0.5
+    assert env["goals"].advance_calls == [{"goal_id": 9, "delta": 0.1, "cap": 0.99}]
     assert [c[0] for c in env["tasks"].calls] == [
         "create", "assign", "start_executing", "start_verifying", "close"
     ]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from app.memory import benchmark
+from app.memory.benchmark import build_corpus, compare, percentile, run
+
+
+def test_build_corpus_plants_ground_truth():
+    corpus = build_corpus(500, n_queries=10, seed=3)
+    assert len(corpus.queries) == 10
+    for q in corpus.queries:
+        assert len(q["relevant_positions"]) == benchmark.RELEVANT_PER_QUERY
+        assert all(pos in corpus.planted for pos in q["relevant_positions"])
+    assert build_corpus(500, n_queries=10, seed=3).queries == corpus.queries
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_run_small_corpus_reports_recall_and_candidates(tmp_path):
+    report = run((400,), n_queries=5, top_k=5, workdir=tmp_path)
+    assert report["params"]["sizes"] == [400]
+    targets = report["results"][0]["targets"]
+    assert set(targets) == {"memory_query", "memory_recent", "lmf_episodic_search"}
+    mq = targets["memory_query"]
+    assert mq["calls"] == 5
+    assert mq["recall_at_k"] > 0
+    assert mq["candidates_returned_mean"] > 0
+    assert mq["p99_ms"] >= mq["p50_ms"]
+
+
+def test_compare_reports_deltas():
+    base = {"version": "a", "results": [{"rows": 10, "targets": {"memory_query": {"p50_ms": 2.0, "p99_ms": 5.0, "recall_at_k": 0.5}}}]}
+    cur = {"version": "b", "results": [{"rows": 10, "targets": {"memory_query": {"p50_ms": 1.5, "p99_ms": 6.0, "recall_at_k": 1.0}}}]}
+    diff = compare(base, cur)
+    assert diff["sizes"]["10"]["memory_query"] == {"p50_ms": -0.5, "p99_ms": 1.0, "recall_at_k": 0.5}
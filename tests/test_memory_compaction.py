@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.memory.compaction import MemoryCompactor, hamming, simhash
+from app.memory.store import MemoryStore
+
+
+def _backdate(factory, memory_id: int, days: int) -> None:
+    from app.db.schema import AHMemory
+
+    db = factory()
+    try:
+        row = db.get(AHMemory, memory_id)
+        row.created_at = datetime.utcnow() - timedelta(days=days)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_simhash_is_close_for_near_duplicates():
+    a = simhash('[ArcHillx] Task #12 succeeded — web_search returned 5 results for cron status')
+    b = simhash('[ArcHillx] Task #1307 succeeded — web_search returned 8 results for cron status')
+    c = simhash('資料庫備份失敗，請檢查磁碟空間')
+    assert hamming(a, b) == 0
+    assert hamming(a, c) > 3
+
+
+def test_band_layout_always_catches_pairs_within_the_threshold():
+    import random
+
+    from app.memory.compaction import _band_keys, _bands
+
+    rng = random.Random(7)
+    for threshold in (0, 3, 5, 9, 15):
+        layout = _bands(threshold)
+        assert len(layout) == max(4, threshold + 1)
+        assert sum(bin(mask).count('1') for _, mask in layout) == 64
+        for _ in range(200):
+            fp = rng.getrandbits(64)
+            near = fp
+            for bit in rng.sample(range(64), threshold):
+                near ^= 1 << bit
+            assert set(_band_keys(None, fp, layout)) & set(_band_keys(None, near, layout))
+
+
+def test_collapse_duplicates_keeps_oldest_with_hit_count(sqlite_db, monkeypatch):
+    from app.db.schema import AHMemory, AHMemoryTerm
+
+    monkeypatch.setattr(settings, 'memory_dedup_hamming_threshold', 3)
+    store = MemoryStore()
+    first = store.add('nightly backup finished ok', tags=['ops'], importance=0.4)
+    store.add('nightly backup finished ok', tags=['backup'], importance=0.7)
+    store.add('Nightly   backup finished OK', importance=0.2)
+    other = store.add('deploy pipeline failed on stage 3')
+
+    result = MemoryCompactor().collapse_duplicates()
+    assert result == {'scanned': 4, 'collapsed': 2, 'survivors': 2}
+
+    db = sqlite_db()
+    try:
+        rows = {r.id: r for r in db.query(AHMemory).all()}
+        assert set(rows) == {first, other}
+        assert rows[first].hit_count == 3
+        assert rows[first].importance == 0.7
+        assert json.loads(rows[first].tags) == ['ops', 'backup']
+        assert {t.memory_id for t in db.query(AHMemoryTerm).all()} == {first, other}
+    finally:
+        db.close()
+
+
+def test_decay_is_anchored_and_not_reapplied(sqlite_db, monkeypatch):
+    from app.db.schema import AHMemory
+
+    monkeypatch.setattr(settings, 'memory_importance_half_life_days', 10.0)
+    mid = MemoryStore().add('old observation', importance=0.8)
+    _backdate(sqlite_db, mid, 10)
+
+    compactor = MemoryCompactor()
+    now = datetime.utcnow()
+    assert compactor.decay_importance(now)['updated'] == 1
+    assert compactor.decay_importance(now)['updated'] == 0
+
+    db = sqlite_db()
+    try:
+        assert abs(db.get(AHMemory, mid).importance - 0.4) < 0.01
+    finally:
+        db.close()
+
+
+def test_archive_cold_moves_rows_to_archive_table(sqlite_db, monkeypatch):
+    from app.db.schema import AHMemory, AHMemoryArchive
+
+    monkeypatch.setattr(settings, 'memory_archive_mode', 'table')
+    monkeypatch.setattr(settings, 'memory_archive_after_days', 30)
+    monkeypatch.setattr(settings, 'memory_archive_max_importance', 0.3)
+    store = MemoryStore()
+    cold = store.add('cold trivia', importance=0.1)
+    warm = store.add('important but old', importance=0.9)
+    store.add('fresh trivia', importance=0.1)
+    _backdate(sqlite_db, cold, 60)
+    _backdate(sqlite_db, warm, 60)
+
+    result = MemoryCompactor().archive_cold(datetime.utcnow())
+    assert result['archived'] == 1
+
+    db = sqlite_db()
+    try:
+        assert db.get(AHMemory, cold) is None
+        archived = db.query(AHMemoryArchive).one()
+        assert archived.memory_id == cold and archived.content == 'cold trivia'
+    finally:
+        db.close()
+
+
+def test_archive_cold_file_mode_writes_gzip_jsonl(sqlite_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'evidence_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'memory_archive_mode', 'file')
+    mid = MemoryStore().add('file tier row', importance=0.0)
+    _backdate(sqlite_db, mid, 90)
+
+    result = MemoryCompactor().archive_cold(datetime.utcnow())
+    assert result['archived'] == 1
+    with gzip.open(result['path'], 'rt', encoding='utf-8') as f:
+        rec = json.loads(f.readline())
+    assert rec['memory_id'] == mid
+
+
+def test_compaction_status_route(client, monkeypatch):
+    from app.memory import compaction as comp_mod
+
+    monkeypatch.setattr(comp_mod.memory_compactor, '_last_run', {'dedup': {'collapsed': 2}})
+    resp = client.get('/v1/memory/compaction')
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['enabled'] is False
+    assert body['policy']['archive_mode'] in ('table', 'file')
+    assert body['last_run']['dedup']['collapsed'] == 2
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from app.config import settings
+from app.memory.store import MemoryStore
+from app.utils.telemetry import telemetry
+
+
+def _skipped() -> float:
+    return telemetry.snapshot()['counters'].get('memory_recall_db_skipped_total', 0.0)
+
+
+def _seed(store: MemoryStore) -> None:
+    for i in range(30):
+        store.add(f'routine cron heartbeat {i}', source='cron', importance=0.1 + (i % 5) * 0.01)
+    store.add('deploy rollback checklist for the payments service', source='ops', importance=0.95, tags=['deploy'])
+    store.add('部署回滾流程：先凍結流量再切換版本', source='ops', importance=0.9, tags=['deploy'])
+    store.add('backup rotation policy keeps 14 days', source='ops', importance=0.8)
+    store.add('low priority deploy note', source='ops', importance=0.05)
+
+
+def test_hot_set_results_match_db_path(sqlite_db, monkeypatch):
+    cold = MemoryStore()
+    _seed(cold)
+    queries = [('deploy rollback', {}), ('回滾', {}), ('cron heartbeat', {}), ('deploy', {'source': 'ops'}),
+               ('deploy', {'tags': ['deploy']}), ('', {'top_k': 3})]
+    expected = [[r['id'] for r in cold.query(q, **kw)] for q, kw in queries]
+
+    monkeypatch.setattr(settings, 'enable_memory_hot_set', True)
+    monkeypatch.setattr(settings, 'memory_hot_set_size', 4)
+    hot = MemoryStore()
+    assert [[r['id'] for r in hot.query(q, **kw)] for q, kw in queries] == expected
+
+
+def test_hot_set_serves_importance_recall_without_db(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'enable_memory_hot_set', True)
+    monkeypatch.setattr(settings, 'memory_hot_set_size', 4)
+    store = MemoryStore()
+    _seed(store)
+    before = _skipped()
+    top = store.query('', top_k=2)
+    assert [r['importance'] for r in top] == [0.95, 0.9]
+    assert _skipped() == before + 1
+
+
+def test_write_path_admits_and_evicts(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, 'enable_memory_hot_set', True)
+    monkeypatch.setattr(settings, 'memory_hot_set_size', 2)
+    store = MemoryStore()
+    a = store.add('alpha', importance=0.5)
+    b = store.add('beta', importance=0.6)
+    store.add('gamma', importance=0.1)
+    entries, watermark = store.hot_set().snapshot()
+    assert {e.id for e in entries} == {a, b}
+    assert watermark[0] == 0.5
+
+    c = store.add('delta', importance=0.9)
+    entries, watermark = store.hot_set().snapshot()
+    assert {e.id for e in entries} == {b, c}
+    assert watermark[0] == 0.6
+    # evicted row is still found through the DB side of the watermark
+    assert [r['id'] for r in store.query('alpha')] == [a]
+
+    store.delete(c)
+    assert c not in {e.id for e in store.hot_set().snapshot()[0]}
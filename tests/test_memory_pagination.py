@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.memory.store import MemoryStore, decode_cursor, encode_cursor
+
+
+def _seed(factory, n: int) -> list[int]:
+    from app.db.schema import AHMemory
+
+    store = MemoryStore()
+    ids = [store.add(f'memory row {i}', source='odd' if i % 2 else 'even') for i in range(n)]
+    # Same timestamp for a block of rows so the id tiebreaker is exercised.
+    base = datetime(2026, 10, 1, 12, 0, 0)
+    db = factory()
+    try:
+        for i, mid in enumerate(ids):
+            db.get(AHMemory, mid).created_at = base + timedelta(minutes=i // 3)
+        db.commit()
+    finally:
+        db.close()
+    return ids
+
+
+def test_cursor_roundtrip_and_invalid():
+    ts = datetime(2026, 10, 1, 12, 0, 0, 123456)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_list_page_walks_every_row_once(sqlite_db):
+    ids = _seed(sqlite_db, 11)
+    store = MemoryStore()
+    seen, cursor = [], None
+    while True:
+        page = store.list_page(limit=4, cursor=cursor)
+        seen.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_list_page_source_filter(sqlite_db):
+    _seed(sqlite_db, 6)
+    page = MemoryStore().list_page(limit=10, source='odd')
+    assert [item['source'] for item in page['items']] == ['odd'] * 3
+    assert page['next_cursor'] is None
+
+
+def test_memory_list_route_rejects_bad_cursor(client):
+    resp = client.get('/v1/memory?cursor=%%%')
+    assert resp.status_code == 400
+    assert resp.json()['detail']['code'] == 'INVALID_CURSOR'
+
+
+def test_memory_export_streams_ndjson(client, sqlite_db):
+    ids = _seed(sqlite_db, 5)
+    resp = client.get('/v1/memory/export')
+    assert resp.status_code == 200
+    assert resp.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row['id'] for row in lines] == ids
+
+
+def test_list_page_reaches_rows_without_created_at(sqlite_db):
+    from app.db.schema import AHMemory
+
+    ids = _seed(sqlite_db, 7)
+    db = sqlite_db()
+    try:
+        for mid in ids[1:6:2]:                      # legacy rows with no timestamp, interleaved by id
+            db.get(AHMemory, mid).created_at = None
+        db.commit()
+    finally:
+        db.close()
+    store = MemoryStore()
+    seen, cursor = [], None
+    while True:
+        page = store.list_page(limit=2, cursor=cursor)
+        seen.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    nulls = sorted(ids[1:6:2], reverse=True)
+    assert seen == [i for i in sorted(ids, reverse=True) if i not in nulls] + nulls
+    assert decode_cursor(encode_cursor(None, 5)) == (None, 5)
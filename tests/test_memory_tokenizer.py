@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from app.memory import tokenizer
+from app.memory.store import MemoryStore
+
+
+def test_cjk_runs_become_bigrams_and_trigrams():
+    assert tokenizer.query_terms('資料庫備份') == ['資料', '料庫', '庫備', '備份']
+    terms = tokenizer.index_terms('資料庫備份')
+    assert '資料庫' in terms and '庫備份' in terms and '料庫' in terms
+
+
+def test_latin_terms_are_stemmed_and_stopwords_dropped():
+    assert tokenizer.query_terms('The cron jobs are running') == ['cron', 'job', 'run']
+    assert tokenizer.stem('failed') == 'fail'
+    assert tokenizer.stem('status') == 'status'
+
+
+def test_mixed_language_text_keeps_both_scripts():
+    terms = tokenizer.query_terms('部署 MySQL 失敗')
+    assert 'mysql' in terms
+    assert '部署' in terms and '失敗' in terms
+
+
+def test_query_recalls_partial_chinese_phrase_through_index(sqlite_db):
+    store = MemoryStore()
+    hit = store.add('昨天夜間的資料庫備份任務失敗，需要重新執行', tags=['ops'], importance=0.6)
+    store.add('週報已寄出給團隊', importance=0.9)
+    store.add('Deploy pipeline succeeded for the web service', importance=0.7)
+
+    results = store.query('資料庫備份')
+    assert [r['id'] for r in results] == [hit]
+
+    results = store.query('deployed pipelines')
+    assert results and 'pipeline' in results[0]['content']
+
+
+def test_delete_and_reindex_maintain_term_rows(sqlite_db):
+    from app.db.schema import AHMemoryTerm
+
+    store = MemoryStore()
+    keep = store.add('記憶體壓縮排程')
+    drop = store.add('another memory row')
+    assert store.delete(drop) is True
+
+    db = sqlite_db()
+    try:
+        assert db.query(AHMemoryTerm).filter(AHMemoryTerm.memory_id == drop).count() == 0
+        before = db.query(AHMemoryTerm).count()
+    finally:
+        db.close()
+
+    assert store.reindex(batch_size=1) == 1
+    db = sqlite_db()
+    try:
+        assert db.query(AHMemoryTerm).count() == before
+    finally:
+        db.close()
+    assert store.query('壓縮')[0]['id'] == keep
+
+
+def test_pre_upgrade_rows_are_backfilled_and_long_rows_count_dropped_terms(sqlite_db):
+    from sqlalchemy import text
+
+    from app.db import schema
+    from app.utils.telemetry import telemetry
+
+    store = MemoryStore()
+    with schema.engine.begin() as conn:              # written before ah_memory_terms existed
+        conn.execute(text("INSERT INTO ah_memory (content, source, importance, hit_count) "
+                          "VALUES ('legacy backup runbook', 'agent', 0.5, 1)"))
+    fresh = store.add('backup finished on the new cluster')
+    assert [r['id'] for r in store.query('backup')] == [fresh]
+
+    assert store.reindex(only_missing=True) == 1
+    assert store.reindex(only_missing=True) == 0
+    assert len(store.query('backup')) == 2
+
+    before = telemetry.snapshot()['counters'].get('memory_index_terms_dropped_total', 0)
+    words = [f'w{i}' for i in range(tokenizer.MAX_INDEX_TERMS + 10)]
+    store.add(' '.join(words))
+    assert telemetry.snapshot()['counters']['memory_index_terms_dropped_total'] == before + 10